@@ -82,6 +82,12 @@ public class RelationalAlgebraGenerator {
 
 	private List<RelOptRule> rules;
 
+	/**
+	 * The calcite schema that wraps the {@link BlazingSchema}. Calcite caches the table names of
+	 * this schema, so it has to be refreshed when the catalog changes. See {@link #refreshSchema()}
+	 */
+	private SchemaPlus blazingSchema;
+
 	/**
 	 * Constructor for the relational algebra generator class. It will take the
 	 * schema store it in the  {@link #config} and then set up the  {@link
@@ -104,6 +110,7 @@ public class RelationalAlgebraGenerator {
 			SchemaPlus schema = calciteConnection.getRootSchema();
 
 			schema.add(newSchema.getName(), newSchema);
+			blazingSchema = schema.getSubSchema(newSchema.getName());
 
 			// schema.add("EMP", table);
 			List<String> defaultSchema = new ArrayList<String>();
@@ -132,6 +139,7 @@ public class RelationalAlgebraGenerator {
 			config = null;
 			planner = null;
 			program = null;
+			blazingSchema = null;
 		}
 	}
 
@@ -142,6 +150,20 @@ public class RelationalAlgebraGenerator {
 		this.program = hepProgram;
 	}
 
+	/**
+	 * Makes the tables that were added, removed or replaced in the catalog visible to the planner.
+	 * The {@link BlazingSchema} always reads its tables from the catalog database, but calcite keeps
+	 * a cache of the table names, which is invalidated here. This avoids having to create a new
+	 * connection, catalog reader and planner every time a table is created or dropped.
+	 */
+	public void
+	refreshSchema() {
+		if(blazingSchema != null) {
+			blazingSchema.setCacheEnabled(false);
+			blazingSchema.setCacheEnabled(true);
+		}
+	}
+
 	public void
 	setRules(List<RelOptRule> rules) {
 		this.rules = rules;
@@ -2,9 +2,11 @@ package com.blazingdb.calcite.catalog.domain;
 
 import org.hibernate.annotations.Cascade;
 
+import java.util.Collection;
 import java.util.HashMap;
 import java.util.LinkedHashSet;
 import java.util.Map;
+import java.util.concurrent.ConcurrentHashMap;
 import java.util.Set;
 
 import javax.persistence.Column;
@@ -62,16 +64,17 @@ public class CatalogDatabaseImpl implements CatalogDatabase {
 	*/
 
 	/**
-	 * Empty constructor just sets up an empty HashMap for the tables.
+	 * Empty constructor just sets up an empty map for the tables.
+	 * The map is concurrent because several planners can read the catalog while tables are being replaced.
 	 */
-	public CatalogDatabaseImpl() { this.databaseTables = new HashMap<String, CatalogTableImpl>(); }
+	public CatalogDatabaseImpl() { this.databaseTables = new ConcurrentHashMap<String, CatalogTableImpl>(); }
 	/**
-	 * Constructor that sets up the HashMap for tables and sets the name.
+	 * Constructor that sets up the map for tables and sets the name.
 	 * @param name the name we are to give this database.
 	 */
 	public CatalogDatabaseImpl(String name) {
 		this.name = name;
-		this.databaseTables = new HashMap<String, CatalogTableImpl>();
+		this.databaseTables = new ConcurrentHashMap<String, CatalogTableImpl>();
 	}
 
 	public Long
@@ -162,4 +165,33 @@ public class CatalogDatabaseImpl implements CatalogDatabase {
 	removeTable(String tableName) {
 		this.databaseTables.remove(tableName);
 	}
+	/**
+	 * Adds a table to this database, replacing the table with the same name if there was one.
+	 * @param table the table to be added to the database.
+	 * @return the table that was replaced or null if there was no table with the same name.
+	 */
+	public CatalogTableImpl
+	replaceTable(CatalogTableImpl table) {
+		return this.databaseTables.put(table.getTableName(), table);
+	}
+	/**
+	 * Adds or replaces several tables in this database.
+	 * @param tables the tables to be added to the database.
+	 */
+	public void
+	replaceTables(Collection<CatalogTableImpl> tables) {
+		for(CatalogTableImpl table : tables) {
+			this.databaseTables.put(table.getTableName(), table);
+		}
+	}
+	/**
+	 * Removes several tables from this database.
+	 * @param tableNames the names of the tables to be removed.
+	 */
+	public void
+	removeTables(Collection<String> tableNames) {
+		for(String tableName : tableNames) {
+			this.databaseTables.remove(tableName);
+		}
+	}
 }
@@ -263,6 +263,44 @@ public class BlazingCatalogTest {
 		// TODO: some kind of assertion that we got the reight relational algebra
 	}
 
+	@Test()
+	public void
+	incrementalCatalogUpdateTest() throws Exception {
+		System.out.println(
+			"=============================== INCREMENTAL CATALOG UPDATE TEST ====================================");
+
+		CatalogDatabaseImpl db = new CatalogDatabaseImpl("main");
+
+		List<CatalogColumnImpl> columns = new ArrayList<CatalogColumnImpl>();
+		columns.add(new CatalogColumnImpl("col1", CatalogColumnDataType.INT64, 1));
+		columns.add(new CatalogColumnImpl("col2", CatalogColumnDataType.INT32, 2));
+		db.addTable(new CatalogTableImpl("table1", db, columns));
+
+		BlazingSchema schema = new BlazingSchema(db);
+		RelationalAlgebraGenerator algebraGen = new RelationalAlgebraGenerator(schema);
+		algebraGen.getRelationalAlgebra("select col1 from `table1`");
+
+		List<CatalogColumnImpl> newColumns = new ArrayList<CatalogColumnImpl>();
+		newColumns.add(new CatalogColumnImpl("col3", CatalogColumnDataType.FLOAT64, 1));
+		List<CatalogTableImpl> newTables = new ArrayList<CatalogTableImpl>();
+		newTables.add(new CatalogTableImpl("table2", db, newColumns));
+		db.replaceTables(newTables);
+		algebraGen.refreshSchema();
+
+		// the same generator must see the new table
+		algebraGen.getRelationalAlgebra("select col3 from `table2`");
+
+		List<String> removedTables = new ArrayList<String>();
+		removedTables.add("table1");
+		db.removeTables(removedTables);
+		algebraGen.refreshSchema();
+
+		String algebra = algebraGen.getRelationalAlgebraString("select col1 from `table1`");
+		if(!algebra.startsWith("fail:")) {
+			throw new Exception("table1 should not be visible after being removed");
+		}
+	}
+
 	@Test()
 	public void
 	testLoadDataInFile()
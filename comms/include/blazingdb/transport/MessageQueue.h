@@ -1,17 +1,23 @@
 #pragma once
 
 #include <condition_variable>
+#include <deque>
+#include <functional>
 #include <mutex>
 #include <string>
 #include <vector>
 #include <set>
 #include <map>
+#include <unordered_map>
 
 #include "blazingdb/transport/Message.h"
 
 namespace blazingdb {
 namespace transport {
 
+/// The messages received by the server, indexed by their message token. Every getMessage waits only for
+/// the messages with its token, so a message does not wake up the threads waiting for the others.
+/// The kernels that do not want to wait for the messages in a thread use notifyWhenMessages or a listener instead.
 class MessageQueue {
 public:
   MessageQueue();
@@ -31,16 +37,44 @@ public:
 
   void putMessage(std::shared_ptr<ReceivedMessage>& message);
 
-  
+  /// calls the callback once count messages with the message token were received and not taken yet, right away
+  /// if they already were. Otherwise it is called by the thread that puts the last of them, without the lock.
+  void notifyWhenMessages(const std::string& messageToken, std::size_t count, std::function<void()> callback);
+
+  /// gives the messages with the message token to the listener as they are received, instead of keeping them
+  /// for getMessage. The ones received before are given right away, and the sentinels are given as nullptr.
+  /// It is called with the lock held, so it is not called anymore once removeMessageListener returns.
+  void setMessageListener(const std::string& messageToken,
+                          std::function<void(std::shared_ptr<ReceivedMessage>)> listener);
+
+  void removeMessageListener(const std::string& messageToken);
+
 private:
   std::shared_ptr<ReceivedMessage> getMessageQueue(const std::string& messageToken);
 
   void putMessageQueue(std::shared_ptr<ReceivedMessage>& message);
 
+  bool hasMessage(const std::string& messageToken) const;
+
 private:
+  // the threads waiting for a message token
+  struct MessageWaiter {
+    std::condition_variable condition_variable;
+    std::size_t count = 0;
+  };
+
+  // a notifyWhenMessages call that was not called back yet
+  struct MessageCallback {
+    std::size_t count;
+    std::function<void()> callback;
+  };
+
   std::mutex mutex_;
-  std::vector<std::shared_ptr<ReceivedMessage>> message_queue_;
-  std::condition_variable condition_variable_;
+  // the messages of every message token, in the order they were put
+  std::unordered_map<std::string, std::deque<std::shared_ptr<ReceivedMessage>>> message_queue_;
+  std::unordered_map<std::string, MessageWaiter> waiters_;
+  std::unordered_map<std::string, std::vector<MessageCallback>> callbacks_;
+  std::unordered_map<std::string, std::function<void(std::shared_ptr<ReceivedMessage>)>> listeners_;
 };
 
 }  // namespace transport
@@ -128,6 +128,27 @@ public:
   virtual void putMessage(const uint32_t context_token,
                           std::shared_ptr<ReceivedMessage> &message);
 
+  /**
+   * It calls the callback once count messages with the message token were
+   * received, see MessageQueue::notifyWhenMessages. It is used instead of
+   * getMessage by the kernels that do not wait for the messages in a thread.
+   */
+  virtual void notifyWhenMessages(const uint32_t context_token,
+                                  const std::string &messageToken,
+                                  std::size_t count,
+                                  std::function<void()> callback);
+
+  /**
+   * It gives the messages with the message token to the listener as they are
+   * received, see MessageQueue::setMessageListener.
+   */
+  virtual void setMessageListener(const uint32_t context_token,
+                                  const std::string &messageToken,
+                                  std::function<void(std::shared_ptr<ReceivedMessage>)> listener);
+
+  virtual void removeMessageListener(const uint32_t context_token,
+                                     const std::string &messageToken);
+
 
   Server::MakeDeviceFrameCallback getDeviceDeserializationFunction(const std::string &endpoint);
 
@@ -20,11 +20,10 @@ std::shared_ptr<ReceivedMessage> MessageQueue::getMessage(
   std::unique_lock<std::mutex> lock(mutex_);
 
   CodeTimer blazing_timer;
-  while(!condition_variable_.wait_for(lock, 60000ms, [&, this] {
-      bool got_the_message = std::any_of(this->message_queue_.cbegin(),
-                        this->message_queue_.cend(), [&](const auto &e) {
-                          return e->getMessageTokenValue() == messageToken;
-                        });
+  MessageWaiter &waiter = waiters_[messageToken];
+  waiter.count++;
+  while(!waiter.condition_variable.wait_for(lock, 60000ms, [&, this] {
+      bool got_the_message = hasMessage(messageToken);
       if (!got_the_message && blazing_timer.elapsed_time() > 59000){
         auto logger = spdlog::get("batch_logger");
         logger->warn("|||{info}|{duration}|messageToken|{messageToken}||",
@@ -34,26 +33,92 @@ std::shared_ptr<ReceivedMessage> MessageQueue::getMessage(
       }
       return got_the_message;
     })){}
+  if (--waiter.count == 0) {
+    waiters_.erase(messageToken);
+  }
   return getMessageQueue(messageToken);
 }
 
 void MessageQueue::putMessage(std::shared_ptr<ReceivedMessage> &message) {
   std::unique_lock<std::mutex> lock(mutex_);
+  const std::string messageToken = message->getMessageTokenValue();
+  auto listener = listeners_.find(messageToken);
+  if (listener != listeners_.end()) {
+    listener->second(message->is_sentinel() ? nullptr : message);
+    return;
+  }
+
   putMessageQueue(message);
+  // only the threads waiting for this message token are woken up. It is notified with the lock held,
+  // so the waiter is not erased meanwhile
+  auto waiter = waiters_.find(messageToken);
+  if (waiter != waiters_.end()) {
+    waiter->second.condition_variable.notify_all();
+  }
+
+  std::vector<std::function<void()>> ready_callbacks;
+  auto callbacks = callbacks_.find(messageToken);
+  if (callbacks != callbacks_.end()) {
+    std::size_t received = message_queue_[messageToken].size();
+    auto & pending = callbacks->second;
+    for (auto it = pending.begin(); it != pending.end();) {
+      if (it->count <= received) {
+        ready_callbacks.push_back(std::move(it->callback));
+        it = pending.erase(it);
+      } else {
+        it++;
+      }
+    }
+    if (pending.empty()) {
+      callbacks_.erase(callbacks);
+    }
+  }
   lock.unlock();
-  condition_variable_.notify_all(); // Note: Very important to notify all threads
+  for (auto & callback : ready_callbacks) {
+    callback();
+  }
+}
+
+void MessageQueue::notifyWhenMessages(const std::string &messageToken, std::size_t count, std::function<void()> callback) {
+  std::unique_lock<std::mutex> lock(mutex_);
+  auto messages = message_queue_.find(messageToken);
+  std::size_t received = messages == message_queue_.end() ? 0 : messages->second.size();
+  if (received < count) {
+    callbacks_[messageToken].push_back({count, std::move(callback)});
+    return;
+  }
+  lock.unlock();
+  callback();
+}
+
+void MessageQueue::setMessageListener(const std::string &messageToken,
+                                      std::function<void(std::shared_ptr<ReceivedMessage>)> listener) {
+  std::unique_lock<std::mutex> lock(mutex_);
+  auto messages = message_queue_.find(messageToken);
+  if (messages != message_queue_.end()) {
+    for (auto & message : messages->second) {
+      listener(message->is_sentinel() ? nullptr : message);
+    }
+    message_queue_.erase(messages);
+  }
+  listeners_[messageToken] = std::move(listener);
+}
+
+void MessageQueue::removeMessageListener(const std::string &messageToken) {
+  std::unique_lock<std::mutex> lock(mutex_);
+  listeners_.erase(messageToken);
 }
 
 std::shared_ptr<ReceivedMessage> MessageQueue::getMessageQueue(
     const std::string &messageToken) {
-  auto it = std::find_if(message_queue_.begin(), message_queue_.end(),
-                           [&messageToken](const auto &e) {
-                             return e->getMessageTokenValue() == messageToken;
-                           });
+  auto it = message_queue_.find(messageToken);
   assert(it != message_queue_.end());
 
-  std::shared_ptr<ReceivedMessage> message = *it;
-  message_queue_.erase(it, it + 1);
+  std::shared_ptr<ReceivedMessage> message = it->second.front();
+  it->second.pop_front();
+  if (it->second.empty()) {
+    message_queue_.erase(it);
+  }
 
   if (message->is_sentinel()) {
     return nullptr;
@@ -63,7 +128,11 @@ std::shared_ptr<ReceivedMessage> MessageQueue::getMessageQueue(
 }
 
 void MessageQueue::putMessageQueue(std::shared_ptr<ReceivedMessage> &message) {
-  message_queue_.push_back(message);
+  message_queue_[message->getMessageTokenValue()].push_back(message);
+}
+
+bool MessageQueue::hasMessage(const std::string &messageToken) const {
+  return message_queue_.find(messageToken) != message_queue_.end();
 }
 
 }  // namespace transport
@@ -65,6 +65,38 @@ void Server::putMessage(const uint32_t context_token, std::shared_ptr<ReceivedMe
 	message_queue.putMessage(message);
 }
 
+void Server::notifyWhenMessages(const uint32_t context_token, const std::string & messageToken, std::size_t count, std::function<void()> callback) {
+	std::shared_lock<std::shared_timed_mutex> lock(context_messages_mutex_);
+	if(context_messages_map_.find(context_token) == context_messages_map_.end()) {
+		lock.unlock();
+		registerContext(context_token);
+		lock.lock();
+	}
+
+	MessageQueue & message_queue = context_messages_map_.at(context_token);
+	message_queue.notifyWhenMessages(messageToken, count, std::move(callback));
+}
+
+void Server::setMessageListener(const uint32_t context_token, const std::string & messageToken, std::function<void(std::shared_ptr<ReceivedMessage>)> listener) {
+	std::shared_lock<std::shared_timed_mutex> lock(context_messages_mutex_);
+	if(context_messages_map_.find(context_token) == context_messages_map_.end()) {
+		lock.unlock();
+		registerContext(context_token);
+		lock.lock();
+	}
+
+	MessageQueue & message_queue = context_messages_map_.at(context_token);
+	message_queue.setMessageListener(messageToken, std::move(listener));
+}
+
+void Server::removeMessageListener(const uint32_t context_token, const std::string & messageToken) {
+	std::shared_lock<std::shared_timed_mutex> lock(context_messages_mutex_);
+	auto it = context_messages_map_.find(context_token);
+	if(it != context_messages_map_.end()) {
+		it->second.removeMessageListener(messageToken);
+	}
+}
+
 Server::MakeDeviceFrameCallback Server::getDeviceDeserializationFunction(const std::string & endpoint) {
 	const auto & iterator = device_deserializer_.find(endpoint);
 	if(iterator == device_deserializer_.end()) {
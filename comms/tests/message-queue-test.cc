@@ -0,0 +1,144 @@
+#include <blazingdb/transport/MessageQueue.h>
+
+#include <atomic>
+#include <chrono>
+#include <iostream>
+#include <thread>
+#include <vector>
+
+#include <gtest/gtest.h>
+
+using blazingdb::transport::Address;
+using blazingdb::transport::MessageQueue;
+using blazingdb::transport::Node;
+using blazingdb::transport::ReceivedMessage;
+
+static std::shared_ptr<ReceivedMessage> makeMessage(const std::string &messageToken, bool is_sentinel = false) {
+  Node node(Address::TCP("1.2.3.4", 9999, 1234));
+  return std::make_shared<ReceivedMessage>(messageToken, 0, node, is_sentinel);
+}
+
+TEST(MessageQueueTest, MessagesWithTheSameTokenAreGottenInOrder) {
+  MessageQueue queue;
+  auto first = makeMessage("a");
+  auto other = makeMessage("b");
+  auto second = makeMessage("a");
+  queue.putMessage(first);
+  queue.putMessage(other);
+  queue.putMessage(second);
+
+  EXPECT_EQ(queue.getMessage("a"), first);
+  EXPECT_EQ(queue.getMessage("a"), second);
+  EXPECT_EQ(queue.getMessage("b"), other);
+}
+
+TEST(MessageQueueTest, SentinelsAreGottenAsNull) {
+  MessageQueue queue;
+  auto sentinel = makeMessage("a", true);
+  queue.putMessage(sentinel);
+  EXPECT_EQ(queue.getMessage("a"), nullptr);
+}
+
+TEST(MessageQueueTest, WaitersGetTheMessagesOfTheirToken) {
+  MessageQueue queue;
+  const int num_tokens = 8;
+  std::vector<std::shared_ptr<ReceivedMessage>> received(num_tokens);
+  std::vector<std::thread> consumers;
+  for (int i = 0; i < num_tokens; i++) {
+    consumers.emplace_back([&queue, &received, i] { received[i] = queue.getMessage(std::to_string(i)); });
+  }
+  // the messages come in reverse order, each one has to wake up only its waiter
+  std::this_thread::sleep_for(std::chrono::milliseconds(50));
+  for (int i = num_tokens - 1; i >= 0; i--) {
+    auto message = makeMessage(std::to_string(i));
+    queue.putMessage(message);
+  }
+  for (auto &consumer : consumers) {
+    consumer.join();
+  }
+  for (int i = 0; i < num_tokens; i++) {
+    ASSERT_NE(received[i], nullptr);
+    EXPECT_EQ(received[i]->getMessageTokenValue(), std::to_string(i));
+  }
+}
+
+TEST(MessageQueueTest, CallbacksAreCalledOnceTheMessagesArrive) {
+  MessageQueue queue;
+  auto first = makeMessage("a");
+  queue.putMessage(first);
+
+  int calls = 0;
+  queue.notifyWhenMessages("a", 1, [&calls] { calls++; });
+  EXPECT_EQ(calls, 1);
+
+  queue.notifyWhenMessages("a", 3, [&calls] { calls++; });
+  auto other = makeMessage("b");
+  auto second = makeMessage("a");
+  queue.putMessage(other);
+  queue.putMessage(second);
+  EXPECT_EQ(calls, 1);
+  auto third = makeMessage("a");
+  queue.putMessage(third);
+  EXPECT_EQ(calls, 2);
+
+  // the messages are still there for getMessage
+  EXPECT_EQ(queue.getMessage("a"), first);
+}
+
+TEST(MessageQueueTest, ListenersGetTheMessagesOfTheirToken) {
+  MessageQueue queue;
+  auto before = makeMessage("a");
+  queue.putMessage(before);
+
+  std::vector<std::shared_ptr<ReceivedMessage>> received;
+  queue.setMessageListener("a", [&received](std::shared_ptr<ReceivedMessage> message) { received.push_back(message); });
+  auto after = makeMessage("a");
+  auto sentinel = makeMessage("a", true);
+  auto other = makeMessage("b");
+  queue.putMessage(after);
+  queue.putMessage(sentinel);
+  queue.putMessage(other);
+  EXPECT_EQ(received, std::vector<std::shared_ptr<ReceivedMessage>>({before, after, nullptr}));
+
+  queue.removeMessageListener("a");
+  auto last = makeMessage("a");
+  queue.putMessage(last);
+  EXPECT_EQ(received.size(), std::size_t(3));
+  EXPECT_EQ(queue.getMessage("a"), last);
+  EXPECT_EQ(queue.getMessage("b"), other);
+}
+
+// not a check, it prints how long many producers and consumers take to exchange messages with many pending tokens
+TEST(MessageQueueTest, ManyProducersAndConsumersBenchmark) {
+  const int num_threads = 16;
+  const int messages_per_thread = 2000;
+  MessageQueue queue;
+
+  // every consumer gets its messages in the reverse order they are put, so most of them are pending
+  std::atomic<int> gotten(0);
+  auto start = std::chrono::steady_clock::now();
+  std::vector<std::thread> threads;
+  for (int t = 0; t < num_threads; t++) {
+    threads.emplace_back([&queue, t] {
+      for (int i = 0; i < messages_per_thread; i++) {
+        auto message = makeMessage(std::to_string(t) + "_" + std::to_string(i));
+        queue.putMessage(message);
+      }
+    });
+    threads.emplace_back([&queue, &gotten, t] {
+      for (int i = messages_per_thread - 1; i >= 0; i--) {
+        if (queue.getMessage(std::to_string(t) + "_" + std::to_string(i)) != nullptr) {
+          gotten++;
+        }
+      }
+    });
+  }
+  for (auto &thread : threads) {
+    thread.join();
+  }
+  auto elapsed = std::chrono::duration_cast<std::chrono::milliseconds>(std::chrono::steady_clock::now() - start).count();
+
+  std::cout << num_threads << " producers and " << num_threads << " consumers, " << num_threads * messages_per_thread
+            << " messages: " << elapsed << " ms" << std::endl;
+  EXPECT_EQ(gotten, num_threads * messages_per_thread);
+}
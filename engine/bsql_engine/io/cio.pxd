@@ -34,6 +34,7 @@ cdef extern from "../include/engine/errors.h":
     cdef void raiseRunQueryError()
     cdef void raiseRunSkipDataError()
     cdef void raiseParseSchemaError()
+    cdef void raiseFileSystemMetadataError()
     cdef void raiseRegisterFileSystemHDFSError();
     cdef void raiseRegisterFileSystemGCSError();
     cdef void raiseRegisterFileSystemS3Error();
@@ -89,6 +90,30 @@ cdef extern from "../include/io/io.h":
         shared_ptr[CTable] arrow_table
 
 
+    cdef struct FileInfo:
+        string uri
+        unsigned long long size
+        unsigned long long modification_time
+        bool exists
+
+    cdef struct FileBlockLocation:
+        int file_index
+        long long offset
+        long long length
+        vector[string] hosts
+
+    cdef struct FileSystemCacheStats:
+        size_t hits
+        size_t misses
+        size_t entries
+
+    cdef struct RowGroupInfo:
+        int file_index
+        int row_group_index
+        long long num_rows
+        long long num_bytes
+
+
     cdef struct HDFS:
         string host
         int port
@@ -115,6 +140,12 @@ cdef extern from "../include/io/io.h":
         string adcJsonFile
 
 
+    vector[FileInfo] getFileInfo(vector[string] files) except +raiseFileSystemMetadataError
+    vector[RowGroupInfo] getRowGroupInfo(vector[string] files) except +raiseFileSystemMetadataError
+    vector[FileBlockLocation] getBlockLocations(vector[string] files) except +raiseFileSystemMetadataError
+    vector[vector[string]] listResourceNames(vector[string] directories) except +raiseFileSystemMetadataError
+    size_t invalidateFileSystemCache(vector[string] prefixes) except +raiseFileSystemMetadataError
+    FileSystemCacheStats getFileSystemCacheStats() except +raiseFileSystemMetadataError
     pair[bool, string] registerFileSystemHDFS(HDFS hdfs, string root, string authority) except +raiseRegisterFileSystemHDFSError
     pair[bool, string] registerFileSystemGCS( GCS gcs, string root, string authority) except +raiseRegisterFileSystemGCSError
     pair[bool, string] registerFileSystemS3( S3 s3, string root, string authority) except +raiseRegisterFileSystemS3Error
@@ -154,6 +185,10 @@ cdef extern from "../include/engine/engine.h":
             string ip
             int communication_port
         unique_ptr[PartitionedResultSet] runQuery(int masterIndex, vector[NodeMetaDataTCP] tcpMetadata, vector[string] tableNames, vector[string] tableScans, vector[TableSchema] tableSchemas, vector[vector[string]] tableSchemaCppArgKeys, vector[vector[string]] tableSchemaCppArgValues, vector[vector[string]] filesAll, vector[int] fileTypes, int ctxToken, string query, unsigned long accessToken, vector[vector[map[string,string]]] uri_values_cpp, map[string,string] config_options) except +raiseRunQueryError
+        void runQueryStream(int masterIndex, vector[NodeMetaDataTCP] tcpMetadata, vector[string] tableNames, vector[string] tableScans, vector[TableSchema] tableSchemas, vector[vector[string]] tableSchemaCppArgKeys, vector[vector[string]] tableSchemaCppArgValues, vector[vector[string]] filesAll, vector[int] fileTypes, int ctxToken, string query, unsigned long accessToken, vector[vector[map[string,string]]] uri_values_cpp, map[string,string] config_options, int maxBatches) except +raiseRunQueryError
+        unique_ptr[PartitionedResultSet] fetchStreamBatch(int ctxToken) except +raiseRunQueryError
+        void closeStream(int ctxToken) except +raiseRunQueryError
+        void cancelStream(int ctxToken) except +raiseRunQueryError
         unique_ptr[ResultSet] runSkipData(BlazingTableView metadata, vector[string] all_column_names, string query) except +raiseRunSkipDataError
 
         cdef struct TableScanInfo:
@@ -162,9 +197,21 @@ cdef extern from "../include/engine/engine.h":
             vector[vector[int]] table_columns
         TableScanInfo getTableScanInfo(string logicalPlan)
 
+        cdef struct ExecutorStats:
+            size_t num_threads
+            size_t active_tasks
+            size_t queued_tasks
+            size_t completed_tasks
+            size_t running_kernels
+            size_t peak_running_kernels
+        ExecutorStats getExecutorStats() except +raiseRunQueryError
+
 cdef extern from "../include/engine/initialize.h":
     cdef void initialize(int ralId, int gpuId, string network_iface_name, string ralHost, int ralCommunicationPort, bool singleNode, map[string,string] config_options) except +raiseInitializeError
     cdef void finalize() except +raiseFinalizeError
+    cdef void flushLogs() except +raiseFinalizeError
+    cdef vector[string] getLogRecords(string logger_name) except +raiseFinalizeError
+    cdef vector[string] getRolledLogFiles(string logger_name) except +raiseFinalizeError
     cdef void blazingSetAllocator(string allocation_mode, size_t initial_pool_size, map[string,string] config_options) except +raiseBlazingSetAllocatorError
 
 cdef extern from "../include/engine/static.h":
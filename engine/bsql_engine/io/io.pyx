@@ -77,6 +77,10 @@ class ParseSchemaError(BlazingError):
     """ParseSchema Error."""
 cdef public PyObject * ParseSchemaError_ = <PyObject *>ParseSchemaError
 
+class FileSystemMetadataError(BlazingError):
+    """FileSystemMetadata Error."""
+cdef public PyObject * FileSystemMetadataError_ = <PyObject *>FileSystemMetadataError
+
 class RegisterFileSystemHDFSError(BlazingError):
     """RegisterFileSystemHDFS Error."""
 cdef public PyObject * RegisterFileSystemHDFSError_ = <PyObject *>RegisterFileSystemHDFSError
@@ -103,6 +107,9 @@ cdef unique_ptr[cio.ResultSet] parseMetadataPython(vector[string] files, pair[in
 cdef unique_ptr[cio.PartitionedResultSet] runQueryPython(int masterIndex, vector[NodeMetaDataTCP] tcpMetadata, vector[string] tableNames, vector[string] tableScans, vector[TableSchema] tableSchemas, vector[vector[string]] tableSchemaCppArgKeys, vector[vector[string]] tableSchemaCppArgValues, vector[vector[string]] filesAll, vector[int] fileTypes, int ctxToken, string query, unsigned long accessToken,vector[vector[map[string,string]]] uri_values_cpp, map[string,string] config_options) except *:
     return blaz_move(cio.runQuery( masterIndex, tcpMetadata, tableNames, tableScans, tableSchemas, tableSchemaCppArgKeys, tableSchemaCppArgValues, filesAll, fileTypes, ctxToken, query, accessToken, uri_values_cpp, config_options))
 
+cdef void runQueryStreamPython(int masterIndex, vector[NodeMetaDataTCP] tcpMetadata, vector[string] tableNames, vector[string] tableScans, vector[TableSchema] tableSchemas, vector[vector[string]] tableSchemaCppArgKeys, vector[vector[string]] tableSchemaCppArgValues, vector[vector[string]] filesAll, vector[int] fileTypes, int ctxToken, string query, unsigned long accessToken,vector[vector[map[string,string]]] uri_values_cpp, map[string,string] config_options, int maxBatches) except *:
+    cio.runQueryStream( masterIndex, tcpMetadata, tableNames, tableScans, tableSchemas, tableSchemaCppArgKeys, tableSchemaCppArgValues, filesAll, fileTypes, ctxToken, query, accessToken, uri_values_cpp, config_options, maxBatches)
+
 cdef unique_ptr[cio.ResultSet] performPartitionPython(int masterIndex, vector[NodeMetaDataTCP] tcpMetadata, int ctxToken, BlazingTableView blazingTableView, vector[string] column_names) except *:
     return blaz_move(cio.performPartition(masterIndex, tcpMetadata, ctxToken, blazingTableView, column_names))
 
@@ -167,6 +174,17 @@ cpdef initializeCaller(int ralId, int gpuId, string network_iface_name, string r
 cpdef finalizeCaller():
     finalizePython()
 
+cpdef flushLogsCaller():
+    cio.flushLogs()
+
+cpdef getLogRecordsCaller(logger_name):
+    records = cio.getLogRecords(str.encode(logger_name))
+    return [record.decode('utf-8', errors='replace') for record in records]
+
+cpdef getRolledLogFilesCaller(logger_name):
+    files = cio.getRolledLogFiles(str.encode(logger_name))
+    return [file.decode('utf-8') for file in files]
+
 cpdef blazingSetAllocatorCaller(string allocation_mode, size_t initial_pool_size, map[string,string] config_options):
     blazingSetAllocatorPython(allocation_mode, initial_pool_size, config_options)
 
@@ -221,6 +239,77 @@ cpdef parseSchemaCaller(fileList, file_format_hint, args, extra_columns, ignore_
     return return_object
 
 
+cpdef getFileInfoCaller(fileList):
+    cdef vector[string] files
+    for file in fileList:
+      files.push_back(str.encode(file))
+
+    files_info = cio.getFileInfo(files)
+    result = []
+    for i in range(files_info.size()):
+      file_info = {}
+      file_info['uri'] = files_info[i].uri.decode('utf-8')
+      file_info['size'] = files_info[i].size
+      file_info['modification_time'] = files_info[i].modification_time
+      file_info['exists'] = files_info[i].exists
+      result.append(file_info)
+    return result
+
+cpdef getRowGroupInfoCaller(fileList):
+    cdef vector[string] files
+    for file in fileList:
+      files.push_back(str.encode(file))
+
+    row_groups = cio.getRowGroupInfo(files)
+    result = {'file_index': [], 'row_group_index': [], 'num_rows': [], 'num_bytes': []}
+    for i in range(row_groups.size()):
+      result['file_index'].append(row_groups[i].file_index)
+      result['row_group_index'].append(row_groups[i].row_group_index)
+      result['num_rows'].append(row_groups[i].num_rows)
+      result['num_bytes'].append(row_groups[i].num_bytes)
+    return result
+
+cpdef getBlockLocationsCaller(fileList):
+    cdef vector[string] files
+    for file in fileList:
+      files.push_back(str.encode(file))
+
+    block_locations = cio.getBlockLocations(files)
+    result = []
+    for i in range(block_locations.size()):
+      block_location = {}
+      block_location['file_index'] = block_locations[i].file_index
+      block_location['offset'] = block_locations[i].offset
+      block_location['length'] = block_locations[i].length
+      block_location['hosts'] = [host.decode('utf-8') for host in block_locations[i].hosts]
+      result.append(block_location)
+    return result
+
+cpdef listResourceNamesCaller(directories):
+    cdef vector[string] directories_cpp
+    for directory in directories:
+      directories_cpp.push_back(str.encode(directory))
+
+    names = cio.listResourceNames(directories_cpp)
+    return [[name.decode('utf-8') for name in directory_names] for directory_names in names]
+
+cpdef invalidateFileSystemCacheCaller(prefixes):
+    cdef vector[string] prefixes_cpp
+    for prefix in prefixes:
+      prefixes_cpp.push_back(str.encode(prefix))
+
+    return cio.invalidateFileSystemCache(prefixes_cpp)
+
+cpdef getFileSystemCacheStatsCaller():
+    stats = cio.getFileSystemCacheStats()
+    return {'hits': stats.hits, 'misses': stats.misses, 'entries': stats.entries}
+
+cpdef getExecutorStatsCaller():
+    stats = cio.getExecutorStats()
+    return {'num_threads': stats.num_threads, 'active_tasks': stats.active_tasks, 'queued_tasks': stats.queued_tasks,
+            'completed_tasks': stats.completed_tasks, 'running_kernels': stats.running_kernels,
+            'peak_running_kernels': stats.peak_running_kernels}
+
 cpdef parseMetadataCaller(fileList, offset, schema, file_format_hint, args):
     cdef vector[string] files
     for file in fileList:
@@ -287,7 +376,7 @@ cpdef performPartitionCaller(int masterIndex, tcpMetadata, int ctxToken, input,
 
     return df
 
-cpdef runQueryCaller(int masterIndex,  tcpMetadata,  tables,  table_scans, vector[int] fileTypes, int ctxToken, queryPy, unsigned long accessToken, map[string,string] config_options, bool is_single_node):
+cpdef runQueryCaller(int masterIndex,  tcpMetadata,  tables,  table_scans, vector[int] fileTypes, int ctxToken, queryPy, unsigned long accessToken, map[string,string] config_options, bool is_single_node, int stream_max_batches = 0):
     cdef string query
     query = str.encode(queryPy)
     cdef vector[NodeMetaDataTCP] tcpMetadataCpp
@@ -390,6 +479,10 @@ cpdef runQueryCaller(int masterIndex,  tcpMetadata,  tables,  table_scans, vecto
         currentMetadataCpp.communication_port = currentMetadata['communication_port']
         tcpMetadataCpp.push_back(currentMetadataCpp)
 
+    if stream_max_batches > 0: # the result is read with fetchStreamBatchCaller while the query runs
+        runQueryStreamPython(masterIndex, tcpMetadataCpp, tableNames, tableScans, tableSchemaCpp, tableSchemaCppArgKeys, tableSchemaCppArgValues, filesAll, fileTypes, ctxToken, query,accessToken,uri_values_cpp_all, config_options, stream_max_batches)
+        return None
+
     resultSet = blaz_move(runQueryPython(masterIndex, tcpMetadataCpp, tableNames, tableScans, tableSchemaCpp, tableSchemaCppArgKeys, tableSchemaCppArgValues, filesAll, fileTypes, ctxToken, query,accessToken,uri_values_cpp_all, config_options))
 
     names = dereference(resultSet).names
@@ -406,6 +499,28 @@ cpdef runQueryCaller(int masterIndex,  tcpMetadata,  tables,  table_scans, vecto
             dfs.append(cudf.DataFrame(CudfXxTable.from_unique_ptr(blaz_move(dereference(resultSet).cudfTables[i]), decoded_names)._data))
         return dfs
 
+cpdef fetchStreamBatchCaller(int ctxToken):
+    """
+    Returns the next batch of a query started with runQueryCaller(..., stream_max_batches=n) as a cudf.DataFrame,
+    or None when the query finished. Blocks until the batch is ready.
+    """
+    resultSet = blaz_move(cio.fetchStreamBatch(ctxToken))
+
+    if dereference(resultSet).cudfTables.size() == 0:
+        return None
+
+    names = dereference(resultSet).names
+    decoded_names = []
+    for i in range(names.size()):
+        decoded_names.append(names[i].decode('utf-8'))
+    return cudf.DataFrame(CudfXxTable.from_unique_ptr(blaz_move(dereference(resultSet).cudfTables[0]), decoded_names)._data)
+
+cpdef closeStreamCaller(int ctxToken):
+    cio.closeStream(ctxToken)
+
+cpdef cancelStreamCaller(int ctxToken):
+    cio.cancelStream(ctxToken)
+
 cpdef runSkipDataCaller(table, queryPy):
     cdef string query
     cdef BlazingTableView metadata
@@ -31,6 +31,44 @@ std::unique_ptr<PartitionedResultSet> runQuery(int32_t masterIndex,
 	std::vector<std::vector<std::map<std::string, std::string>>> uri_values,
 	std::map<std::string, std::string> config_options);
 
+/**
+ * Starts running a query in the background and returns right away. The result is read with fetchStreamBatch
+ * one batch at a time while the query runs, and at most max_batches batches are buffered, so the query
+ * is paused when the consumer falls behind. The stream is identified by ctxToken.
+ */
+void runQueryStream(int32_t masterIndex,
+	std::vector<NodeMetaDataTCP> tcpMetadata,
+	std::vector<std::string> tableNames,
+	std::vector<std::string> tableScans,
+	std::vector<TableSchema> tableSchemas,
+	std::vector<std::vector<std::string>> tableSchemaCppArgKeys,
+	std::vector<std::vector<std::string>> tableSchemaCppArgValues,
+	std::vector<std::vector<std::string>> filesAll,
+	std::vector<int> fileTypes,
+	int32_t ctxToken,
+	std::string query,
+	uint64_t accessToken,
+	std::vector<std::vector<std::map<std::string, std::string>>> uri_values,
+	std::map<std::string, std::string> config_options,
+	int32_t maxBatches);
+
+/**
+ * Blocks until the next batch of the stream is available. The result has no tables once the query finished,
+ * and the stream is closed then. Throws if the query failed.
+ */
+std::unique_ptr<PartitionedResultSet> fetchStreamBatch(int32_t ctxToken);
+
+/**
+ * Stops a stream: the batches not fetched yet are released and the query is left to finish without buffering.
+ * Waits for the query to finish.
+ */
+void closeStream(int32_t ctxToken);
+
+/**
+ * Stops a stream like closeStream, but returns right away and the query finishes in the background.
+ */
+void cancelStream(int32_t ctxToken);
+
 
 struct TableScanInfo {
 	std::vector<std::string> relational_algebra_steps;
@@ -40,6 +78,21 @@ struct TableScanInfo {
 
 TableScanInfo getTableScanInfo(std::string logicalPlan);
 
+struct ExecutorStats {
+	size_t num_threads;
+	size_t active_tasks;
+	size_t queued_tasks;
+	size_t completed_tasks;
+	size_t running_kernels;
+	size_t peak_running_kernels;
+};
+
+/**
+ * Returns the threads of the executor that runs the kernels of all the queries, its tasks,
+ * and the kernels of the running queries.
+ */
+ExecutorStats getExecutorStats();
+
 std::unique_ptr<ResultSet> runSkipData(
 	ral::frame::BlazingTableView metadata, 
 	std::vector<std::string> all_column_names, 
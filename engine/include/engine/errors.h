@@ -5,6 +5,7 @@ void raiseGetProductDetailsError();
 void raiseRunQueryError();
 void raiseRunSkipDataError();
 void raiseParseSchemaError();
+void raiseFileSystemMetadataError();
 void raiseRegisterFileSystemHDFSError();
 void raiseRegisterFileSystemGCSError();
 void raiseRegisterFileSystemS3Error();
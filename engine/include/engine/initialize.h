@@ -12,6 +12,23 @@ void initialize(int ralId,
 
 void finalize();
 
+/**
+ * Asks all the loggers to write what they have buffered. The loggers are asynchronous, so the
+ * logs are written shortly after this returns.
+ */
+void flushLogs();
+
+/**
+ * Returns the records of a log (batch_logger, queries_logger, kernels_logger, kernels_edges_logger, events_logger
+ * or cache_events_logger) retained in memory, as configured with BLAZING_LOGGING_BUFFER_SIZE.
+ */
+std::vector<std::string> getLogRecords(std::string logger_name);
+
+/**
+ * Returns the parquet files the old records of a log were rolled to, when BLAZING_LOGGING_ROLL_TO_PARQUET is set.
+ */
+std::vector<std::string> getRolledLogFiles(std::string logger_name);
+
 void blazingSetAllocator(
 	std::string allocation_mode, 
 	std::size_t initial_pool_size, 
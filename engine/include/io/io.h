@@ -42,6 +42,33 @@ struct TableSchema {
 	std::shared_ptr<arrow::Table> arrow_table;
 };
 
+struct FileInfo {
+	std::string uri;
+	unsigned long long size;
+	unsigned long long modification_time;
+	bool exists;
+};
+
+struct FileBlockLocation {
+	int file_index;
+	long long offset;
+	long long length;
+	std::vector<std::string> hosts;
+};
+
+struct FileSystemCacheStats {
+	size_t hits;
+	size_t misses;
+	size_t entries;
+};
+
+struct RowGroupInfo {
+	int file_index;
+	int row_group_index;
+	long long num_rows;
+	long long num_bytes;
+};
+
 struct HDFS {
 	std::string host;
 	int port;
@@ -91,6 +118,20 @@ std::unique_ptr<ResultSet> parseMetadata(std::vector<std::string> files,
 	std::vector<std::string> arg_keys,
 	std::vector<std::string> arg_values);
 
+std::vector<FileInfo> getFileInfo(std::vector<std::string> files);
+
+std::vector<RowGroupInfo> getRowGroupInfo(std::vector<std::string> files);
+
+std::vector<FileBlockLocation> getBlockLocations(std::vector<std::string> files);
+
+/// The names of the files and directories in each of the directories, listed in parallel
+std::vector<std::vector<std::string>> listResourceNames(std::vector<std::string> directories);
+
+/// Removes the cached metadata (existence, file status and listings) of the uris that start with any of the prefixes
+size_t invalidateFileSystemCache(std::vector<std::string> prefixes);
+
+FileSystemCacheStats getFileSystemCacheStats();
+
 std::pair<bool, std::string> registerFileSystemHDFS(HDFS hdfs, std::string root, std::string authority);
 std::pair<bool, std::string> registerFileSystemGCS(GCS gcs, std::string root, std::string authority);
 std::pair<bool, std::string> registerFileSystemS3(S3 s3, std::string root, std::string authority);
@@ -28,7 +28,8 @@ std::vector<std::unique_ptr<ral::frame::BlazingTable>> execute_plan(std::vector<
 	std::vector<std::string> table_scans,
 	std::string logicalPlan,
 	int64_t connection,
-	Context & queryContext)  {
+	Context & queryContext,
+	std::shared_ptr<ral::batch::OutputStream> output_stream)  {
 
 	CodeTimer blazing_timer;
 	auto logger = spdlog::get("batch_logger");
@@ -51,6 +52,9 @@ std::vector<std::unique_ptr<ral::frame::BlazingTable>> execute_plan(std::vector<
 		auto query_graph = std::get<0>(query_graph_and_max_kernel_id);
 		auto max_kernel_id = std::get<1>(query_graph_and_max_kernel_id);
 		ral::batch::OutputKernel output(max_kernel_id, queryContext.clone());
+		if (output_stream) {
+			output.set_output_stream(output_stream);
+		}
 		
 		logger->info("{query_id}|{step}|{substep}|{info}|||||",
 									"query_id"_a=queryContext.getContextToken(),
@@ -96,7 +100,8 @@ std::vector<std::unique_ptr<ral::frame::BlazingTable>> execute_plan(std::vector<
 
 		if (query_graph->num_nodes() > 0) {
 			ral::cache::cache_settings cache_machine_config;
-			cache_machine_config.type = queryContext.getTotalNodes() == 1 ? ral::cache::CacheType::CONCATENATING : ral::cache::CacheType::SIMPLE;
+			// a streamed result is consumed batch by batch, so it is not concatenated
+			cache_machine_config.type = queryContext.getTotalNodes() == 1 && !output_stream ? ral::cache::CacheType::CONCATENATING : ral::cache::CacheType::SIMPLE;
 			cache_machine_config.context = queryContext.clone();
 
 			*query_graph += link(query_graph->get_last_kernel(), output, cache_machine_config);
@@ -116,7 +121,7 @@ std::vector<std::unique_ptr<ral::frame::BlazingTable>> execute_plan(std::vector<
 									"info"_a="Query Execution Done",
 									"duration"_a=blazing_timer.elapsed_time());
 
-		assert(!output_frame.empty());
+		assert(output_stream || !output_frame.empty());
 
 		logger->flush();
 
@@ -9,19 +9,27 @@
 #include "cudf/binaryop.hpp"
 #include "io/DataLoader.h"
 #include <iostream>
+#include <memory>
 #include <string>
 #include <vector>
 
 #include <blazingdb/manager/Context.h>
 using blazingdb::manager::Context;
 
+namespace ral {
+namespace batch {
+class OutputStream;
+}  // namespace batch
+}  // namespace ral
+
 std::vector<std::unique_ptr<ral::frame::BlazingTable>> execute_plan(std::vector<ral::io::data_loader> input_loaders,
 	std::vector<ral::io::Schema> schemas,
 	std::vector<std::string> table_names,
 	std::vector<std::string> table_scans,
 	std::string logicalPlan,
 	int64_t connection,
-	Context & queryContext);
+	Context & queryContext,
+	std::shared_ptr<ral::batch::OutputStream> output_stream = nullptr);
 
 void getTableScanInfo(std::string & logicalPlan_in,
 						std::vector<std::string> & relational_algebra_steps_out,
@@ -244,6 +244,7 @@ public:
         } 
         total_memory_size = (size_t)si.freeram;
         used_memory_size = 0;
+        logical_memory_size = 0;
         memory_limit = custom_threshold * total_memory_size;
 	}
 
@@ -251,11 +252,26 @@ public:
 
     // TODO
     void allocate(std::size_t bytes)  {
-		used_memory_size +=  bytes;
+		allocate(bytes, bytes);
 	}
 
 	void deallocate(std::size_t bytes)  {
+		deallocate(bytes, bytes);
+	}
+
+    // compressed data uses bytes of memory to hold logical_bytes of data
+    void allocate(std::size_t bytes, std::size_t logical_bytes)  {
+		used_memory_size +=  bytes;
+		logical_memory_size += logical_bytes;
+	}
+
+	void deallocate(std::size_t bytes, std::size_t logical_bytes)  {
 		used_memory_size -= bytes;
+		logical_memory_size -= logical_bytes;
+	}
+
+	size_t get_logical_memory_used() {
+		return logical_memory_size;
 	}
 
 	size_t get_from_driver_available_memory()  {
@@ -283,6 +299,7 @@ private:
     size_t memory_limit;
 	size_t total_memory_size;
 	std::atomic<std::size_t> used_memory_size;
+	std::atomic<std::size_t> logical_memory_size;
 };
 
 /** -------------------------------------------------------------------------*
@@ -328,6 +345,19 @@ public:
 		initialized_resource->deallocate(bytes);
 	}
 
+    void allocate(std::size_t bytes, std::size_t logical_bytes)  {
+		initialized_resource->allocate(bytes, logical_bytes);
+	}
+
+	void deallocate(std::size_t bytes, std::size_t logical_bytes)  {
+		initialized_resource->deallocate(bytes, logical_bytes);
+	}
+
+    /// the bytes the data in host memory would use uncompressed, get_memory_used counts the bytes it uses
+    size_t get_logical_memory_used() {
+		return initialized_resource->get_logical_memory_used();
+	}
+
    /** -----------------------------------------------------------------------*
    * @brief Initialize
    * 
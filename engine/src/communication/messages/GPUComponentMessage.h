@@ -50,6 +50,9 @@ std::shared_ptr<ReceivedMessage> deserialize_from_gpu(const MessageMetadata& mes
 
 std::unique_ptr<ral::frame::BlazingHostTable> serialize_gpu_message_to_host_table(ral::frame::BlazingTableView table_view);
 
+std::unique_ptr<ral::frame::BlazingTable> deserialize_from_gpu_raw_buffers(const std::vector<ColumnTransport> & columns_offsets,
+									  const std::vector<rmm::device_buffer> & raw_buffers);
+
 std::unique_ptr<ral::frame::BlazingTable> deserialize_from_cpu(const ral::frame::BlazingHostTable* host_table);
 
 
@@ -63,6 +63,18 @@ std::shared_ptr<ReceivedMessage> Server::getHostMessage(const ContextToken & tok
 	return comm_server->getMessage(token_value, messageToken);
 }
 
+void Server::notifyWhenMessages(const ContextToken & token_value, const MessageTokenType & messageToken, std::size_t count, std::function<void()> callback) {
+	comm_server->notifyWhenMessages(token_value, messageToken, count, std::move(callback));
+}
+
+void Server::setHostMessageListener(const ContextToken & token_value, const MessageTokenType & messageToken, std::function<void(std::shared_ptr<ReceivedMessage>)> listener) {
+	comm_server->setMessageListener(token_value, messageToken, std::move(listener));
+}
+
+void Server::removeMessageListener(const ContextToken & token_value, const MessageTokenType & messageToken) {
+	comm_server->removeMessageListener(token_value, messageToken);
+}
+
 void Server::setEndPoints() {
 	// device messages
 	{
@@ -37,6 +37,14 @@ public:
 
 	std::shared_ptr<ReceivedMessage> getHostMessage(const ContextToken & token_value, const MessageTokenType & messageToken);
 
+	/// calls the callback once count messages with the token arrived, so getMessage does not wait for them
+	void notifyWhenMessages(const ContextToken & token_value, const MessageTokenType & messageToken, std::size_t count, std::function<void()> callback);
+
+	/// gives the messages with the token to the listener, as getHostMessage would return them, when they arrive
+	void setHostMessageListener(const ContextToken & token_value, const MessageTokenType & messageToken, std::function<void(std::shared_ptr<ReceivedMessage>)> listener);
+
+	void removeMessageListener(const ContextToken & token_value, const MessageTokenType & messageToken);
+
 private:
 	Server(Server &&) = delete;
 
@@ -11,10 +11,14 @@
 #include "../io/data_provider/UriDataProvider.h"
 #include "../skip_data/SkipDataProcessor.h"
 #include "../execution_graph/logic_controllers/LogicalFilter.h"
+#include "../execution_graph/logic_controllers/OutputStream.h"
+#include "../execution_graph/logic_controllers/taskflow/executor.h"
 #include "communication/network/Server.h"
 #include <numeric>
 #include <map>
+#include <mutex>
 #include "communication/CommunicationData.h"
+#include "blazingdb/concurrency/BlazingThread.h"
 #include <spdlog/spdlog.h>
 #include "CodeTimer.h"
 
@@ -191,6 +195,164 @@ std::unique_ptr<PartitionedResultSet> runQuery(int32_t masterIndex,
 	}
 }
 
+struct QueryStream {
+	std::shared_ptr<ral::batch::OutputStream> output_stream;
+	BlazingThread query_thread;
+};
+
+static std::mutex query_streams_mutex;
+static std::map<int32_t, std::shared_ptr<QueryStream>> query_streams;
+
+static std::shared_ptr<QueryStream> get_query_stream(int32_t ctxToken) {
+	std::lock_guard<std::mutex> lock(query_streams_mutex);
+	auto it = query_streams.find(ctxToken);
+	if(it == query_streams.end()) {
+		throw std::runtime_error("There is no query stream " + std::to_string(ctxToken));
+	}
+	return it->second;
+}
+
+static void remove_query_stream(int32_t ctxToken, bool wait = true) {
+	std::shared_ptr<QueryStream> query_stream;
+	{
+		std::lock_guard<std::mutex> lock(query_streams_mutex);
+		auto it = query_streams.find(ctxToken);
+		if(it == query_streams.end()) {
+			return;
+		}
+		query_stream = it->second;
+		query_streams.erase(it);
+	}
+	if(wait) {
+		query_stream->query_thread.join();
+	} else {
+		// the query thread keeps its own references to what it uses
+		query_stream->query_thread.detach();
+	}
+}
+
+void runQueryStream(int32_t masterIndex,
+	std::vector<NodeMetaDataTCP> tcpMetadata,
+	std::vector<std::string> tableNames,
+	std::vector<std::string> tableScans,
+	std::vector<TableSchema> tableSchemas,
+	std::vector<std::vector<std::string>> tableSchemaCppArgKeys,
+	std::vector<std::vector<std::string>> tableSchemaCppArgValues,
+	std::vector<std::vector<std::string>> filesAll,
+	std::vector<int> fileTypes,
+	int32_t ctxToken,
+	std::string query,
+	uint64_t accessToken,
+	std::vector<std::vector<std::map<std::string, std::string>>> uri_values,
+	std::map<std::string, std::string> config_options,
+	int32_t maxBatches) {
+
+	std::vector<ral::io::data_loader> input_loaders;
+	std::vector<ral::io::Schema> schemas;
+	std::tie(input_loaders, schemas) = get_loaders_and_schemas(tableSchemas, tableSchemaCppArgKeys,
+		tableSchemaCppArgValues, filesAll, fileTypes, uri_values);
+
+	using blazingdb::manager::Context;
+	using blazingdb::transport::Node;
+
+	std::vector<Node> contextNodes;
+	for(auto currentMetadata : tcpMetadata) {
+		auto address =
+			blazingdb::transport::Address::TCP(currentMetadata.ip, currentMetadata.communication_port, 0);
+		contextNodes.push_back(Node(address));
+	}
+	ral::communication::network::Server::getInstance().registerContext(ctxToken);
+
+	auto query_stream = std::make_shared<QueryStream>();
+	query_stream->output_stream = std::make_shared<ral::batch::OutputStream>(maxBatches);
+	{
+		std::lock_guard<std::mutex> lock(query_streams_mutex);
+		if(query_streams.find(ctxToken) != query_streams.end()) {
+			throw std::runtime_error("There is already a query stream " + std::to_string(ctxToken));
+		}
+		query_streams[ctxToken] = query_stream;
+	}
+
+	auto output_stream = query_stream->output_stream;
+	query_stream->query_thread = BlazingThread([=]() mutable {
+		Context queryContext{ctxToken, contextNodes, contextNodes[masterIndex], "", config_options};
+		try {
+			auto logger = spdlog::get("queries_logger");
+			CodeTimer eventTimer(true);
+			logger->info("{ral_id}|{query_id}|{start_time}|{plan}",
+										"ral_id"_a=queryContext.getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode()),
+										"query_id"_a=queryContext.getContextToken(),
+										"start_time"_a=eventTimer.start_time(),
+										"plan"_a=query);
+
+			execute_plan(input_loaders, schemas, tableNames, tableScans, query, accessToken, queryContext, output_stream);
+			output_stream->finish();
+		} catch(const std::exception & e) {
+			std::shared_ptr<spdlog::logger> logger = spdlog::get("batch_logger");
+			logger->error("{query_id}|{step}|{substep}|{info}|{duration}||||",
+										"query_id"_a=queryContext.getContextToken(),
+										"step"_a=queryContext.getQueryStep(),
+										"substep"_a=queryContext.getQuerySubstep(),
+										"info"_a="In runQueryStream. What: {}"_format(e.what()),
+										"duration"_a="");
+			logger->flush();
+			output_stream->fail(e.what());
+		}
+	});
+}
+
+std::unique_ptr<PartitionedResultSet> fetchStreamBatch(int32_t ctxToken) {
+	auto query_stream = get_query_stream(ctxToken);
+
+	std::unique_ptr<PartitionedResultSet> result = std::make_unique<PartitionedResultSet>();
+	result->skipdata_analysis_fail = false;
+	std::unique_ptr<ral::frame::BlazingTable> batch;
+	try {
+		batch = query_stream->output_stream->pop();
+	} catch(const std::exception & e) {
+		remove_query_stream(ctxToken);
+		std::cerr << e.what() << std::endl;
+		throw;
+	}
+	if(!batch) {
+		remove_query_stream(ctxToken);
+		return result;
+	}
+
+	result->names = batch->names();
+	fix_column_names_duplicated(result->names);
+	result->cudfTables.emplace_back(std::move(batch->releaseCudfTable()));
+	return result;
+}
+
+void closeStream(int32_t ctxToken) {
+	std::shared_ptr<QueryStream> query_stream;
+	{
+		std::lock_guard<std::mutex> lock(query_streams_mutex);
+		auto it = query_streams.find(ctxToken);
+		if(it == query_streams.end()) {
+			return;
+		}
+		query_stream = it->second;
+	}
+	query_stream->output_stream->cancel();
+	remove_query_stream(ctxToken);
+}
+
+void cancelStream(int32_t ctxToken) {
+	std::shared_ptr<QueryStream> query_stream;
+	{
+		std::lock_guard<std::mutex> lock(query_streams_mutex);
+		auto it = query_streams.find(ctxToken);
+		if(it == query_streams.end()) {
+			return;
+		}
+		query_stream = it->second;
+	}
+	query_stream->output_stream->cancel();
+	remove_query_stream(ctxToken, false);
+}
+
 std::unique_ptr<ResultSet> performPartition(int32_t masterIndex,
 	std::vector<NodeMetaDataTCP> tcpMetadata,
 	int32_t ctxToken,
@@ -282,3 +444,15 @@ TableScanInfo getTableScanInfo(std::string logicalPlan){
 	getTableScanInfo(logicalPlan, relational_algebra_steps, table_names, table_columns);
 	return TableScanInfo{relational_algebra_steps, table_names, table_columns};
 }
+
+ExecutorStats getExecutorStats() {
+	ral::cache::executor_stats stats = ral::cache::executor::getInstance().get_stats();
+	ExecutorStats result;
+	result.num_threads = stats.num_threads;
+	result.active_tasks = stats.active_tasks;
+	result.queued_tasks = stats.queued_tasks;
+	result.completed_tasks = stats.completed_tasks;
+	result.running_kernels = stats.running_kernels;
+	result.peak_running_kernels = stats.peak_running_kernels;
+	return result;
+}
@@ -28,6 +28,7 @@ RAISE_ERROR(GetProductDetails)
 RAISE_ERROR(RunQuery)
 RAISE_ERROR(RunSkipData)
 RAISE_ERROR(ParseSchema)
+RAISE_ERROR(FileSystemMetadata)
 RAISE_ERROR(RegisterFileSystemHDFS)
 RAISE_ERROR(RegisterFileSystemGCS)
 RAISE_ERROR(RegisterFileSystemS3)
@@ -22,8 +22,14 @@
 #include <blazingdb/io/Config/BlazingContext.h>
 #include <blazingdb/io/Library/Logging/CoutOutput.h>
 #include <blazingdb/io/Library/Logging/Logger.h>
+#include <blazingdb/io/FileSystem/ReadAheadOptions.h>
 #include "blazingdb/io/Library/Logging/ServiceLogging.h"
 #include "utilities/StringUtils.h"
+#include "utilities/LogRingBuffer.h"
+#include "execution_graph/logic_controllers/SpillFile.h"
+#include "execution_graph/logic_controllers/CacheTierManager.h"
+#include "execution_graph/logic_controllers/taskflow/executor.h"
+#include <blazingdb/io/Util/StringUtil.h>
 
 #include "config/GPUManager.cuh"
 
@@ -60,20 +66,47 @@ std::string get_ip(const std::string & iface_name = "eth0") {
 }
 
 // simple_log: true (no timestamp or log level)
-void create_logger(std::string fileName, std::string loggingName, int ralId, bool simple_log=true){
+// how the records of the logs are retained besides the log files
+struct log_retention {
+	std::size_t buffer_size = 0; // records of every log kept in memory, 0 disables the ring buffers
+	bool roll_to_parquet = false; // roll the records dropped from memory to parquet files instead of writing text log files
+};
+
+// the ring buffer of a log keeps 16 segments, so memory is released (or rolled) a 1/16th at a time
+const std::size_t log_ring_buffer_segments = 16;
+
+void create_logger(std::string fileName, std::string loggingName, int ralId, bool simple_log=true,
+	log_retention retention = log_retention(), std::vector<std::string> column_names = {}){
 	auto stdout_sink = std::make_shared<spdlog::sinks::stdout_color_sink_mt>();
 	stdout_sink->set_pattern("[%T.%e] [%^%l%$] %v");
 	stdout_sink->set_level(spdlog::level::err);
-	auto file_sink = std::make_shared<spdlog::sinks::basic_file_sink_mt>(fileName);
-	if(simple_log){
-		file_sink->set_pattern(fmt::format("%v"));
-	}else{
-		file_sink->set_pattern(fmt::format("%Y-%m-%d %T.%e|{}|%^%l%$|%v", ralId));
+	std::string pattern = simple_log ? "%v" : fmt::format("%Y-%m-%d %T.%e|{}|%l|%v", ralId);
+
+	std::vector<spdlog::sink_ptr> sink_list = { stdout_sink };
+	if(!(retention.roll_to_parquet && retention.buffer_size > 0)){
+		auto file_sink = std::make_shared<spdlog::sinks::basic_file_sink_mt>(fileName);
+		if(simple_log){
+			file_sink->set_pattern(fmt::format("%v"));
+		}else{
+			file_sink->set_pattern(fmt::format("%Y-%m-%d %T.%e|{}|%^%l%$|%v", ralId));
+		}
+		file_sink->set_level(spdlog::level::trace);
+		sink_list.push_back(file_sink);
+	}
+	if(retention.buffer_size > 0){
+		std::string roll_path_prefix = "";
+		if(retention.roll_to_parquet){
+			roll_path_prefix = fileName.substr(0, fileName.size() - std::string(".log").size());
+		}
+		std::size_t segment_size = (retention.buffer_size + log_ring_buffer_segments - 1) / log_ring_buffer_segments;
+		auto ring_buffer_sink = std::make_shared<ral::utilities::log_ring_buffer_sink>(column_names, segment_size, log_ring_buffer_segments, roll_path_prefix);
+		ring_buffer_sink->set_pattern(pattern);
+		ring_buffer_sink->set_level(spdlog::level::trace);
+		ral::utilities::register_log_ring_buffer(loggingName, ring_buffer_sink);
+		sink_list.push_back(ring_buffer_sink);
 	}
 
-	file_sink->set_level(spdlog::level::trace);
-	spdlog::sinks_init_list sink_list = { stdout_sink, file_sink };
-	auto logger = std::make_shared<spdlog::async_logger>(loggingName, sink_list, spdlog::thread_pool(), spdlog::async_overflow_policy::block);
+	auto logger = std::make_shared<spdlog::async_logger>(loggingName, sink_list.begin(), sink_list.end(), spdlog::thread_pool(), spdlog::async_overflow_policy::block);
 	logger->set_level(spdlog::level::trace);
 	spdlog::register_logger(logger);
 
@@ -137,6 +170,73 @@ void initialize(int ralId,
 	spdlog::flush_on(spdlog::level::warn);
 	spdlog::flush_every(std::chrono::seconds(1));
 
+	// the metadata of the input files (existence, status and listings) is reused for this many seconds
+	long long filesystem_cache_ttl = 60;
+	auto cache_it = config_options.find("BLAZING_FILESYSTEM_CACHE_TTL");
+	if (cache_it != config_options.end()){
+		filesystem_cache_ttl = std::stoll(config_options["BLAZING_FILESYSTEM_CACHE_TTL"]);
+	}
+	BlazingContext::getInstance()->getFileSystemManager()->setMetadataCacheTTL(filesystem_cache_ttl * 1000);
+
+	// how the files in S3 are read: the min size of a request and the parallel requests of big reads
+	ReadAheadOptions read_ahead_options;
+	cache_it = config_options.find("BLAZING_READ_AHEAD_SIZE");
+	if (cache_it != config_options.end()){
+		read_ahead_options.readAheadSize = std::stoll(config_options["BLAZING_READ_AHEAD_SIZE"]);
+	}
+	cache_it = config_options.find("BLAZING_READ_PARALLEL_REQUESTS");
+	if (cache_it != config_options.end()){
+		read_ahead_options.maxParallelRequests = std::stoi(config_options["BLAZING_READ_PARALLEL_REQUESTS"]);
+	}
+	setDefaultReadAheadOptions(read_ahead_options);
+
+	// the threads that write the raw spill files of the disk cache (BLAZING_CACHE_SPILL_FORMAT RAW or RAW_LZ4)
+	std::size_t spill_threads = 2;
+	cache_it = config_options.find("BLAZING_CACHE_SPILL_THREADS");
+	if (cache_it != config_options.end()){
+		spill_threads = std::stoul(config_options["BLAZING_CACHE_SPILL_THREADS"]);
+	}
+	ral::cache::spill_io_pool::getInstance().set_num_threads(spill_threads);
+	cache_it = config_options.find("BLAZING_CACHE_SPILL_MAX_PENDING_BYTES");
+	if (cache_it != config_options.end()){
+		ral::cache::spill_io_pool::getInstance().set_max_pending_bytes(std::stoull(config_options["BLAZING_CACHE_SPILL_MAX_PENDING_BYTES"]));
+	}
+
+	// the kernels of all the queries are run by a fixed number of executor threads
+	std::size_t executor_threads = std::max(BlazingThread::hardware_concurrency(), 1u);
+	cache_it = config_options.find("BLAZING_EXECUTOR_THREADS");
+	if (cache_it != config_options.end()){
+		executor_threads = std::stoul(config_options["BLAZING_EXECUTOR_THREADS"]);
+	}
+	ral::cache::executor::getInstance().set_num_threads(executor_threads);
+
+	// the cache data is moved between the GPU, CPU and disk cache levels when the memory used crosses the watermarks
+	std::size_t cache_tier_interval = 100;
+	double cache_tier_high_watermark = 0.95;
+	double cache_tier_low_watermark = 0.8;
+	cache_it = config_options.find("BLAZING_CACHE_TIER_INTERVAL");
+	if (cache_it != config_options.end()){
+		cache_tier_interval = std::stoul(config_options["BLAZING_CACHE_TIER_INTERVAL"]);
+	}
+	cache_it = config_options.find("BLAZING_CACHE_TIER_HIGH_WATERMARK");
+	if (cache_it != config_options.end()){
+		cache_tier_high_watermark = std::stod(config_options["BLAZING_CACHE_TIER_HIGH_WATERMARK"]);
+	}
+	cache_it = config_options.find("BLAZING_CACHE_TIER_LOW_WATERMARK");
+	if (cache_it != config_options.end()){
+		cache_tier_low_watermark = std::stod(config_options["BLAZING_CACHE_TIER_LOW_WATERMARK"]);
+	}
+	std::string cache_directory = "/tmp";
+	cache_it = config_options.find("BLAZING_CACHE_DIRECTORY");
+	if (cache_it != config_options.end()){
+		cache_directory = config_options["BLAZING_CACHE_DIRECTORY"];
+	}
+	ral::cache::cache_tier_manager::getInstance().configure(cache_tier_interval, cache_tier_high_watermark, cache_tier_low_watermark,
+		cache_directory, ral::cache::get_spill_format(config_options));
+
+	// the batches in the host cache level can be kept compressed
+	ral::frame::set_default_host_cache_compression(ral::frame::get_host_cache_compression(config_options));
+
 	std::string logging_dir = "blazing_log";
 	auto config_it = config_options.find("BLAZING_LOGGING_DIRECTORY");
 	if (config_it != config_options.end()){
@@ -152,28 +252,48 @@ void initialize(int ralId,
 	}
 
 
+	log_retention retention;
+	config_it = config_options.find("BLAZING_LOGGING_BUFFER_SIZE");
+	if (config_it != config_options.end()){
+		retention.buffer_size = std::stoull(config_options["BLAZING_LOGGING_BUFFER_SIZE"]);
+	}
+	config_it = config_options.find("BLAZING_LOGGING_ROLL_TO_PARQUET");
+	if (config_it != config_options.end()){
+		std::string roll_to_parquet = StringUtil::toLower(config_options["BLAZING_LOGGING_ROLL_TO_PARQUET"]);
+		retention.roll_to_parquet = roll_to_parquet == "true" || roll_to_parquet == "1";
+	}
+	// when the logs are rolled to parquet there are no text files, so their headers are never written
+	bool write_headers = !(retention.roll_to_parquet && retention.buffer_size > 0);
+	ral::utilities::clear_log_ring_buffers();
+
 	std::string batchLoggerFileName = logging_dir + "/RAL." + std::to_string(ralId) + ".log";
-	create_logger(batchLoggerFileName, "batch_logger", ralId, false);
+	create_logger(batchLoggerFileName, "batch_logger", ralId, false, retention,
+		{"log_time", "node_id", "type", "query_id", "step", "substep", "info", "duration", "extra1", "data1", "extra2", "data2"});
 
 	std::string queriesFileName = logging_dir + "/bsql_queries." + std::to_string(ralId) + ".log";
-	bool existsQueriesFileName = std::ifstream(queriesFileName).good();
-	create_logger(queriesFileName, "queries_logger", ralId);
+	bool existsQueriesFileName = !write_headers || std::ifstream(queriesFileName).good();
+	create_logger(queriesFileName, "queries_logger", ralId, true, retention,
+		{"ral_id", "query_id", "start_time", "plan"});
 
 	std::string kernelsFileName = logging_dir + "/bsql_kernels." + std::to_string(ralId) + ".log";
-	bool existsKernelsFileName = std::ifstream(kernelsFileName).good();
-	create_logger(kernelsFileName, "kernels_logger", ralId);
+	bool existsKernelsFileName = !write_headers || std::ifstream(kernelsFileName).good();
+	create_logger(kernelsFileName, "kernels_logger", ralId, true, retention,
+		{"ral_id", "query_id", "kernel_id", "is_kernel", "kernel_type"});
 
 	std::string kernelsEdgesFileName = logging_dir + "/bsql_kernels_edges." + std::to_string(ralId) + ".log";
-	bool existsKernelsEdgesFileName = std::ifstream(kernelsEdgesFileName).good();
-	create_logger(kernelsEdgesFileName, "kernels_edges_logger", ralId);
+	bool existsKernelsEdgesFileName = !write_headers || std::ifstream(kernelsEdgesFileName).good();
+	create_logger(kernelsEdgesFileName, "kernels_edges_logger", ralId, true, retention,
+		{"ral_id", "query_id", "source", "sink"});
 
 	std::string kernelEventsFileName = logging_dir + "/bsql_kernel_events." + std::to_string(ralId) + ".log";
-	bool existsKernelEventsFileName = std::ifstream(kernelEventsFileName).good();
-	create_logger(kernelEventsFileName, "events_logger", ralId);
+	bool existsKernelEventsFileName = !write_headers || std::ifstream(kernelEventsFileName).good();
+	create_logger(kernelEventsFileName, "events_logger", ralId, true, retention,
+		{"ral_id", "query_id", "kernel_id", "input_num_rows", "input_num_bytes", "output_num_rows", "output_num_bytes", "event_type", "timestamp_begin", "timestamp_end"});
 
 	std::string cacheEventsFileName = logging_dir + "/bsql_cache_events." + std::to_string(ralId) + ".log";
-	bool existsCacheEventsFileName = std::ifstream(cacheEventsFileName).good();
-	create_logger(cacheEventsFileName, "cache_events_logger", ralId);
+	bool existsCacheEventsFileName = !write_headers || std::ifstream(cacheEventsFileName).good();
+	create_logger(cacheEventsFileName, "cache_events_logger", ralId, true, retention,
+		{"ral_id", "query_id", "source", "sink", "num_rows", "num_bytes", "event_type", "timestamp_begin", "timestamp_end"});
 
 	//Logger Headers
 	if(!existsQueriesFileName) {
@@ -228,6 +348,25 @@ void finalize() {
 	exit(0);
 }
 
+void flushLogs() {
+	spdlog::apply_all([](std::shared_ptr<spdlog::logger> logger) { logger->flush(); });
+}
+
+std::vector<std::string> getLogRecords(std::string logger_name) {
+	auto ring_buffer = ral::utilities::get_log_ring_buffer(logger_name);
+	if(!ring_buffer) {
+		return {};
+	}
+	return ring_buffer->get_records();
+}
+
+std::vector<std::string> getRolledLogFiles(std::string logger_name) {
+	auto ring_buffer = ral::utilities::get_log_ring_buffer(logger_name);
+	if(!ring_buffer) {
+		return {};
+	}
+	return ring_buffer->get_rolled_files();
+}
 
 void blazingSetAllocator(
 	std::string allocation_mode,
@@ -11,12 +11,18 @@
 #include "utilities/DebuggingUtils.h"
 
 #include <blazingdb/io/Config/BlazingContext.h>
+#include <blazingdb/io/ExceptionHandling/BlazingException.h>
+#include "blazingdb/concurrency/BlazingThread.h"
+
+#include <parquet/file_reader.h>
 
 using namespace fmt::literals;
 
 // #include <blazingdb/io/Library/Logging/TcpOutput.h>
 // #include "blazingdb/io/Library/Network/NormalSyncSocket.h"
 
+#include <algorithm>
+#include <atomic>
 #include <numeric>
 
 TableSchema parseSchema(std::vector<std::string> files,
@@ -158,6 +164,149 @@ std::unique_ptr<ResultSet> parseMetadata(std::vector<std::string> files,
 }
 
 
+std::vector<FileInfo> getFileInfo(std::vector<std::string> files) {
+	auto fileSystemManager = BlazingContext::getInstance()->getFileSystemManager();
+
+	std::vector<FileInfo> files_info(files.size());
+	for(size_t i = 0; i < files.size(); ++i) {
+		files_info[i].uri = files[i];
+		files_info[i].size = 0;
+		files_info[i].modification_time = 0;
+		files_info[i].exists = false;
+		try {
+			// the status is used to check if the file changed (like in the result cache fingerprints), so it is
+			// always read again instead of reusing the one in the metadata cache
+			Uri uri(files[i]);
+			fileSystemManager->invalidateMetadataCache(uri.toString());
+			FileStatus status = fileSystemManager->getFileStatus(uri);
+			if(status.isFile()) {
+				files_info[i].size = status.getFileSize();
+				files_info[i].modification_time = status.getModificationTime();
+				files_info[i].exists = true;
+			}
+		} catch(const BlazingFileNotFoundException & e) {
+			// a file that does not exist is reported as such, the other errors (like permissions or connections)
+			// reach python as a FileSystemMetadataError
+		}
+	}
+	return files_info;
+}
+
+std::vector<RowGroupInfo> getRowGroupInfo(std::vector<std::string> files) {
+	auto fileSystemManager = BlazingContext::getInstance()->getFileSystemManager();
+
+	// a fixed number of threads takes the files one by one, since a table can have thousands of them
+	const size_t max_threads = 32;
+	std::vector<std::vector<RowGroupInfo>> row_groups_per_file(files.size());
+	std::atomic<size_t> next_file(0);
+	std::vector<BlazingThread> threads(std::min(files.size(), max_threads));
+	for(size_t thread_index = 0; thread_index < threads.size(); thread_index++) {
+		threads[thread_index] = BlazingThread([&]() {
+			for(size_t file_index = next_file++; file_index < files.size(); file_index = next_file++) {
+				try {
+					auto file = fileSystemManager->openReadable(Uri(files[file_index]));
+					if(file == nullptr) {
+						continue;
+					}
+					auto parquet_reader = parquet::ParquetFileReader::Open(file);
+					std::shared_ptr<parquet::FileMetaData> file_metadata = parquet_reader->metadata();
+					for(int row_group_index = 0; row_group_index < file_metadata->num_row_groups(); row_group_index++) {
+						auto row_group_metadata = file_metadata->RowGroup(row_group_index);
+						RowGroupInfo info;
+						info.file_index = file_index;
+						info.row_group_index = row_group_index;
+						info.num_rows = row_group_metadata->num_rows();
+						info.num_bytes = row_group_metadata->total_byte_size();
+						row_groups_per_file[file_index].push_back(info);
+					}
+					parquet_reader->Close();
+				} catch(const std::exception & e) {
+					// files that can not be read just have no row groups, the callers fall back to file sizes
+				}
+			}
+		});
+	}
+	for(auto & thread : threads) {
+		thread.join();
+	}
+
+	std::vector<RowGroupInfo> row_groups;
+	for(auto & file_row_groups : row_groups_per_file) {
+		row_groups.insert(row_groups.end(), file_row_groups.begin(), file_row_groups.end());
+	}
+	return row_groups;
+}
+
+std::vector<FileBlockLocation> getBlockLocations(std::vector<std::string> files) {
+	auto fileSystemManager = BlazingContext::getInstance()->getFileSystemManager();
+
+	std::vector<FileBlockLocation> block_locations;
+	for(size_t file_index = 0; file_index < files.size(); file_index++) {
+		try {
+			for(auto & location : fileSystemManager->getBlockLocations(Uri(files[file_index]))) {
+				FileBlockLocation block_location;
+				block_location.file_index = file_index;
+				block_location.offset = location.offset;
+				block_location.length = location.length;
+				block_location.hosts = location.hosts;
+				block_locations.push_back(block_location);
+			}
+		} catch(const std::exception & e) {
+			// files without locality information are just assigned by size
+		}
+	}
+	return block_locations;
+}
+
+std::vector<std::vector<std::string>> listResourceNames(std::vector<std::string> directories) {
+	auto fileSystemManager = BlazingContext::getInstance()->getFileSystemManager();
+
+	// a fixed number of threads takes the directories one by one, since there can be thousands of them
+	const size_t max_threads = 32;
+	std::vector<std::vector<std::string>> names(directories.size());
+	std::atomic<size_t> next_directory(0);
+	std::vector<BlazingThread> threads(std::min(directories.size(), max_threads));
+	for(size_t thread_index = 0; thread_index < threads.size(); thread_index++) {
+		threads[thread_index] = BlazingThread([&]() {
+			for(size_t index = next_directory++; index < directories.size(); index = next_directory++) {
+				try {
+					names[index] = fileSystemManager->listResourceNames(Uri(directories[index]));
+				} catch(const std::exception & e) {
+					// a directory that can not be listed is reported as empty, like a directory that does not exist
+				}
+			}
+		});
+	}
+	for(auto & thread : threads) {
+		thread.join();
+	}
+	return names;
+}
+
+size_t invalidateFileSystemCache(std::vector<std::string> prefixes) {
+	auto fileSystemManager = BlazingContext::getInstance()->getFileSystemManager();
+
+	size_t count = 0;
+	for(auto & prefix : prefixes) {
+		// the cache is keyed by the normalized uri, which can differ from what the user wrote (like a missing scheme)
+		Uri uri(prefix, false);
+		std::string normalized_prefix = uri.isValid() ? uri.toString() : prefix;
+		count += fileSystemManager->invalidateMetadataCache(normalized_prefix);
+		if(normalized_prefix != prefix) {
+			count += fileSystemManager->invalidateMetadataCache(prefix);
+		}
+	}
+	return count;
+}
+
+FileSystemCacheStats getFileSystemCacheStats() {
+	MetadataCacheStats stats = BlazingContext::getInstance()->getFileSystemManager()->getMetadataCacheStats();
+	FileSystemCacheStats result;
+	result.hits = stats.hits;
+	result.misses = stats.misses;
+	result.entries = stats.entries;
+	return result;
+}
 
 std::pair<bool, std::string> registerFileSystem(
 	FileSystemConnection fileSystemConnection, std::string root, std::string authority) {
@@ -32,19 +32,18 @@ public:
 		return true;
 	}
 
-	virtual kstatus run() {
-		CodeTimer timer;
-        CodeTimer eventTimer(false);
+	virtual void run() {
+		timer.start();
 
-        std::vector<std::string> aggregation_input_expressions, aggregation_column_assigned_aliases;
-        std::tie(this->group_column_indices, aggregation_input_expressions, this->aggregation_types,
-            aggregation_column_assigned_aliases) = ral::operators::parseGroupByExpression(this->expression);
-
-        BatchSequence input(this->input_cache(), this);
-        int batch_count = 0;
-        while (input.wait_for_next()) {
+        std::tie(this->group_column_indices, this->aggregation_input_expressions, this->aggregation_types,
+            this->aggregation_column_assigned_aliases) = ral::operators::parseGroupByExpression(this->expression);
 
-            this->output_cache()->wait_if_cache_is_saturated();
+        input.set_source(this->input_cache());
+        for_each_batch(this->input_cache(), [this]() {
+            CodeTimer eventTimer(false);
+            if (!input.wait_for_next()) {
+                return false;
+            }
             auto batch = input.next();
 
             eventTimer.start();
@@ -96,17 +95,18 @@ public:
                             "duration"_a="");
                 throw;
             }
-        }
-
-        logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-                    "query_id"_a=context->getContextToken(),
-                    "step"_a=context->getQueryStep(),
-                    "substep"_a=context->getQuerySubstep(),
-                    "info"_a="ComputeAggregate Kernel Completed",
-                    "duration"_a=timer.elapsed_time(),
-                    "kernel_id"_a=this->get_id());
+            return true;
+        }, [this]() {
+            logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+                        "query_id"_a=context->getContextToken(),
+                        "step"_a=context->getQueryStep(),
+                        "substep"_a=context->getQuerySubstep(),
+                        "info"_a="ComputeAggregate Kernel Completed",
+                        "duration"_a=timer.elapsed_time(),
+                        "kernel_id"_a=this->get_id());
 
-        return kstatus::proceed;
+            done();
+        }, true);
     }
 
     std::pair<bool, uint64_t> get_estimated_output_num_rows(){
@@ -131,6 +131,9 @@ public:
 private:
     std::vector<AggregateKind> aggregation_types;
     std::vector<int> group_column_indices;
+    std::vector<std::string> aggregation_input_expressions, aggregation_column_assigned_aliases;
+    BatchSequence input{nullptr, this};
+    int batch_count = 0;
 };
 
 class DistributeAggregateKernel : public kernel {
@@ -144,130 +147,139 @@ public:
 		return true;
 	}
 
-	virtual kstatus run() {
-        using ColumnDataPartitionMessage = ral::communication::messages::ColumnDataPartitionMessage;
+	virtual void run() {
+        timer.start();
 
-        CodeTimer timer;
-
-        std::vector<int> group_column_indices;
         std::vector<std::string> aggregation_input_expressions, aggregation_column_assigned_aliases; // not used in this kernel
         std::vector<AggregateKind> aggregation_types; // not used in this kernel
         std::tie(group_column_indices, aggregation_input_expressions, aggregation_types,
             aggregation_column_assigned_aliases) = ral::operators::parseGroupByExpression(this->expression);
 
-        std::vector<cudf::size_type> columns_to_hash;
         std::transform(group_column_indices.begin(), group_column_indices.end(), std::back_inserter(columns_to_hash), [](int index) { return (cudf::size_type)index; });
 
+        // Lets put the server listener to feed the output, but not if its aggregations without group by and its not the master
+        bool has_external_input = group_column_indices.size() > 0 ||
+            this->context->isMasterNode(ral::communication::CommunicationData::getInstance().getSelfNode());
+
+        auto finished = when_all(has_external_input ? 2 : 1, [this]() {
+            logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+                        "query_id"_a=context->getContextToken(),
+                        "step"_a=context->getQueryStep(),
+                        "substep"_a=context->getQuerySubstep(),
+                        "info"_a="DistributeAggregate Kernel Completed",
+                        "duration"_a=timer.elapsed_time(),
+                        "kernel_id"_a=this->get_id());
+
+            done();
+        });
 
-        BlazingThread producer_thread([this, group_column_indices, columns_to_hash](){
+        if(has_external_input) {
+            external_input = std::make_unique<ExternalBatchColumnDataSequence<ColumnDataPartitionMessage>>(context, this->get_message_id(), this);
+            for_each_batch([this](std::function<void()> callback) {
+                external_input->notify_when_ready(std::move(callback));
+            }, [this]() {
+                std::unique_ptr<ral::frame::BlazingHostTable> host_table = external_input->next();
+                if (!host_table) {
+                    return false;
+                }
+                this->add_to_output_cache(std::move(host_table));
+                return true;
+            }, finished);
+        }
+
+        input.set_source(this->input_cache());
+        for_each_batch(this->input_cache(), [this]() {
             // num_partitions = context->getTotalNodes() will do for now, but may want a function to determine this in the future.
             // If we do partition into something other than the number of nodes, then we have to use part_ids and change up more of the logic
             int num_partitions = this->context->getTotalNodes();
-            bool set_empty_part_for_non_master_node = false; // this is only for aggregation without group by
 
-            BatchSequence input(this->input_cache(), this);
-            int batch_count = 0;
-            while (input.wait_for_next()) {
-                auto batch = input.next();
+            if (!input.wait_for_next()) {
+                return false;
+            }
+            auto batch = input.next();
 
-                try {
-                    //std::cout<<"DistributeAggregateKernel batch "<<batch_count<<std::endl;
+            try {
+                //std::cout<<"DistributeAggregateKernel batch "<<batch_count<<std::endl;
 
-                    // If its an aggregation without group by we want to send all the results to the master node
-                    if (group_column_indices.size() == 0) {
-                        if(this->context->isMasterNode(ral::communication::CommunicationData::getInstance().getSelfNode())) {
-                            this->add_to_output_cache(std::move(batch));
-                        } else {
-                            if (!set_empty_part_for_non_master_node){ // we want to keep in the non-master nodes something, so that the cache is not empty
-                                std::unique_ptr<ral::frame::BlazingTable> empty =
-                                    ral::utilities::create_empty_table(batch->toBlazingTableView());
-                                this->add_to_output_cache(std::move(empty));
-                                set_empty_part_for_non_master_node = true;
-                            }
-                            std::vector<ral::distribution::NodeColumnView> selfPartition;
-                            selfPartition.emplace_back(this->context->getMasterNode(), batch->toBlazingTableView());
-                            ral::distribution::distributeTablePartitions(this->context.get(), selfPartition);
+                // If its an aggregation without group by we want to send all the results to the master node
+                if (group_column_indices.size() == 0) {
+                    if(this->context->isMasterNode(ral::communication::CommunicationData::getInstance().getSelfNode())) {
+                        this->add_to_output_cache(std::move(batch));
+                    } else {
+                        if (!set_empty_part_for_non_master_node){ // we want to keep in the non-master nodes something, so that the cache is not empty
+                            std::unique_ptr<ral::frame::BlazingTable> empty =
+                                ral::utilities::create_empty_table(batch->toBlazingTableView());
+                            this->add_to_output_cache(std::move(empty));
+                            set_empty_part_for_non_master_node = true;
                         }
+                        std::vector<ral::distribution::NodeColumnView> selfPartition;
+                        selfPartition.emplace_back(this->context->getMasterNode(), batch->toBlazingTableView());
+                        ral::distribution::distributeTablePartitions(this->context.get(), selfPartition);
+                    }
+                } else {
+                    CudfTableView batch_view = batch->view();
+                    std::vector<CudfTableView> partitioned;
+                    std::unique_ptr<CudfTable> hashed_data; // Keep table alive in this scope
+                    if (batch_view.num_rows() > 0) {
+                        std::vector<cudf::size_type> hased_data_offsets;
+                        std::tie(hashed_data, hased_data_offsets) = cudf::hash_partition(batch->view(), columns_to_hash, num_partitions);
+                        // the offsets returned by hash_partition will always start at 0, which is a value we want to ignore for cudf::split
+                        std::vector<cudf::size_type> split_indexes(hased_data_offsets.begin() + 1, hased_data_offsets.end());
+                        partitioned = cudf::split(hashed_data->view(), split_indexes);
                     } else {
-                        CudfTableView batch_view = batch->view();
-                        std::vector<CudfTableView> partitioned;
-                        std::unique_ptr<CudfTable> hashed_data; // Keep table alive in this scope
-                        if (batch_view.num_rows() > 0) {
-                            std::vector<cudf::size_type> hased_data_offsets;
-                            std::tie(hashed_data, hased_data_offsets) = cudf::hash_partition(batch->view(), columns_to_hash, num_partitions);
-                            // the offsets returned by hash_partition will always start at 0, which is a value we want to ignore for cudf::split
-                            std::vector<cudf::size_type> split_indexes(hased_data_offsets.begin() + 1, hased_data_offsets.end());
-                            partitioned = cudf::split(hashed_data->view(), split_indexes);
-                        } else {
-                            //  copy empty view
-                            for (auto i = 0; i < num_partitions; i++) {
-                                partitioned.push_back(batch_view);
-                            }
+                        //  copy empty view
+                        for (auto i = 0; i < num_partitions; i++) {
+                            partitioned.push_back(batch_view);
                         }
+                    }
 
-                        std::vector<ral::distribution::NodeColumnView > partitions_to_send;
-                        for(int nodeIndex = 0; nodeIndex < this->context->getTotalNodes(); nodeIndex++ ){
-                            ral::frame::BlazingTableView partition_table_view = ral::frame::BlazingTableView(partitioned[nodeIndex], batch->names());
-                            if (this->context->getNode(nodeIndex) == ral::communication::CommunicationData::getInstance().getSelfNode()){
-                                // hash_partition followed by split does not create a partition that we can own, so we need to clone it.
-                                // if we dont clone it, hashed_data will go out of scope before we get to use the partition
-                                // also we need a BlazingTable to put into the cache, we cant cache views.
-                                std::unique_ptr<ral::frame::BlazingTable> partition_table_clone = partition_table_view.clone();
-                                this->add_to_output_cache(std::move(partition_table_clone));
-                            } else {
-                                partitions_to_send.emplace_back(
-                                    std::make_pair(this->context->getNode(nodeIndex), partition_table_view));
-                            }
+                    std::vector<ral::distribution::NodeColumnView > partitions_to_send;
+                    for(int nodeIndex = 0; nodeIndex < this->context->getTotalNodes(); nodeIndex++ ){
+                        ral::frame::BlazingTableView partition_table_view = ral::frame::BlazingTableView(partitioned[nodeIndex], batch->names());
+                        if (this->context->getNode(nodeIndex) == ral::communication::CommunicationData::getInstance().getSelfNode()){
+                            // hash_partition followed by split does not create a partition that we can own, so we need to clone it.
+                            // if we dont clone it, hashed_data will go out of scope before we get to use the partition
+                            // also we need a BlazingTable to put into the cache, we cant cache views.
+                            std::unique_ptr<ral::frame::BlazingTable> partition_table_clone = partition_table_view.clone();
+                            this->add_to_output_cache(std::move(partition_table_clone));
+                        } else {
+                            partitions_to_send.emplace_back(
+                                std::make_pair(this->context->getNode(nodeIndex), partition_table_view));
                         }
-                        ral::distribution::distributeTablePartitions(this->context.get(), partitions_to_send);
                     }
-                    batch_count++;
-                } catch(const std::exception& e) {
-                    // TODO add retry here
-                    this->logger->error("{query_id}|{step}|{substep}|{info}|{duration}||||",
-                                        "query_id"_a=context->getContextToken(),
-                                        "step"_a=context->getQueryStep(),
-                                        "substep"_a=context->getQuerySubstep(),
-                                        "info"_a="In DistributeAggregate kernel batch {} for {}. What: {}"_format(batch_count, expression, e.what()),
-                                        "duration"_a="");
-                    throw;
+                    ral::distribution::distributeTablePartitions(this->context.get(), partitions_to_send);
                 }
+                batch_count++;
+            } catch(const std::exception& e) {
+                // TODO add retry here
+                this->logger->error("{query_id}|{step}|{substep}|{info}|{duration}||||",
+                                    "query_id"_a=context->getContextToken(),
+                                    "step"_a=context->getQueryStep(),
+                                    "substep"_a=context->getQuerySubstep(),
+                                    "info"_a="In DistributeAggregate kernel batch {} for {}. What: {}"_format(batch_count, expression, e.what()),
+                                    "duration"_a="");
+                throw;
             }
-
+            return true;
+        }, [this, finished]() {
             if (!(group_column_indices.size() == 0
                 && this->context->isMasterNode(ral::communication::CommunicationData::getInstance().getSelfNode()))) {
                 // Aggregations without groupby does not send distributeTablePartitions
                 ral::distribution::notifyLastTablePartitions(this->context.get(), ColumnDataPartitionMessage::MessageID());
             }
+            finished();
         });
-
-        BlazingThread consumer_thread([this, group_column_indices](){
-            // Lets put the server listener to feed the output, but not if its aggregations without group by and its not the master
-            if(group_column_indices.size() > 0 ||
-                        this->context->isMasterNode(ral::communication::CommunicationData::getInstance().getSelfNode())) {
-                ExternalBatchColumnDataSequence<ColumnDataPartitionMessage> external_input(context, this->get_message_id(), this);
-                std::unique_ptr<ral::frame::BlazingHostTable> host_table;
-                while (host_table = external_input.next()) {
-                    this->add_to_output_cache(std::move(host_table));
-                }
-            }
-        });
-        producer_thread.join();
-        consumer_thread.join();
-
-        logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-                    "query_id"_a=context->getContextToken(),
-                    "step"_a=context->getQueryStep(),
-                    "substep"_a=context->getQuerySubstep(),
-                    "info"_a="DistributeAggregate Kernel Completed",
-                    "duration"_a=timer.elapsed_time(),
-                    "kernel_id"_a=this->get_id());
-
-		return kstatus::proceed;
 	}
 
 private:
+    using ColumnDataPartitionMessage = ral::communication::messages::ColumnDataPartitionMessage;
 
+    std::vector<int> group_column_indices;
+    std::vector<cudf::size_type> columns_to_hash;
+    bool set_empty_part_for_non_master_node = false; // this is only for aggregation without group by
+    BatchSequence input{nullptr, this};
+    int batch_count = 0;
+    std::unique_ptr<ExternalBatchColumnDataSequence<ColumnDataPartitionMessage>> external_input;
 };
 
 
@@ -282,106 +294,106 @@ public:
 		return false;
 	}
 
-	virtual kstatus run() {
-        CodeTimer timer;
-        CodeTimer eventTimer(false);
-
-        std::vector<std::unique_ptr<ral::frame::BlazingTable>> tablesToConcat;
-		std::vector<ral::frame::BlazingTableView> tableViewsToConcat;
+	virtual void run() {
+        timer.start();
 
         // This Kernel needs all of the input before it can do any output. So lets wait until all the input is available
-        this->input_cache()->wait_until_finished();
-
-        BatchSequence input(this->input_cache(), this);
-        int batch_count=0;
-        try {
-            while (input.wait_for_next()) {
-                auto batch = input.next();
-                // std::cout<<"MergeAggregateKernel batch "<<batch_count<<std::endl;
-                // ral::utilities::print_blazing_table_view_schema(batch->toBlazingTableView(), "MergeAggregateKernel_batch" + std::to_string(batch_count));
-                batch_count++;
-                tableViewsToConcat.emplace_back(batch->toBlazingTableView());
-                tablesToConcat.emplace_back(std::move(batch));
-            }
-            eventTimer.start();
+        submit_when_finished(this->input_cache(), [this]() {
+            CodeTimer eventTimer(false);
 
-            auto concatenated = ral::utilities::concatTables(tableViewsToConcat);
-
-            auto log_input_num_rows = concatenated ? concatenated->num_rows() : 0;
-            auto log_input_num_bytes = concatenated ? concatenated->sizeInBytes() : 0;
-
-            std::vector<int> group_column_indices;
-            std::vector<std::string> aggregation_input_expressions, aggregation_column_assigned_aliases;
-            std::vector<AggregateKind> aggregation_types;
-            std::tie(group_column_indices, aggregation_input_expressions, aggregation_types,
-                aggregation_column_assigned_aliases) = ral::operators::parseGroupByExpression(this->expression);
-
-            std::vector<int> mod_group_column_indices;
-            std::vector<std::string> mod_aggregation_input_expressions, mod_aggregation_column_assigned_aliases, merging_column_names;
-            std::vector<AggregateKind> mod_aggregation_types;
-            std::tie(mod_group_column_indices, mod_aggregation_input_expressions, mod_aggregation_types,
-                mod_aggregation_column_assigned_aliases) = ral::operators::modGroupByParametersForMerge(
-                group_column_indices, aggregation_types, concatenated->names());
-
-            std::unique_ptr<ral::frame::BlazingTable> output;
-            if(aggregation_types.size() == 0) {
-                output = ral::operators::compute_groupby_without_aggregations(
-                        concatenated->toBlazingTableView(), mod_group_column_indices);
-            } else if (group_column_indices.size() == 0) {
-                // aggregations without groupby are only merged on the master node
-                if(context->isMasterNode(ral::communication::CommunicationData::getInstance().getSelfNode())) {
-                    output = ral::operators::compute_aggregations_without_groupby(
-                            concatenated->toBlazingTableView(), mod_aggregation_input_expressions, mod_aggregation_types,
-                            mod_aggregation_column_assigned_aliases);
+            std::vector<std::unique_ptr<ral::frame::BlazingTable>> tablesToConcat;
+            std::vector<ral::frame::BlazingTableView> tableViewsToConcat;
+
+            BatchSequence input(this->input_cache(), this);
+            int batch_count=0;
+            try {
+                while (input.wait_for_next()) {
+                    auto batch = input.next();
+                    // std::cout<<"MergeAggregateKernel batch "<<batch_count<<std::endl;
+                    // ral::utilities::print_blazing_table_view_schema(batch->toBlazingTableView(), "MergeAggregateKernel_batch" + std::to_string(batch_count));
+                    batch_count++;
+                    tableViewsToConcat.emplace_back(batch->toBlazingTableView());
+                    tablesToConcat.emplace_back(std::move(batch));
+                }
+                eventTimer.start();
+
+                auto concatenated = ral::utilities::concatTables(tableViewsToConcat);
+
+                auto log_input_num_rows = concatenated ? concatenated->num_rows() : 0;
+                auto log_input_num_bytes = concatenated ? concatenated->sizeInBytes() : 0;
+
+                std::vector<int> group_column_indices;
+                std::vector<std::string> aggregation_input_expressions, aggregation_column_assigned_aliases;
+                std::vector<AggregateKind> aggregation_types;
+                std::tie(group_column_indices, aggregation_input_expressions, aggregation_types,
+                    aggregation_column_assigned_aliases) = ral::operators::parseGroupByExpression(this->expression);
+
+                std::vector<int> mod_group_column_indices;
+                std::vector<std::string> mod_aggregation_input_expressions, mod_aggregation_column_assigned_aliases, merging_column_names;
+                std::vector<AggregateKind> mod_aggregation_types;
+                std::tie(mod_group_column_indices, mod_aggregation_input_expressions, mod_aggregation_types,
+                    mod_aggregation_column_assigned_aliases) = ral::operators::modGroupByParametersForMerge(
+                    group_column_indices, aggregation_types, concatenated->names());
+
+                std::unique_ptr<ral::frame::BlazingTable> output;
+                if(aggregation_types.size() == 0) {
+                    output = ral::operators::compute_groupby_without_aggregations(
+                            concatenated->toBlazingTableView(), mod_group_column_indices);
+                } else if (group_column_indices.size() == 0) {
+                    // aggregations without groupby are only merged on the master node
+                    if(context->isMasterNode(ral::communication::CommunicationData::getInstance().getSelfNode())) {
+                        output = ral::operators::compute_aggregations_without_groupby(
+                                concatenated->toBlazingTableView(), mod_aggregation_input_expressions, mod_aggregation_types,
+                                mod_aggregation_column_assigned_aliases);
+                    } else {
+                        // with aggregations without groupby the distribution phase should deposit an empty dataframe with the right schema into the cache, which is then output here
+                        output = std::move(concatenated);
+                    }
                 } else {
-                    // with aggregations without groupby the distribution phase should deposit an empty dataframe with the right schema into the cache, which is then output here
-                    output = std::move(concatenated);
+                    output = ral::operators::compute_aggregations_with_groupby(
+                            concatenated->toBlazingTableView(), mod_aggregation_input_expressions, mod_aggregation_types,
+                            mod_aggregation_column_assigned_aliases, mod_group_column_indices);
                 }
-            } else {
-                output = ral::operators::compute_aggregations_with_groupby(
-                        concatenated->toBlazingTableView(), mod_aggregation_input_expressions, mod_aggregation_types,
-                        mod_aggregation_column_assigned_aliases, mod_group_column_indices);
-            }
-            // ral::utilities::print_blazing_table_view_schema(output->toBlazingTableView(), "MergeAggregateKernel_output");
-            eventTimer.stop();
+                // ral::utilities::print_blazing_table_view_schema(output->toBlazingTableView(), "MergeAggregateKernel_output");
+                eventTimer.stop();
 
-            auto log_output_num_rows = output->num_rows();
-            auto log_output_num_bytes = output->sizeInBytes();
+                auto log_output_num_rows = output->num_rows();
+                auto log_output_num_bytes = output->sizeInBytes();
+
+                events_logger->info("{ral_id}|{query_id}|{kernel_id}|{input_num_rows}|{input_num_bytes}|{output_num_rows}|{output_num_bytes}|{event_type}|{timestamp_begin}|{timestamp_end}",
+                                "ral_id"_a=context->getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode()),
+                                "query_id"_a=context->getContextToken(),
+                                "kernel_id"_a=this->get_id(),
+                                "input_num_rows"_a=log_input_num_rows,
+                                "input_num_bytes"_a=log_input_num_bytes,
+                                "output_num_rows"_a=log_output_num_rows,
+                                "output_num_bytes"_a=log_output_num_bytes,
+                                "event_type"_a="compute",
+                                "timestamp_begin"_a=eventTimer.start_time(),
+                                "timestamp_end"_a=eventTimer.end_time());
 
-            events_logger->info("{ral_id}|{query_id}|{kernel_id}|{input_num_rows}|{input_num_bytes}|{output_num_rows}|{output_num_bytes}|{event_type}|{timestamp_begin}|{timestamp_end}",
-                            "ral_id"_a=context->getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode()),
+                this->add_to_output_cache(std::move(output));
+            } catch(const std::exception& e) {
+                // TODO add retry here
+                logger->error("{query_id}|{step}|{substep}|{info}|{duration}||||",
                             "query_id"_a=context->getContextToken(),
-                            "kernel_id"_a=this->get_id(),
-                            "input_num_rows"_a=log_input_num_rows,
-                            "input_num_bytes"_a=log_input_num_bytes,
-                            "output_num_rows"_a=log_output_num_rows,
-                            "output_num_bytes"_a=log_output_num_bytes,
-                            "event_type"_a="compute",
-                            "timestamp_begin"_a=eventTimer.start_time(),
-                            "timestamp_end"_a=eventTimer.end_time());
-
-            this->add_to_output_cache(std::move(output));
-        } catch(const std::exception& e) {
-            // TODO add retry here
-            logger->error("{query_id}|{step}|{substep}|{info}|{duration}||||",
+                            "step"_a=context->getQueryStep(),
+                            "substep"_a=context->getQuerySubstep(),
+                            "info"_a="In MergeAggregate kernel for {}. What: {}"_format(expression, e.what()),
+                            "duration"_a="");
+                throw;
+            }
+
+            logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
                         "query_id"_a=context->getContextToken(),
                         "step"_a=context->getQueryStep(),
                         "substep"_a=context->getQuerySubstep(),
-                        "info"_a="In MergeAggregate kernel for {}. What: {}"_format(expression, e.what()),
-                        "duration"_a="");
-            throw;
-        }
-
+                        "info"_a="MergeAggregate Kernel Completed",
+                        "duration"_a=timer.elapsed_time(),
+                        "kernel_id"_a=this->get_id());
 
-        logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-                    "query_id"_a=context->getContextToken(),
-                    "step"_a=context->getQueryStep(),
-                    "substep"_a=context->getQuerySubstep(),
-                    "info"_a="MergeAggregate Kernel Completed",
-                    "duration"_a=timer.elapsed_time(),
-                    "kernel_id"_a=this->get_id());
-
-		return kstatus::proceed;
+            done();
+        });
 	}
 
     bool ready_to_execute() {
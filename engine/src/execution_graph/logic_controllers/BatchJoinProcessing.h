@@ -74,66 +74,38 @@ public:
 	std::unique_ptr<TableSchema> left_schema{nullptr};
  	std::unique_ptr<TableSchema> right_schema{nullptr};
 
-	std::unique_ptr<ral::frame::BlazingTable> load_set(BatchSequence & input, bool load_all){
-		std::size_t bytes_loaded = 0;
-		std::vector<std::unique_ptr<ral::frame::BlazingTable>> tables_loaded;
-		if (input.wait_for_next()){
-			tables_loaded.emplace_back(input.next());
-			bytes_loaded += tables_loaded.back()->sizeInBytes();
-		} else {
-			return nullptr;
-		}
-		// NOTE this used to be like this:
-		// while ((input.has_next_now() && bytes_loaded < join_partition_size_theshold) ||
-		//  	(load_all && input.wait_for_next())) {
-		// with the idea that it would just start processing as soon as there was data to process.
+	// called once the input is ready, so that wait_for_next does not wait. Returns true once the set is loaded
+	bool load_next_batch(BatchSequence & input, bool load_all){
+		// NOTE this used to load the batches that were already available, with the idea that it would just start processing as soon as there was data to process.
 		// This actually does not make it faster, because it makes it so that there are more chunks to do pairwise joins and therefore more join operations
 		// We may want to revisit or rethink this
-
-		while ((input.wait_for_next() && bytes_loaded < join_partition_size_theshold) ||
-					(load_all && input.wait_for_next())) {
-			tables_loaded.emplace_back(input.next());
-			bytes_loaded += tables_loaded.back()->sizeInBytes();
-		}
-		if (tables_loaded.size() == 0){
-			return nullptr;
-		} else if (tables_loaded.size() == 1){
-			return std::move(tables_loaded[0]);
-		} else {
-			std::vector<ral::frame::BlazingTableView> tables_to_concat(tables_loaded.size());
-			for (std::size_t i = 0; i < tables_loaded.size(); i++){
-				tables_to_concat[i] = tables_loaded[i]->toBlazingTableView();
-			}
-			return ral::utilities::concatTables(tables_to_concat);
+		if (!input.wait_for_next()){
+			return true;
 		}
+		this->tables_loaded.emplace_back(input.next());
+		this->bytes_loaded += this->tables_loaded.back()->sizeInBytes();
+		return !(this->bytes_loaded < join_partition_size_theshold || load_all);
 	}
 
-
-    std::unique_ptr<ral::frame::BlazingTable> load_left_set(){
-
-		this->max_left_ind++;
-		// need to load all the left side, only if doing a FULL OUTER JOIN
-		bool load_all = this->join_type == OUTER_JOIN ?  true : false;
-		auto table = load_set(this->left_sequence, load_all);
-		if (not left_schema && table != nullptr) {
-			left_schema = std::make_unique<TableSchema>(table->get_schema(),  table->names());
-		}
-		if (table == nullptr) {
-			return ral::frame::createEmptyBlazingTable(left_schema->column_types, left_schema->column_names);
+	std::unique_ptr<ral::frame::BlazingTable> take_loaded_set(std::unique_ptr<TableSchema> & schema){
+		std::unique_ptr<ral::frame::BlazingTable> table;
+		if (this->tables_loaded.size() == 1){
+			table = std::move(this->tables_loaded[0]);
+		} else if (this->tables_loaded.size() > 1){
+			std::vector<ral::frame::BlazingTableView> tables_to_concat(this->tables_loaded.size());
+			for (std::size_t i = 0; i < this->tables_loaded.size(); i++){
+				tables_to_concat[i] = this->tables_loaded[i]->toBlazingTableView();
+			}
+			table = ral::utilities::concatTables(tables_to_concat);
 		}
-		return std::move(table);
-	}
+		this->tables_loaded.clear();
+		this->bytes_loaded = 0;
 
-	std::unique_ptr<ral::frame::BlazingTable> load_right_set(){
-		this->max_right_ind++;
-		// need to load all the right side, if doing any type of outer join
-		bool load_all = this->join_type != INNER_JOIN ?  true : false;
-		auto table = load_set(this->right_sequence, load_all);
-		if (not right_schema && table != nullptr) {
-			right_schema = std::make_unique<TableSchema>(table->get_schema(),  table->names());
+		if (not schema && table != nullptr) {
+			schema = std::make_unique<TableSchema>(table->get_schema(),  table->names());
 		}
 		if (table == nullptr) {
-			return ral::frame::createEmptyBlazingTable(right_schema->column_types, right_schema->column_names);
+			return ral::frame::createEmptyBlazingTable(schema->column_types, schema->column_names);
 		}
 		return std::move(table);
 	}
@@ -256,190 +228,252 @@ public:
 		return std::make_unique<ral::frame::BlazingTable>(std::move(result_table), this->result_names);
 	}
 
-    virtual kstatus run() {
-		CodeTimer timer;
-
-		this->left_sequence = BatchSequence(this->input_.get_cache("input_a"), this);
-		this->right_sequence = BatchSequence(this->input_.get_cache("input_b"), this);
+    virtual void run() {
+		timer.start();
 
 		// lets parse part of the expression here, because we need the joinType before we load
-		std::string new_join_statement, filter_statement;
+		std::string new_join_statement;
 		StringUtil::findAndReplaceAll(this->expression, "IS NOT DISTINCT FROM", "=");
-		split_inequality_join_into_join_and_filter(this->expression, new_join_statement, filter_statement);
-		std::string condition = get_named_expression(new_join_statement, "condition");
+		split_inequality_join_into_join_and_filter(this->expression, new_join_statement, this->filter_statement);
+		this->condition = get_named_expression(new_join_statement, "condition");
 		this->join_type = get_named_expression(new_join_statement, "joinType");
 
-		std::unique_ptr<ral::frame::BlazingTable> left_batch = nullptr;
-		std::unique_ptr<ral::frame::BlazingTable> right_batch = nullptr;
-		bool done = false;
-		bool produced_output = false;
-		int left_ind = 0;
-		int right_ind = 0;
-
-		while (!done) {
-			try {
-
-				if (left_batch == nullptr && right_batch == nullptr){ // first load
-					left_batch = load_left_set();
-					right_batch = load_right_set();
-					this->max_left_ind = 0; // we have loaded just once. This is the highest index for now
-					this->max_right_ind = 0; // we have loaded just once. This is the highest index for now
-
-					// parsing more of the expression here because we need to have the number of columns of the tables
-					std::vector<int> column_indices;
-					parseJoinConditionToColumnIndices(condition, column_indices);
-					for(int i = 0; i < column_indices.size();i++){
-						if(column_indices[i] >= left_batch->num_columns()){
-							this->right_column_indices.push_back(column_indices[i] - left_batch->num_columns());
-						}else{
-							this->left_column_indices.push_back(column_indices[i]);
-						}
+		ral::cache::CacheMachine * left_cache = this->input_.get_cache("input_a").get();
+		ral::cache::CacheMachine * right_cache = this->input_.get_cache("input_b").get();
+		for_each_batch([this, left_cache, right_cache](std::function<void()> callback) {
+			if (this->phase == join_phase::loading_left || this->phase == join_phase::waiting_for_left) {
+				left_cache->notify_when_ready(std::move(callback));
+			} else if (this->phase == join_phase::loading_right || this->phase == join_phase::waiting_for_right) {
+				right_cache->notify_when_ready(std::move(callback));
+			} else {
+				callback();
+			}
+		}, [this]() {
+			return join_step();
+		}, [this]() {
+			if (!produced_output){
+				logger->warn("{query_id}|{step}|{substep}|{info}|{duration}||||",
+											"query_id"_a=context->getContextToken(),
+											"step"_a=context->getQueryStep(),
+											"substep"_a=context->getQuerySubstep(),
+											"info"_a="PartwiseJoin kernel did not produce an output",
+											"duration"_a="");
+				// WSM TODO put an empty output into output cache
+			}
+
+			logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+										"query_id"_a=context->getContextToken(),
+										"step"_a=context->getQueryStep(),
+										"substep"_a=context->getQuerySubstep(),
+										"info"_a="PartwiseJoin Kernel Completed",
+										"duration"_a=timer.elapsed_time(),
+										"kernel_id"_a=this->get_id());
+
+			done();
+		});
+	}
+
+private:
+	/// what the next step of the join does, the steps that load or wait for a batch run once its input is ready
+	enum class join_phase { loading_left, loading_right, waiting_for_left, waiting_for_right, choosing_next_set };
+
+	// does one step of the join, returns false once there are no more sets to join
+	bool join_step() {
+		try {
+			switch (this->phase) {
+			case join_phase::loading_left:
+			case join_phase::loading_right: {
+				bool left = this->phase == join_phase::loading_left;
+				if (left) {
+					// need to load all the left side, only if doing a FULL OUTER JOIN
+					if (!load_next_batch(this->left_sequence, this->join_type == OUTER_JOIN)) {
+						return true;
 					}
-					std::vector<std::string> left_names = left_batch->names();
-					std::vector<std::string> right_names = right_batch->names();
-					this->result_names.reserve(left_names.size() + right_names.size());
-					this->result_names.insert(this->result_names.end(), left_names.begin(), left_names.end());
-					this->result_names.insert(this->result_names.end(), right_names.begin(), right_names.end());
-
-					computeNormalizationData(left_batch->get_schema(), right_batch->get_schema());
-
-				} else { // Not first load, so we have joined a set pair. Now lets see if there is another set pair we can do, but keeping one of the two sides we already have
-
-					int new_left_ind, new_right_ind;
-					std::tie(new_left_ind, new_right_ind) = check_for_another_set_to_do_with_data_we_already_have(left_ind, right_ind);
-					if (new_left_ind >= 0 || new_right_ind >= 0) {
-						if (new_left_ind != left_ind) { // if we are switching out left
-							this->leftArrayCache->put(left_ind, std::move(left_batch));
-							left_ind = new_left_ind;
-							left_batch = this->leftArrayCache->get_or_wait(left_ind);
-						} else { // if we are switching out right
-							this->rightArrayCache->put(right_ind, std::move(right_batch));
-							right_ind = new_right_ind;
-							right_batch = this->rightArrayCache->get_or_wait(right_ind);
-						}
-					} else {
-						// lets try first to just grab the next one that is already available and waiting, but we keep one of the two sides we already have
-						if (this->left_sequence.has_next_now()){
-							this->leftArrayCache->put(left_ind, std::move(left_batch));
-							left_batch = load_left_set();
-							left_ind = this->max_left_ind;
-						} else if (this->right_sequence.has_next_now()){
-							this->rightArrayCache->put(right_ind, std::move(right_batch));
-							right_batch = load_right_set();
-							right_ind = this->max_right_ind;
-						} else {
-							// lets see if there are any in are matrix that have not been completed
-							std::tie(new_left_ind, new_right_ind) = check_for_set_that_has_not_been_completed();
-							if (new_left_ind >= 0 && new_right_ind >= 0) {
-								this->leftArrayCache->put(left_ind, std::move(left_batch));
-								left_ind = new_left_ind;
-								left_batch = this->leftArrayCache->get_or_wait(left_ind);
-								this->rightArrayCache->put(right_ind, std::move(right_batch));
-								right_ind = new_right_ind;
-								right_batch = this->rightArrayCache->get_or_wait(right_ind);
-							} else {
-								// nothing else for us to do buy wait and see if there are any left to do
-								if (this->left_sequence.wait_for_next()){
-									this->leftArrayCache->put(left_ind, std::move(left_batch));
-									left_batch = load_left_set();
-									left_ind = this->max_left_ind;
-								} else if (this->right_sequence.wait_for_next()){
-									this->rightArrayCache->put(right_ind, std::move(right_batch));
-									right_batch = load_right_set();
-									right_ind = this->max_right_ind;
-								} else {
-									done = true;
-								}
-							}
-						}
+					this->max_left_ind++;
+					left_batch = take_loaded_set(left_schema);
+					left_ind = this->max_left_ind;
+				} else {
+					// need to load all the right side, if doing any type of outer join
+					if (!load_next_batch(this->right_sequence, this->join_type != INNER_JOIN)) {
+						return true;
 					}
+					this->max_right_ind++;
+					right_batch = take_loaded_set(right_schema);
+					right_ind = this->max_right_ind;
 				}
-				if (!done) {
-					CodeTimer eventTimer(false);
-					eventTimer.start();
-
-					if (this->normalize_left){
-						ral::utilities::normalize_types(left_batch, this->join_column_common_types, this->left_column_indices);
-					}
-					if (this->normalize_right){
-						ral::utilities::normalize_types(right_batch, this->join_column_common_types, this->right_column_indices);
+				if (first_load) { // the first load is of both sides
+					if (left) {
+						this->phase = join_phase::loading_right;
+						return true;
 					}
+					first_load = false;
+					parse_join_columns();
+				}
+				break;
+			}
+			case join_phase::waiting_for_left:
+				if (this->left_sequence.wait_for_next()){
+					this->leftArrayCache->put(left_ind, std::move(left_batch));
+					this->phase = join_phase::loading_left;
+				} else {
+					this->phase = join_phase::waiting_for_right;
+				}
+				return true;
+			case join_phase::waiting_for_right:
+				if (this->right_sequence.wait_for_next()){
+					this->rightArrayCache->put(right_ind, std::move(right_batch));
+					this->phase = join_phase::loading_right;
+					return true;
+				}
+				return false;
+			case join_phase::choosing_next_set:
+				if (!choose_next_set()) {
+					return true;
+				}
+				break;
+			}
 
-					auto log_input_num_rows = left_batch->num_rows() + right_batch->num_rows();
-					auto log_input_num_bytes = left_batch->sizeInBytes() + right_batch->sizeInBytes();
+			this->phase = join_phase::choosing_next_set;
 
-					std::unique_ptr<ral::frame::BlazingTable> joined = join_set(left_batch->toBlazingTableView(), right_batch->toBlazingTableView());
+			CodeTimer eventTimer(false);
+			eventTimer.start();
 
-					auto log_output_num_rows = joined->num_rows();
-					auto log_output_num_bytes = joined->sizeInBytes();
+			if (this->normalize_left){
+				ral::utilities::normalize_types(left_batch, this->join_column_common_types, this->left_column_indices);
+			}
+			if (this->normalize_right){
+				ral::utilities::normalize_types(right_batch, this->join_column_common_types, this->right_column_indices);
+			}
 
-					produced_output = true;
-					if (filter_statement != "") {
-						auto filter_table = ral::processor::process_filter(joined->toBlazingTableView(), filter_statement, this->context.get());
-						eventTimer.stop();
+			auto log_input_num_rows = left_batch->num_rows() + right_batch->num_rows();
+			auto log_input_num_bytes = left_batch->sizeInBytes() + right_batch->sizeInBytes();
 
-						log_output_num_rows = filter_table->num_rows();
-						log_output_num_bytes = filter_table->sizeInBytes();
+			std::unique_ptr<ral::frame::BlazingTable> joined = join_set(left_batch->toBlazingTableView(), right_batch->toBlazingTableView());
 
-						this->add_to_output_cache(std::move(filter_table));
-					} else{
-						// printf("joined table\n");
-						// ral::utilities::print_blazing_table_view(joined->toBlazingTableView());
-						eventTimer.stop();
-						this->add_to_output_cache(std::move(joined));
-					}
+			auto log_output_num_rows = joined->num_rows();
+			auto log_output_num_bytes = joined->sizeInBytes();
 
-					events_logger->info("{ral_id}|{query_id}|{kernel_id}|{input_num_rows}|{input_num_bytes}|{output_num_rows}|{output_num_bytes}|{event_type}|{timestamp_begin}|{timestamp_end}",
-								"ral_id"_a=context->getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode()),
-								"query_id"_a=context->getContextToken(),
-								"kernel_id"_a=this->get_id(),
-								"input_num_rows"_a=log_input_num_rows,
-								"input_num_bytes"_a=log_input_num_bytes,
-								"output_num_rows"_a=log_output_num_rows,
-								"output_num_bytes"_a=log_output_num_bytes,
-								"event_type"_a="compute",
-								"timestamp_begin"_a=eventTimer.start_time(),
-								"timestamp_end"_a=eventTimer.end_time());
-
-					mark_set_completed(left_ind, right_ind);
-				}
+			produced_output = true;
+			if (filter_statement != "") {
+				auto filter_table = ral::processor::process_filter(joined->toBlazingTableView(), filter_statement, this->context.get());
+				eventTimer.stop();
 
-			} catch(const std::exception& e) {
-				// TODO add retry here
-				logger->error("{query_id}|{step}|{substep}|{info}|{duration}||||",
-											"query_id"_a=context->getContextToken(),
-											"step"_a=context->getQueryStep(),
-											"substep"_a=context->getQuerySubstep(),
-											"info"_a="In PartwiseJoin kernel left_idx[{}] right_ind[{}] for {}. What: {}"_format(left_ind, right_ind, expression, e.what()),
-											"duration"_a="");
-				throw;
+				log_output_num_rows = filter_table->num_rows();
+				log_output_num_bytes = filter_table->sizeInBytes();
+
+				this->add_to_output_cache(std::move(filter_table));
+			} else{
+				// printf("joined table\n");
+				// ral::utilities::print_blazing_table_view(joined->toBlazingTableView());
+				eventTimer.stop();
+				this->add_to_output_cache(std::move(joined));
 			}
-		}
 
-		if (!produced_output){
-			logger->warn("{query_id}|{step}|{substep}|{info}|{duration}||||",
+			events_logger->info("{ral_id}|{query_id}|{kernel_id}|{input_num_rows}|{input_num_bytes}|{output_num_rows}|{output_num_bytes}|{event_type}|{timestamp_begin}|{timestamp_end}",
+						"ral_id"_a=context->getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode()),
+						"query_id"_a=context->getContextToken(),
+						"kernel_id"_a=this->get_id(),
+						"input_num_rows"_a=log_input_num_rows,
+						"input_num_bytes"_a=log_input_num_bytes,
+						"output_num_rows"_a=log_output_num_rows,
+						"output_num_bytes"_a=log_output_num_bytes,
+						"event_type"_a="compute",
+						"timestamp_begin"_a=eventTimer.start_time(),
+						"timestamp_end"_a=eventTimer.end_time());
+
+			mark_set_completed(left_ind, right_ind);
+		} catch(const std::exception& e) {
+			// TODO add retry here
+			logger->error("{query_id}|{step}|{substep}|{info}|{duration}||||",
 										"query_id"_a=context->getContextToken(),
 										"step"_a=context->getQueryStep(),
 										"substep"_a=context->getQuerySubstep(),
-										"info"_a="PartwiseJoin kernel did not produce an output",
+										"info"_a="In PartwiseJoin kernel left_idx[{}] right_ind[{}] for {}. What: {}"_format(left_ind, right_ind, expression, e.what()),
 										"duration"_a="");
-			// WSM TODO put an empty output into output cache
+			throw;
 		}
+		return true;
+	}
 
-		logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-									"query_id"_a=context->getContextToken(),
-									"step"_a=context->getQueryStep(),
-									"substep"_a=context->getQuerySubstep(),
-									"info"_a="PartwiseJoin Kernel Completed",
-									"duration"_a=timer.elapsed_time(),
-									"kernel_id"_a=this->get_id());
+	// parsing more of the expression here because we need to have the number of columns of the tables
+	void parse_join_columns() {
+		std::vector<int> column_indices;
+		parseJoinConditionToColumnIndices(this->condition, column_indices);
+		for(int i = 0; i < column_indices.size();i++){
+			if(column_indices[i] >= left_batch->num_columns()){
+				this->right_column_indices.push_back(column_indices[i] - left_batch->num_columns());
+			}else{
+				this->left_column_indices.push_back(column_indices[i]);
+			}
+		}
+		std::vector<std::string> left_names = left_batch->names();
+		std::vector<std::string> right_names = right_batch->names();
+		this->result_names.reserve(left_names.size() + right_names.size());
+		this->result_names.insert(this->result_names.end(), left_names.begin(), left_names.end());
+		this->result_names.insert(this->result_names.end(), right_names.begin(), right_names.end());
 
-		return kstatus::proceed;
+		computeNormalizationData(left_batch->get_schema(), right_batch->get_schema());
+	}
+
+	// we have joined a set pair. Now lets see if there is another set pair we can do, but keeping one of the two sides we already have.
+	// Returns true if there is one, false if a batch has to be loaded, or waited for, first
+	bool choose_next_set() {
+		int new_left_ind, new_right_ind;
+		std::tie(new_left_ind, new_right_ind) = check_for_another_set_to_do_with_data_we_already_have(left_ind, right_ind);
+		if (new_left_ind >= 0 || new_right_ind >= 0) {
+			if (new_left_ind != left_ind) { // if we are switching out left
+				this->leftArrayCache->put(left_ind, std::move(left_batch));
+				left_ind = new_left_ind;
+				left_batch = this->leftArrayCache->get_or_wait(left_ind);
+			} else { // if we are switching out right
+				this->rightArrayCache->put(right_ind, std::move(right_batch));
+				right_ind = new_right_ind;
+				right_batch = this->rightArrayCache->get_or_wait(right_ind);
+			}
+			return true;
+		}
+		// lets try first to just grab the next one that is already available and waiting, but we keep one of the two sides we already have
+		if (this->left_sequence.has_next_now()){
+			this->leftArrayCache->put(left_ind, std::move(left_batch));
+			this->phase = join_phase::loading_left;
+			return false;
+		}
+		if (this->right_sequence.has_next_now()){
+			this->rightArrayCache->put(right_ind, std::move(right_batch));
+			this->phase = join_phase::loading_right;
+			return false;
+		}
+		// lets see if there are any in are matrix that have not been completed
+		std::tie(new_left_ind, new_right_ind) = check_for_set_that_has_not_been_completed();
+		if (new_left_ind >= 0 && new_right_ind >= 0) {
+			this->leftArrayCache->put(left_ind, std::move(left_batch));
+			left_ind = new_left_ind;
+			left_batch = this->leftArrayCache->get_or_wait(left_ind);
+			this->rightArrayCache->put(right_ind, std::move(right_batch));
+			right_ind = new_right_ind;
+			right_batch = this->rightArrayCache->get_or_wait(right_ind);
+			return true;
+		}
+		// nothing else for us to do buy wait and see if there are any left to do
+		this->phase = join_phase::waiting_for_left;
+		return false;
 	}
 
-private:
 	BatchSequence left_sequence, right_sequence;
 
+	// the state of the join between its steps
+	join_phase phase = join_phase::loading_left;
+	bool first_load = true;
+	std::vector<std::unique_ptr<ral::frame::BlazingTable>> tables_loaded;
+	std::size_t bytes_loaded = 0;
+	std::unique_ptr<ral::frame::BlazingTable> left_batch;
+	std::unique_ptr<ral::frame::BlazingTable> right_batch;
+	int left_ind = 0;
+	int right_ind = 0;
+	bool produced_output = false;
+	std::string condition;
+	std::string filter_statement;
+
 	int max_left_ind;
 	int max_right_ind;
 	std::vector<std::vector<bool>> completion_matrix;
@@ -484,87 +518,104 @@ public:
 													right_join_types.cbegin(), right_join_types.cend());
 	}
 
+	// hash partitions a batch of one of the tables, keeps the partition of this node and sends the others
 	static void partition_table(std::shared_ptr<Context> local_context,
 				std::vector<cudf::size_type> column_indices,
 				std::unique_ptr<ral::frame::BlazingTable> batch,
-				BatchSequence & sequence,
 				bool normalize_types,
 				const std::vector<cudf::data_type> & join_column_common_types,
 				std::shared_ptr<ral::cache::CacheMachine> & output,
 				const std::string & message_id,
-				std::shared_ptr<spdlog::logger> logger)
+				std::shared_ptr<spdlog::logger> logger,
+				int batch_count)
 	{
-		using ColumnDataPartitionMessage = ral::communication::messages::ColumnDataPartitionMessage;
-
-		bool done = false;
 		// num_partitions = context->getTotalNodes() will do for now, but may want a function to determine this in the future.
 		// If we do partition into something other than the number of nodes, then we have to use part_ids and change up more of the logic
 		int num_partitions = local_context->getTotalNodes();
 		std::unique_ptr<CudfTable> hashed_data;
 		std::vector<cudf::size_type> hased_data_offsets;
-		int batch_count = 0;
-		while (!done) {
-			try {
-				if (normalize_types) {
-					ral::utilities::normalize_types(batch, join_column_common_types, column_indices);
-				}
+		try {
+			if (normalize_types) {
+				ral::utilities::normalize_types(batch, join_column_common_types, column_indices);
+			}
 
-				auto batch_view = batch->view();
-				std::vector<CudfTableView> partitioned;
-				if (batch->num_rows() > 0) {
-					std::tie(hashed_data, hased_data_offsets) = cudf::hash_partition(batch_view, column_indices, num_partitions);
+			auto batch_view = batch->view();
+			std::vector<CudfTableView> partitioned;
+			if (batch->num_rows() > 0) {
+				std::tie(hashed_data, hased_data_offsets) = cudf::hash_partition(batch_view, column_indices, num_partitions);
 
-					assert(hased_data_offsets.begin() != hased_data_offsets.end());
-					// the offsets returned by hash_partition will always start at 0, which is a value we want to ignore for cudf::split
-					std::vector<cudf::size_type> split_indexes(hased_data_offsets.begin() + 1, hased_data_offsets.end());
-					partitioned = cudf::split(hashed_data->view(), split_indexes);
-				} else {
-					for(int nodeIndex = 0; nodeIndex < local_context->getTotalNodes(); nodeIndex++ ){
-						partitioned.push_back(batch_view);
-					}
-				}
-				std::vector<ral::distribution::NodeColumnView > partitions_to_send;
+				assert(hased_data_offsets.begin() != hased_data_offsets.end());
+				// the offsets returned by hash_partition will always start at 0, which is a value we want to ignore for cudf::split
+				std::vector<cudf::size_type> split_indexes(hased_data_offsets.begin() + 1, hased_data_offsets.end());
+				partitioned = cudf::split(hashed_data->view(), split_indexes);
+			} else {
 				for(int nodeIndex = 0; nodeIndex < local_context->getTotalNodes(); nodeIndex++ ){
-					ral::frame::BlazingTableView partition_table_view = ral::frame::BlazingTableView(partitioned[nodeIndex], batch->names());
-					if (local_context->getNode(nodeIndex) == ral::communication::CommunicationData::getInstance().getSelfNode()){
-						// hash_partition followed by split does not create a partition that we can own, so we need to clone it.
-						// if we dont clone it, hashed_data will go out of scope before we get to use the partition
-						// also we need a BlazingTable to put into the cache, we cant cache views.
-						std::unique_ptr<ral::frame::BlazingTable> partition_table_clone = partition_table_view.clone();
-
-						// TODO: create message id and send to add add_to_output_cache
-						output->addToCache(std::move(partition_table_clone), message_id);
-					} else {
-						partitions_to_send.emplace_back(
-							std::make_pair(local_context->getNode(nodeIndex), partition_table_view));
-					}
+					partitioned.push_back(batch_view);
 				}
-				ral::distribution::distributeTablePartitions(local_context.get(), partitions_to_send);
-
-				if (sequence.wait_for_next()){
-					batch = sequence.next();
-					batch_count++;
+			}
+			std::vector<ral::distribution::NodeColumnView > partitions_to_send;
+			for(int nodeIndex = 0; nodeIndex < local_context->getTotalNodes(); nodeIndex++ ){
+				ral::frame::BlazingTableView partition_table_view = ral::frame::BlazingTableView(partitioned[nodeIndex], batch->names());
+				if (local_context->getNode(nodeIndex) == ral::communication::CommunicationData::getInstance().getSelfNode()){
+					// hash_partition followed by split does not create a partition that we can own, so we need to clone it.
+					// if we dont clone it, hashed_data will go out of scope before we get to use the partition
+					// also we need a BlazingTable to put into the cache, we cant cache views.
+					std::unique_ptr<ral::frame::BlazingTable> partition_table_clone = partition_table_view.clone();
+
+					// TODO: create message id and send to add add_to_output_cache
+					output->addToCache(std::move(partition_table_clone), message_id);
 				} else {
-					done = true;
+					partitions_to_send.emplace_back(
+						std::make_pair(local_context->getNode(nodeIndex), partition_table_view));
 				}
-			} catch(const std::exception& e) {
-				// TODO add retry here
-				std::string err = "ERROR: in partition_table batch_count " + std::to_string(batch_count) + " Error message: " + std::string(e.what());
-
-				logger->error("{query_id}|{step}|{substep}|{info}|{duration}||||",
-											"query_id"_a=local_context->getContextToken(),
-											"step"_a=local_context->getQueryStep(),
-											"substep"_a=local_context->getQuerySubstep(),
-											"info"_a=err,
-											"duration"_a="");
-				throw;
 			}
+			ral::distribution::distributeTablePartitions(local_context.get(), partitions_to_send);
+		} catch(const std::exception& e) {
+			// TODO add retry here
+			std::string err = "ERROR: in partition_table batch_count " + std::to_string(batch_count) + " Error message: " + std::string(e.what());
+
+			logger->error("{query_id}|{step}|{substep}|{info}|{duration}||||",
+										"query_id"_a=local_context->getContextToken(),
+										"step"_a=local_context->getQueryStep(),
+										"substep"_a=local_context->getQuerySubstep(),
+										"info"_a=err,
+										"duration"_a="");
+			throw;
 		}
-		//printf("... notifyLastTablePartitions\n");
-		ral::distribution::notifyLastTablePartitions(local_context.get(), ColumnDataPartitionMessage::MessageID());
 	}
 
-	std::pair<bool, bool> determine_if_we_are_scattering_a_small_table(const ral::frame::BlazingTableView & left_batch_view,
+	// partitions the first batch and then the batches of the input as they arrive, then is called after the other nodes
+	// were notified that there are no more partitions
+	void distribute_partitions(std::shared_ptr<Context> local_context,
+				std::vector<cudf::size_type> column_indices,
+				std::unique_ptr<ral::frame::BlazingTable> batch,
+				std::shared_ptr<ral::cache::CacheMachine> input,
+				BatchSequence & sequence,
+				bool normalize_types,
+				std::shared_ptr<ral::cache::CacheMachine> output,
+				const std::string & message_id,
+				std::function<void()> then)
+	{
+		partition_table(local_context, column_indices, std::move(batch), normalize_types, this->join_column_common_types, output, message_id, this->logger, 0);
+
+		auto batch_count = std::make_shared<int>(0);
+		BatchSequence * input_sequence = &sequence;
+		for_each_batch(input, [this, local_context, column_indices, input_sequence, normalize_types, output, message_id, batch_count]() mutable {
+			if (!input_sequence->wait_for_next()){
+				return false;
+			}
+			(*batch_count)++;
+			partition_table(local_context, column_indices, input_sequence->next(), normalize_types, this->join_column_common_types, output, message_id, this->logger, *batch_count);
+			return true;
+		}, [local_context, then]() {
+			//printf("... notifyLastTablePartitions\n");
+			ral::distribution::notifyLastTablePartitions(local_context.get(), ColumnDataPartitionMessage::MessageID());
+			then();
+		});
+	}
+
+	// sends the estimated sizes of the tables in this node, the other nodes send theirs, the next substep collects them
+	void distribute_table_size_bytes(const ral::frame::BlazingTableView & left_batch_view,
 		const ral::frame::BlazingTableView & right_batch_view ){
 
 		logger->trace("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
@@ -614,10 +665,17 @@ public:
 			right_bytes_estimate = right_batch_rows == 0 ? 0 : (int64_t)(right_batch_bytes*(((double)right_num_rows_estimate.second)/right_batch_rows));
 		}
 
-		int self_node_idx = context->getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode());
+		this->left_bytes_estimate = left_bytes_estimate;
+		this->right_bytes_estimate = right_bytes_estimate;
 
 		context->incrementQuerySubstep();
 		ral::distribution::distributeLeftRightTableSizeBytes(context.get(), left_bytes_estimate, right_bytes_estimate);
+	}
+
+	// called once the sizes of the tables in all the nodes arrived
+	std::pair<bool, bool> determine_if_we_are_scattering_a_small_table(){
+		int self_node_idx = context->getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode());
+
 		std::vector<int64_t> nodes_num_bytes_left;
 		std::vector<int64_t> nodes_num_bytes_right;
 
@@ -688,18 +746,12 @@ public:
 		return std::make_pair(scatter_left, scatter_right);
 	}
 
-	void perform_standard_hash_partitioning(const std::string & condition,
-		std::unique_ptr<ral::frame::BlazingTable> left_batch,
-		std::unique_ptr<ral::frame::BlazingTable> right_batch,
-		BatchSequence left_sequence,
-		BatchSequence right_sequence){
-		using ColumnDataPartitionMessage = ral::communication::messages::ColumnDataPartitionMessage;
-
+	void perform_standard_hash_partitioning(std::function<void()> then){
 		this->context->incrementQuerySubstep();
 
 		// parsing more of the expression here because we need to have the number of columns of the tables
 		std::vector<int> column_indices;
-		parseJoinConditionToColumnIndices(condition, column_indices);
+		parseJoinConditionToColumnIndices(this->condition, column_indices);
 		for(int i = 0; i < column_indices.size();i++){
 			if(column_indices[i] >= left_batch->num_columns()){
 				this->right_column_indices.push_back(column_indices[i] - left_batch->num_columns());
@@ -710,53 +762,49 @@ public:
 
 		computeNormalizationData(left_batch->get_schema(), right_batch->get_schema());
 
-		BlazingMutableThread distribute_left_thread(&JoinPartitionKernel::partition_table, this->context,
-			this->left_column_indices, std::move(left_batch), std::ref(left_sequence), this->normalize_left, this->join_column_common_types,
-			std::ref(this->output_.get_cache("output_a")), "output_a_" + this->get_message_id(),
-			this->logger);
-
-		BlazingThread left_consumer([context = this->context, this](){
-			ExternalBatchColumnDataSequence<ColumnDataPartitionMessage> external_input_left(this->context, this->get_message_id(), this);
-			std::unique_ptr<ral::frame::BlazingHostTable> host_table;
+		// the partitions of both tables are distributed and the ones of the other nodes are collected at the same time
+		auto finished = when_all(4, then);
 
-			while (host_table = external_input_left.next()) {
-				this->add_to_output_cache(std::move(host_table), "output_a");
+		external_input_left = std::make_unique<ExternalBatchColumnDataSequence<ColumnDataPartitionMessage>>(this->context, this->get_message_id(), this);
+		for_each_batch([this](std::function<void()> callback) {
+			external_input_left->notify_when_ready(std::move(callback));
+		}, [this]() {
+			std::unique_ptr<ral::frame::BlazingHostTable> host_table = external_input_left->next();
+			if (!host_table) {
+				return false;
 			}
-		});
+			this->add_to_output_cache(std::move(host_table), "output_a");
+			return true;
+		}, finished);
+
+		distribute_partitions(this->context, this->left_column_indices, std::move(left_batch), this->input_.get_cache("input_a"), this->left_sequence,
+			this->normalize_left, this->output_.get_cache("output_a"), "output_a_" + this->get_message_id(), finished);
 
 		// clone context, increment step counter to make it so that the next partition_table will have different message id
 		auto cloned_context = context->clone();
 		cloned_context->incrementQuerySubstep();
 
-		BlazingMutableThread distribute_right_thread(&JoinPartitionKernel::partition_table, cloned_context,
-			this->right_column_indices, std::move(right_batch), std::ref(right_sequence), this->normalize_right, this->join_column_common_types,
-			std::ref(this->output_.get_cache("output_b")), "output_b_" + this->get_message_id(),
-			this->logger);
-
-		// create thread with ExternalBatchColumnDataSequence for the right table being distriubted
-		BlazingThread right_consumer([cloned_context, this](){
-			ExternalBatchColumnDataSequence<ColumnDataPartitionMessage> external_input_right(cloned_context, this->get_message_id(), this);
-			std::unique_ptr<ral::frame::BlazingHostTable> host_table;
-
-			while (host_table = external_input_right.next()) {
-				this->add_to_output_cache(std::move(host_table), "output_b");
+		external_input_right = std::make_unique<ExternalBatchColumnDataSequence<ColumnDataPartitionMessage>>(cloned_context, this->get_message_id(), this);
+		for_each_batch([this](std::function<void()> callback) {
+			external_input_right->notify_when_ready(std::move(callback));
+		}, [this]() {
+			std::unique_ptr<ral::frame::BlazingHostTable> host_table = external_input_right->next();
+			if (!host_table) {
+				return false;
 			}
-		});
-
+			this->add_to_output_cache(std::move(host_table), "output_b");
+			return true;
+		}, finished);
 
-		distribute_left_thread.join();
-		left_consumer.join();
-		distribute_right_thread.join();
-		right_consumer.join();
+		distribute_partitions(cloned_context, this->right_column_indices, std::move(right_batch), this->input_.get_cache("input_b"), this->right_sequence,
+			this->normalize_right, this->output_.get_cache("output_b"), "output_b_" + this->get_message_id(), finished);
 	}
 
 	void small_table_scatter_distribution(std::unique_ptr<ral::frame::BlazingTable> small_table_batch,
 		std::unique_ptr<ral::frame::BlazingTable> big_table_batch,
-		BatchSequence small_table_sequence,
-		BatchSequenceBypass big_table_sequence,
-		const std::pair<bool, bool> & scatter_left_right){
-		using ColumnDataMessage = ral::communication::messages::ColumnDataMessage;
-
+		BatchSequence & small_table_sequence,
+		const std::pair<bool, bool> & scatter_left_right,
+		std::function<void()> then){
 		this->context->incrementQuerySubstep();
 
 		// In this function we are assuming that one and only one of the two bools in scatter_left_right is true
@@ -764,84 +812,111 @@ public:
 
 		std::string small_output_cache_name = scatter_left_right.first ? "output_a" : "output_b";
 		std::string big_output_cache_name = scatter_left_right.first ? "output_b" : "output_a";
-
-		BlazingThread distribute_small_table_thread([this, &small_table_batch, &small_table_sequence, small_output_cache_name](){
-			bool done = false;
-			int batch_count = 0;
-			while (!done) {
-				try {
-					if(small_table_batch != nullptr && small_table_batch->num_rows() > 0) {
-						ral::distribution::scatterData(this->context.get(), small_table_batch->toBlazingTableView());
-					}
-					this->add_to_output_cache(std::move(small_table_batch), small_output_cache_name);
-					if (small_table_sequence.wait_for_next()){
-						small_table_batch = small_table_sequence.next();
-						batch_count++;
-					} else {
-						done = true;
-					}
-				} catch(const std::exception& e) {
-					// TODO add retry here
-					logger->error("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-												"query_id"_a=this->context->getContextToken(),
-												"step"_a=this->context->getQueryStep(),
-												"substep"_a=this->context->getQuerySubstep(),
-												"info"_a="In JoinPartitionKernel scatter_small_table batch_count [{}]. What: {}"_format(batch_count, expression, e.what()),
-												"duration"_a="",
-												"kernel_id"_a=this->get_id());
-					throw;
-				}
+		std::shared_ptr<ral::cache::CacheMachine> small_input = this->input_.get_cache(scatter_left_right.first ? "input_a" : "input_b");
+		std::shared_ptr<ral::cache::CacheMachine> big_input = this->input_.get_cache(scatter_left_right.first ? "input_b" : "input_a");
+
+		// the small table is scattered and collected while the big table passes through
+		auto finished = when_all(3, then);
+
+		external_input_small_table = std::make_unique<ExternalBatchColumnDataSequence<ColumnDataMessage>>(this->context, this->get_message_id(), this);
+		for_each_batch([this](std::function<void()> callback) {
+			external_input_small_table->notify_when_ready(std::move(callback));
+		}, [this, small_output_cache_name]() {
+			if (!external_input_small_table->wait_for_next()) {
+				return false;
 			}
-			ral::distribution::notifyLastTablePartitions(this->context.get(), ColumnDataMessage::MessageID());
-		});
-
-		BlazingThread collect_small_table_thread([this, small_output_cache_name](){
-			ExternalBatchColumnDataSequence<ColumnDataMessage> external_input_left(this->context, this->get_message_id(), this);
-
-			while (external_input_left.wait_for_next()) {
-				std::unique_ptr<ral::frame::BlazingHostTable> host_table = external_input_left.next();
-				this->add_to_output_cache(std::move(host_table), small_output_cache_name);
+			std::unique_ptr<ral::frame::BlazingHostTable> host_table = external_input_small_table->next();
+			this->add_to_output_cache(std::move(host_table), small_output_cache_name);
+			return true;
+		}, finished);
+
+		scatter_small_table(std::move(small_table_batch), small_output_cache_name, 0);
+		auto batch_count = std::make_shared<int>(0);
+		BatchSequence * small_sequence = &small_table_sequence;
+		for_each_batch(small_input, [this, small_sequence, small_output_cache_name, batch_count]() {
+			if (!small_sequence->wait_for_next()){
+				return false;
 			}
+			(*batch_count)++;
+			scatter_small_table(small_sequence->next(), small_output_cache_name, *batch_count);
+			return true;
+		}, [this, finished]() {
+			ral::distribution::notifyLastTablePartitions(this->context.get(), ColumnDataMessage::MessageID());
+			finished();
 		});
 
 		this->add_to_output_cache(std::move(big_table_batch), big_output_cache_name);
 
-		BlazingThread big_table_passthrough_thread([this, &big_table_sequence, big_output_cache_name](){
-			while (big_table_sequence.wait_for_next()) {
-				auto batch = big_table_sequence.next();
-				this->add_to_output_cache(std::move(batch), big_output_cache_name);
+		big_table_sequence.set_source(big_input);
+		for_each_batch(big_input, [this, big_output_cache_name]() {
+			if (!big_table_sequence.wait_for_next()) {
+				return false;
 			}
-		});
+			auto batch = big_table_sequence.next();
+			this->add_to_output_cache(std::move(batch), big_output_cache_name);
+			return true;
+		}, finished);
+	}
 
-		distribute_small_table_thread.join();
-		collect_small_table_thread.join();
-		big_table_passthrough_thread.join();
+	void scatter_small_table(std::unique_ptr<ral::frame::BlazingTable> small_table_batch, const std::string & small_output_cache_name, int batch_count) {
+		try {
+			if(small_table_batch != nullptr && small_table_batch->num_rows() > 0) {
+				ral::distribution::scatterData(this->context.get(), small_table_batch->toBlazingTableView());
+			}
+			this->add_to_output_cache(std::move(small_table_batch), small_output_cache_name);
+		} catch(const std::exception& e) {
+			// TODO add retry here
+			logger->error("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+										"query_id"_a=this->context->getContextToken(),
+										"step"_a=this->context->getQueryStep(),
+										"substep"_a=this->context->getQuerySubstep(),
+										"info"_a="In JoinPartitionKernel scatter_small_table batch_count [{}]. What: {}"_format(batch_count, e.what()),
+										"duration"_a="",
+										"kernel_id"_a=this->get_id());
+			throw;
+		}
 	}
 
-	virtual kstatus run() {
-		CodeTimer timer;
+	virtual void run() {
+		timer.start();
 
-		BatchSequence left_sequence(this->input_.get_cache("input_a"), this);
-		BatchSequence right_sequence(this->input_.get_cache("input_b"), this);
+		left_sequence.set_source(this->input_.get_cache("input_a"));
+		right_sequence.set_source(this->input_.get_cache("input_b"));
 
 		// lets parse part of the expression here, because we need the joinType before we load
 		std::string new_join_statement, filter_statement;
 		StringUtil::findAndReplaceAll(this->expression, "IS NOT DISTINCT FROM", "=");
 		split_inequality_join_into_join_and_filter(this->expression, new_join_statement, filter_statement);
-		std::string condition = get_named_expression(new_join_statement, "condition");
+		this->condition = get_named_expression(new_join_statement, "condition");
 		this->join_type = get_named_expression(new_join_statement, "joinType");
 
-		std::unique_ptr<ral::frame::BlazingTable> left_batch = left_sequence.next();
-		std::unique_ptr<ral::frame::BlazingTable> right_batch = right_sequence.next();
+		auto first_batches_ready = when_all(2, [this]() {
+			left_batch = left_sequence.next();
+			right_batch = right_sequence.next();
 
-		if (left_batch == nullptr || left_batch->num_columns() == 0){
-			while (left_sequence.wait_for_next()){
-				left_batch = left_sequence.next();
+			// the left side needs a batch with columns to determine the join column indices
+			for_each_batch(this->input_.get_cache("input_a"), [this]() {
 				if (left_batch != nullptr && left_batch->num_columns() > 0){
-					break;
+					return false;
 				}
-			}
-		}
+				if (!left_sequence.wait_for_next()){
+					return false;
+				}
+				left_batch = left_sequence.next();
+				return true;
+			}, [this]() {
+				start_distribution();
+			});
+		});
+		submit_when_ready(this->input_.get_cache("input_a"), first_batches_ready);
+		submit_when_ready(this->input_.get_cache("input_b"), first_batches_ready);
+	}
+
+private:
+	using ColumnDataPartitionMessage = ral::communication::messages::ColumnDataPartitionMessage;
+	using ColumnDataMessage = ral::communication::messages::ColumnDataMessage;
+
+	void start_distribution() {
 		if (left_batch == nullptr || left_batch->num_columns() == 0){
 			std::string err = "In JoinPartitionKernel left side is empty and cannot determine join column indices";
 			logger->error("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
@@ -854,16 +929,34 @@ public:
 			throw err;
 		}
 
-		std::pair<bool, bool> scatter_left_right;
 		if (this->join_type == OUTER_JOIN){ // cant scatter a full outer join
-			scatter_left_right = std::make_pair(false, false);
+			distribute(std::make_pair(false, false));
 		} else {
-			scatter_left_right = determine_if_we_are_scattering_a_small_table(left_batch->toBlazingTableView(),
-																				right_batch->toBlazingTableView());
-			if (scatter_left_right.first && this->join_type == LEFT_JOIN){
-				scatter_left_right.first = false; // cant scatter the left side for a left outer join
-			}
+			distribute_table_size_bytes(left_batch->toBlazingTableView(), right_batch->toBlazingTableView());
+			// the sizes of the other nodes are collected once they arrived
+			submit_when_received(this->context.get(), ral::communication::messages::SampleToNodeMasterMessage::MessageID(), context->getTotalNodes() - 1, [this]() {
+				std::pair<bool, bool> scatter_left_right = determine_if_we_are_scattering_a_small_table();
+				if (scatter_left_right.first && this->join_type == LEFT_JOIN){
+					scatter_left_right.first = false; // cant scatter the left side for a left outer join
+				}
+				distribute(scatter_left_right);
+			});
 		}
+	}
+
+	void distribute(std::pair<bool, bool> scatter_left_right) {
+		auto finished = [this]() {
+			logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+										"query_id"_a=context->getContextToken(),
+										"step"_a=context->getQueryStep(),
+										"substep"_a=context->getQuerySubstep(),
+										"info"_a="JoinPartition Kernel Completed",
+										"duration"_a=timer.elapsed_time(),
+										"kernel_id"_a=this->get_id());
+
+			done();
+		};
+
 		// scatter_left_right = std::make_pair(false, false); // Do this for debugging if you want to disable small table join optmization
 		if (scatter_left_right.first){
 			logger->trace("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
@@ -874,9 +967,8 @@ public:
 										"duration"_a="",
 										"kernel_id"_a=this->get_id());
 
-			BatchSequenceBypass big_table_sequence(this->input_.get_cache("input_b"), this);
 			small_table_scatter_distribution( std::move(left_batch), std::move(right_batch),
-						std::move(left_sequence), std::move(big_table_sequence), scatter_left_right);
+						left_sequence, scatter_left_right, finished);
 		} else if (scatter_left_right.second) {
 			logger->trace("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
 										"query_id"_a=context->getContextToken(),
@@ -886,9 +978,8 @@ public:
 										"duration"_a="",
 										"kernel_id"_a=this->get_id());
 
-			BatchSequenceBypass big_table_sequence(this->input_.get_cache("input_a"), this);
 			small_table_scatter_distribution( std::move(right_batch), std::move(left_batch),
-						std::move(right_sequence), std::move(big_table_sequence), scatter_left_right);
+						right_sequence, scatter_left_right, finished);
 		} else {
 			logger->trace("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
 										"query_id"_a=context->getContextToken(),
@@ -898,23 +989,23 @@ public:
 										"duration"_a="",
 										"kernel_id"_a=this->get_id());
 
-			perform_standard_hash_partitioning(condition, std::move(left_batch), std::move(right_batch),
-				std::move(left_sequence), std::move(right_sequence));
+			perform_standard_hash_partitioning(finished);
 		}
-
-		logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-									"query_id"_a=context->getContextToken(),
-									"step"_a=context->getQueryStep(),
-									"substep"_a=context->getQuerySubstep(),
-									"info"_a="JoinPartition Kernel Completed",
-									"duration"_a=timer.elapsed_time(),
-									"kernel_id"_a=this->get_id());
-
-		return kstatus::proceed;
 	}
 
-private:
+	BatchSequence left_sequence{nullptr, this};
+	BatchSequence right_sequence{nullptr, this};
+	BatchSequenceBypass big_table_sequence{nullptr, this};
+	std::unique_ptr<ral::frame::BlazingTable> left_batch;
+	std::unique_ptr<ral::frame::BlazingTable> right_batch;
+	int64_t left_bytes_estimate;
+	int64_t right_bytes_estimate;
+	std::unique_ptr<ExternalBatchColumnDataSequence<ColumnDataPartitionMessage>> external_input_left;
+	std::unique_ptr<ExternalBatchColumnDataSequence<ColumnDataPartitionMessage>> external_input_right;
+	std::unique_ptr<ExternalBatchColumnDataSequence<ColumnDataMessage>> external_input_small_table;
+
 	// parsed expression related parameters
+	std::string condition;
 	std::string join_type;
 	std::vector<cudf::size_type> left_column_indices, right_column_indices;
 	std::vector<cudf::data_type> join_column_common_types;
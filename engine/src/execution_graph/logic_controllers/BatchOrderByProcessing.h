@@ -31,57 +31,68 @@ public:
 		return true;
 	}
 
-	virtual kstatus run() {
-		CodeTimer timer;
-
-		BatchSequence input_partitionPlan(this->input_.get_cache("input_b"), this);
-		auto partitionPlan = std::move(input_partitionPlan.next());
-
-		BatchSequence input(this->input_.get_cache("input_a"), this);
-		int batch_count = 0;
-		while (input.wait_for_next()) {
-			try {
-				auto batch = input.next();
-				auto partitions = ral::operators::partition_table(partitionPlan->toBlazingTableView(), batch->toBlazingTableView(), this->expression);
-
-				// std::cout<<">>>>>>>>>>>>>>> PARTITIONS START"<< std::endl;
-				// for(auto& partition : partitions)
-				// 	ral::utilities::print_blazing_table_view(ral::frame::BlazingTableView(partition, batch->names()));
-				// std::cout<<">>>>>>>>>>>>>>> PARTITIONS START"<< std::endl;
-
-				for (auto i = 0; i < partitions.size(); i++) {
-					std::string cache_id = "output_" + std::to_string(i);
-					this->add_to_output_cache(
-						std::make_unique<ral::frame::BlazingTable>(std::make_unique<cudf::table>(partitions[i]), batch->names()),
-						cache_id
-						);
-				}
-				batch_count++;
-			} catch(const std::exception& e) {
-				// TODO add retry here
-				logger->error("{query_id}|{step}|{substep}|{info}|{duration}||||",
+	virtual void run() {
+		timer.start();
+
+		submit_when_ready(this->input_.get_cache("input_b"), [this]() {
+			BatchSequence input_partitionPlan(this->input_.get_cache("input_b"), this);
+			partitionPlan = std::move(input_partitionPlan.next());
+
+			input.set_source(this->input_.get_cache("input_a"));
+			for_each_batch(this->input_.get_cache("input_a"), [this]() {
+				return partition_next_batch();
+			}, [this]() {
+				logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
 											"query_id"_a=context->getContextToken(),
 											"step"_a=context->getQueryStep(),
 											"substep"_a=context->getQuerySubstep(),
-											"info"_a="In PartitionSingleNode kernel batch {} for {}. What: {}"_format(batch_count, expression, e.what()),
-											"duration"_a="");
-				throw;
-			}
-		}
+											"info"_a="PartitionSingleNode Kernel Completed",
+											"duration"_a=timer.elapsed_time(),
+											"kernel_id"_a=this->get_id());
 
-		logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-									"query_id"_a=context->getContextToken(),
-									"step"_a=context->getQueryStep(),
-									"substep"_a=context->getQuerySubstep(),
-									"info"_a="PartitionSingleNode Kernel Completed",
-									"duration"_a=timer.elapsed_time(),
-									"kernel_id"_a=this->get_id());
-
-		return kstatus::proceed;
+				done();
+			});
+		});
 	}
 
 private:
+	bool partition_next_batch() {
+		if (!input.wait_for_next()) {
+			return false;
+		}
+		try {
+			auto batch = input.next();
+			auto partitions = ral::operators::partition_table(partitionPlan->toBlazingTableView(), batch->toBlazingTableView(), this->expression);
+
+			// std::cout<<">>>>>>>>>>>>>>> PARTITIONS START"<< std::endl;
+			// for(auto& partition : partitions)
+			// 	ral::utilities::print_blazing_table_view(ral::frame::BlazingTableView(partition, batch->names()));
+			// std::cout<<">>>>>>>>>>>>>>> PARTITIONS START"<< std::endl;
+
+			for (auto i = 0; i < partitions.size(); i++) {
+				std::string cache_id = "output_" + std::to_string(i);
+				this->add_to_output_cache(
+					std::make_unique<ral::frame::BlazingTable>(std::make_unique<cudf::table>(partitions[i]), batch->names()),
+					cache_id
+					);
+			}
+			batch_count++;
+		} catch(const std::exception& e) {
+			// TODO add retry here
+			logger->error("{query_id}|{step}|{substep}|{info}|{duration}||||",
+										"query_id"_a=context->getContextToken(),
+										"step"_a=context->getQueryStep(),
+										"substep"_a=context->getQuerySubstep(),
+										"info"_a="In PartitionSingleNode kernel batch {} for {}. What: {}"_format(batch_count, expression, e.what()),
+										"duration"_a="");
+			throw;
+		}
+		return true;
+	}
 
+	std::unique_ptr<ral::frame::BlazingTable> partitionPlan;
+	BatchSequence input{nullptr, this};
+	int batch_count = 0;
 };
 
 class SortAndSampleKernel : public kernel {
@@ -93,16 +104,29 @@ public:
 		this->output_.add_port("output_a", "output_b");
 	}
 
-	void compute_partition_plan(std::vector<ral::frame::BlazingTableView> sampledTableViews, std::size_t avg_bytes_per_row, std::size_t local_total_num_rows) {
+	// computes the partition plan in a task while the batches are sorted, then is called once it is in the output_b cache
+	void compute_partition_plan(std::vector<ral::frame::BlazingTableView> sampledTableViews, std::size_t avg_bytes_per_row, std::size_t local_total_num_rows,
+		std::function<void()> then) {
 		if (this->context->getAllNodes().size() == 1){ // single node mode
-			auto partitionPlan = ral::operators::generate_partition_plan(sampledTableViews,
-				local_total_num_rows, avg_bytes_per_row, this->expression, this->context.get());
-			this->add_to_output_cache(std::move(partitionPlan), "output_b");
+			submit([this, sampledTableViews, avg_bytes_per_row, local_total_num_rows, then]() {
+				auto partitionPlan = ral::operators::generate_partition_plan(sampledTableViews,
+					local_total_num_rows, avg_bytes_per_row, this->expression, this->context.get());
+				this->add_to_output_cache(std::move(partitionPlan), "output_b");
+				then();
+			});
 		} else { // distributed mode
-			auto concatSamples = ral::utilities::concatTables(sampledTableViews);
-			auto partitionPlan = ral::operators::generate_distributed_partition_plan(concatSamples->toBlazingTableView(),
-				local_total_num_rows, avg_bytes_per_row, this->expression, this->context.get());
-			this->add_to_output_cache(std::move(partitionPlan), "output_b");
+			std::shared_ptr<ral::frame::BlazingTable> concatSamples = ral::utilities::concatTables(sampledTableViews);
+			std::string message_id;
+			std::size_t num_messages;
+			std::tie(message_id, num_messages) = ral::operators::send_distributed_samples(concatSamples->toBlazingTableView(),
+				local_total_num_rows, this->context.get());
+			// the samples, or the partition plan, of the other nodes are collected once they arrived
+			submit_when_received(this->context.get(), message_id, num_messages, [this, concatSamples, avg_bytes_per_row, local_total_num_rows, then]() {
+				auto partitionPlan = ral::operators::generate_distributed_partition_plan(concatSamples->toBlazingTableView(),
+					local_total_num_rows, avg_bytes_per_row, this->expression, this->context.get());
+				this->add_to_output_cache(std::move(partitionPlan), "output_b");
+				then();
+			});
 		}
 	}
 
@@ -110,32 +134,39 @@ public:
 		return true;
 	}
 
-	virtual kstatus run() {
-		CodeTimer timer;
-		CodeTimer eventTimer(false);
+	virtual void run() {
+		timer.start();
 
-		bool try_num_rows_estimation = true;
-		bool estimate_samples = false;
-		uint64_t num_rows_estimate = 0;
-		uint64_t population_to_sample = 0;
-		uint64_t population_sampled = 0;
-		BlazingThread partition_plan_thread;
-		float order_by_samples_ratio = 0.1;
 		std::map<std::string, std::string> config_options = context->getConfigOptions();
 		auto it = config_options.find("ORDER_BY_SAMPLES_RATIO");
 		if (it != config_options.end()){
 			order_by_samples_ratio = std::stof(config_options["ORDER_BY_SAMPLES_RATIO"]);
 		}
 
-		BatchSequence input(this->input_cache(), this);
-		std::vector<std::unique_ptr<ral::frame::BlazingTable>> sampledTables;
-		std::vector<ral::frame::BlazingTableView> sampledTableViews;
-		std::size_t localTotalNumRows = 0;
-		std::size_t localTotalBytes = 0;
-		int batch_count = 0;
-		while (input.wait_for_next()) {
+		// the kernel is done once the batches are sorted and the partition plan is computed
+		auto finished = when_all(2, [this]() {
+			logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+										"query_id"_a=context->getContextToken(),
+										"step"_a=context->getQueryStep(),
+										"substep"_a=context->getQuerySubstep(),
+										"info"_a="SortAndSample Kernel Completed",
+										"duration"_a=timer.elapsed_time(),
+										"kernel_id"_a=this->get_id());
+
+			done();
+		});
+
+		ral::cache::CacheMachine * input_cache = this->input_cache().get();
+		ral::cache::CacheMachine * output_a = this->output_cache("output_a").get();
+		input.set_source(this->input_cache());
+		for_each_batch([input_cache](std::function<void()> callback) {
+			input_cache->notify_when_ready(std::move(callback));
+		}, [this, finished]() {
+			CodeTimer eventTimer(false);
+			if (!input.wait_for_next()) {
+				return false;
+			}
 			try {
-				this->output_cache("output_a")->wait_if_cache_is_saturated();
 				auto batch = input.next();
 
 				eventTimer.start();
@@ -158,7 +189,8 @@ public:
 				population_sampled += batch->num_rows();
 				if (estimate_samples && population_sampled > population_to_sample)	{
 					size_t avg_bytes_per_row = localTotalNumRows == 0 ? 1 : localTotalBytes/localTotalNumRows;
-					partition_plan_thread = BlazingThread(&SortAndSampleKernel::compute_partition_plan, this, sampledTableViews, avg_bytes_per_row, num_rows_estimate);
+					compute_partition_plan(sampledTableViews, avg_bytes_per_row, num_rows_estimate, finished);
+					partition_plan_started = true;
 					estimate_samples = false;
 				}
 				// End estimation
@@ -195,28 +227,33 @@ public:
 											"duration"_a="");
 				throw;
 			}
-		}
-
-		if (partition_plan_thread.joinable()){
-			partition_plan_thread.join();
-		} else {
-			size_t avg_bytes_per_row = localTotalNumRows == 0 ? 1 : localTotalBytes/localTotalNumRows;
-			compute_partition_plan(sampledTableViews, avg_bytes_per_row, localTotalNumRows);
-		}
-
-		logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-									"query_id"_a=context->getContextToken(),
-									"step"_a=context->getQueryStep(),
-									"substep"_a=context->getQuerySubstep(),
-									"info"_a="SortAndSample Kernel Completed",
-									"duration"_a=timer.elapsed_time(),
-									"kernel_id"_a=this->get_id());
-
-		return kstatus::proceed;
+			return true;
+		}, [this, finished]() {
+			if (!partition_plan_started){
+				size_t avg_bytes_per_row = localTotalNumRows == 0 ? 1 : localTotalBytes/localTotalNumRows;
+				compute_partition_plan(sampledTableViews, avg_bytes_per_row, localTotalNumRows, finished);
+			}
+			finished();
+		}, [output_a](std::function<void()> callback) {
+			output_a->notify_when_not_saturated(std::move(callback));
+		});
 	}
 
 private:
-
+	bool try_num_rows_estimation = true;
+	bool estimate_samples = false;
+	uint64_t num_rows_estimate = 0;
+	uint64_t population_to_sample = 0;
+	uint64_t population_sampled = 0;
+	bool partition_plan_started = false;
+	float order_by_samples_ratio = 0.1;
+
+	BatchSequence input{nullptr, this};
+	std::vector<std::unique_ptr<ral::frame::BlazingTable>> sampledTables;
+	std::vector<ral::frame::BlazingTableView> sampledTableViews;
+	std::size_t localTotalNumRows = 0;
+	std::size_t localTotalBytes = 0;
+	int batch_count = 0;
 };
 
 class PartitionKernel : public kernel {
@@ -231,20 +268,45 @@ public:
 		return true;
 	}
 
-	virtual kstatus run() {
-		using ColumnDataPartitionMessage = ral::communication::messages::ColumnDataPartitionMessage;
+	virtual void run() {
+		timer.start();
 
-		CodeTimer timer;
+		submit_when_ready(this->input_.get_cache("input_b"), [this]() {
+			BatchSequence input_partitionPlan(this->input_.get_cache("input_b"), this);
+			partitionPlan = std::move(input_partitionPlan.next());
 
-		BatchSequence input_partitionPlan(this->input_.get_cache("input_b"), this);
-		auto partitionPlan = std::move(input_partitionPlan.next());
+			context->incrementQuerySubstep();
 
-		context->incrementQuerySubstep();
+			auto finished = when_all(2, [this]() {
+				logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+											"query_id"_a=context->getContextToken(),
+											"step"_a=context->getQueryStep(),
+											"substep"_a=context->getQuerySubstep(),
+											"info"_a="Partition Kernel Completed",
+											"duration"_a=timer.elapsed_time(),
+											"kernel_id"_a=this->get_id());
+
+				done();
+			});
+
+			external_input = std::make_unique<ExternalBatchColumnDataSequence<ColumnDataPartitionMessage>>(context, this->get_message_id(), this);
+			for_each_batch([this](std::function<void()> callback) {
+				external_input->notify_when_ready(std::move(callback));
+			}, [this]() {
+				std::unique_ptr<ral::frame::BlazingHostTable> host_table = external_input->next();
+				if (!host_table) {
+					return false;
+				}
+				std::string cache_id = "output_" + std::to_string(host_table->get_part_id());
+				this->add_to_output_cache(std::move(host_table), cache_id);
+				return true;
+			}, finished);
 
-		BlazingThread generator([input_cache = this->input_.get_cache("input_a"), &partitionPlan, this](){
-			BatchSequence input(input_cache, this);
-			int batch_count = 0;
-			while (input.wait_for_next()) {
+			input.set_source(this->input_.get_cache("input_a"));
+			for_each_batch(this->input_.get_cache("input_a"), [this]() {
+				if (!input.wait_for_next()) {
+					return false;
+				}
 				try {
 					auto batch = input.next();
 					auto self_partitions = ral::operators::distribute_table_partitions(partitionPlan->toBlazingTableView(), batch->toBlazingTableView(), this->expression, this->context.get());
@@ -264,34 +326,21 @@ public:
 												"duration"_a="");
 					throw;
 				}
-			}
-			ral::distribution::notifyLastTablePartitions(this->context.get(), ColumnDataPartitionMessage::MessageID());
+				return true;
+			}, [this, finished]() {
+				ral::distribution::notifyLastTablePartitions(this->context.get(), ColumnDataPartitionMessage::MessageID());
+				finished();
+			});
 		});
-
-		BlazingThread consumer([this](){
-			ExternalBatchColumnDataSequence<ColumnDataPartitionMessage> external_input(context, this->get_message_id(), this);
-			std::unique_ptr<ral::frame::BlazingHostTable> host_table;
-			while (host_table = external_input.next()) {
-				std::string cache_id = "output_" + std::to_string(host_table->get_part_id());
-				this->add_to_output_cache(std::move(host_table), cache_id);
-			}
-		});
-		generator.join();
-		consumer.join();
-
-		logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-									"query_id"_a=context->getContextToken(),
-									"step"_a=context->getQueryStep(),
-									"substep"_a=context->getQuerySubstep(),
-									"info"_a="Partition Kernel Completed",
-									"duration"_a=timer.elapsed_time(),
-									"kernel_id"_a=this->get_id());
-
-		return kstatus::proceed;
 	}
 
 private:
+	using ColumnDataPartitionMessage = ral::communication::messages::ColumnDataPartitionMessage;
 
+	std::unique_ptr<ral::frame::BlazingTable> partitionPlan;
+	BatchSequence input{nullptr, this};
+	int batch_count = 0;
+	std::unique_ptr<ExternalBatchColumnDataSequence<ColumnDataPartitionMessage>> external_input;
 };
 
 class MergeStreamKernel : public kernel {
@@ -305,19 +354,34 @@ public:
 		return false;
 	}
 
-	virtual kstatus run() {
-		CodeTimer timer;
+	virtual void run() {
+		timer.start();
+
+		merge_partition(0);
+	}
+
+private:
+	// merges the partitions in order, each one once all its input is available
+	void merge_partition(int idx) {
+		if (idx == this->input_.count()) {
+			logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+										"query_id"_a=context->getContextToken(),
+										"step"_a=context->getQueryStep(),
+										"substep"_a=context->getQuerySubstep(),
+										"info"_a="MergeStream Kernel Completed",
+										"duration"_a=timer.elapsed_time(),
+										"kernel_id"_a=this->get_id());
+
+			done();
+			return;
+		}
 
-		int batch_count = 0;
-		for (auto idx = 0; idx < this->input_.count(); idx++)
-		{
+		auto cache_id = "input_" + std::to_string(idx);
+		// This Kernel needs all of the input before it can do any output. So lets wait until all the input is available
+		submit_when_finished(this->input_.get_cache(cache_id), [this, idx, cache_id]() {
 			try {
 				std::vector<ral::frame::BlazingTableView> tableViews;
 				std::vector<std::unique_ptr<ral::frame::BlazingTable>> tables;
-				auto cache_id = "input_" + std::to_string(idx);
-
-				// This Kernel needs all of the input before it can do any output. So lets wait until all the input is available
-				this->input_.get_cache(cache_id)->wait_until_finished();
 
 				while (this->input_.get_cache(cache_id)->wait_for_next()) {
 					CodeTimer cacheEventTimer(false);
@@ -374,21 +438,11 @@ public:
 												"duration"_a="");
 				throw;
 			}
-		}
-
-		logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-									"query_id"_a=context->getContextToken(),
-									"step"_a=context->getQueryStep(),
-									"substep"_a=context->getQuerySubstep(),
-									"info"_a="MergeStream Kernel Completed",
-									"duration"_a=timer.elapsed_time(),
-									"kernel_id"_a=this->get_id());
-
-		return kstatus::proceed;
+			merge_partition(idx + 1);
+		});
 	}
 
-private:
-
+	int batch_count = 0;
 };
 
 
@@ -403,20 +457,34 @@ public:
 		return false;
 	}
 
-	virtual kstatus run() {
-		CodeTimer timer;
-		CodeTimer eventTimer(false);
+	virtual void run() {
+		timer.start();
 
-		int64_t total_batch_rows = 0;
-		std::vector<std::unique_ptr<ral::cache::CacheData>> cache_vector;
-		BatchSequenceBypass input_seq(this->input_cache(), this);
-		while (input_seq.wait_for_next()) {
-			auto batch = input_seq.next();
-			total_batch_rows += batch->num_rows();
-			cache_vector.push_back(std::move(batch));
-		}
+		submit_when_finished(this->input_cache(), [this]() {
+			BatchSequenceBypass input_seq(this->input_cache(), this);
+			while (input_seq.wait_for_next()) {
+				auto batch = input_seq.next();
+				total_batch_rows += batch->num_rows();
+				cache_vector.push_back(std::move(batch));
+			}
+
+			std::string message_id;
+			std::size_t num_messages;
+			std::tie(message_id, num_messages) = ral::operators::distribute_local_num_rows(total_batch_rows, this->expression, this->context.get());
+			if (num_messages > 0) {
+				// the number of rows of the other nodes are collected once they arrived
+				submit_when_received(this->context.get(), message_id, num_messages, [this]() {
+					apply_limit(ral::operators::get_local_limit(total_batch_rows, this->expression, this->context.get()));
+				});
+			} else {
+				apply_limit(ral::operators::get_local_limit(total_batch_rows, this->expression, this->context.get()));
+			}
+		});
+	}
 
-		int64_t rows_limit = ral::operators::get_local_limit(total_batch_rows, this->expression, this->context.get());
+private:
+	void apply_limit(int64_t rows_limit) {
+		CodeTimer eventTimer(false);
 
 		if (rows_limit < 0) {
 			for (auto &&cache_data : cache_vector) {
@@ -478,11 +546,11 @@ public:
 									"duration"_a=timer.elapsed_time(),
 									"kernel_id"_a=this->get_id());
 
-		return kstatus::proceed;
+		done();
 	}
 
-private:
-
+	int64_t total_batch_rows = 0;
+	std::vector<std::unique_ptr<ral::cache::CacheData>> cache_vector;
 };
 
 } // namespace batch
@@ -50,6 +50,7 @@
 #include "communication/CommunicationData.h"
 
 #include "CodeTimer.h"
+#include "OutputStream.h"
 
 namespace ral {
 namespace batch {
@@ -169,36 +170,49 @@ using ral::communication::network::Server;
 using ral::communication::network::Client;
 using ral::communication::messages::ReceivedHostMessage;
 
+/**
+	@brief The batches that the other nodes send to this kernel. They are put in a host cache by the thread of the server
+	that receives them, so no thread of the kernel waits for them.
+*/
 template<class MessageType>
 class ExternalBatchColumnDataSequence {
 public:
 	ExternalBatchColumnDataSequence(std::shared_ptr<Context> context, const std::string & message_id, const ral::cache::kernel * kernel = nullptr)
-		: context{context}, last_message_counter{context->getTotalNodes() - 1}, kernel{kernel}
+		: context{context}, kernel{kernel}
 	{
 		host_cache = std::make_shared<ral::cache::HostCacheMachine>(context, 0); //todo assing right id
 		std::string context_comm_token = context->getContextCommunicationToken();
-		const uint32_t context_token = context->getContextToken();
-		std::string comms_message_token = MessageType::MessageID() + "_" + context_comm_token;
-
-		BlazingMutableThread t([this, comms_message_token, context_token, message_id](){
-			while(true){
-					auto message = Server::getInstance().getHostMessage(context_token, comms_message_token);
-					if(!message) {
-						--last_message_counter;
-						if (last_message_counter == 0 ){
-							this->host_cache->finish();
-							break;
-						}
-					}	else{
-						auto concreteMessage = std::static_pointer_cast<ReceivedHostMessage>(message);
-						assert(concreteMessage != nullptr);
-						auto host_table = concreteMessage->releaseBlazingHostTable();
-						host_table->setPartitionId(concreteMessage->getPartitionId());
-						this->host_cache->addToCache(std::move(host_table), message_id);
-					}
+		context_token = context->getContextToken();
+		comms_message_token = MessageType::MessageID() + "_" + context_comm_token;
+
+		auto host_cache = this->host_cache;
+		auto last_message_counter = std::make_shared<int>(context->getTotalNodes() - 1);
+		Server::getInstance().setHostMessageListener(context_token, comms_message_token, [host_cache, last_message_counter, message_id](std::shared_ptr<ral::communication::network::ReceivedMessage> message) {
+			if(!message) {
+				--(*last_message_counter);
+				if (*last_message_counter == 0 ){
+					host_cache->finish();
+				}
+			}	else{
+				auto concreteMessage = std::static_pointer_cast<ReceivedHostMessage>(message);
+				assert(concreteMessage != nullptr);
+				auto host_table = concreteMessage->releaseBlazingHostTable();
+				host_table->setPartitionId(concreteMessage->getPartitionId());
+				host_cache->addToCache(std::move(host_table), message_id);
 			}
 		});
-		t.detach();
+	}
+
+	~ExternalBatchColumnDataSequence() {
+		Server::getInstance().removeMessageListener(context_token, comms_message_token);
+	}
+
+	ExternalBatchColumnDataSequence(const ExternalBatchColumnDataSequence &) = delete;
+	ExternalBatchColumnDataSequence & operator=(const ExternalBatchColumnDataSequence &) = delete;
+
+	/// calls the callback once next would not wait
+	void notify_when_ready(std::function<void()> callback) {
+		host_cache->notify_when_ready(std::move(callback));
 	}
 
 	bool wait_for_next() {
@@ -237,7 +251,8 @@ private:
 	std::shared_ptr<Context> context;
 	std::shared_ptr<ral::cache::HostCacheMachine> host_cache;
 	const ral::cache::kernel * kernel;
-	int last_message_counter;
+	uint32_t context_token;
+	std::string comms_message_token;
 };
 
 
@@ -349,8 +364,8 @@ public:
 		return false;
 	}
 
-	virtual kstatus run() {
-		CodeTimer timer;
+	virtual void run() {
+		timer.start();
 
 		int table_scan_kernel_num_threads = 4;
 		std::map<std::string, std::string> config_options = context->getConfigOptions();
@@ -360,54 +375,43 @@ public:
 		}
 		bool has_limit = this->has_limit_;
 		size_t limit_ = this->limit_rows_;
-		cudf::size_type current_rows = 0;
-		std::vector<BlazingThread> threads;
-		for (int i = 0; i < table_scan_kernel_num_threads; i++) {
-			threads.push_back(BlazingThread([this, &has_limit, &limit_, &current_rows]() {
-				CodeTimer eventTimer(false);
-
-				this->output_cache()->wait_if_cache_is_saturated();
-
-				std::unique_ptr<ral::frame::BlazingTable> batch;
-				while(batch = input.next()) {
-					eventTimer.start();
-					eventTimer.stop();
-					current_rows += batch->num_rows();
+		run_batch_tasks(table_scan_kernel_num_threads, [this, has_limit, limit_]() {
+			CodeTimer eventTimer(false);
 
-					events_logger->info("{ral_id}|{query_id}|{kernel_id}|{input_num_rows}|{input_num_bytes}|{output_num_rows}|{output_num_bytes}|{event_type}|{timestamp_begin}|{timestamp_end}",
-									"ral_id"_a=context->getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode()),
-									"query_id"_a=context->getContextToken(),
-									"kernel_id"_a=this->get_id(),
-									"input_num_rows"_a=batch->num_rows(),
-									"input_num_bytes"_a=batch->sizeInBytes(),
-									"output_num_rows"_a=batch->num_rows(),
-									"output_num_bytes"_a=batch->sizeInBytes(),
-									"event_type"_a="compute",
-									"timestamp_begin"_a=eventTimer.start_time(),
-									"timestamp_end"_a=eventTimer.end_time());
-
-					this->add_to_output_cache(std::move(batch));
-					this->output_cache()->wait_if_cache_is_saturated();
-
-					if (has_limit && current_rows >= limit_) {
-						break;
-					}
-				}
-			}));
-		}
-		for (auto &&t : threads) {
-			t.join();
-		}
-
-		logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-									"query_id"_a=context->getContextToken(),
-									"step"_a=context->getQueryStep(),
-									"substep"_a=context->getQuerySubstep(),
-									"info"_a="TableScan Kernel Completed",
-									"duration"_a=timer.elapsed_time(),
-									"kernel_id"_a=this->get_id());
+			std::unique_ptr<ral::frame::BlazingTable> batch = input.next();
+			if (!batch) {
+				return false;
+			}
+			eventTimer.start();
+			eventTimer.stop();
+			current_rows += batch->num_rows();
 
-		return kstatus::proceed;
+			events_logger->info("{ral_id}|{query_id}|{kernel_id}|{input_num_rows}|{input_num_bytes}|{output_num_rows}|{output_num_bytes}|{event_type}|{timestamp_begin}|{timestamp_end}",
+							"ral_id"_a=context->getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode()),
+							"query_id"_a=context->getContextToken(),
+							"kernel_id"_a=this->get_id(),
+							"input_num_rows"_a=batch->num_rows(),
+							"input_num_bytes"_a=batch->sizeInBytes(),
+							"output_num_rows"_a=batch->num_rows(),
+							"output_num_bytes"_a=batch->sizeInBytes(),
+							"event_type"_a="compute",
+							"timestamp_begin"_a=eventTimer.start_time(),
+							"timestamp_end"_a=eventTimer.end_time());
+
+			this->add_to_output_cache(std::move(batch));
+
+			return !(has_limit && current_rows >= limit_);
+		}, [this]() {
+			logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+										"query_id"_a=context->getContextToken(),
+										"step"_a=context->getQueryStep(),
+										"substep"_a=context->getQuerySubstep(),
+										"info"_a="TableScan Kernel Completed",
+										"duration"_a=timer.elapsed_time(),
+										"kernel_id"_a=this->get_id());
+
+			done();
+		});
 	}
 
 	virtual std::pair<bool, uint64_t> get_estimated_output_num_rows(){
@@ -423,6 +427,7 @@ public:
 
 private:
 	DataSourceSequence input;
+	std::atomic<cudf::size_type> current_rows{0};
 };
 
 class BindableTableScan : public kernel {
@@ -438,8 +443,8 @@ public:
 		return false;
 	}
 
-	virtual kstatus run() {
-		CodeTimer timer;
+	virtual void run() {
+		timer.start();
 
 		input.set_projections(get_projections(expression));
 
@@ -452,103 +457,90 @@ public:
 
 		bool has_limit = this->has_limit_;
 		size_t limit_ = this->limit_rows_;
-		cudf::size_type current_rows = 0;
-		std::vector<BlazingThread> threads;
-		for (int i = 0; i < table_scan_kernel_num_threads; i++) {
-			threads.push_back(BlazingThread([expression = this->expression, &limit_, &has_limit, &current_rows, this]() {
-
-				CodeTimer eventTimer(false);
-
-				this->output_cache()->wait_if_cache_is_saturated();
-				std::unique_ptr<ral::frame::BlazingTable> batch;
-
-				while(batch = input.next()) {
-					try {
-						eventTimer.start();
-						auto log_input_num_rows = batch->num_rows();
-						auto log_input_num_bytes = batch->sizeInBytes();
-
-						if(is_filtered_bindable_scan(expression)) {
-							auto columns = ral::processor::process_filter(batch->toBlazingTableView(), expression, this->context.get());
-							current_rows += columns->num_rows();
-							columns->setNames(fix_column_aliases(columns->names(), expression));
-							eventTimer.stop();
-
-							if( columns ) {
-								auto log_output_num_rows = columns->num_rows();
-								auto log_output_num_bytes = columns->sizeInBytes();
-
-								events_logger->info("{ral_id}|{query_id}|{kernel_id}|{input_num_rows}|{input_num_bytes}|{output_num_rows}|{output_num_bytes}|{event_type}|{timestamp_begin}|{timestamp_end}",
-												"ral_id"_a=context->getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode()),
-												"query_id"_a=context->getContextToken(),
-												"kernel_id"_a=this->get_id(),
-												"input_num_rows"_a=log_input_num_rows,
-												"input_num_bytes"_a=log_input_num_bytes,
-												"output_num_rows"_a=log_output_num_rows,
-												"output_num_bytes"_a=log_output_num_bytes,
-												"event_type"_a="compute",
-												"timestamp_begin"_a=eventTimer.start_time(),
-												"timestamp_end"_a=eventTimer.end_time());
-							}
-
-							this->add_to_output_cache(std::move(columns));
-						}
-						else{
-							current_rows += batch->num_rows();
-							batch->setNames(fix_column_aliases(batch->names(), expression));
-
-							auto log_output_num_rows = batch->num_rows();
-							auto log_output_num_bytes = batch->sizeInBytes();
-							eventTimer.stop();
-
-							events_logger->info("{ral_id}|{query_id}|{kernel_id}|{input_num_rows}|{input_num_bytes}|{output_num_rows}|{output_num_bytes}|{event_type}|{timestamp_begin}|{timestamp_end}",
-											"ral_id"_a=context->getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode()),
-											"query_id"_a=context->getContextToken(),
-											"kernel_id"_a=this->get_id(),
-											"input_num_rows"_a=log_input_num_rows,
-											"input_num_bytes"_a=log_input_num_bytes,
-											"output_num_rows"_a=log_output_num_rows,
-											"output_num_bytes"_a=log_output_num_bytes,
-											"event_type"_a="compute",
-											"timestamp_begin"_a=eventTimer.start_time(),
-											"timestamp_end"_a=eventTimer.end_time());
-
-							this->add_to_output_cache(std::move(batch));
-						}
-
-						this->output_cache()->wait_if_cache_is_saturated();
-
-						// useful when the Algebra Relacional only contains: BindableTableScan and LogicalLimit
-						if (has_limit && current_rows >= limit_) {
-							break;
-						}
-
-					} catch(const std::exception& e) {
-						// TODO add retry here
-						logger->error("{query_id}|{step}|{substep}|{info}|{duration}||||",
-														"query_id"_a=context->getContextToken(),
-														"step"_a=context->getQueryStep(),
-														"substep"_a=context->getQuerySubstep(),
-														"info"_a="In BindableTableScan kernel batch for {}. What: {}"_format(expression, e.what()),
-														"duration"_a="");
-						throw;
+		run_batch_tasks(table_scan_kernel_num_threads, [expression = this->expression, limit_, has_limit, this]() {
+			CodeTimer eventTimer(false);
+
+			std::unique_ptr<ral::frame::BlazingTable> batch = input.next();
+			if (!batch) {
+				return false;
+			}
+			try {
+				eventTimer.start();
+				auto log_input_num_rows = batch->num_rows();
+				auto log_input_num_bytes = batch->sizeInBytes();
+
+				if(is_filtered_bindable_scan(expression)) {
+					auto columns = ral::processor::process_filter(batch->toBlazingTableView(), expression, this->context.get());
+					current_rows += columns->num_rows();
+					columns->setNames(fix_column_aliases(columns->names(), expression));
+					eventTimer.stop();
+
+					if( columns ) {
+						auto log_output_num_rows = columns->num_rows();
+						auto log_output_num_bytes = columns->sizeInBytes();
+
+						events_logger->info("{ral_id}|{query_id}|{kernel_id}|{input_num_rows}|{input_num_bytes}|{output_num_rows}|{output_num_bytes}|{event_type}|{timestamp_begin}|{timestamp_end}",
+										"ral_id"_a=context->getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode()),
+										"query_id"_a=context->getContextToken(),
+										"kernel_id"_a=this->get_id(),
+										"input_num_rows"_a=log_input_num_rows,
+										"input_num_bytes"_a=log_input_num_bytes,
+										"output_num_rows"_a=log_output_num_rows,
+										"output_num_bytes"_a=log_output_num_bytes,
+										"event_type"_a="compute",
+										"timestamp_begin"_a=eventTimer.start_time(),
+										"timestamp_end"_a=eventTimer.end_time());
 					}
+
+					this->add_to_output_cache(std::move(columns));
 				}
-			}));
-		}
-		for (auto &&t : threads) {
-			t.join();
-		}
+				else{
+					current_rows += batch->num_rows();
+					batch->setNames(fix_column_aliases(batch->names(), expression));
+
+					auto log_output_num_rows = batch->num_rows();
+					auto log_output_num_bytes = batch->sizeInBytes();
+					eventTimer.stop();
 
-		logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+					events_logger->info("{ral_id}|{query_id}|{kernel_id}|{input_num_rows}|{input_num_bytes}|{output_num_rows}|{output_num_bytes}|{event_type}|{timestamp_begin}|{timestamp_end}",
+									"ral_id"_a=context->getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode()),
 									"query_id"_a=context->getContextToken(),
-									"step"_a=context->getQueryStep(),
-									"substep"_a=context->getQuerySubstep(),
-									"info"_a="BindableTableScan Kernel Completed",
-									"duration"_a=timer.elapsed_time(),
-									"kernel_id"_a=this->get_id());
+									"kernel_id"_a=this->get_id(),
+									"input_num_rows"_a=log_input_num_rows,
+									"input_num_bytes"_a=log_input_num_bytes,
+									"output_num_rows"_a=log_output_num_rows,
+									"output_num_bytes"_a=log_output_num_bytes,
+									"event_type"_a="compute",
+									"timestamp_begin"_a=eventTimer.start_time(),
+									"timestamp_end"_a=eventTimer.end_time());
+
+					this->add_to_output_cache(std::move(batch));
+				}
+
+				// useful when the Algebra Relacional only contains: BindableTableScan and LogicalLimit
+				return !(has_limit && current_rows >= limit_);
 
-		return kstatus::proceed;
+			} catch(const std::exception& e) {
+				// TODO add retry here
+				logger->error("{query_id}|{step}|{substep}|{info}|{duration}||||",
+												"query_id"_a=context->getContextToken(),
+												"step"_a=context->getQueryStep(),
+												"substep"_a=context->getQuerySubstep(),
+												"info"_a="In BindableTableScan kernel batch for {}. What: {}"_format(expression, e.what()),
+												"duration"_a="");
+				throw;
+			}
+		}, [this]() {
+			logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+										"query_id"_a=context->getContextToken(),
+										"step"_a=context->getQueryStep(),
+										"substep"_a=context->getQuerySubstep(),
+										"info"_a="BindableTableScan Kernel Completed",
+										"duration"_a=timer.elapsed_time(),
+										"kernel_id"_a=this->get_id());
+
+			done();
+		});
 	}
 
 	virtual std::pair<bool, uint64_t> get_estimated_output_num_rows(){
@@ -564,6 +556,7 @@ public:
 
 private:
 	DataSourceSequence input;
+	std::atomic<cudf::size_type> current_rows{0};
 };
 
 class Projection : public kernel {
@@ -578,16 +571,16 @@ public:
 		return true;
 	}
 
-	virtual kstatus run() {
-		CodeTimer timer;
-		CodeTimer eventTimer(false);
+	virtual void run() {
+		timer.start();
 
-		BatchSequence input(this->input_cache(), this);
-		int batch_count = 0;
-		while (input.wait_for_next()) {
+		input.set_source(this->input_cache());
+		for_each_batch(this->input_cache(), [this]() {
+			CodeTimer eventTimer(false);
+			if (!input.wait_for_next()) {
+				return false;
+			}
 			try {
-				this->output_cache()->wait_if_cache_is_saturated();
-
 				auto batch = input.next();
 
 				auto log_input_num_rows = batch ? batch->num_rows() : 0;
@@ -626,21 +619,23 @@ public:
 											"duration"_a="");
 				throw;
 			}
-		}
-
-		logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-									"query_id"_a=context->getContextToken(),
-									"step"_a=context->getQueryStep(),
-									"substep"_a=context->getQuerySubstep(),
-									"info"_a="Projection Kernel Completed",
-									"duration"_a=timer.elapsed_time(),
-									"kernel_id"_a=this->get_id());
+			return true;
+		}, [this]() {
+			logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+										"query_id"_a=context->getContextToken(),
+										"step"_a=context->getQueryStep(),
+										"substep"_a=context->getQuerySubstep(),
+										"info"_a="Projection Kernel Completed",
+										"duration"_a=timer.elapsed_time(),
+										"kernel_id"_a=this->get_id());
 
-		return kstatus::proceed;
+			done();
+		}, true);
 	}
 
 private:
-
+	BatchSequence input{nullptr, this};
+	int batch_count = 0;
 };
 
 class Filter : public kernel {
@@ -655,16 +650,16 @@ public:
 		return true;
 	}
 
-	virtual kstatus run() {
-		CodeTimer timer;
-		CodeTimer eventTimer(false);
+	virtual void run() {
+		timer.start();
 
-		BatchSequence input(this->input_cache(), this);
-		int batch_count = 0;
-		while (input.wait_for_next()) {
+		input.set_source(this->input_cache());
+		for_each_batch(this->input_cache(), [this]() {
+			CodeTimer eventTimer(false);
+			if (!input.wait_for_next()) {
+				return false;
+			}
 			try {
-				this->output_cache()->wait_if_cache_is_saturated();
-
 				auto batch = input.next();
 
 				auto log_input_num_rows = batch->num_rows();
@@ -701,17 +696,18 @@ public:
 											"duration"_a="");
 				throw;
 			}
-		}
-
-		logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-									"query_id"_a=context->getContextToken(),
-									"step"_a=context->getQueryStep(),
-									"substep"_a=context->getQuerySubstep(),
-									"info"_a="Filter Kernel Completed",
-									"duration"_a=timer.elapsed_time(),
-									"kernel_id"_a=this->get_id());
+			return true;
+		}, [this]() {
+			logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+										"query_id"_a=context->getContextToken(),
+										"step"_a=context->getQueryStep(),
+										"substep"_a=context->getQuerySubstep(),
+										"info"_a="Filter Kernel Completed",
+										"duration"_a=timer.elapsed_time(),
+										"kernel_id"_a=this->get_id());
 
-		return kstatus::proceed;
+			done();
+		}, true);
 	}
 
 	std::pair<bool, uint64_t> get_estimated_output_num_rows(){
@@ -730,7 +726,8 @@ public:
     }
 
 private:
-
+	BatchSequence input{nullptr, this};
+	int batch_count = 0;
 };
 
 class Print : public kernel {
@@ -742,17 +739,23 @@ public:
 		return false;
 	}
 
-	virtual kstatus run() {
-		std::lock_guard<std::mutex> lg(print_lock);
-		BatchSequence input(this->input_cache(), this);
-		while (input.wait_for_next() ) {
+	virtual void run() {
+		input.set_source(this->input_cache());
+		for_each_batch(this->input_cache(), [this]() {
+			std::lock_guard<std::mutex> lg(print_lock);
+			if (!input.wait_for_next()) {
+				return false;
+			}
 			auto batch = input.next();
 			ral::utilities::print_blazing_table_view(batch->toBlazingTableView());
-		}
-		return kstatus::stop;
+			return true;
+		}, [this]() {
+			done(kstatus::stop);
+		});
 	}
 
 protected:
+	BatchSequence input{nullptr, this};
 	std::ostream * ofs = nullptr;
 	std::mutex print_lock;
 };
@@ -762,8 +765,13 @@ class OutputKernel : public kernel {
 public:
 	OutputKernel(std::size_t kernel_id, std::shared_ptr<Context> context) : kernel(kernel_id,"OutputKernel", context, kernel_type::OutputKernel) { }
 
-	virtual kstatus run() {
-		while (this->input_.get_cache()->wait_for_next()) {
+	virtual void run() {
+		for_each_batch([this](std::function<void()> callback) {
+			this->input_.get_cache()->notify_when_ready(std::move(callback));
+		}, [this]() {
+			if (!this->input_.get_cache()->wait_for_next()) {
+				return false;
+			}
 			CodeTimer cacheEventTimer(false);
 
 			cacheEventTimer.start();
@@ -785,11 +793,19 @@ public:
 								"timestamp_begin"_a=cacheEventTimer.start_time(),
 								"timestamp_end"_a=cacheEventTimer.end_time());
 
-				output.emplace_back(std::move(temp_output));
+				if(output_stream) {
+					// the next batch is taken once the consumer is not behind; once it cancelled the batches are just dropped
+					output_stream->push(std::move(temp_output));
+				} else {
+					output.emplace_back(std::move(temp_output));
+				}
 			}
-		}
-
-		return kstatus::stop;
+			return true;
+		}, [this]() {
+			done(kstatus::stop);
+		}, output_stream ? notifier([stream = output_stream](std::function<void()> callback) {
+			stream->notify_when_not_full(std::move(callback));
+		}) : notifier());
 	}
 
 	bool can_you_throttle_my_input() {
@@ -800,8 +816,17 @@ public:
 		return std::move(output);
 	}
 
+	/**
+	 * When an output stream is set the batches are handed to it as soon as they arrive instead of
+	 * being accumulated until the query finishes.
+	 */
+	void set_output_stream(std::shared_ptr<OutputStream> output_stream) {
+		this->output_stream = output_stream;
+	}
+
 protected:
 	frame_type output;
+	std::shared_ptr<OutputStream> output_stream;
 };
 
 } // namespace batch
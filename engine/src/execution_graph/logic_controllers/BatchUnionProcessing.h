@@ -33,80 +33,76 @@ public:
 		return true;
 	}
 
-	virtual kstatus run() {
-		CodeTimer timer;
+	virtual void run() {
+		timer.start();
 
         bool isUnionAll = (get_named_expression(this->expression, "all") == "true");
         RAL_EXPECTS(isUnionAll, "In UnionKernel: UNION is not supported, use UNION ALL");
 
-        BatchSequenceBypass input_a(this->input_.get_cache("input_a"), this);
-        BatchSequenceBypass input_b(this->input_.get_cache("input_b"), this);
-        auto batch_a = input_a.next();
-        auto batch_b = input_b.next();
-
-        std::vector<cudf::data_type> data_types_a = batch_a->get_schema();
-        std::vector<cudf::data_type> data_types_b = batch_b->get_schema();
-
-        bool strict = false;
-        std::vector<cudf::data_type> common_types = ral::utilities::get_common_types(data_types_a, data_types_b, strict);
-
-        if (!std::equal(common_types.cbegin(), common_types.cend(), data_types_a.cbegin(), data_types_a.cend())){
-            auto decached = batch_a->decache();
-            ral::utilities::normalize_types(decached, common_types);
-            this->add_to_output_cache(std::move(decached));
-        } else {
-            this->add_to_output_cache(std::move(batch_a));
-        }
-        if (!std::equal(common_types.cbegin(), common_types.cend(), data_types_b.cbegin(), data_types_b.cend())){
-            auto decached = batch_b->decache();
-            ral::utilities::normalize_types(decached, common_types);
-            this->add_to_output_cache(std::move(decached));
-        } else {
-            this->add_to_output_cache(std::move(batch_b));
-        }
-
-        BlazingThread left_thread([this, &input_a, common_types](){
-            std::unique_ptr<ral::cache::CacheData> batch;
-            while (batch = input_a.next()) {
-                std::vector<cudf::data_type> data_types = batch->get_schema();
-                if (!std::equal(common_types.cbegin(), common_types.cend(), data_types.cbegin(), data_types.cend())){
-                    auto decached = batch->decache();
-                    ral::utilities::normalize_types(decached, common_types);
-                    this->add_to_output_cache(std::move(decached));
-                } else {
-                    this->add_to_output_cache(std::move(batch));
+        input_a.set_source(this->input_.get_cache("input_a"));
+        input_b.set_source(this->input_.get_cache("input_b"));
+
+        // the common types are taken from the first batch of each input
+        auto first_batches_ready = when_all(2, [this]() {
+            auto batch_a = input_a.next();
+            auto batch_b = input_b.next();
+
+            std::vector<cudf::data_type> data_types_a = batch_a->get_schema();
+            std::vector<cudf::data_type> data_types_b = batch_b->get_schema();
+
+            bool strict = false;
+            common_types = ral::utilities::get_common_types(data_types_a, data_types_b, strict);
+
+            add_normalized_to_output_cache(std::move(batch_a));
+            add_normalized_to_output_cache(std::move(batch_b));
+
+            auto finished = when_all(2, [this]() {
+                logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
+                            "query_id"_a=context->getContextToken(),
+                            "step"_a=context->getQueryStep(),
+                            "substep"_a=context->getQuerySubstep(),
+                            "info"_a="Union Kernel Completed",
+                            "duration"_a=timer.elapsed_time(),
+                            "kernel_id"_a=this->get_id());
+
+                done();
+            });
+            for_each_batch(this->input_.get_cache("input_a"), [this]() {
+                auto batch = input_a.next();
+                if (!batch) {
+                    return false;
                 }
-            }
-        });
-        BlazingThread right_thread([this, &input_b, common_types](){
-            std::unique_ptr<ral::cache::CacheData> batch;
-            while (batch = input_b.next()) {
-                std::vector<cudf::data_type> data_types = batch->get_schema();
-                if (!std::equal(common_types.cbegin(), common_types.cend(), data_types.cbegin(), data_types.cend())){
-                    auto decached = batch->decache();
-                    ral::utilities::normalize_types(decached, common_types);
-                    this->add_to_output_cache(std::move(decached));
-                } else {
-                    this->add_to_output_cache(std::move(batch));
+                add_normalized_to_output_cache(std::move(batch));
+                return true;
+            }, finished);
+            for_each_batch(this->input_.get_cache("input_b"), [this]() {
+                auto batch = input_b.next();
+                if (!batch) {
+                    return false;
                 }
-            }
+                add_normalized_to_output_cache(std::move(batch));
+                return true;
+            }, finished);
         });
-        left_thread.join();
-        right_thread.join();
-
-		logger->debug("{query_id}|{step}|{substep}|{info}|{duration}|kernel_id|{kernel_id}||",
-                    "query_id"_a=context->getContextToken(),
-                    "step"_a=context->getQueryStep(),
-                    "substep"_a=context->getQuerySubstep(),
-                    "info"_a="Union Kernel Completed",
-                    "duration"_a=timer.elapsed_time(),
-                    "kernel_id"_a=this->get_id());
-
-		return kstatus::proceed;
+        submit_when_ready(this->input_.get_cache("input_a"), first_batches_ready);
+        submit_when_ready(this->input_.get_cache("input_b"), first_batches_ready);
 	}
 
 private:
+    void add_normalized_to_output_cache(std::unique_ptr<ral::cache::CacheData> batch) {
+        std::vector<cudf::data_type> data_types = batch->get_schema();
+        if (!std::equal(common_types.cbegin(), common_types.cend(), data_types.cbegin(), data_types.cend())){
+            auto decached = batch->decache();
+            ral::utilities::normalize_types(decached, common_types);
+            this->add_to_output_cache(std::move(decached));
+        } else {
+            this->add_to_output_cache(std::move(batch));
+        }
+    }
 
+    BatchSequenceBypass input_a{nullptr, this};
+    BatchSequenceBypass input_b{nullptr, this};
+    std::vector<cudf::data_type> common_types;
 };
 
 } // namespace batch
@@ -1,4 +1,5 @@
 #include "CacheMachine.h"
+#include "CacheTierManager.h"
 #include <sys/stat.h>
 #include <random>
 #include <src/utilities/CommonOperations.h>
@@ -29,6 +30,10 @@ std::string randomString(std::size_t length) {
 }
 
 size_t CacheDataLocalFile::sizeInBytes() const {
+	if(this->format != SpillFormat::ORC) {
+		return this->size_in_bytes;
+	}
+
 	struct stat st;
 
 	if(stat(this->filePath_.c_str(), &st) == 0)
@@ -38,6 +43,22 @@ size_t CacheDataLocalFile::sizeInBytes() const {
 }
 
 std::unique_ptr<ral::frame::BlazingTable> CacheDataLocalFile::decache() {
+	if(this->format != SpillFormat::ORC) {
+		// waits for the spill thread if it is writing the file, or takes the table back if it did not start yet
+		std::unique_lock<std::mutex> lock(this->pending->mutex);
+		if(this->pending->host_table != nullptr) {
+			auto host_table = std::move(this->pending->host_table);
+			lock.unlock();
+			remove(this->filePath_.c_str());
+			return ral::communication::messages::deserialize_from_cpu(host_table.get());
+		}
+		lock.unlock();
+
+		auto table = read_raw_spill_file(this->filePath_);
+		remove(this->filePath_.c_str());
+		return table;
+	}
+
 	cudf_io::read_orc_args in_args{cudf_io::source_info{this->filePath_}};
 	auto result = cudf_io::read_orc(in_args);
 
@@ -47,9 +68,81 @@ std::unique_ptr<ral::frame::BlazingTable> CacheDataLocalFile::decache() {
 	return std::make_unique<ral::frame::BlazingTable>(std::move(result.tbl), this->names());
 }
 
-CacheDataLocalFile::CacheDataLocalFile(std::unique_ptr<ral::frame::BlazingTable> table, std::string orc_files_path)
-	: CacheData(CacheDataType::LOCAL_FILE, table->names(), table->get_schema(), table->num_rows())
+CacheDataLocalFile::CacheDataLocalFile(std::unique_ptr<ral::frame::BlazingTable> table, std::string orc_files_path, SpillFormat format)
+	: CacheData(CacheDataType::LOCAL_FILE, table->names(), table->get_schema(), table->num_rows()), format(format), size_in_bytes(table->sizeInBytes())
 {
+	if(this->format != SpillFormat::ORC) {
+		create_spill_file(orc_files_path);
+		spill_host_table(ral::communication::messages::serialize_gpu_message_to_host_table(table->toBlazingTableView()));
+	} else {
+		write_orc_file(std::move(table), orc_files_path);
+	}
+}
+
+CacheDataLocalFile::CacheDataLocalFile(std::unique_ptr<ral::frame::BlazingHostTable> host_table, std::string orc_files_path, SpillFormat format)
+	: CacheData(CacheDataType::LOCAL_FILE, host_table->names(), host_table->get_schema(), host_table->num_rows()), format(format), size_in_bytes(host_table->sizeInBytes())
+{
+	if(this->format != SpillFormat::ORC) {
+		create_spill_file(orc_files_path);
+		spill_host_table(std::move(host_table));
+	} else {
+		write_orc_file(ral::communication::messages::deserialize_from_cpu(host_table.get()), orc_files_path);
+	}
+}
+
+CacheDataLocalFile::CacheDataLocalFile(std::vector<std::string> col_names, std::vector<cudf::data_type> schema, size_t n_rows,
+	size_t size_in_bytes, std::string orc_files_path, SpillFormat format)
+	: CacheData(CacheDataType::LOCAL_FILE, col_names, schema, n_rows), format(format), size_in_bytes(size_in_bytes)
+{
+	assert(this->format != SpillFormat::ORC);
+	create_spill_file(orc_files_path);
+}
+
+void CacheDataLocalFile::create_spill_file(const std::string & orc_files_path) {
+	this->filePath_ = orc_files_path + "/.blazing-temp-" + randomString(64) + ".spill";
+	this->pending = std::make_shared<pending_spill>();
+}
+
+void CacheDataLocalFile::spill_host_table(std::unique_ptr<ral::frame::BlazingHostTable> host_table) {
+	std::size_t num_bytes = host_table->sizeInBytes();
+	// the spill thread does not have it yet, it is not locked
+	this->pending->host_table = std::move(host_table);
+
+	std::shared_ptr<pending_spill> pending = this->pending;
+	std::string path = this->filePath_;
+	bool compress = this->format == SpillFormat::RAW_LZ4;
+	try {
+		spill_io_pool::getInstance().submit([pending, path, compress]() {
+			std::lock_guard<std::mutex> lock(pending->mutex);
+			if(pending->host_table == nullptr) {
+				return;
+			}
+			// if the write fails the table stays in host memory until it is decached or the cache data is destroyed
+			try {
+				write_raw_spill_file(path, *pending->host_table, compress);
+			} catch(...) {
+				remove(path.c_str());
+				throw;
+			}
+			pending->host_table.reset();
+		}, num_bytes);
+	} catch(const std::exception & e) {
+		auto logger = spdlog::get("batch_logger");
+		if(logger) {
+			logger->error("|||{info}|||||", "info"_a = std::string("Could not queue the spill write: ") + e.what());
+		}
+	}
+}
+
+CacheDataLocalFile::~CacheDataLocalFile() {
+	if(this->pending != nullptr) {
+		// frees the table of a write that failed or did not start yet, the spill thread skips it
+		std::lock_guard<std::mutex> lock(this->pending->mutex);
+		this->pending->host_table.reset();
+	}
+}
+
+void CacheDataLocalFile::write_orc_file(std::unique_ptr<ral::frame::BlazingTable> table, const std::string & orc_files_path) {
 	this->filePath_ = orc_files_path + "/.blazing-temp-" + randomString(64) + ".orc";
 
 	std::cout << "CacheDataLocalFile: " << this->filePath_ << std::endl;
@@ -69,6 +162,7 @@ CacheMachine::CacheMachine(std::shared_ptr<Context> context): ctx(context), cach
 	CacheMachine::cache_count++;
 
 	waitingCache = std::make_unique<WaitingQueue>();
+	cache_tier_manager::getInstance().register_queue(waitingCache.get());
 	this->memory_resources.push_back( &blazing_device_memory_resource::getInstance() );
 	this->memory_resources.push_back( &blazing_host_memory_resource::getInstance() );
 	this->memory_resources.push_back( &blazing_disk_memory_resource::getInstance() );
@@ -98,6 +192,7 @@ CacheMachine::CacheMachine(std::shared_ptr<Context> context, std::uint32_t flow_
 	CacheMachine::cache_count++;
 
 	waitingCache = std::make_unique<WaitingQueue>();
+	cache_tier_manager::getInstance().register_queue(waitingCache.get());
 	this->memory_resources.push_back( &blazing_device_memory_resource::getInstance() ); 
 	this->memory_resources.push_back( &blazing_host_memory_resource::getInstance() ); 
 	this->memory_resources.push_back( &blazing_disk_memory_resource::getInstance() );
@@ -124,7 +219,9 @@ CacheMachine::CacheMachine(std::shared_ptr<Context> context, std::uint32_t flow_
 							"kernel_type"_a="cache");
 }
 
-CacheMachine::~CacheMachine() {}
+CacheMachine::~CacheMachine() {
+	cache_tier_manager::getInstance().unregister_queue(waitingCache.get());
+}
 
 Context * CacheMachine::get_context() const {
 	return ctx.get();
@@ -198,6 +295,9 @@ void CacheMachine::addCacheData(std::unique_ptr<ral::cache::CacheData> cache_dat
 
 		num_rows_added += cache_data->num_rows();
 		num_bytes_added += cache_data->sizeInBytes();
+		auto num_rows = cache_data->num_rows();
+		auto num_bytes = cache_data->sizeInBytes();
+		CodeTimer placementTimer;
 		int cacheIndex = 0;
 		while(cacheIndex < this->memory_resources.size()) {
 			auto memory_to_use = (this->memory_resources[cacheIndex]->get_memory_used() + cache_data->sizeInBytes());
@@ -244,6 +344,8 @@ void CacheMachine::addCacheData(std::unique_ptr<ral::cache::CacheData> cache_dat
 						// }); t.detach();
 					}
 				}
+				placementTimer.stop();
+				log_cache_event(cacheIndex == 0 ? "placeGPU" : (cacheIndex == 1 ? "placeCPU" : "placeDisk"), num_rows, num_bytes, placementTimer);
 				break;
 			}
 			cacheIndex++;
@@ -278,6 +380,9 @@ void CacheMachine::addToCache(std::unique_ptr<ral::frame::BlazingTable> table, c
 		
 		num_rows_added += table->num_rows();
 		num_bytes_added += table->sizeInBytes();
+		auto num_rows = table->num_rows();
+		auto num_bytes = table->sizeInBytes();
+		CodeTimer placementTimer;
 		int cacheIndex = 0;
 		while(cacheIndex < memory_resources.size()) {
 			auto memory_to_use = (this->memory_resources[cacheIndex]->get_memory_used() + table->sizeInBytes());
@@ -333,13 +438,15 @@ void CacheMachine::addToCache(std::unique_ptr<ral::frame::BlazingTable> table, c
 						if (it != config_options.end()) {
 							orc_files_path = config_options["BLAZING_CACHE_DIRECTORY"];
 						}
-						auto cache_data = std::make_unique<CacheDataLocalFile>(std::move(table), orc_files_path);
+						auto cache_data = std::make_unique<CacheDataLocalFile>(std::move(table), orc_files_path, get_spill_format(config_options));
 						auto item =	std::make_unique<message>(std::move(cache_data), message_id);
 						this->waitingCache->put(std::move(item));
 						// NOTE: Wait don't kill the main process until the last thread is finished!
 						// });t.detach();
 					}
 				}
+				placementTimer.stop();
+				log_cache_event(cacheIndex == 0 ? "placeGPU" : (cacheIndex == 1 ? "placeCPU" : "placeDisk"), num_rows, num_bytes, placementTimer);
 				break;
 			}
 			cacheIndex++;
@@ -354,21 +461,60 @@ void CacheMachine::wait_until_finished() {
 
 
 std::unique_ptr<ral::frame::BlazingTable> CacheMachine::get_or_wait(size_t index) {
+	CodeTimer waitTimer;
 	std::unique_ptr<message> message_data = waitingCache->get_or_wait(std::to_string(index));
+	waitTimer.stop();
+	log_wait(waitTimer);
 	if (message_data == nullptr) {
 		return nullptr;
 	}
 	
 	std::unique_ptr<ral::frame::BlazingTable> output = message_data->get_data().decache();
-	std::unique_lock<std::mutex> lock(flow_control_mutex);
-	flow_control_batches_count--;
-	flow_control_bytes_count -= output->sizeInBytes();
-	flow_control_condition_variable.notify_all();
+	release_flow_control(output->sizeInBytes());
 	return std::move(output);
 }
 
-std::unique_ptr<ral::frame::BlazingTable> CacheMachine::pullFromCache() {
+bool CacheMachine::wait_for_next() {
+	CodeTimer waitTimer;
+	bool has_next = this->waitingCache->wait_for_next();
+	waitTimer.stop();
+	log_wait(waitTimer);
+	return has_next;
+}
+
+std::unique_ptr<message> CacheMachine::pop_or_wait() {
+	CodeTimer waitTimer;
 	std::unique_ptr<message> message_data = waitingCache->pop_or_wait();
+	waitTimer.stop();
+	log_wait(waitTimer);
+	return message_data;
+}
+
+void CacheMachine::log_wait(CodeTimer & waitTimer) {
+	// only the waits that actually blocked are logged, to keep the cache events log small
+	if (waitTimer.elapsed_time() >= 1) {
+		log_cache_event("waitCache", 0, 0, waitTimer);
+	}
+}
+
+void CacheMachine::log_cache_event(const std::string & event_type, std::size_t num_rows, std::size_t num_bytes, CodeTimer & eventTimer) {
+	if (!ctx || !cache_events_logger) {
+		return;
+	}
+	cache_events_logger->info("{ral_id}|{query_id}|{source}|{sink}|{num_rows}|{num_bytes}|{event_type}|{timestamp_begin}|{timestamp_end}",
+					"ral_id"_a=ctx->getNodeIndex(ral::communication::CommunicationData::getInstance().getSelfNode()),
+					"query_id"_a=ctx->getContextToken(),
+					"source"_a=this->get_id(),
+					"sink"_a=this->get_id(),
+					"num_rows"_a=num_rows,
+					"num_bytes"_a=num_bytes,
+					"event_type"_a=event_type,
+					"timestamp_begin"_a=eventTimer.start_time(),
+					"timestamp_end"_a=eventTimer.end_time());
+}
+
+std::unique_ptr<ral::frame::BlazingTable> CacheMachine::pullFromCache() {
+	std::unique_ptr<message> message_data = this->pop_or_wait();
 	if (message_data == nullptr) {
 		return nullptr;
 	}
@@ -383,15 +529,12 @@ std::unique_ptr<ral::frame::BlazingTable> CacheMachine::pullFromCache() {
 								"rows"_a=message_data->get_data().num_rows());
 
 	std::unique_ptr<ral::frame::BlazingTable> output = message_data->get_data().decache();
-	std::unique_lock<std::mutex> lock(flow_control_mutex);
-	flow_control_batches_count--;
-	flow_control_bytes_count -= output->sizeInBytes();
-	flow_control_condition_variable.notify_all();
+	release_flow_control(output->sizeInBytes());
 	return std::move(output);
 }
 
 std::unique_ptr<ral::cache::CacheData> CacheMachine::pullCacheData() {
-	std::unique_ptr<message> message_data = waitingCache->pop_or_wait();
+	std::unique_ptr<message> message_data = this->pop_or_wait();
 	if (message_data == nullptr) {
 		return nullptr;
 	}
@@ -406,10 +549,7 @@ std::unique_ptr<ral::cache::CacheData> CacheMachine::pullCacheData() {
 								"rows"_a=message_data->get_data().num_rows());
 
 	std::unique_ptr<ral::cache::CacheData> output = message_data->release_data();
-	std::unique_lock<std::mutex> lock(flow_control_mutex);
-	flow_control_batches_count--;
-	flow_control_bytes_count -= output->sizeInBytes();
-	flow_control_condition_variable.notify_all();
+	release_flow_control(output->sizeInBytes());
 	return std::move(output);
 }
 
@@ -439,9 +579,55 @@ void CacheMachine::wait_if_cache_is_saturated() {
 		})){}
 }
 
+void CacheMachine::notify_when_ready(std::function<void()> callback) {
+	this->waitingCache->notify_when_ready(std::move(callback));
+}
+
+void CacheMachine::notify_when_finished(std::function<void()> callback) {
+	this->waitingCache->notify_when_ready(std::move(callback), [] { return false; });
+}
+
+bool CacheMachine::is_saturated() {
+	std::unique_lock<std::mutex> lock(flow_control_mutex);
+	return thresholds_are_met(flow_control_batches_count, flow_control_bytes_count);
+}
+
+void CacheMachine::notify_when_not_saturated(std::function<void()> callback) {
+	std::unique_lock<std::mutex> lock(flow_control_mutex);
+	if(thresholds_are_met(flow_control_batches_count, flow_control_bytes_count)) {
+		not_saturated_callbacks.push_back(std::move(callback));
+		return;
+	}
+	lock.unlock();
+	callback();
+}
+
+void CacheMachine::release_flow_control(std::size_t num_bytes) {
+	std::unique_lock<std::mutex> lock(flow_control_mutex);
+	flow_control_batches_count--;
+	flow_control_bytes_count -= num_bytes;
+	flow_control_condition_variable.notify_all();
+	if(not_saturated_callbacks.empty() || thresholds_are_met(flow_control_batches_count, flow_control_bytes_count)) {
+		return;
+	}
+	auto callbacks = std::move(not_saturated_callbacks);
+	not_saturated_callbacks.clear();
+	lock.unlock();
+	for(auto & callback : callbacks) {
+		callback();
+	}
+}
+
 ConcatenatingCacheMachine::ConcatenatingCacheMachine(std::shared_ptr<Context> context)
 	: CacheMachine(context) {}
 
+void ConcatenatingCacheMachine::notify_when_ready(std::function<void()> callback) {
+	this->waitingCache->notify_when_ready(std::move(callback), [this] {
+		std::unique_lock<std::mutex> lock(flow_control_mutex);
+		return thresholds_are_met(flow_control_batches_count, flow_control_bytes_count);
+	});
+}
+
 ConcatenatingCacheMachine::ConcatenatingCacheMachine(std::shared_ptr<Context> context, std::uint32_t flow_control_batches_threshold, std::size_t flow_control_bytes_threshold)
 	: CacheMachine(context, flow_control_batches_threshold, flow_control_bytes_threshold) {}
 
@@ -452,7 +638,7 @@ std::unique_ptr<ral::frame::BlazingTable> ConcatenatingCacheMachine::pullFromCac
 	std::vector<std::unique_ptr<message>> collected_messages;
 	std::unique_ptr<message> message_data;
 	std::string message_id = "";
-	while (message_data = waitingCache->pop_or_wait())
+	while (message_data = this->pop_or_wait())
 	{
 		auto& cache_data = message_data->get_data();
 		if (collected_messages.empty() || !thresholds_are_met(1 + collected_messages.size(), total_bytes + cache_data.sizeInBytes())) {
@@ -461,10 +647,11 @@ std::unique_ptr<ral::frame::BlazingTable> ConcatenatingCacheMachine::pullFromCac
 			collected_messages.push_back(std::move(message_data));
 
 			// we need to decrement here and not at the end, otherwise we can end up with a dead lock
-			std::unique_lock<std::mutex> lock(flow_control_mutex);
-			flow_control_batches_count--;
-			flow_control_bytes_count -= cache_data.sizeInBytes();
-			flow_control_condition_variable.notify_all();
+			release_flow_control(cache_data.sizeInBytes());
+			if (thresholds_are_met(collected_messages.size(), total_bytes)) {
+				// a first batch that meets the thresholds on its own is returned without waiting for the next one
+				break;
+			}
 		} else {
 			waitingCache->put(std::move(message_data));
 			break;
@@ -14,11 +14,16 @@
 #include <atomic>
 #include <blazingdb/manager/Context.h>
 #include <cudf/io/functions.hpp>
+#include <functional>
 #include <future>
 #include <memory>
 #include <condition_variable>
 #include <mutex>
 #include <queue>
+#include <set>
+#include <map>
+#include <unordered_map>
+#include <chrono>
 #include <src/communication/messages/GPUComponentMessage.h>
 #include <string>
 #include <typeindex>
@@ -27,6 +32,8 @@
 #include <bmr/BlazingMemoryResource.h>
 #include <spdlog/spdlog.h>
 #include "communication/CommunicationData.h"
+#include "execution_graph/logic_controllers/SpillFile.h"
+#include "execution_graph/logic_controllers/CompressedHostTable.h"
 #include "CodeTimer.h"
 using namespace std::chrono_literals;
 
@@ -82,6 +89,8 @@ public:
 
 	size_t sizeInBytes() const override { return data->sizeInBytes(); }
 
+	ral::frame::BlazingTableView getTableView() const { return data->toBlazingTableView(); }
+
 	virtual ~GPUCacheData() {}
 
 private:
@@ -91,44 +100,99 @@ private:
 /// \brief A specific class for a CacheData on CPU Memory
  class CPUCacheData : public CacheData {
  public:
- 	CPUCacheData(std::unique_ptr<ral::frame::BlazingTable> gpu_table)
+ 	CPUCacheData(std::unique_ptr<ral::frame::BlazingTable> gpu_table,
+		const ral::frame::host_cache_compression & compression = ral::frame::get_default_host_cache_compression())
 		: CacheData(CacheDataType::CPU, gpu_table->names(), gpu_table->get_schema(), gpu_table->num_rows())
 	{
 		this->host_table = ral::communication::messages::serialize_gpu_message_to_host_table(gpu_table->toBlazingTableView());
+		compress(compression);
  	}
 
-	CPUCacheData(std::unique_ptr<ral::frame::BlazingHostTable> host_table)
+	CPUCacheData(std::unique_ptr<ral::frame::BlazingHostTable> host_table,
+		const ral::frame::host_cache_compression & compression = ral::frame::get_default_host_cache_compression())
 		: CacheData(CacheDataType::CPU, host_table->names(), host_table->get_schema(), host_table->num_rows()), host_table{std::move(host_table)}
 	{
+		compress(compression);
 	}
  	std::unique_ptr<ral::frame::BlazingTable> decache() override {
+		if (compressed_table) {
+			// it is decompressed lazily, only when it is needed
+			auto decompressed_table = compressed_table->decompress();
+			return ral::communication::messages::deserialize_from_cpu(decompressed_table.get());
+		}
  		return ral::communication::messages::deserialize_from_cpu(host_table.get());
  	}
 
 	std::unique_ptr<ral::frame::BlazingHostTable> releaseHostTable() {
+		if (compressed_table) {
+			auto decompressed_table = compressed_table->decompress();
+			compressed_table.reset();
+			return decompressed_table;
+		}
  		return std::move(host_table);
  	}
- 	size_t sizeInBytes() const override { return host_table->sizeInBytes(); }
+
+	/// the logical bytes of the table, the bytes it uses are in compressedSizeInBytes
+ 	size_t sizeInBytes() const override { return compressed_table ? compressed_table->logicalSizeInBytes() : host_table->sizeInBytes(); }
+
+	size_t compressedSizeInBytes() const { return compressed_table ? compressed_table->sizeInBytes() : host_table->sizeInBytes(); }
+
+	bool isCompressed() const { return compressed_table != nullptr; }
 
  	virtual ~CPUCacheData() {}
 
 protected:
+	void compress(const ral::frame::host_cache_compression & compression) {
+		if (compression.enabled()) {
+			compressed_table = std::make_unique<ral::frame::CompressedHostTable>(*host_table, compression);
+			host_table.reset();
+		}
+	}
+
 	 std::unique_ptr<ral::frame::BlazingHostTable> host_table;
+	 std::unique_ptr<ral::frame::CompressedHostTable> compressed_table;
  };
 
+/// \brief A raw spill file that a spill thread has not finished writing yet.
+/// The spill thread holds the mutex while it writes, a decache that comes before it starts takes the host table back.
+struct pending_spill {
+	std::mutex mutex;
+	std::unique_ptr<ral::frame::BlazingHostTable> host_table;
+};
+
 /// \brief A specific class for a CacheData on Disk Memory
+/// With the ORC format the table is written with cudf when it is added. With the RAW formats it is copied
+/// to host memory and the file is written by the spill_io_pool, so the kernel adding it does not wait for the disk.
 class CacheDataLocalFile : public CacheData {
 public:
-	CacheDataLocalFile(std::unique_ptr<ral::frame::BlazingTable> table, std::string orc_files_path);
+	CacheDataLocalFile(std::unique_ptr<ral::frame::BlazingTable> table, std::string orc_files_path, SpillFormat format = SpillFormat::ORC);
+
+	CacheDataLocalFile(std::unique_ptr<ral::frame::BlazingHostTable> host_table, std::string orc_files_path, SpillFormat format);
+
+	/// sets up the file of a RAW spill without its table, the table is given afterwards with spill_host_table
+	CacheDataLocalFile(std::vector<std::string> col_names, std::vector<cudf::data_type> schema, size_t n_rows,
+		size_t size_in_bytes, std::string orc_files_path, SpillFormat format);
+
+	/// gives the table to the spill thread to write it, it does not throw. If the write can not be queued the
+	/// table stays in host memory, like when the write fails
+	void spill_host_table(std::unique_ptr<ral::frame::BlazingHostTable> host_table);
 
 	std::unique_ptr<ral::frame::BlazingTable> decache() override;
 
 	size_t sizeInBytes() const override;
-	virtual ~CacheDataLocalFile() {}
+	virtual ~CacheDataLocalFile();
 	std::string filePath() const { return filePath_; }
+	SpillFormat spillFormat() const { return format; }
 
 private:
+	void write_orc_file(std::unique_ptr<ral::frame::BlazingTable> table, const std::string & orc_files_path);
+
+	void create_spill_file(const std::string & orc_files_path);
+
 	std::string filePath_;
+	SpillFormat format;
+	std::shared_ptr<pending_spill> pending;
+	size_t size_in_bytes;
 };
 
 using frame_type = std::unique_ptr<ral::frame::BlazingTable>;
@@ -152,9 +216,25 @@ public:
 
 	std::unique_ptr<CacheData> release_data() { return std::move(data); }
 
+	/// the order of the message in its WaitingQueue, it keeps its place when it is moved to another cache level
+	std::uint64_t get_sequence() const { return sequence; }
+
+	void set_sequence(std::uint64_t sequence) { this->sequence = sequence; }
+
 protected:
 	const std::string message_id;
 	std::unique_ptr<CacheData> data;
+	std::uint64_t sequence = 0;
+};
+
+/// \brief A message of a WaitingQueue that can be moved to another cache level
+struct queued_message_info {
+	std::uint64_t sequence;
+	std::size_t position;
+	/// the logical bytes of the table, the gpu memory it uses when it is promoted
+	std::size_t size_in_bytes;
+	/// the bytes it uses in its cache level, less than size_in_bytes when it is compressed in host memory
+	std::size_t memory_bytes;
 };
 
 /**
@@ -162,13 +242,17 @@ protected:
 	into the multi-tier cache system to stores data (GPUCacheData, CPUCacheData, CacheDataLocalFile).
 	This class brings concurrency support the all cache machines into the  execution graph.
 	A blocking messaging system for `pop_or_wait` method is implemeted by using a condition variable.
+	The cache_tier_manager can take a message out (`take`) to move it to another cache level and `put_back` it
+	in its place. Meanwhile the consumers wait instead of getting the messages that come after it.
+	The messages are indexed by their message id, and `get_or_wait` is only woken up by the messages with its id.
+	A consumer that does not want to wait in a thread uses `notify_when_ready`, it is called back once a message can be consumed.
 	Note: WaitingQueue class is based on communication MessageQueue.
 */
 class WaitingQueue {
 public:
 	using message_ptr = std::unique_ptr<message>;
 
-	WaitingQueue() : finished{false} {}
+	WaitingQueue() : finished{false}, next_sequence{0}, last_pop_time{std::chrono::steady_clock::now()} {}
 	~WaitingQueue() = default;
 
 	WaitingQueue(WaitingQueue &&) = delete;
@@ -178,15 +262,36 @@ public:
 
 	void put(message_ptr item) {
 		std::unique_lock<std::mutex> lock(mutex_);
+		auto waiters = message_waiters.find(item->get_message_id());
 		putWaitingQueue(std::move(item));
+		// only the get_or_wait calls waiting for this message id are woken up
+		if(waiters != message_waiters.end()) {
+			waiters->second.condition.notify_all();
+		}
+		auto callbacks = take_ready_callbacks();
 		lock.unlock();
 		condition_variable_.notify_all();
+		call(callbacks);
 	}
 
 	void finish() {
 		std::unique_lock<std::mutex> lock(mutex_);
 		this->finished = true;
-		condition_variable_.notify_all();
+		notify_all_waiters();
+		auto callbacks = take_ready_callbacks();
+		lock.unlock();
+		call(callbacks);
+	}
+
+	/// calls the callback once, when a message can be consumed or the queue is finished and drained. It is called right away
+	/// if that is already the case, otherwise by the thread that puts the message or finishes the queue, without the lock.
+	/// The condition, when there is one, has to hold too before a message is considered ready. It is checked with the lock held.
+	void notify_when_ready(std::function<void()> callback, std::function<bool()> condition = nullptr) {
+		std::unique_lock<std::mutex> lock(mutex_);
+		ready_callbacks.push_back({std::move(condition), std::move(callback)});
+		auto callbacks = take_ready_callbacks();
+		lock.unlock();
+		call(callbacks);
 	}
 
 	bool is_finished() {
@@ -199,7 +304,7 @@ public:
 		CodeTimer blazing_timer;
 		std::unique_lock<std::mutex> lock(mutex_);
 		while(!condition_variable_.wait_for(lock, 60000ms, [&, this] { 
-				bool done_waiting = this->finished.load(std::memory_order_seq_cst) or !this->empty(); 
+				bool done_waiting = this->ready() or (this->finished.load(std::memory_order_seq_cst) and this->drained()); 
 				if (!done_waiting && blazing_timer.elapsed_time() > 59000){
 					auto logger = spdlog::get("batch_logger");
 					logger->warn("|||{info}|{duration}||||",
@@ -209,19 +314,17 @@ public:
 				return done_waiting;
 			})){}
 		
-		if(this->message_queue_.size() == 0) {
+		if(!this->ready()) {
 			return nullptr;
 		}
-		auto data = std::move(this->message_queue_.front());
-		this->message_queue_.pop_front();
-		return std::move(data);
+		return this->pop();
 	}
 
 	bool wait_for_next() {
 		CodeTimer blazing_timer;
 		std::unique_lock<std::mutex> lock(mutex_);
 		while(!condition_variable_.wait_for(lock, 60000ms, [&, this] { 
-				bool done_waiting = this->finished.load(std::memory_order_seq_cst) or !this->empty(); 
+				bool done_waiting = this->ready() or (this->finished.load(std::memory_order_seq_cst) and this->drained()); 
 				if (!done_waiting && blazing_timer.elapsed_time() > 59000){
 					auto logger = spdlog::get("batch_logger");
 					logger->warn("|||{info}|{duration}||||",
@@ -231,15 +334,12 @@ public:
 				return done_waiting;
 			})){}
 
-		if(this->empty()) {
-			return false;
-		}
-		return true;
+		return this->ready();
 	}
 
 	bool has_next_now() {
 		std::unique_lock<std::mutex> lock(mutex_);
-		return !this->empty();
+		return !this->drained();
 	}
 
 	void wait_until_finished() {
@@ -260,12 +360,11 @@ public:
 	message_ptr get_or_wait(std::string message_id) {
 		CodeTimer blazing_timer;
 		std::unique_lock<std::mutex> lock(mutex_);
-		while(!condition_variable_.wait_for(lock, 60000ms, [message_id, &blazing_timer, this] {
-				auto result = std::any_of(this->message_queue_.cbegin(),
-							this->message_queue_.cend(), [&](auto &e) {
-								return e->get_message_id() == message_id;
-							});
-				bool done_waiting = this->finished.load(std::memory_order_seq_cst) or result;
+		message_waiter & waiter = message_waiters[message_id];
+		waiter.count++;
+		while(!waiter.condition.wait_for(lock, 60000ms, [&message_id, &blazing_timer, this] {
+				bool done_waiting = (this->finished.load(std::memory_order_seq_cst) and this->in_transit.empty()) or
+					this->message_ids.find(message_id) != this->message_ids.end();
 				if (!done_waiting && blazing_timer.elapsed_time() > 59000){
 					auto logger = spdlog::get("batch_logger");
 					logger->warn("|||{info}|{duration}|message_id|{message_id}||",
@@ -275,30 +374,29 @@ public:
 				}
 				return done_waiting;
 			})){}
-		if(this->message_queue_.size() == 0) {
-			return nullptr;
+		if(--waiter.count == 0) {
+			message_waiters.erase(message_id);
 		}
-		while (true){
-			auto data = this->pop();
-			if (data->get_message_id() == message_id){
-				return std::move(data);
-			} else {
-				putWaitingQueue(std::move(data));
-			}
+
+		// the message is taken from its place, so that the order of the others is kept
+		auto ids = this->message_ids.find(message_id);
+		if(ids == this->message_ids.end()) {
+			return nullptr;
 		}
+		this->last_pop_time = std::chrono::steady_clock::now();
+		return eraseWaitingQueue(this->message_queue_.find(*ids->second.begin()));
 	}
 
 	message_ptr pop() {
-		auto data = std::move(this->message_queue_.front());
-		this->message_queue_.pop_front();
-		return std::move(data);
+		this->last_pop_time = std::chrono::steady_clock::now();
+		return eraseWaitingQueue(this->message_queue_.begin());
 	}
 
 	std::vector<message_ptr> get_all_or_wait() {
 		CodeTimer blazing_timer;
 		std::unique_lock<std::mutex> lock(mutex_);
 		while(!condition_variable_.wait_for(lock, 60000ms,  [&blazing_timer, this] { 
-				bool done_waiting = this->finished.load(std::memory_order_seq_cst); 
+				bool done_waiting = this->finished.load(std::memory_order_seq_cst) and this->in_transit.empty(); 
 				if (!done_waiting && blazing_timer.elapsed_time() > 59000){
 					auto logger = spdlog::get("batch_logger");
 					logger->warn("|||{info}|{duration}||||",
@@ -308,21 +406,147 @@ public:
 				return done_waiting;
 			})){}
 		std::vector<message_ptr> response;
-		for(message_ptr & it : message_queue_) {
-			response.emplace_back(std::move(it));
+		for(auto & it : message_queue_) {
+			response.emplace_back(std::move(it.second));
 		}
-		message_queue_.erase(message_queue_.begin(), message_queue_.end());
+		message_queue_.clear();
+		message_ids.clear();
+		this->last_pop_time = std::chrono::steady_clock::now();
 		return response;
 	}
 
+	/// returns the messages whose data is in the given cache level, with their position from the front
+	std::vector<queued_message_info> get_messages(CacheDataType cache_type) {
+		std::unique_lock<std::mutex> lock(mutex_);
+		std::vector<queued_message_info> messages;
+		std::size_t position = 0;
+		for(auto & it : message_queue_) {
+			CacheData & data = it.second->get_data();
+			if(data.get_type() == cache_type) {
+				std::size_t memory_bytes = cache_type == CacheDataType::CPU ? static_cast<CPUCacheData &>(data).compressedSizeInBytes() : data.sizeInBytes();
+				messages.push_back({it.first, position, data.sizeInBytes(), memory_bytes});
+			}
+			position++;
+		}
+		return messages;
+	}
+
+	/// the last time a consumer got a message from this queue
+	std::chrono::steady_clock::time_point get_last_pop_time() {
+		std::unique_lock<std::mutex> lock(mutex_);
+		return last_pop_time;
+	}
+
+	/// takes a message out of the queue to move it to another cache level, nullptr if it was already consumed.
+	/// It has to be returned with put_back, the consumers wait for it.
+	message_ptr take(std::uint64_t sequence) {
+		std::unique_lock<std::mutex> lock(mutex_);
+		auto it = message_queue_.find(sequence);
+		if(it == message_queue_.end()) {
+			return nullptr;
+		}
+		in_transit.insert(sequence);
+		return eraseWaitingQueue(it);
+	}
+
+	/// puts a message that was taken back in its place
+	void put_back(message_ptr item) {
+		std::unique_lock<std::mutex> lock(mutex_);
+		auto sequence = item->get_sequence();
+		insertWaitingQueue(std::move(item));
+		in_transit.erase(sequence);
+		// the messages after it can be consumed now, whatever their message id
+		notify_all_waiters();
+		auto callbacks = take_ready_callbacks();
+		lock.unlock();
+		call(callbacks);
+	}
+
 private:
-	void putWaitingQueue(message_ptr item) { message_queue_.emplace_back(std::move(item)); }
+	/// the get_or_wait calls waiting for a message id
+	struct message_waiter {
+		std::condition_variable condition;
+		std::size_t count = 0;
+	};
+
+	/// a notify_when_ready call that was not called back yet
+	struct ready_callback {
+		std::function<bool()> condition;
+		std::function<void()> callback;
+	};
+
+	/// removes the ready callbacks that can be called now, they are called after the lock is released
+	std::vector<std::function<void()>> take_ready_callbacks() {
+		std::vector<std::function<void()>> callbacks;
+		auto it = ready_callbacks.begin();
+		while(it != ready_callbacks.end()) {
+			bool is_ready = (this->ready() && (!it->condition || it->condition())) ||
+				(this->finished.load(std::memory_order_seq_cst) && (this->ready() || this->drained()));
+			if(is_ready) {
+				callbacks.push_back(std::move(it->callback));
+				it = ready_callbacks.erase(it);
+			} else {
+				it++;
+			}
+		}
+		return callbacks;
+	}
+
+	static void call(std::vector<std::function<void()>> & callbacks) {
+		for(auto & callback : callbacks) {
+			callback();
+		}
+	}
+
+	void putWaitingQueue(message_ptr item) {
+		item->set_sequence(next_sequence++);
+		insertWaitingQueue(std::move(item));
+	}
+
+	void insertWaitingQueue(message_ptr item) {
+		auto sequence = item->get_sequence();
+		message_ids[item->get_message_id()].insert(sequence);
+		message_queue_.emplace(sequence, std::move(item));
+	}
+
+	message_ptr eraseWaitingQueue(std::map<std::uint64_t, message_ptr>::iterator it) {
+		auto data = std::move(it->second);
+		auto ids = message_ids.find(data->get_message_id());
+		ids->second.erase(it->first);
+		if(ids->second.empty()) {
+			message_ids.erase(ids);
+		}
+		message_queue_.erase(it);
+		return std::move(data);
+	}
+
+	void notify_all_waiters() {
+		for(auto & waiter : message_waiters) {
+			waiter.second.condition.notify_all();
+		}
+		condition_variable_.notify_all();
+	}
+
+	/// the front message can be consumed, there is no message before it that is being moved to another cache level
+	bool ready() const {
+		return !message_queue_.empty() && (in_transit.empty() || message_queue_.begin()->first < *in_transit.begin());
+	}
+
+	bool drained() const { return message_queue_.empty() && in_transit.empty(); }
 
 private:
 	std::mutex mutex_;
-	std::deque<message_ptr> message_queue_;
+	/// the messages by their sequence, that is the order they were put
+	std::map<std::uint64_t, message_ptr> message_queue_;
+	/// the sequences of the messages with every message id, so get_or_wait does not look through the whole queue
+	std::unordered_map<std::string, std::set<std::uint64_t>> message_ids;
+	std::unordered_map<std::string, message_waiter> message_waiters;
+	std::vector<ready_callback> ready_callbacks;
 	std::atomic<bool> finished;
 	std::condition_variable condition_variable_;
+	std::uint64_t next_sequence;
+	std::set<std::uint64_t> in_transit;
+	std::chrono::steady_clock::time_point last_pop_time;
 };
 /**
 	@brief A class that represents a Cache Machine on a
@@ -362,9 +586,7 @@ public:
 
 	Context * get_context() const;
 
-	bool wait_for_next() {
-		return this->waitingCache->wait_for_next();
-	}
+	bool wait_for_next();
 
 	bool has_next_now() {
 		return this->waitingCache->has_next_now();
@@ -377,8 +599,30 @@ public:
 	
 	virtual void wait_if_cache_is_saturated();
 
+	/// calls the callback once pullFromCache, or pullCacheData, would not wait: there is a batch or the cache is finished.
+	/// Kernels use it to submit a task for the next batch instead of having a thread waiting for it.
+	virtual void notify_when_ready(std::function<void()> callback);
+
+	/// calls the callback once the cache is finished, for the kernels that need all their input, instead of wait_until_finished
+	void notify_when_finished(std::function<void()> callback);
+
+	bool is_saturated();
+
+	/// calls the callback once the cache is not saturated, right away if it is not, the producers use it instead of wait_if_cache_is_saturated
+	void notify_when_not_saturated(std::function<void()> callback);
 
 protected:
+	/// pops from the waiting queue, logging the time it was blocked as a waitCache event
+	std::unique_ptr<message> pop_or_wait();
+
+	void log_wait(CodeTimer & waitTimer);
+
+	/// a batch was pulled, the producers waiting for the cache to not be saturated are woken up
+	void release_flow_control(std::size_t num_bytes);
+
+	/// logs an event of this cache (placeGPU, placeCPU, placeDisk, waitCache) in the bsql_cache_events log
+	void log_cache_event(const std::string & event_type, std::size_t num_rows, std::size_t num_bytes, CodeTimer & eventTimer);
+
 	static std::size_t cache_count;
 
 	/// This property represents a waiting queue object which stores all CacheData Objects
@@ -401,6 +645,7 @@ protected:
 	std::size_t flow_control_bytes_count;
 	std::mutex flow_control_mutex;
 	std::condition_variable flow_control_condition_variable;
+	std::vector<std::function<void()>> not_saturated_callbacks;
 
 };
 
@@ -441,7 +686,8 @@ public:
 										"kernel_id"_a=message_id,
 										"rows"_a=host_table->num_rows());
 
-			auto cache_data = std::make_unique<CPUCacheData>(std::move(host_table));
+			// the tables received from other nodes are pulled right away, so they are not compressed
+			auto cache_data = std::make_unique<CPUCacheData>(std::move(host_table), ral::frame::host_cache_compression{});
 			auto item = std::make_unique<message>(std::move(cache_data), message_id);
 			this->waitingCache->put(std::move(item));
 			this->something_added = true;
@@ -466,6 +712,11 @@ public:
 		return this->waitingCache->has_next_now();
 	}
 
+	/// calls the callback once pullFromCache would not wait
+	void notify_when_ready(std::function<void()> callback) {
+		this->waitingCache->notify_when_ready(std::move(callback));
+	}
+
 	virtual std::unique_ptr<ral::frame::BlazingHostTable> pullFromCache(Context * ctx = nullptr) {
 		std::unique_ptr<message> message_data = waitingCache->pop_or_wait();
 		if (message_data == nullptr) {
@@ -511,6 +762,9 @@ public:
 	~ConcatenatingCacheMachine() = default;
 
 	std::unique_ptr<ral::frame::BlazingTable> pullFromCache() override;
+
+	/// it is ready once the batches in the cache meet the thresholds, or it is finished
+	void notify_when_ready(std::function<void()> callback) override;
 };
 
 }  // namespace cache
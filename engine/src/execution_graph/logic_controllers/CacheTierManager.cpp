@@ -0,0 +1,247 @@
+#include "CacheTierManager.h"
+
+#include <algorithm>
+
+namespace ral {
+namespace cache {
+
+namespace {
+
+/// a message that can be moved, with what tells how soon it is going to be consumed
+struct tier_candidate {
+	WaitingQueue * queue;
+	queued_message_info info;
+	std::chrono::steady_clock::time_point last_pop_time;
+};
+
+std::vector<tier_candidate> get_candidates(const std::set<WaitingQueue *> & queues, CacheDataType cache_type) {
+	std::vector<tier_candidate> candidates;
+	for(WaitingQueue * queue : queues) {
+		auto last_pop_time = queue->get_last_pop_time();
+		for(const auto & info : queue->get_messages(cache_type)) {
+			candidates.push_back({queue, info, last_pop_time});
+		}
+	}
+	return candidates;
+}
+
+}  // namespace
+
+cache_tier_manager::~cache_tier_manager() {
+	std::unique_lock<std::mutex> lock(mutex);
+	stop_thread(lock);
+}
+
+void cache_tier_manager::configure(std::size_t interval_ms, double high_watermark, double low_watermark,
+	std::string spill_path, SpillFormat spill_format) {
+	std::unique_lock<std::mutex> lock(mutex);
+	stop_thread(lock);
+
+	std::unique_lock<std::mutex> queues_lock(queues_mutex);
+	this->interval_ms = interval_ms;
+	this->high_watermark = high_watermark;
+	this->low_watermark = std::min(low_watermark, high_watermark);
+	this->spill_path = spill_path;
+	this->spill_format = spill_format;
+	queues_lock.unlock();
+
+	if(interval_ms > 0) {
+		running = true;
+		thread = BlazingThread(&cache_tier_manager::run, this);
+	}
+}
+
+void cache_tier_manager::register_queue(WaitingQueue * queue) {
+	std::lock_guard<std::mutex> lock(queues_mutex);
+	queues.insert(queue);
+}
+
+void cache_tier_manager::unregister_queue(WaitingQueue * queue) {
+	std::unique_lock<std::mutex> lock(queues_mutex);
+	queues.erase(queue);
+	// the queue is destroyed after it is unregistered, a move that is using it has to finish first
+	moving_condition.wait(lock, [this, queue] { return moving_queues.count(queue) == 0; });
+}
+
+cache_tier_stats cache_tier_manager::get_stats() const {
+	return {demoted_to_cpu_bytes.load(), demoted_to_disk_bytes.load(), promoted_to_gpu_bytes.load()};
+}
+
+void cache_tier_manager::run() {
+	std::unique_lock<std::mutex> lock(mutex);
+	while(!stopped) {
+		condition.wait_for(lock, std::chrono::milliseconds(interval_ms), [this] { return stopped; });
+		if(stopped) {
+			break;
+		}
+		lock.unlock();
+		rebalance();
+		lock.lock();
+	}
+}
+
+void cache_tier_manager::stop_thread(std::unique_lock<std::mutex> & lock) {
+	if(!running) {
+		return;
+	}
+	stopped = true;
+	lock.unlock();
+	condition.notify_all();
+	thread.join();
+	lock.lock();
+	running = false;
+	stopped = false;
+}
+
+void cache_tier_manager::rebalance() {
+	std::unique_lock<std::mutex> lock(queues_mutex);
+	if(queues.empty()) {
+		return;
+	}
+	double high_watermark = this->high_watermark;
+	double low_watermark = this->low_watermark;
+	std::string spill_path = this->spill_path;
+	SpillFormat spill_format = this->spill_format;
+	// the data is moved without the lock, the caches can be created and destroyed meanwhile
+	lock.unlock();
+
+	auto & device = blazing_device_memory_resource::getInstance();
+	std::size_t device_high = device.get_memory_limit() * high_watermark;
+	std::size_t device_low = device.get_memory_limit() * low_watermark;
+	std::size_t device_used = device.get_memory_used();
+	if(device_used > device_high) {
+		demote(CacheDataType::GPU, device_used - device_low, spill_path, spill_format);
+	} else if(device_used < device_low) {
+		promote(device_low - device_used);
+	}
+
+	auto & host = blazing_host_memory_resource::getInstance();
+	std::size_t host_high = host.get_memory_limit() * high_watermark;
+	std::size_t host_low = host.get_memory_limit() * low_watermark;
+	std::size_t host_used = host.get_memory_used();
+	if(host_used > host_high) {
+		demote(CacheDataType::CPU, host_used - host_low, spill_path, spill_format);
+	}
+}
+
+void cache_tier_manager::demote(CacheDataType cache_type, std::size_t bytes_to_free,
+	const std::string & spill_path, SpillFormat spill_format) {
+	std::unique_lock<std::mutex> lock(queues_mutex);
+	std::vector<tier_candidate> candidates = get_candidates(queues, cache_type);
+	lock.unlock();
+	// the coldest first: the caches that were consumed less recently, and the batches farthest from their front
+	std::sort(candidates.begin(), candidates.end(), [](const tier_candidate & a, const tier_candidate & b) {
+		if(a.last_pop_time != b.last_pop_time) {
+			return a.last_pop_time < b.last_pop_time;
+		}
+		return a.info.position > b.info.position;
+	});
+
+	CacheDataType next_type = cache_type == CacheDataType::GPU ? CacheDataType::CPU : CacheDataType::LOCAL_FILE;
+	std::size_t freed = 0;
+	for(const auto & candidate : candidates) {
+		if(freed >= bytes_to_free) {
+			break;
+		}
+		// the batches that are going to be consumed next stay where they are
+		if(candidate.info.position < consumer_ready_messages) {
+			continue;
+		}
+		if(move_message(candidate.queue, candidate.info.sequence, next_type, spill_path, spill_format)) {
+			freed += candidate.info.memory_bytes;
+			if(next_type == CacheDataType::CPU) {
+				demoted_to_cpu_bytes += candidate.info.memory_bytes;
+			} else {
+				demoted_to_disk_bytes += candidate.info.memory_bytes;
+			}
+		}
+	}
+}
+
+void cache_tier_manager::promote(std::size_t bytes_available) {
+	std::unique_lock<std::mutex> lock(queues_mutex);
+	std::vector<tier_candidate> candidates = get_candidates(queues, CacheDataType::CPU);
+	std::vector<tier_candidate> disk_candidates = get_candidates(queues, CacheDataType::LOCAL_FILE);
+	lock.unlock();
+	candidates.insert(candidates.end(), disk_candidates.begin(), disk_candidates.end());
+	// the hottest first: the batches at the front of the caches that were consumed more recently
+	std::sort(candidates.begin(), candidates.end(), [](const tier_candidate & a, const tier_candidate & b) {
+		if(a.info.position != b.info.position) {
+			return a.info.position < b.info.position;
+		}
+		return a.last_pop_time > b.last_pop_time;
+	});
+
+	for(const auto & candidate : candidates) {
+		if(candidate.info.position >= consumer_ready_messages) {
+			break;
+		}
+		if(candidate.info.size_in_bytes > bytes_available) {
+			continue;
+		}
+		if(move_message(candidate.queue, candidate.info.sequence, CacheDataType::GPU, "", SpillFormat::RAW)) {
+			bytes_available -= candidate.info.size_in_bytes;
+			promoted_to_gpu_bytes += candidate.info.size_in_bytes;
+		}
+	}
+}
+
+bool cache_tier_manager::move_message(WaitingQueue * queue, std::uint64_t sequence, CacheDataType cache_type,
+	const std::string & spill_path, SpillFormat spill_format) {
+	std::unique_lock<std::mutex> lock(queues_mutex);
+	if(queues.find(queue) == queues.end()) {
+		// it was unregistered after the candidates were taken
+		return false;
+	}
+	auto moving = moving_queues.insert(queue);
+	lock.unlock();
+
+	bool moved = false;
+	std::unique_ptr<message> item = queue->take(sequence);
+	// when it is null it was consumed meanwhile
+	if(item != nullptr) {
+		try {
+			std::unique_ptr<CacheData> data = move_data(item->get_data(), cache_type, spill_path, spill_format);
+			auto moved_item = std::make_unique<message>(std::move(data), item->get_message_id());
+			moved_item->set_sequence(item->get_sequence());
+			item = std::move(moved_item);
+			moved = true;
+		} catch(const std::exception & e) {
+			auto logger = spdlog::get("batch_logger");
+			if(logger) {
+				logger->error("|||{info}|||||", "info"_a = std::string("Could not move cache data to another cache level: ") + e.what());
+			}
+		}
+		queue->put_back(std::move(item));
+	}
+
+	lock.lock();
+	moving_queues.erase(moving);
+	lock.unlock();
+	moving_condition.notify_all();
+	return moved;
+}
+
+std::unique_ptr<CacheData> cache_tier_manager::move_data(CacheData & data, CacheDataType cache_type,
+	const std::string & spill_path, SpillFormat spill_format) {
+	if(cache_type == CacheDataType::GPU) {
+		return std::make_unique<GPUCacheData>(data.decache());
+	}
+
+	if(cache_type == CacheDataType::CPU) {
+		auto host_table = ral::communication::messages::serialize_gpu_message_to_host_table(static_cast<GPUCacheData &>(data).getTableView());
+		return std::make_unique<CPUCacheData>(std::move(host_table));
+	}
+
+	// the data comes from host memory, ORC would have to copy it to the gpu to encode it, so it is written raw
+	SpillFormat format = spill_format == SpillFormat::ORC ? SpillFormat::RAW : spill_format;
+	auto & cpu_data = static_cast<CPUCacheData &>(data);
+	auto local_file = std::make_unique<CacheDataLocalFile>(
+		cpu_data.names(), cpu_data.get_schema(), cpu_data.num_rows(), cpu_data.sizeInBytes(), spill_path, format);
+	// the host table is released once nothing else can throw, so the data is left as it was otherwise
+	local_file->spill_host_table(cpu_data.releaseHostTable());
+	return std::move(local_file);
+}
+
+}  // namespace cache
+}  // namespace ral
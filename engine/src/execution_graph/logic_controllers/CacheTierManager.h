@@ -0,0 +1,105 @@
+#pragma once
+
+#include <atomic>
+#include <condition_variable>
+#include <mutex>
+#include <set>
+#include <string>
+
+#include "blazingdb/concurrency/BlazingThread.h"
+#include "execution_graph/logic_controllers/CacheMachine.h"
+
+namespace ral {
+namespace cache {
+
+/// \brief How many bytes the cache_tier_manager has moved between the cache levels.
+/// The demoted bytes are the ones freed in the level the data left, the compressed ones for the host memory.
+struct cache_tier_stats {
+	std::size_t demoted_to_cpu_bytes;
+	std::size_t demoted_to_disk_bytes;
+	std::size_t promoted_to_gpu_bytes;
+};
+
+/**
+	@brief Moves the data of the caches between the cache levels (GPU, CPU, Disk) after it was added.
+	The CacheMachines place every batch in the first level with room when it is added, so a batch that
+	is not going to be consumed for a long time can keep the GPU memory that newer batches need.
+	A background thread checks the memory used every interval: when the GPU (or host) memory goes over
+	the high watermark it moves the coldest batches to the next level until it is under the low watermark,
+	and when the GPU memory is under the low watermark it brings back the batches that are next to be consumed.
+	The coldest batches are the ones of the caches that were consumed less recently, farthest from the front.
+*/
+class cache_tier_manager {
+public:
+	static cache_tier_manager & getInstance() {
+		// Myers' singleton. Thread safe and unique. Note: C++11 required.
+		static cache_tier_manager instance;
+		return instance;
+	}
+
+	~cache_tier_manager();
+
+	/// starts the background thread, interval_ms 0 stops it. The watermarks are fractions of the memory limits.
+	/// The data moved from host memory to disk is written RAW when the spill_format is ORC, so it does not go through the GPU.
+	void configure(std::size_t interval_ms, double high_watermark, double low_watermark,
+		std::string spill_path, SpillFormat spill_format);
+
+	void register_queue(WaitingQueue * queue);
+
+	void unregister_queue(WaitingQueue * queue);
+
+	/// checks the memory used and moves the data that needs to be moved, the background thread calls it every interval
+	void rebalance();
+
+	cache_tier_stats get_stats() const;
+
+private:
+	cache_tier_manager() = default;
+
+	void run();
+
+	void stop_thread(std::unique_lock<std::mutex> & lock);
+
+	/// moves the coldest data of a cache level to the next one until bytes_to_free are moved
+	void demote(CacheDataType cache_type, std::size_t bytes_to_free, const std::string & spill_path, SpillFormat spill_format);
+
+	/// moves the data that is next to be consumed to the GPU, while it fits in bytes_available
+	void promote(std::size_t bytes_available);
+
+	/// returns a copy of the data in the given cache level, the data is left as it was when it throws
+	std::unique_ptr<CacheData> move_data(CacheData & data, CacheDataType cache_type,
+		const std::string & spill_path, SpillFormat spill_format);
+
+	/// takes the message out of its queue, moves its data and puts it back, returns if it was moved.
+	/// The queue is skipped when it was unregistered, and it can not be unregistered until the move finishes
+	bool move_message(WaitingQueue * queue, std::uint64_t sequence, CacheDataType cache_type,
+		const std::string & spill_path, SpillFormat spill_format);
+
+	/// the batches at the front of the queues that are not demoted and that are promoted
+	static const std::size_t consumer_ready_messages = 1;
+
+	/// guards the background thread
+	std::mutex mutex;
+	std::condition_variable condition;
+	/// guards the queues, the queues that are being moved and the configuration. It is not held while the data is moved
+	std::mutex queues_mutex;
+	std::set<WaitingQueue *> queues;
+	std::multiset<WaitingQueue *> moving_queues;
+	std::condition_variable moving_condition;
+	BlazingThread thread;
+	bool running = false;
+	bool stopped = false;
+
+	std::size_t interval_ms = 0;
+	double high_watermark = 0.95;
+	double low_watermark = 0.8;
+	std::string spill_path = "/tmp";
+	SpillFormat spill_format = SpillFormat::ORC;
+
+	std::atomic<std::size_t> demoted_to_cpu_bytes{0};
+	std::atomic<std::size_t> demoted_to_disk_bytes{0};
+	std::atomic<std::size_t> promoted_to_gpu_bytes{0};
+};
+
+}  // namespace cache
+}  // namespace ral
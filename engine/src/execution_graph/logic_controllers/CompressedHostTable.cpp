@@ -0,0 +1,251 @@
+#include "CompressedHostTable.h"
+
+#include <algorithm>
+#include <cstring>
+#include <mutex>
+#include <stdexcept>
+#include <unordered_map>
+
+#include <arrow/util/compression.h>
+
+#include "bmr/BlazingMemoryResource.h"
+
+namespace ral {
+namespace frame {
+
+namespace {
+
+std::mutex default_compression_mutex;
+host_cache_compression default_compression;
+
+/// a string column is dictionary encoded when it has at most one distinct value every this many rows
+const std::size_t max_dictionary_ratio = 4;
+
+std::unique_ptr<arrow::util::Codec> make_codec(HostCompression codec) {
+	if(codec == HostCompression::NONE) {
+		return nullptr;
+	}
+	auto result = arrow::util::Codec::Create(codec == HostCompression::LZ4 ? arrow::Compression::LZ4_FRAME : arrow::Compression::ZSTD);
+	if(!result.ok()) {
+		return nullptr;
+	}
+	return std::move(result).ValueOrDie();
+}
+
+int32_t read_index(const std::string & indices, int index_width, int32_t row) {
+	if(index_width == 1) {
+		return static_cast<uint8_t>(indices[row]);
+	}
+	if(index_width == 2) {
+		uint16_t index;
+		std::memcpy(&index, indices.data() + row * 2, 2);
+		return index;
+	}
+	int32_t index;
+	std::memcpy(&index, indices.data() + row * 4, 4);
+	return index;
+}
+
+/// encodes the chars and offsets of a string column as its distinct values and the index of every row,
+/// returns false when the column has too many distinct values for the encoding to pay off
+bool dictionary_encode(const std::string & chars, const std::string & offsets_buffer, int32_t num_rows,
+	std::string & dictionary_chars, std::string & dictionary_offsets, std::string & indices, int & index_width) {
+	if(num_rows == 0 || offsets_buffer.size() != (num_rows + 1) * sizeof(int32_t)) {
+		return false;
+	}
+	const int32_t * offsets = reinterpret_cast<const int32_t *>(offsets_buffer.data());
+	// the chars that no row references would be lost
+	if(offsets[0] != 0 || static_cast<std::size_t>(offsets[num_rows]) != chars.size()) {
+		return false;
+	}
+
+	std::unordered_map<std::string, int32_t> distinct_values;
+	std::vector<int32_t> row_indices(num_rows);
+	std::vector<int32_t> value_offsets(1, 0);
+	for(int32_t row = 0; row < num_rows; row++) {
+		std::string value(chars.data() + offsets[row], offsets[row + 1] - offsets[row]);
+		auto it = distinct_values.find(value);
+		if(it == distinct_values.end()) {
+			if((distinct_values.size() + 1) * max_dictionary_ratio > static_cast<std::size_t>(num_rows)) {
+				return false;
+			}
+			it = distinct_values.emplace(value, distinct_values.size()).first;
+			dictionary_chars.append(value);
+			value_offsets.push_back(dictionary_chars.size());
+		}
+		row_indices[row] = it->second;
+	}
+
+	index_width = distinct_values.size() <= 256 ? 1 : (distinct_values.size() <= 65536 ? 2 : 4);
+	indices.resize(static_cast<std::size_t>(num_rows) * index_width);
+	for(int32_t row = 0; row < num_rows; row++) {
+		if(index_width == 1) {
+			indices[row] = static_cast<char>(row_indices[row]);
+		} else if(index_width == 2) {
+			uint16_t index = row_indices[row];
+			std::memcpy(&indices[row * 2], &index, 2);
+		} else {
+			std::memcpy(&indices[row * 4], &row_indices[row], 4);
+		}
+	}
+	dictionary_offsets.assign(reinterpret_cast<const char *>(value_offsets.data()), value_offsets.size() * sizeof(int32_t));
+	return dictionary_chars.size() + dictionary_offsets.size() + indices.size() < chars.size() + offsets_buffer.size();
+}
+
+void dictionary_decode(const std::string & dictionary_chars, const std::string & dictionary_offsets, const std::string & indices,
+	int index_width, int32_t num_rows, std::string & chars, std::string & offsets_buffer) {
+	const int32_t * value_offsets = reinterpret_cast<const int32_t *>(dictionary_offsets.data());
+	offsets_buffer.resize((num_rows + 1) * sizeof(int32_t));
+	int32_t * offsets = reinterpret_cast<int32_t *>(&offsets_buffer[0]);
+	offsets[0] = 0;
+	for(int32_t row = 0; row < num_rows; row++) {
+		int32_t index = read_index(indices, index_width, row);
+		offsets[row + 1] = offsets[row] + value_offsets[index + 1] - value_offsets[index];
+	}
+	chars.resize(offsets[num_rows]);
+	for(int32_t row = 0; row < num_rows; row++) {
+		int32_t index = read_index(indices, index_width, row);
+		std::memcpy(&chars[offsets[row]], dictionary_chars.data() + value_offsets[index], offsets[row + 1] - offsets[row]);
+	}
+}
+
+}  // namespace
+
+host_cache_compression get_host_cache_compression(const std::map<std::string, std::string> & config_options) {
+	host_cache_compression compression;
+	auto it = config_options.find("BLAZING_HOST_CACHE_COMPRESSION");
+	if(it != config_options.end()) {
+		std::string codec = it->second;
+		std::transform(codec.begin(), codec.end(), codec.begin(), ::toupper);
+		if(codec == "LZ4") {
+			compression.codec = HostCompression::LZ4;
+		} else if(codec == "ZSTD") {
+			compression.codec = HostCompression::ZSTD;
+		}
+	}
+	it = config_options.find("BLAZING_HOST_CACHE_DICTIONARY_ENCODING");
+	if(it != config_options.end()) {
+		std::string value = it->second;
+		std::transform(value.begin(), value.end(), value.begin(), ::tolower);
+		compression.dictionary_encode_strings = value == "true" || value == "1";
+	}
+	return compression;
+}
+
+void set_default_host_cache_compression(const host_cache_compression & compression) {
+	std::lock_guard<std::mutex> lock(default_compression_mutex);
+	default_compression = compression;
+}
+
+host_cache_compression get_default_host_cache_compression() {
+	std::lock_guard<std::mutex> lock(default_compression_mutex);
+	return default_compression;
+}
+
+CompressedHostTable::CompressedHostTable(const BlazingHostTable & host_table, const host_cache_compression & compression)
+	: codec(compression.codec), columns_offsets(host_table.get_columns_offsets()), compressed_size(0), logical_size(0)
+{
+	std::unique_ptr<arrow::util::Codec> codec_instance = make_codec(this->codec);
+	if(codec_instance == nullptr) {
+		this->codec = HostCompression::NONE;
+	}
+
+	const auto & raw_buffers = host_table.get_raw_buffers();
+	std::vector<bool> dictionary_encoded(raw_buffers.size(), false);
+	if(compression.dictionary_encode_strings) {
+		for(const auto & column : columns_offsets) {
+			if(column.strings_data == -1 || column.strings_offsets == -1) {
+				continue;
+			}
+			std::string dictionary_chars, dictionary_offsets, indices;
+			int index_width;
+			if(!dictionary_encode(raw_buffers[column.strings_data], raw_buffers[column.strings_offsets], column.metadata.size,
+					dictionary_chars, dictionary_offsets, indices, index_width)) {
+				continue;
+			}
+			dictionary_columns.push_back({column.strings_data, column.strings_offsets, column.metadata.size, index_width,
+				compress_buffer(codec_instance.get(), std::move(dictionary_chars)),
+				compress_buffer(codec_instance.get(), std::move(dictionary_offsets)),
+				compress_buffer(codec_instance.get(), std::move(indices))});
+			dictionary_encoded[column.strings_data] = true;
+			dictionary_encoded[column.strings_offsets] = true;
+
+			const auto & encoded = dictionary_columns.back();
+			compressed_size += encoded.dictionary_chars.data.size() + encoded.dictionary_offsets.data.size() + encoded.indices.data.size();
+		}
+	}
+
+	for(std::size_t i = 0; i < raw_buffers.size(); i++) {
+		if(dictionary_encoded[i]) {
+			// rebuilt from its dictionary column
+			buffers.push_back({std::string(), raw_buffers[i].size(), false});
+		} else {
+			buffers.push_back(compress_buffer(codec_instance.get(), std::string(raw_buffers[i])));
+			compressed_size += buffers.back().data.size();
+		}
+	}
+
+	for(const auto & column : columns_offsets) {
+		logical_size += column.size_in_bytes;
+	}
+	blazing_host_memory_resource::getInstance().allocate(compressed_size, logical_size);
+}
+
+CompressedHostTable::~CompressedHostTable() {
+	blazing_host_memory_resource::getInstance().deallocate(compressed_size, logical_size);
+}
+
+std::unique_ptr<BlazingHostTable> CompressedHostTable::decompress() const {
+	std::unique_ptr<arrow::util::Codec> codec_instance = make_codec(this->codec);
+
+	std::vector<std::basic_string<char>> raw_buffers;
+	for(const auto & buffer : buffers) {
+		raw_buffers.push_back(decompress_buffer(codec_instance.get(), buffer));
+	}
+	for(const auto & column : dictionary_columns) {
+		dictionary_decode(decompress_buffer(codec_instance.get(), column.dictionary_chars),
+			decompress_buffer(codec_instance.get(), column.dictionary_offsets),
+			decompress_buffer(codec_instance.get(), column.indices),
+			column.index_width, column.num_rows,
+			raw_buffers[column.chars_buffer], raw_buffers[column.offsets_buffer]);
+	}
+	return std::make_unique<BlazingHostTable>(columns_offsets, std::move(raw_buffers));
+}
+
+CompressedHostTable::compressed_buffer CompressedHostTable::compress_buffer(arrow::util::Codec * codec, std::string && buffer) {
+	compressed_buffer result{std::string(), buffer.size(), false};
+	if(codec != nullptr && !buffer.empty()) {
+		const uint8_t * input = reinterpret_cast<const uint8_t *>(buffer.data());
+		std::string compressed(codec->MaxCompressedLen(buffer.size(), input), '\0');
+		auto compressed_length = codec->Compress(buffer.size(), input, compressed.size(), reinterpret_cast<uint8_t *>(&compressed[0]));
+		// the buffers that do not get smaller are kept as they are
+		if(compressed_length.ok() && static_cast<std::size_t>(compressed_length.ValueOrDie()) < buffer.size()) {
+			compressed.resize(compressed_length.ValueOrDie());
+			compressed.shrink_to_fit();
+			result.data = std::move(compressed);
+			result.compressed = true;
+			return result;
+		}
+	}
+	result.data = std::move(buffer);
+	return result;
+}
+
+std::string CompressedHostTable::decompress_buffer(arrow::util::Codec * codec, const compressed_buffer & buffer) {
+	if(!buffer.compressed) {
+		return buffer.data;
+	}
+	if(codec == nullptr) {
+		throw std::runtime_error("Could not decompress a host cache buffer, its codec is not available");
+	}
+	std::string data(buffer.size, '\0');
+	auto decompressed = codec->Decompress(buffer.data.size(), reinterpret_cast<const uint8_t *>(buffer.data.data()),
+		data.size(), reinterpret_cast<uint8_t *>(&data[0]));
+	if(!decompressed.ok()) {
+		throw std::runtime_error("Could not decompress a host cache buffer: " + decompressed.status().ToString());
+	}
+	return data;
+}
+
+}  // namespace frame
+}  // namespace ral
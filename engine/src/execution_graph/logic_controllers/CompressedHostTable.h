@@ -0,0 +1,92 @@
+#pragma once
+
+#include <map>
+#include <memory>
+#include <string>
+#include <vector>
+
+#include <blazingdb/transport/ColumnTransport.h>
+
+#include "execution_graph/logic_controllers/BlazingHostTable.h"
+
+namespace arrow {
+namespace util {
+class Codec;
+}  // namespace util
+}  // namespace arrow
+
+namespace ral {
+namespace frame {
+
+/// \brief The codec of the buffers of the batches in the host cache level
+enum class HostCompression { NONE, LZ4, ZSTD };
+
+/// \brief How the batches in the host cache level (CPUCacheData) are kept
+struct host_cache_compression {
+	HostCompression codec = HostCompression::NONE;
+	/// the string columns with few distinct values are kept as a dictionary and the index of every row
+	bool dictionary_encode_strings = false;
+
+	bool enabled() const { return codec != HostCompression::NONE || dictionary_encode_strings; }
+};
+
+/// reads the BLAZING_HOST_CACHE_COMPRESSION (NONE, LZ4 or ZSTD) and BLAZING_HOST_CACHE_DICTIONARY_ENCODING config options
+host_cache_compression get_host_cache_compression(const std::map<std::string, std::string> & config_options);
+
+void set_default_host_cache_compression(const host_cache_compression & compression);
+
+host_cache_compression get_default_host_cache_compression();
+
+/**
+	@brief A compressed copy of a BlazingHostTable. Every buffer is compressed on its own, after the
+	low cardinality string columns are dictionary encoded. The memory it uses is accounted in
+	blazing_host_memory_resource as compressed bytes that hold the logical bytes of the table.
+*/
+class CompressedHostTable {
+public:
+	CompressedHostTable(const BlazingHostTable & host_table, const host_cache_compression & compression);
+
+	~CompressedHostTable();
+
+	/// returns the uncompressed table
+	std::unique_ptr<BlazingHostTable> decompress() const;
+
+	/// the bytes it uses
+	std::size_t sizeInBytes() const { return compressed_size; }
+
+	/// the bytes of the uncompressed table
+	std::size_t logicalSizeInBytes() const { return logical_size; }
+
+private:
+	/// a buffer as it is kept, compressed or as it was when it does not get smaller
+	struct compressed_buffer {
+		std::string data;
+		std::size_t size;
+		bool compressed;
+	};
+
+	/// a string column kept as its distinct values (chars and offsets) and the index of every row
+	struct dictionary_column {
+		int chars_buffer;
+		int offsets_buffer;
+		int32_t num_rows;
+		int index_width;
+		compressed_buffer dictionary_chars;
+		compressed_buffer dictionary_offsets;
+		compressed_buffer indices;
+	};
+
+	static compressed_buffer compress_buffer(arrow::util::Codec * codec, std::string && buffer);
+
+	static std::string decompress_buffer(arrow::util::Codec * codec, const compressed_buffer & buffer);
+
+	HostCompression codec;
+	std::vector<ColumnTransport> columns_offsets;
+	std::vector<compressed_buffer> buffers;
+	std::vector<dictionary_column> dictionary_columns;
+	std::size_t compressed_size;
+	std::size_t logical_size;
+};
+
+}  // namespace frame
+}  // namespace ral
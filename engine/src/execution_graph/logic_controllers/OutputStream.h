@@ -0,0 +1,135 @@
+#pragma once
+
+#include <condition_variable>
+#include <deque>
+#include <functional>
+#include <memory>
+#include <mutex>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#include "LogicPrimitives.h"
+
+namespace ral {
+namespace batch {
+
+/**
+	@brief A bounded queue between the OutputKernel and a consumer that reads the result of a query
+	while the query is still running. The producer waits for notify_when_not_full before it takes the next batch,
+	which applies backpressure to the execution graph, so that only a few batches are held at the same time.
+*/
+class OutputStream {
+public:
+	OutputStream(std::size_t max_batches) : max_batches{max_batches > 0 ? max_batches : 1}, finished{false}, cancelled{false} {}
+	~OutputStream() = default;
+
+	OutputStream(OutputStream &&) = delete;
+	OutputStream(const OutputStream &) = delete;
+	OutputStream & operator=(OutputStream &&) = delete;
+	OutputStream & operator=(const OutputStream &) = delete;
+
+	/**
+	 * Blocks until there is room for the batch. Returns false (and drops the batch) if the consumer cancelled the stream.
+	 */
+	bool push(std::unique_ptr<ral::frame::BlazingTable> batch) {
+		std::unique_lock<std::mutex> lock(mutex_);
+		not_full_.wait(lock, [this] { return this->cancelled || this->batches.size() < this->max_batches; });
+		if(this->cancelled) {
+			return false;
+		}
+		this->batches.push_back(std::move(batch));
+		lock.unlock();
+		not_empty_.notify_all();
+		return true;
+	}
+
+	/**
+	 * Blocks until a batch is available. Returns nullptr once the query finished and all its batches were consumed.
+	 * Throws if the query failed.
+	 */
+	std::unique_ptr<ral::frame::BlazingTable> pop() {
+		std::unique_lock<std::mutex> lock(mutex_);
+		not_empty_.wait(lock, [this] { return this->finished || !this->batches.empty(); });
+		if(this->batches.empty()) {
+			if(!this->error.empty()) {
+				throw std::runtime_error(this->error);
+			}
+			return nullptr;
+		}
+		auto batch = std::move(this->batches.front());
+		this->batches.pop_front();
+		auto callbacks = std::move(this->not_full_callbacks);
+		this->not_full_callbacks.clear();
+		lock.unlock();
+		not_full_.notify_all();
+		for(auto & callback : callbacks) {
+			callback();
+		}
+		return batch;
+	}
+
+	void finish() {
+		std::unique_lock<std::mutex> lock(mutex_);
+		this->finished = true;
+		lock.unlock();
+		not_empty_.notify_all();
+	}
+
+	void fail(const std::string & error) {
+		std::unique_lock<std::mutex> lock(mutex_);
+		this->error = error;
+		this->finished = true;
+		lock.unlock();
+		not_empty_.notify_all();
+	}
+
+	/**
+	 * Called by the consumer when it does not want more batches. The batches already queued are released
+	 * and the producer stops blocking.
+	 */
+	void cancel() {
+		std::unique_lock<std::mutex> lock(mutex_);
+		this->cancelled = true;
+		this->batches.clear();
+		auto callbacks = std::move(this->not_full_callbacks);
+		this->not_full_callbacks.clear();
+		lock.unlock();
+		not_full_.notify_all();
+		for(auto & callback : callbacks) {
+			callback();
+		}
+	}
+
+	/**
+	 * Calls the callback once push would not block, right away if there is room or the stream was cancelled.
+	 */
+	void notify_when_not_full(std::function<void()> callback) {
+		std::unique_lock<std::mutex> lock(mutex_);
+		if(!this->cancelled && this->batches.size() >= this->max_batches) {
+			this->not_full_callbacks.push_back(std::move(callback));
+			return;
+		}
+		lock.unlock();
+		callback();
+	}
+
+	bool is_cancelled() {
+		std::lock_guard<std::mutex> lock(mutex_);
+		return this->cancelled;
+	}
+
+private:
+	std::mutex mutex_;
+	std::condition_variable not_empty_;
+	std::condition_variable not_full_;
+	std::deque<std::unique_ptr<ral::frame::BlazingTable>> batches;
+	std::vector<std::function<void()>> not_full_callbacks;
+	const std::size_t max_batches;
+	bool finished;
+	bool cancelled;
+	std::string error;
+};
+
+} // namespace batch
+} // namespace ral
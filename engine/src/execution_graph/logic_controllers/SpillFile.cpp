@@ -0,0 +1,325 @@
+#include "SpillFile.h"
+
+#include <algorithm>
+#include <cerrno>
+#include <cstring>
+#include <stdexcept>
+
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+#include <arrow/util/compression.h>
+#include <spdlog/spdlog.h>
+
+#include "communication/messages/GPUComponentMessage.h"
+
+namespace ral {
+namespace cache {
+
+using namespace fmt::literals;
+using ColumnTransport = blazingdb::transport::ColumnTransport;
+
+namespace {
+
+const char raw_spill_magic[8] = {'B', 'S', 'Q', 'L', 'S', 'P', 'L', '1'};
+
+/// a raw spill file is this header, the ColumnTransport of every column, the size of every buffer
+/// (uncompressed and stored) and then the stored buffers, one after the other.
+/// A buffer whose stored size is its size was written without compression.
+struct raw_spill_header {
+	char magic[8];
+	uint32_t num_columns;
+	uint32_t num_buffers;
+};
+
+std::unique_ptr<arrow::util::Codec> make_lz4_codec() {
+	auto codec = arrow::util::Codec::Create(arrow::Compression::LZ4_FRAME);
+	if(!codec.ok()) {
+		return nullptr;
+	}
+	return std::move(codec).ValueOrDie();
+}
+
+void write_all(int fd, const char * data, std::size_t size, const std::string & path) {
+	while(size > 0) {
+		ssize_t written = ::write(fd, data, size);
+		if(written < 0) {
+			if(errno == EINTR) {
+				continue;
+			}
+			throw std::runtime_error("Could not write spill file " + path + ": " + std::strerror(errno));
+		}
+		data += written;
+		size -= written;
+	}
+}
+
+template <typename T>
+void append(std::string & metadata, const T * values, std::size_t count) {
+	metadata.append(reinterpret_cast<const char *>(values), sizeof(T) * count);
+}
+
+/// unmaps and closes a spill file when the read ends, also when it throws
+struct mapped_file {
+	int fd = -1;
+	void * data = MAP_FAILED;
+	std::size_t size = 0;
+
+	~mapped_file() {
+		if(data != MAP_FAILED) {
+			munmap(data, size);
+		}
+		if(fd >= 0) {
+			close(fd);
+		}
+	}
+};
+
+void copy_to_gpu(void * dst, const void * src, std::size_t size, const std::string & path) {
+	cudaError_t status = cudaMemcpy(dst, src, size, cudaMemcpyHostToDevice);
+	if(status != cudaSuccess) {
+		throw std::runtime_error("Could not copy spill file " + path + " to the gpu: " + cudaGetErrorString(status));
+	}
+}
+
+/// the writes report their errors in the log, there is nobody waiting for them
+void run_write(const std::function<void()> & write) {
+	try {
+		write();
+	} catch(const std::exception & e) {
+		auto logger = spdlog::get("batch_logger");
+		if(logger) {
+			logger->error("|||{info}|||||", "info"_a = std::string("Spill write failed: ") + e.what());
+		}
+	}
+}
+
+}  // namespace
+
+SpillFormat get_spill_format(const std::map<std::string, std::string> & config_options) {
+	auto it = config_options.find("BLAZING_CACHE_SPILL_FORMAT");
+	if(it == config_options.end()) {
+		return SpillFormat::ORC;
+	}
+	std::string format = it->second;
+	std::transform(format.begin(), format.end(), format.begin(), ::toupper);
+	if(format == "RAW") {
+		return SpillFormat::RAW;
+	}
+	if(format == "RAW_LZ4") {
+		return SpillFormat::RAW_LZ4;
+	}
+	return SpillFormat::ORC;
+}
+
+void write_raw_spill_file(const std::string & path, const ral::frame::BlazingHostTable & host_table, bool compress) {
+	const auto & columns = host_table.get_columns_offsets();
+	const auto & buffers = host_table.get_raw_buffers();
+
+	std::unique_ptr<arrow::util::Codec> codec;
+	if(compress) {
+		codec = make_lz4_codec();
+	}
+
+	std::vector<uint64_t> buffer_sizes(buffers.size());
+	std::vector<uint64_t> stored_sizes(buffers.size());
+	std::vector<std::string> compressed_buffers(buffers.size());
+	for(std::size_t i = 0; i < buffers.size(); i++) {
+		buffer_sizes[i] = buffers[i].size();
+		stored_sizes[i] = buffers[i].size();
+		if(codec == nullptr || buffers[i].empty()) {
+			continue;
+		}
+		const uint8_t * input = reinterpret_cast<const uint8_t *>(buffers[i].data());
+		std::string & compressed = compressed_buffers[i];
+		compressed.resize(codec->MaxCompressedLen(buffers[i].size(), input));
+		auto compressed_size = codec->Compress(buffers[i].size(), input, compressed.size(), reinterpret_cast<uint8_t *>(&compressed[0]));
+		// the buffers that do not get smaller are stored as they are
+		if(compressed_size.ok() && static_cast<uint64_t>(compressed_size.ValueOrDie()) < buffer_sizes[i]) {
+			compressed.resize(compressed_size.ValueOrDie());
+			stored_sizes[i] = compressed.size();
+		} else {
+			compressed.clear();
+		}
+	}
+
+	raw_spill_header header;
+	std::memcpy(header.magic, raw_spill_magic, sizeof(raw_spill_magic));
+	header.num_columns = columns.size();
+	header.num_buffers = buffers.size();
+
+	std::string metadata;
+	append(metadata, &header, 1);
+	append(metadata, columns.data(), columns.size());
+	append(metadata, buffer_sizes.data(), buffer_sizes.size());
+	append(metadata, stored_sizes.data(), stored_sizes.size());
+
+	int fd = open(path.c_str(), O_WRONLY | O_CREAT | O_TRUNC, 0644);
+	if(fd < 0) {
+		throw std::runtime_error("Could not create spill file " + path + ": " + std::strerror(errno));
+	}
+	try {
+		write_all(fd, metadata.data(), metadata.size(), path);
+		for(std::size_t i = 0; i < buffers.size(); i++) {
+			const std::string & stored = stored_sizes[i] == buffer_sizes[i] ? buffers[i] : compressed_buffers[i];
+			write_all(fd, stored.data(), stored.size(), path);
+		}
+	} catch(const std::exception & e) {
+		close(fd);
+		unlink(path.c_str());
+		throw;
+	}
+	close(fd);
+}
+
+std::unique_ptr<ral::frame::BlazingTable> read_raw_spill_file(const std::string & path) {
+	mapped_file file;
+	file.fd = open(path.c_str(), O_RDONLY);
+	if(file.fd < 0) {
+		throw std::runtime_error("Could not open spill file " + path + ": " + std::strerror(errno));
+	}
+	struct stat st;
+	if(fstat(file.fd, &st) != 0 || static_cast<std::size_t>(st.st_size) < sizeof(raw_spill_header)) {
+		throw std::runtime_error("Invalid spill file " + path);
+	}
+	file.size = st.st_size;
+	file.data = mmap(nullptr, file.size, PROT_READ, MAP_PRIVATE, file.fd, 0);
+	if(file.data == MAP_FAILED) {
+		throw std::runtime_error("Could not map spill file " + path + ": " + std::strerror(errno));
+	}
+	madvise(file.data, file.size, MADV_SEQUENTIAL);
+
+	const char * data = static_cast<const char *>(file.data);
+	raw_spill_header header;
+	std::memcpy(&header, data, sizeof(header));
+	std::size_t metadata_size = sizeof(header) + header.num_columns * sizeof(ColumnTransport) + 2 * header.num_buffers * sizeof(uint64_t);
+	if(std::memcmp(header.magic, raw_spill_magic, sizeof(raw_spill_magic)) != 0 || metadata_size > file.size) {
+		throw std::runtime_error("Invalid spill file " + path);
+	}
+
+	std::vector<ColumnTransport> columns(header.num_columns);
+	std::vector<uint64_t> buffer_sizes(header.num_buffers);
+	std::vector<uint64_t> stored_sizes(header.num_buffers);
+	std::size_t position = sizeof(header);
+	std::memcpy(columns.data(), data + position, columns.size() * sizeof(ColumnTransport));
+	position += columns.size() * sizeof(ColumnTransport);
+	std::memcpy(buffer_sizes.data(), data + position, buffer_sizes.size() * sizeof(uint64_t));
+	position += buffer_sizes.size() * sizeof(uint64_t);
+	std::memcpy(stored_sizes.data(), data + position, stored_sizes.size() * sizeof(uint64_t));
+	position += stored_sizes.size() * sizeof(uint64_t);
+
+	std::unique_ptr<arrow::util::Codec> codec;
+	std::vector<rmm::device_buffer> gpu_raw_buffers;
+	for(uint32_t i = 0; i < header.num_buffers; i++) {
+		if(position + stored_sizes[i] > file.size) {
+			throw std::runtime_error("Truncated spill file " + path);
+		}
+		rmm::device_buffer dev_buffer(buffer_sizes[i]);
+		if(stored_sizes[i] == buffer_sizes[i]) {
+			copy_to_gpu(dev_buffer.data(), data + position, buffer_sizes[i], path);
+		} else {
+			if(codec == nullptr) {
+				codec = make_lz4_codec();
+				if(codec == nullptr) {
+					throw std::runtime_error("Could not decompress spill file " + path + ": LZ4 is not available");
+				}
+			}
+			std::string buffer(buffer_sizes[i], '\0');
+			auto decompressed = codec->Decompress(stored_sizes[i], reinterpret_cast<const uint8_t *>(data + position),
+				buffer.size(), reinterpret_cast<uint8_t *>(&buffer[0]));
+			if(!decompressed.ok()) {
+				throw std::runtime_error("Could not decompress spill file " + path + ": " + decompressed.status().ToString());
+			}
+			copy_to_gpu(dev_buffer.data(), buffer.data(), buffer.size(), path);
+		}
+		gpu_raw_buffers.emplace_back(std::move(dev_buffer));
+		position += stored_sizes[i];
+	}
+	return ral::communication::messages::deserialize_from_gpu_raw_buffers(columns, gpu_raw_buffers);
+}
+
+spill_io_pool::~spill_io_pool() {
+	std::unique_lock<std::mutex> lock(mutex);
+	stop_threads(lock);
+}
+
+void spill_io_pool::set_num_threads(std::size_t num_threads) {
+	std::unique_lock<std::mutex> lock(mutex);
+	if(num_threads == threads.size()) {
+		return;
+	}
+	stop_threads(lock);
+	for(std::size_t i = 0; i < num_threads; i++) {
+		threads.emplace_back(&spill_io_pool::run, this);
+	}
+}
+
+std::size_t spill_io_pool::get_num_threads() {
+	std::lock_guard<std::mutex> lock(mutex);
+	return threads.size();
+}
+
+void spill_io_pool::set_max_pending_bytes(std::size_t max_pending_bytes) {
+	std::lock_guard<std::mutex> lock(mutex);
+	this->max_pending_bytes = max_pending_bytes;
+	room_condition.notify_all();
+}
+
+std::size_t spill_io_pool::get_pending_bytes() {
+	std::lock_guard<std::mutex> lock(mutex);
+	return pending_bytes;
+}
+
+void spill_io_pool::submit(std::function<void()> write, std::size_t num_bytes) {
+	std::unique_lock<std::mutex> lock(mutex);
+	if(threads.empty()) {
+		lock.unlock();
+		run_write(write);
+		return;
+	}
+	room_condition.wait(lock, [this, num_bytes] {
+		return pending_bytes == 0 || pending_bytes + num_bytes <= max_pending_bytes;
+	});
+	pending_bytes += num_bytes;
+	writes.push_back({std::move(write), num_bytes});
+	lock.unlock();
+	condition.notify_one();
+}
+
+void spill_io_pool::run() {
+	while(true) {
+		std::unique_lock<std::mutex> lock(mutex);
+		condition.wait(lock, [this] { return stopped || !writes.empty(); });
+		// the pending writes are finished before stopping, the caches are waiting for them
+		if(writes.empty()) {
+			return;
+		}
+		spill_write write = std::move(writes.front());
+		writes.pop_front();
+		lock.unlock();
+
+		run_write(write.write);
+
+		lock.lock();
+		pending_bytes -= write.num_bytes;
+		lock.unlock();
+		room_condition.notify_all();
+	}
+}
+
+void spill_io_pool::stop_threads(std::unique_lock<std::mutex> & lock) {
+	stopped = true;
+	lock.unlock();
+	condition.notify_all();
+	for(auto & thread : threads) {
+		thread.join();
+	}
+	lock.lock();
+	threads.clear();
+	stopped = false;
+}
+
+}  // namespace cache
+}  // namespace ral
@@ -0,0 +1,85 @@
+#pragma once
+
+#include <condition_variable>
+#include <deque>
+#include <functional>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <vector>
+
+#include "blazingdb/concurrency/BlazingThread.h"
+#include "execution_graph/logic_controllers/BlazingHostTable.h"
+#include "execution_graph/logic_controllers/LogicPrimitives.h"
+
+namespace ral {
+namespace cache {
+
+/// \brief The format of the files of the disk cache (CacheDataLocalFile)
+/// ORC encodes the table with cudf, RAW writes the serialized column buffers (optionally LZ4 compressed)
+/// as they are, with one sequential write, and reads them back from a memory mapping.
+enum class SpillFormat { ORC, RAW, RAW_LZ4 };
+
+/// returns the spill format of the BLAZING_CACHE_SPILL_FORMAT config option (ORC, RAW or RAW_LZ4), ORC by default
+SpillFormat get_spill_format(const std::map<std::string, std::string> & config_options);
+
+/// writes the column buffers of a table in host memory to a raw spill file
+void write_raw_spill_file(const std::string & path, const ral::frame::BlazingHostTable & host_table, bool compress);
+
+/// reads a raw spill file from a memory mapping, copying its buffers to the gpu
+std::unique_ptr<ral::frame::BlazingTable> read_raw_spill_file(const std::string & path);
+
+/**
+	@brief The threads that write the raw spill files in the background, so that the kernels that add to a
+	cache do not wait for the disk. The writes are run in the order they are submitted.
+*/
+class spill_io_pool {
+public:
+	static spill_io_pool & getInstance() {
+		// Myers' singleton. Thread safe and unique. Note: C++11 required.
+		static spill_io_pool instance;
+		return instance;
+	}
+
+	~spill_io_pool();
+
+	/// sets the number of threads, 0 means the spill files are written by the thread that adds to the cache
+	void set_num_threads(std::size_t num_threads);
+
+	std::size_t get_num_threads();
+
+	/// sets the bound of the bytes of the writes that are queued or running
+	void set_max_pending_bytes(std::size_t max_pending_bytes);
+
+	std::size_t get_pending_bytes();
+
+	/// runs the write in a spill thread, or in the calling one when there are no spill threads.
+	/// num_bytes is the host memory the write holds until it finishes, when the pending bytes would go over
+	/// the bound it waits until they do not, a write bigger than the bound waits until nothing is pending
+	void submit(std::function<void()> write, std::size_t num_bytes = 0);
+
+private:
+	spill_io_pool() = default;
+
+	void run();
+
+	void stop_threads(std::unique_lock<std::mutex> & lock);
+
+	struct spill_write {
+		std::function<void()> write;
+		std::size_t num_bytes;
+	};
+
+	std::mutex mutex;
+	std::condition_variable condition;
+	std::condition_variable room_condition;
+	std::deque<spill_write> writes;
+	std::vector<BlazingThread> threads;
+	std::size_t pending_bytes = 0;
+	std::size_t max_pending_bytes = 1024 * 1024 * 1024;
+	bool stopped = false;
+};
+
+}  // namespace cache
+}  // namespace ral
@@ -0,0 +1,97 @@
+#include "executor.h"
+
+#include <algorithm>
+
+namespace ral {
+namespace cache {
+
+executor::executor() {
+	set_num_threads(std::max(BlazingThread::hardware_concurrency(), 1u));
+}
+
+executor::~executor() {
+	std::unique_lock<std::mutex> lock(mutex);
+	stop_threads(lock);
+}
+
+void executor::set_num_threads(std::size_t num_threads) {
+	// the tasks are never run by the thread that submits them, it can be a thread of the network or of another task
+	num_threads = std::max(num_threads, (std::size_t) 1);
+	std::unique_lock<std::mutex> lock(mutex);
+	if(num_threads == threads.size()) {
+		return;
+	}
+	stop_threads(lock);
+	for(std::size_t i = 0; i < num_threads; i++) {
+		threads.emplace_back(&executor::run, this);
+	}
+}
+
+std::size_t executor::get_num_threads() {
+	std::lock_guard<std::mutex> lock(mutex);
+	return threads.size();
+}
+
+std::future<void> executor::submit(std::function<void()> task, std::size_t priority) {
+	std::packaged_task<void()> packaged_task(std::move(task));
+	std::future<void> result = packaged_task.get_future();
+
+	std::unique_lock<std::mutex> lock(mutex);
+	tasks.emplace(std::make_pair(priority, next_task++), std::move(packaged_task));
+	lock.unlock();
+	condition.notify_one();
+	return result;
+}
+
+void executor::add_running_kernel() {
+	std::lock_guard<std::mutex> lock(mutex);
+	running_kernels++;
+	peak_running_kernels = std::max(peak_running_kernels, running_kernels);
+}
+
+void executor::remove_running_kernel() {
+	std::lock_guard<std::mutex> lock(mutex);
+	running_kernels--;
+}
+
+executor_stats executor::get_stats() {
+	std::lock_guard<std::mutex> lock(mutex);
+	return {threads.size(), active_tasks, tasks.size(), completed_tasks, running_kernels, peak_running_kernels};
+}
+
+void executor::run() {
+	while(true) {
+		std::unique_lock<std::mutex> lock(mutex);
+		condition.wait(lock, [this] { return stopped || !tasks.empty(); });
+		// the queued tasks are finished before stopping, the queries are waiting for them
+		if(tasks.empty()) {
+			return;
+		}
+		std::packaged_task<void()> task = std::move(tasks.begin()->second);
+		tasks.erase(tasks.begin());
+		active_tasks++;
+		lock.unlock();
+
+		// the exceptions of the task are kept in its future
+		task();
+
+		lock.lock();
+		active_tasks--;
+		completed_tasks++;
+	}
+}
+
+void executor::stop_threads(std::unique_lock<std::mutex> & lock) {
+	stopped = true;
+	lock.unlock();
+	condition.notify_all();
+	for(auto & thread : threads) {
+		thread.join();
+	}
+	lock.lock();
+	threads.clear();
+	stopped = false;
+}
+
+}  // namespace cache
+}  // namespace ral
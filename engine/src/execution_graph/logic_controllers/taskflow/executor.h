@@ -0,0 +1,83 @@
+#pragma once
+
+#include <condition_variable>
+#include <cstdint>
+#include <functional>
+#include <future>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <utility>
+#include <vector>
+
+#include "blazingdb/concurrency/BlazingThread.h"
+
+namespace ral {
+namespace cache {
+
+/// \brief The threads of the executor, its tasks, and the kernels of the running queries
+struct executor_stats {
+	std::size_t num_threads;
+	std::size_t active_tasks;
+	std::size_t queued_tasks;
+	std::size_t completed_tasks;
+	/// the kernels that started and did not finish, they do not hold a thread while they wait for their inputs
+	std::size_t running_kernels;
+	std::size_t peak_running_kernels;
+};
+
+/**
+	@brief The process wide pool of threads that runs the batch tasks of the kernels of every query.
+	The kernels do not have threads of their own: they are notified when a batch is ready and submit a task to process it,
+	so the number of threads that run the queries is fixed, no matter the shape of the queries or how many of them run concurrently.
+	The tasks with the lowest priority value run first: the graph gives every kernel its distance to the
+	output kernel, so the batches that are closer to be returned are finished before new ones are read.
+*/
+class executor {
+public:
+	static executor & getInstance() {
+		// Myers' singleton. Thread safe and unique. Note: C++11 required.
+		static executor instance;
+		return instance;
+	}
+
+	~executor();
+
+	/// sets the number of threads, there is always one at least
+	void set_num_threads(std::size_t num_threads);
+
+	std::size_t get_num_threads();
+
+	/// runs the task in an executor thread, the tasks with the same priority run in the order they are submitted
+	std::future<void> submit(std::function<void()> task, std::size_t priority);
+
+	/// the graph calls these when a kernel starts and finishes
+	void add_running_kernel();
+
+	void remove_running_kernel();
+
+	executor_stats get_stats();
+
+private:
+	executor();
+
+	void run();
+
+	void stop_threads(std::unique_lock<std::mutex> & lock);
+
+	std::mutex mutex;
+	std::condition_variable condition;
+	/// ordered by priority and then by submission
+	std::map<std::pair<std::size_t, std::uint64_t>, std::packaged_task<void()>> tasks;
+	std::vector<BlazingThread> threads;
+	bool stopped = false;
+	std::uint64_t next_task = 0;
+
+	std::size_t active_tasks = 0;
+	std::size_t completed_tasks = 0;
+	std::size_t running_kernels = 0;
+	std::size_t peak_running_kernels = 0;
+};
+
+}  // namespace cache
+}  // namespace ral
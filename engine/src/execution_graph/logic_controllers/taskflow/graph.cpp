@@ -1,4 +1,5 @@
 #include "graph.h"
+#include "executor.h"
 #include "operators/OrderBy.h"
 
 namespace ral {
@@ -34,11 +35,99 @@ namespace cache {
 		}
 	}
 
+	void graph::set_kernel_priorities() {
+		// the output kernel is the one whose only edge goes to the dummy node
+		std::deque<kernel *> Q;
+		for(kernel * k : kernels_) {
+			auto edges = get_neighbours(k);
+			if(std::all_of(edges.begin(), edges.end(), [](Edge edge) { return edge.target == -1; })) {
+				k->priority_ = 0;
+				Q.push_back(k);
+			}
+		}
+		std::set<std::int32_t> visited;
+		while(not Q.empty()) {
+			kernel * target = Q.front();
+			Q.pop_front();
+			for(auto edge : get_reverse_neighbours(target)) {
+				kernel * source = get_node(edge.source);
+				if(source && visited.find(edge.source) == visited.end()) {
+					visited.insert(edge.source);
+					source->priority_ = target->priority_ + 1;
+					Q.push_back(source);
+				}
+			}
+		}
+	}
+
+	graph_execution::graph_execution(std::size_t running_kernels) : running_kernels{running_kernels} {
+		for(std::size_t i = 0; i < running_kernels; i++) {
+			executor::getInstance().add_running_kernel();
+		}
+	}
+
+	void graph_execution::submit(std::size_t priority, std::function<void()> task) {
+		std::unique_lock<std::mutex> lock(mutex);
+		if(over || error) {
+			return;
+		}
+		pending_tasks++;
+		lock.unlock();
+
+		auto self = shared_from_this();
+		executor::getInstance().submit([self, task] {
+			std::unique_lock<std::mutex> lock(self->mutex);
+			bool failed = self->error != nullptr;
+			lock.unlock();
+			if(!failed) {
+				try {
+					task();
+				} catch(...) {
+					self->fail(std::current_exception());
+				}
+			}
+			lock.lock();
+			self->pending_tasks--;
+			self->condition.notify_all();
+		}, priority);
+	}
+
+	void graph_execution::fail(std::exception_ptr error) {
+		std::lock_guard<std::mutex> lock(mutex);
+		if(!this->error) {
+			this->error = error;
+		}
+		condition.notify_all();
+	}
+
+	void graph_execution::kernel_done() {
+		executor::getInstance().remove_running_kernel();
+		std::lock_guard<std::mutex> lock(mutex);
+		running_kernels--;
+		condition.notify_all();
+	}
+
+	void graph_execution::wait() {
+		std::unique_lock<std::mutex> lock(mutex);
+		condition.wait(lock, [this] { return pending_tasks == 0 && (running_kernels == 0 || error); });
+		over = true;
+		// the kernels that were waiting for the failed one are not running anymore
+		for(; running_kernels > 0; running_kernels--) {
+			executor::getInstance().remove_running_kernel();
+		}
+		if(error) {
+			std::rethrow_exception(error);
+		}
+	}
+
 	void graph::execute() {
 		check_and_complete_work_flow();
+		set_kernel_priorities();
 
-		std::vector<BlazingThread> threads;
+		// the kernels are started in the order of the graph, the ones that read the tables first
+		std::vector<kernel *> kernels;
 		std::set<std::pair<size_t, size_t>> visited;
+		std::set<int32_t> started;
 		std::deque<size_t> Q;
 		for(auto start_node : get_neighbours(head_id_)) {
 			Q.push_back(start_node.target);
@@ -61,27 +150,29 @@ namespace cache {
 						if(visited.find(edge_id) == visited.end()) {
 							visited.insert(edge_id);
 							Q.push_back(target_id);
-							BlazingThread t([this, source, source_id, edge] {
-								auto state = source->run();
-								if(state == kstatus::proceed) {
-									source->output_.finish();
-								} else if (edge.target != -1) { // not a dummy node
-									std::cout<<"ERROR kernel "<<source_id<<" did not finished successfully"<<std::endl;
-								}
-							});
-							threads.push_back(std::move(t));
 						} else {
 							// TODO: and circular graph is defined here. Report and error
 						}
 					}
+					if(started.find(source_id) == started.end()) {
+						started.insert(source_id);
+						kernels.push_back(source);
+					}
 				}
 			} else { // if we dont have all the dependencies, lets put it back at the back and try it later
 				Q.push_back(source_id);
 			}
 		}
-		for(auto & thread : threads) {
-			thread.join();
+
+		// no kernel has a thread of its own, they run in the executor when their inputs are ready
+		auto execution = std::make_shared<graph_execution>(kernels.size());
+		for(kernel * k : kernels) {
+			k->execution = execution;
+		}
+		for(kernel * k : kernels) {
+			k->submit([k] { k->run(); });
 		}
+		execution->wait();
 	}
 
 	void graph::show() {
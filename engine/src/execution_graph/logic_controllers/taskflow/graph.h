@@ -1,5 +1,9 @@
 #pragma once
 
+#include <condition_variable>
+#include <exception>
+#include <mutex>
+
 #include "kernel.h"
 #include "kpair.h"
 
@@ -26,6 +30,34 @@ static std::vector<std::shared_ptr<ral::cache::CacheMachine>> create_cache_machi
 	return machines;
 }
 
+/**
+	@brief The state of the execution of the kernels of a graph: the tasks they submitted that did not finish,
+	the kernels that did not finish and the first error. The callbacks of the kernels keep it, so the ones that
+	come after the execution is over, like the messages of other nodes after a failure, do not run anything.
+*/
+class graph_execution : public std::enable_shared_from_this<graph_execution> {
+public:
+	graph_execution(std::size_t running_kernels);
+
+	/// runs the task in the executor, unless the execution failed or is over. If the task throws the execution fails.
+	void submit(std::size_t priority, std::function<void()> task);
+
+	void fail(std::exception_ptr error);
+
+	void kernel_done();
+
+	/// waits until all the kernels are done, or one failed and its tasks are finished, and rethrows the error
+	void wait();
+
+private:
+	std::mutex mutex;
+	std::condition_variable condition;
+	std::size_t running_kernels;
+	std::size_t pending_tasks = 0;
+	bool over = false;
+	std::exception_ptr error;
+};
+
 /**
 	@brief A class that represents the execution graph in a taskflow scheme.
 	The taskflow scheme is basically implemeted by the execution graph and the kernels associated to each node in the graph.
@@ -90,6 +122,9 @@ public:
 	void check_for_simple_scan_with_limit_query();
 
 private:
+	/// gives every kernel its distance to the output kernel as its priority in the executor
+	void set_kernel_priorities();
+
 	const std::int32_t head_id_{-1};
 	std::vector<kernel *> kernels_;
 	std::map<std::int32_t, kernel *> container_;
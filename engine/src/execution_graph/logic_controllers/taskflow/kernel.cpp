@@ -1,4 +1,12 @@
 #include "kernel.h"
+#include "executor.h"
+
+#include "communication/network/Server.h"
+
+#include <algorithm>
+#include <atomic>
+#include <iostream>
+
 namespace ral {
 namespace cache {
 
@@ -10,6 +18,173 @@ std::pair<bool, uint64_t> kernel::get_estimated_output_num_rows(){
     return this->query_graph->get_estimated_input_rows_to_kernel(this->kernel_id);
 }
 
+namespace {
+
+/// the state of a for_each_batch loop, the callback or the task that processes its next batch keeps it
+struct batch_loop : public std::enable_shared_from_this<batch_loop> {
+	std::shared_ptr<graph_execution> execution;
+	std::size_t priority;
+	kernel::notifier when_ready;
+	std::function<bool()> process_batch;
+	std::function<void()> then;
+	kernel::notifier when_output_not_saturated;
+
+	void wait_for_next_batch() {
+		auto self = shared_from_this();
+		if(when_output_not_saturated) {
+			when_output_not_saturated([self] { self->when_ready([self] { self->submit_batch(); }); });
+		} else {
+			when_ready([self] { self->submit_batch(); });
+		}
+	}
+
+	void submit_batch() {
+		auto self = shared_from_this();
+		execution->submit(priority, [self] {
+			if(self->process_batch()) {
+				self->wait_for_next_batch();
+			} else {
+				self->then();
+			}
+		});
+	}
+};
+
+/// the state of a run_batch_tasks loop, it is kept by its tasks and by the callback of the output cache
+struct batch_tasks : public std::enable_shared_from_this<batch_tasks> {
+	std::shared_ptr<graph_execution> execution;
+	std::size_t priority;
+	std::size_t max_tasks;
+	std::function<bool()> process_batch;
+	std::function<void()> then;
+	CacheMachine * output;
+
+	std::mutex mutex;
+	std::size_t running_tasks = 0;
+	bool waiting_for_output = false;
+	bool finished = false;
+	bool then_called = false;
+
+	void submit_tasks() {
+		auto self = shared_from_this();
+		std::unique_lock<std::mutex> lock(mutex);
+		while(!finished && !waiting_for_output && running_tasks < max_tasks) {
+			if(output && output->is_saturated()) {
+				waiting_for_output = true;
+				lock.unlock();
+				output->notify_when_not_saturated([self] {
+					std::unique_lock<std::mutex> lock(self->mutex);
+					self->waiting_for_output = false;
+					lock.unlock();
+					self->submit_tasks();
+				});
+				return;
+			}
+			running_tasks++;
+			lock.unlock();
+			execution->submit(priority, [self] { self->run_task(); });
+			lock.lock();
+		}
+	}
+
+	void run_task() {
+		bool has_more = process_batch();
+		std::unique_lock<std::mutex> lock(mutex);
+		running_tasks--;
+		finished = finished || !has_more;
+		if(finished) {
+			if(running_tasks == 0 && !then_called) {
+				then_called = true;
+				lock.unlock();
+				then();
+			}
+			return;
+		}
+		lock.unlock();
+		submit_tasks();
+	}
+};
+
+}  // namespace
+
+void kernel::for_each_batch(notifier when_ready, std::function<bool()> process_batch, std::function<void()> then,
+	notifier when_output_not_saturated) {
+	auto loop = std::make_shared<batch_loop>();
+	loop->execution = this->execution;
+	loop->priority = this->priority_;
+	loop->when_ready = std::move(when_ready);
+	loop->process_batch = std::move(process_batch);
+	loop->then = std::move(then);
+	loop->when_output_not_saturated = std::move(when_output_not_saturated);
+	loop->wait_for_next_batch();
+}
+
+void kernel::for_each_batch(std::shared_ptr<ral::cache::CacheMachine> input, std::function<bool()> process_batch,
+	std::function<void()> then, bool throttled) {
+	// the caches keep the callbacks of the loop while it waits for them, so the loop does not keep the caches
+	CacheMachine * input_cache = input.get();
+	notifier when_output_not_saturated;
+	if(throttled) {
+		CacheMachine * output = this->output_cache().get();
+		when_output_not_saturated = [output](std::function<void()> callback) { output->notify_when_not_saturated(std::move(callback)); };
+	}
+	for_each_batch([input_cache](std::function<void()> callback) { input_cache->notify_when_ready(std::move(callback)); },
+		std::move(process_batch), std::move(then), std::move(when_output_not_saturated));
+}
+
+void kernel::run_batch_tasks(std::size_t max_tasks, std::function<bool()> process_batch, std::function<void()> then) {
+	auto tasks = std::make_shared<batch_tasks>();
+	tasks->execution = this->execution;
+	tasks->priority = this->priority_;
+	tasks->max_tasks = std::max(max_tasks, (std::size_t) 1);
+	tasks->process_batch = std::move(process_batch);
+	tasks->then = std::move(then);
+	tasks->output = this->output_cache().get();
+	tasks->submit_tasks();
+}
+
+void kernel::submit(std::function<void()> task) {
+	this->execution->submit(this->priority_, std::move(task));
+}
+
+void kernel::submit_when_ready(std::shared_ptr<ral::cache::CacheMachine> cache, std::function<void()> task) {
+	auto execution = this->execution;
+	auto priority = this->priority_;
+	cache->notify_when_ready([execution, priority, task] { execution->submit(priority, task); });
+}
+
+void kernel::submit_when_finished(std::shared_ptr<ral::cache::CacheMachine> cache, std::function<void()> task) {
+	auto execution = this->execution;
+	auto priority = this->priority_;
+	cache->notify_when_finished([execution, priority, task] { execution->submit(priority, task); });
+}
+
+void kernel::submit_when_received(Context * context, const std::string & message_id, std::size_t count, std::function<void()> task) {
+	std::string message_token = message_id + "_" + context->getContextCommunicationToken();
+	auto execution = this->execution;
+	auto priority = this->priority_;
+	ral::communication::network::Server::getInstance().notifyWhenMessages(context->getContextToken(), message_token, count,
+		[execution, priority, task] { execution->submit(priority, task); });
+}
+
+std::function<void()> kernel::when_all(std::size_t count, std::function<void()> then) {
+	auto remaining = std::make_shared<std::atomic<std::size_t>>(count);
+	return [remaining, then] {
+		if(--(*remaining) == 0) {
+			then();
+		}
+	};
+}
+
+void kernel::done(kstatus state) {
+	if(state == kstatus::proceed) {
+		this->output_.finish();
+	} else if(this->output_.count() > 0) { // only the output kernels have no output caches
+		std::cout<<"ERROR kernel "<<this->get_id()<<" did not finished successfully"<<std::endl;
+	}
+	this->execution->kernel_done();
+}
+
 
 }  // end namespace cache
 }  // end namespace ral
@@ -1,5 +1,7 @@
 #pragma once
 
+#include <functional>
+
 #include "kernel_type.h"
 #include "port.h"
 #include "graph.h"
@@ -10,18 +12,22 @@ namespace ral {
 namespace cache {
 class kernel;
 class graph;
+class graph_execution;
 using kernel_pair = std::pair<kernel *, std::string>;
 
 /**
 	@brief This interface represents a computation unit in the execution graph.
 	Each kernel has basically and input and output ports and the expression asocciated to the computation unit.
 	Each class that implements this interface should define how the computation is executed. See `run()` method.
+	The kernels do not have threads of their own: they are notified when their inputs have a batch ready, process it
+	in a task of the executor and call `done()` once they finished.
 */
 class kernel {
 public:
 	kernel(std::size_t kernel_id, std::string expr, std::shared_ptr<Context> context, kernel_type kernel_type_id) : expression{expr}, kernel_id(kernel_id), context{context}, kernel_type_id{kernel_type_id} {
 
 		parent_id_ = -1;
+		priority_ = 0;
 		has_limit_ = false;
 		limit_rows_ = -1;
 
@@ -44,7 +50,9 @@ public:
 
 	virtual ~kernel() = default;
 
-	virtual kstatus run() = 0;
+	/// starts the kernel, it is called in a task of the executor and returns once the tasks of the kernel are submitted,
+	/// or once the kernel waits for its inputs to have batches. The kernel calls done() when it finished.
+	virtual void run() = 0;
 
 	kernel_pair operator[](const std::string & portname) { return std::make_pair(this, portname); }
 
@@ -179,6 +187,48 @@ public:
 	// the default is that its the same as the input (i.e. project, sort, ...)
 	virtual std::pair<bool, uint64_t> get_estimated_output_num_rows();
 
+	/// a function that calls the callback it is given once, when the kernel can go on
+	using notifier = std::function<void(std::function<void()>)>;
+
+	/**
+		@brief Processes the batches of an input in tasks of the executor, one at a time, without waiting for them.
+		when_ready calls back once the input has a batch or is finished, then a task runs process_batch, that processes
+		the batch and returns false once there are no more. After it returns false then is called, in the same task.
+		When when_output_not_saturated is given, the next batch is not processed until it calls back too.
+	*/
+	void for_each_batch(notifier when_ready, std::function<bool()> process_batch, std::function<void()> then,
+		notifier when_output_not_saturated = nullptr);
+
+	/// the same for a cache of the kernel, the output cache of the kernel throttles it when throttled is true
+	void for_each_batch(std::shared_ptr<ral::cache::CacheMachine> input, std::function<bool()> process_batch,
+		std::function<void()> then, bool throttled = false);
+
+	/**
+		@brief Processes the batches of a source that does not have to wait for them, like the files of a table,
+		with up to max_tasks tasks of the executor running at a time, until process_batch returns false.
+		No more tasks are submitted while the output cache is saturated. Then then is called, in the last of the tasks.
+	*/
+	void run_batch_tasks(std::size_t max_tasks, std::function<bool()> process_batch, std::function<void()> then);
+
+	/// runs the task in the executor with the priority of the kernel, the query fails if it throws
+	void submit(std::function<void()> task);
+
+	/// runs the task once the cache has a batch or is finished
+	void submit_when_ready(std::shared_ptr<ral::cache::CacheMachine> cache, std::function<void()> task);
+
+	/// runs the task once the cache is finished, for the kernels that need all their input
+	void submit_when_finished(std::shared_ptr<ral::cache::CacheMachine> cache, std::function<void()> task);
+
+	/// calls the task in the executor once the messages of the other nodes with the message id arrived, so the
+	/// collective that gets them does not wait for them
+	void submit_when_received(Context * context, const std::string & message_id, std::size_t count, std::function<void()> task);
+
+	/// returns a function that calls then the count-th time it is called, for the kernels that wait for several loops
+	static std::function<void()> when_all(std::size_t count, std::function<void()> then);
+
+	/// the kernel finished, its output caches are finished when it proceeds
+	void done(kstatus state = kstatus::proceed);
+
 	void wait_if_output_is_saturated(std::string cache_id = ""){
 		std::string message_id = get_message_id();
 		message_id = !cache_id.empty() ? cache_id + "_" + message_id : message_id;
@@ -195,9 +245,15 @@ public:
 	port output_{this};
 	const std::size_t kernel_id;
 	std::int32_t parent_id_;
+	// the distance to the output kernel, the executor runs the tasks of the kernels closer to the output first
+	std::size_t priority_;
+	// started by run, for the log of the kernel when it is completed
+	CodeTimer timer{false};
 	bool execution_done = false;
 	kernel_type kernel_type_id;
 	std::shared_ptr<graph> query_graph;
+	/// set by the graph that runs the kernel, its tasks and callbacks keep it
+	std::shared_ptr<graph_execution> execution;
 	std::shared_ptr<Context> context;
 
 	// useful when the Algebra Relacional only contains: LogicalTableScan (or BindableTableScan) and LogicalLimit
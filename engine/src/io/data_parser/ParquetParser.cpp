@@ -8,6 +8,7 @@
 
 #include <arrow/io/file.h>
 #include "blazingdb/concurrency/BlazingThread.h"
+#include <blazingdb/io/FileSystem/BufferedReadableFile.h>
 
 #include <parquet/column_writer.h>
 #include <parquet/file_writer.h>
@@ -25,6 +26,47 @@ parquet_parser::~parquet_parser() {
 	// TODO Auto-generated destructor stub
 }
 
+// tells the files of object stores which byte ranges read_parquet will read (the column chunks of the
+// columns and row groups to read, from the footer), so that they are fetched while the previous ones are read
+static void hint_column_chunks(std::shared_ptr<BufferedReadableFile> file,
+	const Schema & schema,
+	const std::vector<size_t> & column_indices,
+	const std::vector<cudf::size_type> & row_groups) {
+	try {
+		auto parquet_reader = parquet::ParquetFileReader::Open(file);
+		std::shared_ptr<parquet::FileMetaData> file_metadata = parquet_reader->metadata();
+
+		std::vector<int> file_columns;
+		for(size_t column_index : column_indices) {
+			int file_column = file_metadata->schema()->ColumnIndex(schema.get_name(column_index));
+			if(file_column >= 0) {
+				file_columns.push_back(file_column);
+			}
+		}
+		std::vector<int> row_group_indices(row_groups.begin(), row_groups.end());
+		if(row_group_indices.empty()) {
+			row_group_indices.resize(file_metadata->num_row_groups());
+			std::iota(row_group_indices.begin(), row_group_indices.end(), 0);
+		}
+
+		std::vector<std::pair<int64_t, int64_t>> ranges;
+		for(int row_group_index : row_group_indices) {
+			if(row_group_index >= file_metadata->num_row_groups()) {
+				continue;
+			}
+			auto row_group = file_metadata->RowGroup(row_group_index);
+			for(int file_column : file_columns) {
+				auto column_chunk = row_group->ColumnChunk(file_column);
+				int64_t start = column_chunk->has_dictionary_page() ? column_chunk->dictionary_page_offset() : column_chunk->data_page_offset();
+				ranges.emplace_back(start, column_chunk->total_compressed_size());
+			}
+		}
+		file->willNeed(ranges);
+	} catch(const std::exception & e) {
+		// the hints are only an optimization, read_parquet reports the errors of the file
+	}
+}
+
 std::unique_ptr<ral::frame::BlazingTable> parquet_parser::parse_batch(
 	std::shared_ptr<arrow::io::RandomAccessFile> file,
 	const Schema & schema,
@@ -35,6 +77,11 @@ std::unique_ptr<ral::frame::BlazingTable> parquet_parser::parse_batch(
 		return schema.makeEmptyBlazingTable(column_indices);
 	}
 	if(column_indices.size() > 0) {
+		auto buffered_file = std::dynamic_pointer_cast<BufferedReadableFile>(file);
+		if(buffered_file != nullptr) {
+			hint_column_chunks(buffered_file, schema, column_indices, row_groups);
+		}
+
 		// Fill data to pq_args
 		cudf_io::read_parquet_args pq_args{cudf_io::source_info{file}};
 
@@ -80,9 +80,9 @@ std::unique_ptr<cudf::table> logicalLimit(const cudf::table_view& table, cudf::s
 
 /**---------------------------------------------------------------------------*
  * @brief In a distributed context, this function determines what the limit would be
- * for this local node. It does this be distributing and collecting the total number of
- * rows in the table. Then knowing which node index this local node is, it can calculate
- * how many rows are ahead of the ones in this partition
+ * for this local node. It does this be collecting the total number of rows in the table,
+ * that distribute_local_num_rows distributed. Then knowing which node index this local node is,
+ * it can calculate how many rows are ahead of the ones in this partition
  *
  * @param[in] contex
  * @param[in] local_num_rows    Number of rows of this partition
@@ -91,9 +91,6 @@ std::unique_ptr<cudf::table> logicalLimit(const cudf::table_view& table, cudf::s
  * @returns The limit that would be applied to this partition
  *---------------------------------------------------------------------------**/
 int64_t determine_local_limit(Context * context, int64_t local_num_rows, cudf::size_type limit_rows){
-	context->incrementQuerySubstep();
-	ral::distribution::distributeNumRows(context, local_num_rows);
-
 	std::vector<int64_t> nodesRowSize = ral::distribution::collectNumRows(context);
 	int self_node_idx = context->getNodeIndex(CommunicationData::getInstance().getSelfNode());
 	int64_t prev_total_rows = std::accumulate(nodesRowSize.begin(), nodesRowSize.begin() + self_node_idx, int64_t(0));
@@ -134,6 +131,18 @@ int64_t get_limit_rows_when_relational_alg_is_simple(const std::string & query_p
 	return limitRows;
 }
 
+std::pair<std::string, std::size_t> distribute_local_num_rows(int64_t total_batch_rows, const std::string & query_part, Context * context){
+	cudf::size_type limitRows;
+	std::tie(std::ignore, std::ignore, limitRows) = get_sort_vars(query_part);
+
+	if(context->getTotalNodes() > 1 && limitRows >= 0) {
+		context->incrementQuerySubstep();
+		ral::distribution::distributeNumRows(context, total_batch_rows);
+		return std::make_pair(ral::communication::messages::SampleToNodeMasterMessage::MessageID(), context->getTotalNodes() - 1);
+	}
+	return std::make_pair(std::string(), std::size_t(0));
+}
+
 int64_t get_local_limit(int64_t total_batch_rows, const std::string & query_part, Context * context){
 	cudf::size_type limitRows;
 	std::tie(std::ignore, std::ignore, limitRows) = get_sort_vars(query_part);
@@ -254,16 +263,23 @@ std::unique_ptr<ral::frame::BlazingTable> generate_partition_plan(const std::vec
 	return partitionPlan;
 }
 
+std::pair<std::string, std::size_t> send_distributed_samples(const ral::frame::BlazingTableView & selfSamples,
+	std::size_t table_num_rows, Context * context){
+	if(context->isMasterNode(CommunicationData::getInstance().getSelfNode())) {
+		context->incrementQuerySubstep();
+		return std::make_pair(ral::communication::messages::SampleToNodeMasterMessage::MessageID(), context->getWorkerNodes().size());
+	} else {
+		context->incrementQuerySubstep();
+		sendSamplesToMaster(context, selfSamples, table_num_rows);
+		context->incrementQuerySubstep();
+		return std::make_pair(ral::communication::messages::PartitionPivotsMessage::MessageID(), std::size_t(1));
+	}
+}
+
 std::unique_ptr<ral::frame::BlazingTable> generate_distributed_partition_plan(const ral::frame::BlazingTableView & selfSamples, 
 	std::size_t table_num_rows, std::size_t avg_bytes_per_row, const std::string & query_part, Context * context){
-	std::vector<cudf::order> sortOrderTypes;
-	std::vector<int> sortColIndices;
-	cudf::size_type limitRows;
-	std::tie(sortColIndices, sortOrderTypes, limitRows) = get_sort_vars(query_part);
-
 	std::unique_ptr<ral::frame::BlazingTable> partitionPlan;
 	if(context->isMasterNode(CommunicationData::getInstance().getSelfNode())) {
-		context->incrementQuerySubstep();
 		std::pair<std::vector<NodeColumn>, std::vector<std::size_t> > samples_pair = collectSamples(context);
 		std::vector<ral::frame::BlazingTableView> samples;
 		for (int i = 0; i < samples_pair.first.size(); i++){
@@ -277,9 +293,6 @@ std::unique_ptr<ral::frame::BlazingTable> generate_distributed_partition_plan(co
 		partitionPlan = generate_partition_plan(samples, totalNumRows, avg_bytes_per_row, query_part, context);
 		distributePartitionPlan(context, partitionPlan->toBlazingTableView());
 	} else {
-		context->incrementQuerySubstep();
-		sendSamplesToMaster(context, selfSamples, table_num_rows);
-		context->incrementQuerySubstep();
 		partitionPlan = getPartitionPlan(context);
 	}
 	return partitionPlan;
@@ -22,6 +22,11 @@ std::unique_ptr<ral::frame::BlazingTable> sort(const ral::frame::BlazingTableVie
 
 std::unique_ptr<ral::frame::BlazingTable> sample(const ral::frame::BlazingTableView & table, const std::string & query_part);
 
+// sends the samples of this node, returns the id and the number of the messages that generate_distributed_partition_plan
+// collects, so that it is not called before they arrived
+std::pair<std::string, std::size_t> send_distributed_samples(const ral::frame::BlazingTableView & selfSamples,
+    std::size_t table_num_rows, Context * context);
+
 std::unique_ptr<ral::frame::BlazingTable> generate_distributed_partition_plan(const ral::frame::BlazingTableView & selfSamples, 
     std::size_t table_num_rows, std::size_t avg_bytes_per_row, const std::string & query_part, Context * context);
 
@@ -37,6 +42,10 @@ bool has_limit_only(const std::string & query_part);
 
 int64_t get_limit_rows_when_relational_alg_is_simple(const std::string & query_part);
 
+// sends the number of rows of this node when the limit is distributed, returns the id and the number of the messages
+// that get_local_limit collects, there are none when the limit is not distributed
+std::pair<std::string, std::size_t> distribute_local_num_rows(int64_t total_batch_rows, const std::string & query_part, Context * context);
+
 int64_t get_local_limit(int64_t total_batch_rows, const std::string & query_part, Context * context);
 
 std::pair<std::unique_ptr<ral::frame::BlazingTable>, int64_t>
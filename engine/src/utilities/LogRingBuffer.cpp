@@ -0,0 +1,134 @@
+#include "LogRingBuffer.h"
+
+#include <iostream>
+#include <map>
+
+#include <arrow/api.h>
+#include <arrow/io/file.h>
+#include <parquet/arrow/writer.h>
+
+#include <Util/StringUtil.h>
+
+namespace ral {
+namespace utilities {
+
+log_ring_buffer_sink::log_ring_buffer_sink(std::vector<std::string> column_names, std::size_t segment_size, std::size_t max_segments, std::string roll_path_prefix)
+	: column_names(column_names), segment_size(segment_size > 0 ? segment_size : 1), max_segments(max_segments > 0 ? max_segments : 1),
+	  roll_path_prefix(roll_path_prefix), rolled_segments(0) {}
+
+void log_ring_buffer_sink::sink_it_(const spdlog::details::log_msg & msg) {
+#if defined(SPDLOG_VERSION) && SPDLOG_VERSION >= 10600
+	spdlog::memory_buf_t formatted;
+#else
+	fmt::memory_buffer formatted;
+#endif
+	formatter_->format(msg, formatted);
+	std::string record(formatted.data(), formatted.size());
+	while(!record.empty() && (record.back() == '\n' || record.back() == '\r')) {
+		record.pop_back();
+	}
+
+	if(segments.empty() || segments.back().size() >= segment_size) {
+		segments.emplace_back();
+		segments.back().reserve(segment_size);
+	}
+	segments.back().push_back(std::move(record));
+
+	if(segments.size() > max_segments) {
+		if(!roll_path_prefix.empty()) {
+			roll_segment(segments.front());
+		}
+		segments.pop_front();
+	}
+}
+
+void log_ring_buffer_sink::roll_segment(const std::vector<std::string> & segment) {
+	// this runs on the logging thread, so a failure is just reported on stderr
+	std::vector<arrow::StringBuilder> builders(column_names.size());
+	std::vector<std::shared_ptr<arrow::Field>> fields;
+	for(const auto & column_name : column_names) {
+		fields.push_back(arrow::field(column_name, arrow::utf8()));
+	}
+
+	for(const auto & record : segment) {
+		std::vector<std::string> values = StringUtil::split(record, "|");
+		for(std::size_t i = 0; i < builders.size(); i++) {
+			// the last column keeps the rest of the record, in case the message itself has delimiters
+			if(i + 1 == builders.size() && values.size() > builders.size()) {
+				std::string rest = values[i];
+				for(std::size_t j = i + 1; j < values.size(); j++) {
+					rest += "|" + values[j];
+				}
+				builders[i].Append(rest);
+			} else if(i < values.size()) {
+				builders[i].Append(values[i]);
+			} else {
+				builders[i].AppendNull();
+			}
+		}
+	}
+
+	std::vector<std::shared_ptr<arrow::Array>> arrays(builders.size());
+	for(std::size_t i = 0; i < builders.size(); i++) {
+		arrow::Status status = builders[i].Finish(&arrays[i]);
+		if(!status.ok()) {
+			std::cerr << "Could not roll log segment: " << status.ToString() << std::endl;
+			return;
+		}
+	}
+	auto table = arrow::Table::Make(arrow::schema(fields), arrays);
+
+	std::string path = roll_path_prefix + "." + std::to_string(rolled_segments) + ".parquet";
+	auto output = arrow::io::FileOutputStream::Open(path);
+	if(!output.ok()) {
+		std::cerr << "Could not roll log segment to " << path << ": " << output.status().ToString() << std::endl;
+		return;
+	}
+	arrow::Status status = parquet::arrow::WriteTable(*table, arrow::default_memory_pool(), output.ValueOrDie(), segment_size);
+	output.ValueOrDie()->Close();
+	if(!status.ok()) {
+		std::cerr << "Could not roll log segment to " << path << ": " << status.ToString() << std::endl;
+		return;
+	}
+	rolled_segments++;
+	rolled_files.push_back(path);
+}
+
+std::vector<std::string> log_ring_buffer_sink::get_records() {
+	std::lock_guard<std::mutex> lock(mutex_);
+	std::vector<std::string> records;
+	for(const auto & segment : segments) {
+		records.insert(records.end(), segment.begin(), segment.end());
+	}
+	return records;
+}
+
+std::vector<std::string> log_ring_buffer_sink::get_rolled_files() {
+	std::lock_guard<std::mutex> lock(mutex_);
+	return rolled_files;
+}
+
+static std::mutex log_ring_buffers_mutex;
+static std::map<std::string, std::shared_ptr<log_ring_buffer_sink>> log_ring_buffers;
+
+void register_log_ring_buffer(const std::string & logger_name, std::shared_ptr<log_ring_buffer_sink> sink) {
+	std::lock_guard<std::mutex> lock(log_ring_buffers_mutex);
+	log_ring_buffers[logger_name] = sink;
+}
+
+std::shared_ptr<log_ring_buffer_sink> get_log_ring_buffer(const std::string & logger_name) {
+	std::lock_guard<std::mutex> lock(log_ring_buffers_mutex);
+	auto it = log_ring_buffers.find(logger_name);
+	if(it == log_ring_buffers.end()) {
+		return nullptr;
+	}
+	return it->second;
+}
+
+void clear_log_ring_buffers() {
+	std::lock_guard<std::mutex> lock(log_ring_buffers_mutex);
+	log_ring_buffers.clear();
+}
+
+}  // namespace utilities
+}  // namespace ral
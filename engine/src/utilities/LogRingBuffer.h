@@ -0,0 +1,59 @@
+#pragma once
+
+#include <deque>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <vector>
+
+#include <spdlog/sinks/base_sink.h>
+#include <spdlog/spdlog.h>
+
+namespace ral {
+namespace utilities {
+
+/**
+	@brief A spdlog sink that keeps the last records of a log in memory, so they can be queried without
+	parsing the log files. Records are kept in segments of segment_size records and at most max_segments
+	segments are retained. When roll_path_prefix is set, every segment that is dropped is first written to
+	roll_path_prefix.<segment number>.parquet, with one string column per field of the records.
+*/
+class log_ring_buffer_sink : public spdlog::sinks::base_sink<std::mutex> {
+public:
+	log_ring_buffer_sink(std::vector<std::string> column_names, std::size_t segment_size, std::size_t max_segments, std::string roll_path_prefix = "");
+
+	/// Returns a copy of the records retained in memory, oldest first
+	std::vector<std::string> get_records();
+
+	const std::vector<std::string> & get_column_names() const { return column_names; }
+
+	/// The parquet files written so far by this sink
+	std::vector<std::string> get_rolled_files();
+
+protected:
+	void sink_it_(const spdlog::details::log_msg & msg) override;
+
+	void flush_() override {}
+
+private:
+	void roll_segment(const std::vector<std::string> & segment);
+
+	std::vector<std::string> column_names;
+	const std::size_t segment_size;
+	const std::size_t max_segments;
+	const std::string roll_path_prefix;
+	std::deque<std::vector<std::string>> segments;
+	std::size_t rolled_segments;
+	std::vector<std::string> rolled_files;
+};
+
+/// Makes the ring buffer of a logger available to getLogRecords
+void register_log_ring_buffer(const std::string & logger_name, std::shared_ptr<log_ring_buffer_sink> sink);
+
+/// Returns nullptr if the logger has no ring buffer
+std::shared_ptr<log_ring_buffer_sink> get_log_ring_buffer(const std::string & logger_name);
+
+void clear_log_ring_buffers();
+
+}  // namespace utilities
+}  // namespace ral
@@ -0,0 +1,119 @@
+#include <from_cudf/cpp_tests/utilities/column_wrapper.hpp>
+#include <from_cudf/cpp_tests/utilities/table_utilities.hpp>
+
+#include "execution_graph/logic_controllers/CacheMachine.h"
+#include "execution_graph/logic_controllers/CacheTierManager.h"
+#include "../BlazingUnitTest.h"
+
+using ral::cache::cache_tier_manager;
+using ral::cache::CacheDataLocalFile;
+using ral::cache::CacheDataType;
+using ral::cache::GPUCacheData;
+using ral::cache::SpillFormat;
+using ral::cache::WaitingQueue;
+using ral::cache::message;
+
+struct CacheTierTest : public BlazingUnitTest {
+	CacheTierTest() {}
+	~CacheTierTest() {
+		cache_tier_manager::getInstance().configure(0, 0.95, 0.8, "/tmp", SpillFormat::ORC);
+	}
+};
+
+std::unique_ptr<ral::frame::BlazingTable> make_tier_table(int64_t value) {
+	cudf::test::fixed_width_column_wrapper<int64_t> col1({value, value + 1, value + 2});
+	std::vector<std::unique_ptr<cudf::column>> columns;
+	columns.push_back(col1.release());
+	return std::make_unique<ral::frame::BlazingTable>(std::make_unique<cudf::table>(std::move(columns)), std::vector<std::string>{"a"});
+}
+
+void put_tier_tables(WaitingQueue & queue, int count) {
+	for(int i = 0; i < count; i++) {
+		queue.put(std::make_unique<message>(std::make_unique<GPUCacheData>(make_tier_table(i * 10)), std::to_string(i)));
+	}
+}
+
+void expect_tier_tables(WaitingQueue & queue, int count) {
+	for(int i = 0; i < count; i++) {
+		auto item = queue.pop_or_wait();
+		ASSERT_NE(item, nullptr);
+		EXPECT_EQ(item->get_message_id(), std::to_string(i));
+		auto expected = make_tier_table(i * 10);
+		cudf::test::expect_tables_equal(expected->view(), item->get_data().decache()->view());
+	}
+	EXPECT_EQ(queue.pop_or_wait(), nullptr);
+}
+
+TEST_F(CacheTierTest, TakenMessagesArePutBackInTheirPlace) {
+	WaitingQueue queue;
+	put_tier_tables(queue, 3);
+	auto messages = queue.get_messages(CacheDataType::GPU);
+	ASSERT_EQ(messages.size(), 3);
+
+	auto item = queue.take(messages[0].sequence);
+	ASSERT_NE(item, nullptr);
+	EXPECT_TRUE(queue.has_next_now());
+	// the consumers can not get the messages that come after a message that was taken
+	EXPECT_EQ(queue.get_messages(CacheDataType::GPU).size(), 2);
+	queue.put_back(std::move(item));
+	queue.finish();
+
+	expect_tier_tables(queue, 3);
+}
+
+TEST_F(CacheTierTest, ColdDataIsDemotedAndPromotedBack) {
+	WaitingQueue queue;
+	put_tier_tables(queue, 4);
+	queue.finish();
+	cache_tier_manager & manager = cache_tier_manager::getInstance();
+	manager.register_queue(&queue);
+
+	// with the watermarks at 0 everything but the batch that is next to be consumed leaves the GPU (and the host)
+	manager.configure(0, 0.0, 0.0, "/tmp", SpillFormat::RAW);
+	manager.rebalance();
+	EXPECT_EQ(queue.get_messages(CacheDataType::GPU).size(), 1);
+	EXPECT_EQ(queue.get_messages(CacheDataType::GPU)[0].position, std::size_t(0));
+
+	// and with them at 1 the batch that is next to be consumed comes back to GPU
+	auto first = queue.pop_or_wait();
+	manager.configure(0, 1.0, 1.0, "/tmp", SpillFormat::RAW);
+	manager.rebalance();
+	auto gpu_messages = queue.get_messages(CacheDataType::GPU);
+	ASSERT_EQ(gpu_messages.size(), 1);
+	EXPECT_EQ(gpu_messages[0].position, std::size_t(0));
+	EXPECT_GT(manager.get_stats().demoted_to_cpu_bytes, 0);
+	EXPECT_GT(manager.get_stats().promoted_to_gpu_bytes, 0);
+
+	manager.unregister_queue(&queue);
+	for(int i = 1; i < 4; i++) {
+		auto item = queue.pop_or_wait();
+		ASSERT_NE(item, nullptr);
+		EXPECT_EQ(item->get_message_id(), std::to_string(i));
+		auto expected = make_tier_table(i * 10);
+		cudf::test::expect_tables_equal(expected->view(), item->get_data().decache()->view());
+	}
+}
+
+TEST_F(CacheTierTest, HostDataIsWrittenRawToDisk) {
+	WaitingQueue queue;
+	put_tier_tables(queue, 3);
+	queue.finish();
+	cache_tier_manager & manager = cache_tier_manager::getInstance();
+	manager.register_queue(&queue);
+
+	// the batches go from GPU to host and from host to disk, without going back to the GPU to be encoded as ORC
+	manager.configure(0, 0.0, 0.0, "/tmp", SpillFormat::ORC);
+	manager.rebalance();
+	auto disk_messages = queue.get_messages(CacheDataType::LOCAL_FILE);
+	ASSERT_EQ(disk_messages.size(), 2);
+	for(auto & info : disk_messages) {
+		auto item = queue.take(info.sequence);
+		ASSERT_NE(item, nullptr);
+		EXPECT_EQ(static_cast<CacheDataLocalFile &>(item->get_data()).spillFormat(), SpillFormat::RAW);
+		queue.put_back(std::move(item));
+	}
+	EXPECT_GT(manager.get_stats().demoted_to_disk_bytes, 0);
+
+	manager.unregister_queue(&queue);
+	expect_tier_tables(queue, 3);
+}
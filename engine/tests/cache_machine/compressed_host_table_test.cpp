@@ -0,0 +1,104 @@
+#include <from_cudf/cpp_tests/utilities/column_wrapper.hpp>
+#include <from_cudf/cpp_tests/utilities/table_utilities.hpp>
+
+#include "execution_graph/logic_controllers/CacheMachine.h"
+#include "execution_graph/logic_controllers/CompressedHostTable.h"
+#include "../BlazingUnitTest.h"
+
+using ral::cache::CPUCacheData;
+using ral::frame::CompressedHostTable;
+using ral::frame::HostCompression;
+using ral::frame::host_cache_compression;
+
+struct CompressedHostTableTest : public BlazingUnitTest {
+	CompressedHostTableTest() {}
+	~CompressedHostTableTest() {}
+};
+
+std::unique_ptr<ral::frame::BlazingTable> make_low_cardinality_table(cudf::size_type num_rows) {
+	const std::vector<std::string> categories{"AIR", "MAIL", "SHIP", "TRUCK", "RAIL", "FOB", "REG AIR"};
+	std::vector<int64_t> integers(num_rows);
+	std::vector<std::string> strings(num_rows);
+	for(cudf::size_type i = 0; i < num_rows; i++) {
+		integers[i] = i % 100;
+		strings[i] = categories[i % categories.size()];
+	}
+	cudf::test::fixed_width_column_wrapper<int64_t> col1(integers.begin(), integers.end());
+	cudf::test::strings_column_wrapper col2(strings.begin(), strings.end());
+
+	std::vector<std::unique_ptr<cudf::column>> columns;
+	columns.push_back(col1.release());
+	columns.push_back(col2.release());
+	return std::make_unique<ral::frame::BlazingTable>(std::make_unique<cudf::table>(std::move(columns)), std::vector<std::string>{"a", "b"});
+}
+
+void expect_round_trip(const host_cache_compression & compression, bool expect_smaller) {
+	auto table = make_low_cardinality_table(10000);
+	auto host_table = ral::communication::messages::serialize_gpu_message_to_host_table(table->toBlazingTableView());
+	std::size_t host_memory_used = blazing_host_memory_resource::getInstance().get_memory_used();
+	std::size_t host_logical_memory_used = blazing_host_memory_resource::getInstance().get_logical_memory_used();
+
+	{
+		CompressedHostTable compressed(*host_table, compression);
+		EXPECT_EQ(compressed.logicalSizeInBytes(), host_table->sizeInBytes());
+		if(expect_smaller) {
+			EXPECT_LT(compressed.sizeInBytes(), compressed.logicalSizeInBytes());
+		}
+		EXPECT_EQ(blazing_host_memory_resource::getInstance().get_memory_used(), host_memory_used + compressed.sizeInBytes());
+		EXPECT_EQ(blazing_host_memory_resource::getInstance().get_logical_memory_used(), host_logical_memory_used + compressed.logicalSizeInBytes());
+
+		auto decompressed = compressed.decompress();
+		auto result = ral::communication::messages::deserialize_from_cpu(decompressed.get());
+		cudf::test::expect_tables_equal(table->view(), result->view());
+	}
+	EXPECT_EQ(blazing_host_memory_resource::getInstance().get_memory_used(), host_memory_used);
+	EXPECT_EQ(blazing_host_memory_resource::getInstance().get_logical_memory_used(), host_logical_memory_used);
+}
+
+TEST_F(CompressedHostTableTest, RoundTripLZ4) {
+	expect_round_trip({HostCompression::LZ4, false}, true);
+}
+
+TEST_F(CompressedHostTableTest, RoundTripZSTD) {
+	expect_round_trip({HostCompression::ZSTD, false}, true);
+}
+
+TEST_F(CompressedHostTableTest, RoundTripDictionaryEncoding) {
+	expect_round_trip({HostCompression::NONE, true}, true);
+	expect_round_trip({HostCompression::LZ4, true}, true);
+}
+
+TEST_F(CompressedHostTableTest, HighCardinalityStringsAreNotDictionaryEncoded) {
+	cudf::test::strings_column_wrapper col1({"d", "e", "a", "", "k", "dd", "l"}, {1, 0, 1, 1, 1, 1, 1});
+	std::vector<std::unique_ptr<cudf::column>> columns;
+	columns.push_back(col1.release());
+	auto table = std::make_unique<ral::frame::BlazingTable>(std::make_unique<cudf::table>(std::move(columns)), std::vector<std::string>{"a"});
+	auto host_table = ral::communication::messages::serialize_gpu_message_to_host_table(table->toBlazingTableView());
+
+	CompressedHostTable compressed(*host_table, {HostCompression::NONE, true});
+	EXPECT_EQ(compressed.sizeInBytes(), compressed.logicalSizeInBytes());
+	auto result = ral::communication::messages::deserialize_from_cpu(compressed.decompress().get());
+	cudf::test::expect_tables_equal(table->view(), result->view());
+}
+
+TEST_F(CompressedHostTableTest, CPUCacheDataDecompressesLazily) {
+	auto table = make_low_cardinality_table(10000);
+	CPUCacheData cache_data(make_low_cardinality_table(10000), {HostCompression::LZ4, true});
+	EXPECT_TRUE(cache_data.isCompressed());
+	EXPECT_LT(cache_data.compressedSizeInBytes(), cache_data.sizeInBytes());
+	cudf::test::expect_tables_equal(table->view(), cache_data.decache()->view());
+
+	auto host_table = cache_data.releaseHostTable();
+	cudf::test::expect_tables_equal(table->view(), ral::communication::messages::deserialize_from_cpu(host_table.get())->view());
+}
+
+TEST_F(CompressedHostTableTest, ConfigOptions) {
+	std::map<std::string, std::string> config_options;
+	EXPECT_FALSE(ral::frame::get_host_cache_compression(config_options).enabled());
+
+	config_options["BLAZING_HOST_CACHE_COMPRESSION"] = "zstd";
+	config_options["BLAZING_HOST_CACHE_DICTIONARY_ENCODING"] = "True";
+	auto compression = ral::frame::get_host_cache_compression(config_options);
+	EXPECT_EQ(compression.codec, HostCompression::ZSTD);
+	EXPECT_TRUE(compression.dictionary_encode_strings);
+}
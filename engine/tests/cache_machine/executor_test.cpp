@@ -0,0 +1,94 @@
+#include <atomic>
+#include <future>
+#include <stdexcept>
+#include <vector>
+
+#include "execution_graph/logic_controllers/taskflow/executor.h"
+#include "../BlazingUnitTest.h"
+
+using ral::cache::executor;
+
+struct ExecutorTest : public BlazingUnitTest {
+	ExecutorTest() {}
+	~ExecutorTest() {
+		executor::getInstance().set_num_threads(std::max(BlazingThread::hardware_concurrency(), 1u));
+	}
+};
+
+TEST_F(ExecutorTest, TasksRunByPriority) {
+	executor & pool = executor::getInstance();
+	pool.set_num_threads(1);
+
+	// the only thread waits until all the tasks are queued
+	std::promise<void> running;
+	std::promise<void> start;
+	std::shared_future<void> started = start.get_future().share();
+	auto gate = pool.submit([&running, started] {
+		running.set_value();
+		started.wait();
+	}, 0);
+	running.get_future().wait();
+
+	std::mutex order_mutex;
+	std::vector<int> order;
+	std::vector<std::future<void>> tasks;
+	for(int priority : {3, 1, 2, 1, 0}) {
+		tasks.push_back(pool.submit([priority, &order_mutex, &order] {
+			std::lock_guard<std::mutex> lock(order_mutex);
+			order.push_back(priority);
+		}, priority));
+	}
+	EXPECT_EQ(pool.get_stats().queued_tasks, std::size_t(5));
+	EXPECT_EQ(pool.get_stats().active_tasks, std::size_t(1));
+
+	start.set_value();
+	gate.get();
+	for(auto & task : tasks) {
+		task.get();
+	}
+	EXPECT_EQ(order, std::vector<int>({0, 1, 1, 2, 3}));
+	EXPECT_EQ(pool.get_stats().queued_tasks, std::size_t(0));
+}
+
+TEST_F(ExecutorTest, ExceptionsAreKeptInTheFuture) {
+	executor & pool = executor::getInstance();
+	pool.set_num_threads(2);
+
+	auto task = pool.submit([] { throw std::runtime_error("task failed"); }, 0);
+	EXPECT_THROW(task.get(), std::runtime_error);
+
+	// the thread that ran it keeps running tasks
+	std::atomic<int> count(0);
+	std::vector<std::future<void>> tasks;
+	for(int i = 0; i < 10; i++) {
+		tasks.push_back(pool.submit([&count] { count++; }, 0));
+	}
+	for(auto & pending_task : tasks) {
+		pending_task.get();
+	}
+	EXPECT_EQ(count, 10);
+}
+
+TEST_F(ExecutorTest, ThereIsAlwaysOneThread) {
+	executor & pool = executor::getInstance();
+	pool.set_num_threads(0);
+	EXPECT_EQ(pool.get_num_threads(), std::size_t(1));
+
+	// the task does not run in the thread that submits it
+	std::thread::id task_thread;
+	pool.submit([&task_thread] { task_thread = std::this_thread::get_id(); }, 0).get();
+	EXPECT_NE(task_thread, std::this_thread::get_id());
+}
+
+TEST_F(ExecutorTest, RunningKernelsAreCounted) {
+	executor & pool = executor::getInstance();
+	std::size_t running_kernels = pool.get_stats().running_kernels;
+
+	pool.add_running_kernel();
+	pool.add_running_kernel();
+	EXPECT_EQ(pool.get_stats().running_kernels, running_kernels + 2);
+	EXPECT_GE(pool.get_stats().peak_running_kernels, running_kernels + 2);
+	pool.remove_running_kernel();
+	pool.remove_running_kernel();
+	EXPECT_EQ(pool.get_stats().running_kernels, running_kernels);
+}
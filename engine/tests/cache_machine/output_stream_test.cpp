@@ -0,0 +1,65 @@
+#include <atomic>
+#include <chrono>
+#include <thread>
+
+#include "execution_graph/logic_controllers/OutputStream.h"
+#include "../BlazingUnitTest.h"
+
+using ral::batch::OutputStream;
+
+struct OutputStreamTest : public BlazingUnitTest {
+	OutputStreamTest() {}
+	~OutputStreamTest() {}
+};
+
+std::unique_ptr<ral::frame::BlazingTable> make_batch() {
+	return ral::frame::createEmptyBlazingTable({cudf::type_id::INT32}, {"a"});
+}
+
+TEST_F(OutputStreamTest, BatchesArePoppedInOrderUntilFinished) {
+	OutputStream stream(4);
+	EXPECT_TRUE(stream.push(make_batch()));
+	EXPECT_TRUE(stream.push(make_batch()));
+	stream.finish();
+
+	EXPECT_NE(stream.pop(), nullptr);
+	EXPECT_NE(stream.pop(), nullptr);
+	EXPECT_EQ(stream.pop(), nullptr);
+}
+
+TEST_F(OutputStreamTest, PushBlocksWhileTheBufferIsFull) {
+	OutputStream stream(1);
+	std::atomic<int> pushed{0};
+	std::thread producer([&]() {
+		for(int i = 0; i < 3; i++) {
+			stream.push(make_batch());
+			pushed++;
+		}
+		stream.finish();
+	});
+
+	std::this_thread::sleep_for(std::chrono::milliseconds(100));
+	EXPECT_EQ(pushed.load(), 1);
+
+	int popped = 0;
+	while(stream.pop()) {
+		popped++;
+	}
+	producer.join();
+	EXPECT_EQ(popped, 3);
+}
+
+TEST_F(OutputStreamTest, CancelUnblocksTheProducer) {
+	OutputStream stream(1);
+	EXPECT_TRUE(stream.push(make_batch()));
+	std::thread producer([&]() { EXPECT_FALSE(stream.push(make_batch())); });
+	stream.cancel();
+	producer.join();
+	EXPECT_TRUE(stream.is_cancelled());
+}
+
+TEST_F(OutputStreamTest, FailIsRaisedByPop) {
+	OutputStream stream(1);
+	stream.fail("query failed");
+	EXPECT_THROW(stream.pop(), std::runtime_error);
+}
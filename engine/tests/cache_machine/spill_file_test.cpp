@@ -0,0 +1,168 @@
+#include <atomic>
+#include <chrono>
+#include <future>
+#include <iostream>
+#include <thread>
+
+#include <from_cudf/cpp_tests/utilities/column_wrapper.hpp>
+#include <from_cudf/cpp_tests/utilities/table_utilities.hpp>
+
+#include "execution_graph/logic_controllers/CacheMachine.h"
+#include "execution_graph/logic_controllers/SpillFile.h"
+#include "CodeTimer.h"
+#include "../BlazingUnitTest.h"
+
+using ral::cache::CacheDataLocalFile;
+using ral::cache::SpillFormat;
+using ral::cache::spill_io_pool;
+
+struct SpillFileTest : public BlazingUnitTest {
+	SpillFileTest() {}
+	~SpillFileTest() {
+		spill_io_pool::getInstance().set_num_threads(0);
+		spill_io_pool::getInstance().set_max_pending_bytes(1024 * 1024 * 1024);
+	}
+};
+
+std::unique_ptr<ral::frame::BlazingTable> make_spill_table() {
+	cudf::test::fixed_width_column_wrapper<int64_t> col1({5, 4, 3, 5, 8, 5, 6}, {1, 1, 0, 1, 1, 1, 1});
+	cudf::test::fixed_width_column_wrapper<double> col2({1.5, 4.0, 3.25, 5.0, 8.0, 5.0, 6.0});
+	cudf::test::strings_column_wrapper col3({"d", "e", "a", "d", "k", "d", "l"}, {1, 0, 1, 1, 1, 1, 1});
+
+	std::vector<std::unique_ptr<cudf::column>> columns;
+	columns.push_back(col1.release());
+	columns.push_back(col2.release());
+	columns.push_back(col3.release());
+	return std::make_unique<ral::frame::BlazingTable>(std::make_unique<cudf::table>(std::move(columns)), std::vector<std::string>{"a", "b", "c"});
+}
+
+std::unique_ptr<ral::frame::BlazingTable> make_big_spill_table(cudf::size_type num_rows) {
+	std::vector<int64_t> integers(num_rows);
+	std::vector<double> doubles(num_rows);
+	for(cudf::size_type i = 0; i < num_rows; i++) {
+		integers[i] = i % 1000;
+		doubles[i] = i * 0.25;
+	}
+	cudf::test::fixed_width_column_wrapper<int64_t> col1(integers.begin(), integers.end());
+	cudf::test::fixed_width_column_wrapper<double> col2(doubles.begin(), doubles.end());
+
+	std::vector<std::unique_ptr<cudf::column>> columns;
+	columns.push_back(col1.release());
+	columns.push_back(col2.release());
+	return std::make_unique<ral::frame::BlazingTable>(std::make_unique<cudf::table>(std::move(columns)), std::vector<std::string>{"a", "b"});
+}
+
+void expect_spill_round_trip(SpillFormat format) {
+	auto expected = make_spill_table();
+	CacheDataLocalFile cache_data(make_spill_table(), "/tmp", format);
+	EXPECT_EQ(cache_data.num_rows(), 7);
+	EXPECT_EQ(cache_data.names(), expected->names());
+
+	auto table = cache_data.decache();
+	cudf::test::expect_tables_equal(expected->view(), table->view());
+	EXPECT_EQ(table->names(), expected->names());
+}
+
+TEST_F(SpillFileTest, OrcRoundTrip) {
+	expect_spill_round_trip(SpillFormat::ORC);
+}
+
+TEST_F(SpillFileTest, RawRoundTrip) {
+	expect_spill_round_trip(SpillFormat::RAW);
+}
+
+TEST_F(SpillFileTest, RawLz4RoundTrip) {
+	expect_spill_round_trip(SpillFormat::RAW_LZ4);
+}
+
+TEST_F(SpillFileTest, RawRoundTripWithSpillThreads) {
+	spill_io_pool::getInstance().set_num_threads(2);
+	std::vector<std::unique_ptr<CacheDataLocalFile>> cache_data;
+	for(int i = 0; i < 8; i++) {
+		cache_data.push_back(std::make_unique<CacheDataLocalFile>(make_spill_table(), "/tmp", i % 2 == 0 ? SpillFormat::RAW : SpillFormat::RAW_LZ4));
+	}
+
+	// some are decached before the spill threads write them, they come back from host memory
+	auto expected = make_spill_table();
+	for(auto & data : cache_data) {
+		auto table = data->decache();
+		cudf::test::expect_tables_equal(expected->view(), table->view());
+	}
+}
+
+TEST_F(SpillFileTest, SubmitWaitsWhenThePendingBytesAreOverTheBound) {
+	spill_io_pool::getInstance().set_num_threads(1);
+	spill_io_pool::getInstance().set_max_pending_bytes(100);
+
+	std::promise<void> release_first;
+	std::shared_future<void> first_released = release_first.get_future().share();
+	spill_io_pool::getInstance().submit([first_released]() { first_released.wait(); }, 80);
+	EXPECT_EQ(spill_io_pool::getInstance().get_pending_bytes(), 80);
+
+	std::atomic<bool> submitted(false);
+	std::thread producer([&submitted]() {
+		spill_io_pool::getInstance().submit([]() {}, 30);
+		submitted = true;
+	});
+	std::this_thread::sleep_for(std::chrono::milliseconds(100));
+	EXPECT_FALSE(submitted);
+
+	release_first.set_value();
+	producer.join();
+	EXPECT_TRUE(submitted);
+
+	// a write bigger than the bound is run when nothing else is pending
+	spill_io_pool::getInstance().submit([]() {}, 1000);
+	spill_io_pool::getInstance().set_num_threads(0);
+	EXPECT_EQ(spill_io_pool::getInstance().get_pending_bytes(), 0);
+}
+
+TEST_F(SpillFileTest, FailedRawWriteKeepsTheTableInHostMemory) {
+	spill_io_pool::getInstance().set_num_threads(1);
+	auto expected = make_spill_table();
+	CacheDataLocalFile cache_data(make_spill_table(), "/tmp/blazing-spill-test-missing-directory", SpillFormat::RAW);
+	// waits for the write to fail
+	spill_io_pool::getInstance().set_num_threads(0);
+	EXPECT_EQ(spill_io_pool::getInstance().get_pending_bytes(), 0);
+
+	auto table = cache_data.decache();
+	cudf::test::expect_tables_equal(expected->view(), table->view());
+}
+
+TEST_F(SpillFileTest, SpillFormatFromConfigOptions) {
+	EXPECT_EQ(ral::cache::get_spill_format({}), SpillFormat::ORC);
+	EXPECT_EQ(ral::cache::get_spill_format({{"BLAZING_CACHE_SPILL_FORMAT", "raw"}}), SpillFormat::RAW);
+	EXPECT_EQ(ral::cache::get_spill_format({{"BLAZING_CACHE_SPILL_FORMAT", "RAW_LZ4"}}), SpillFormat::RAW_LZ4);
+	EXPECT_EQ(ral::cache::get_spill_format({{"BLAZING_CACHE_SPILL_FORMAT", "other"}}), SpillFormat::ORC);
+}
+
+// not a check, it prints how long the kernels wait to spill a batch and to get it back with each format
+TEST_F(SpillFileTest, SpillFormatBenchmark) {
+	const cudf::size_type num_rows = 16 * 1024 * 1024;
+	std::vector<std::pair<std::string, SpillFormat>> formats = {
+		{"ORC", SpillFormat::ORC}, {"RAW", SpillFormat::RAW}, {"RAW_LZ4", SpillFormat::RAW_LZ4}};
+	for(auto & format : formats) {
+		for(std::size_t num_threads : {0, 2}) {
+			if(format.second == SpillFormat::ORC && num_threads > 0) {
+				continue;
+			}
+			spill_io_pool::getInstance().set_num_threads(num_threads);
+			auto table = make_big_spill_table(num_rows);
+			auto num_bytes = table->sizeInBytes();
+
+			CodeTimer spill_timer;
+			CacheDataLocalFile cache_data(std::move(table), "/tmp", format.second);
+			auto spill_time = spill_timer.elapsed_time();
+
+			// gives the spill threads the time of some computation
+			std::this_thread::sleep_for(std::chrono::milliseconds(1000));
+			CodeTimer restore_timer;
+			auto restored = cache_data.decache();
+			auto restore_time = restore_timer.elapsed_time();
+
+			std::cout << format.first << " spill threads " << num_threads << ": " << num_bytes << " bytes, spill "
+					  << spill_time << " ms, restore " << restore_time << " ms" << std::endl;
+			EXPECT_EQ(restored->num_rows(), num_rows);
+		}
+	}
+}
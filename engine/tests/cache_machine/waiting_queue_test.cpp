@@ -0,0 +1,124 @@
+#include <atomic>
+#include <chrono>
+#include <iostream>
+#include <thread>
+#include <vector>
+
+#include "execution_graph/logic_controllers/CacheMachine.h"
+#include "../BlazingUnitTest.h"
+
+using ral::cache::CacheData;
+using ral::cache::CacheDataType;
+using ral::cache::WaitingQueue;
+using ral::cache::message;
+
+struct WaitingQueueTest : public BlazingUnitTest {
+	WaitingQueueTest() {}
+	~WaitingQueueTest() {}
+};
+
+/// a CacheData without a table, so the queue can be tested without the GPU
+class EmptyCacheData : public CacheData {
+public:
+	EmptyCacheData() : CacheData(CacheDataType::CPU, {}, {}, 0) {}
+
+	std::unique_ptr<ral::frame::BlazingTable> decache() override { return nullptr; }
+
+	size_t sizeInBytes() const override { return 0; }
+};
+
+std::unique_ptr<message> make_empty_message(const std::string & message_id) {
+	return std::make_unique<message>(std::make_unique<EmptyCacheData>(), message_id);
+}
+
+TEST_F(WaitingQueueTest, GetOrWaitKeepsTheOrderOfTheOthers) {
+	WaitingQueue queue;
+	for(const std::string & message_id : {"a", "b", "c", "b"}) {
+		queue.put(make_empty_message(message_id));
+	}
+	queue.finish();
+
+	auto first_b = queue.get_or_wait("b");
+	ASSERT_NE(first_b, nullptr);
+	EXPECT_EQ(first_b->get_sequence(), std::uint64_t(1));
+	EXPECT_EQ(queue.get_or_wait("d"), nullptr);
+
+	std::vector<std::string> message_ids;
+	while(auto item = queue.pop_or_wait()) {
+		message_ids.push_back(item->get_message_id());
+	}
+	EXPECT_EQ(message_ids, std::vector<std::string>({"a", "c", "b"}));
+}
+
+TEST_F(WaitingQueueTest, GetOrWaitWaitsForItsMessageId) {
+	WaitingQueue queue;
+	const int num_messages = 8;
+	std::vector<std::string> received(num_messages);
+	std::vector<std::thread> consumers;
+	for(int i = 0; i < num_messages; i++) {
+		consumers.emplace_back([&queue, &received, i] {
+			auto item = queue.get_or_wait(std::to_string(i));
+			received[i] = item ? item->get_message_id() : "";
+		});
+	}
+	for(int i = num_messages - 1; i >= 0; i--) {
+		queue.put(make_empty_message(std::to_string(i)));
+	}
+	for(auto & consumer : consumers) {
+		consumer.join();
+	}
+	for(int i = 0; i < num_messages; i++) {
+		EXPECT_EQ(received[i], std::to_string(i));
+	}
+}
+
+TEST_F(WaitingQueueTest, GetOrWaitWaitsForTakenMessages) {
+	WaitingQueue queue;
+	queue.put(make_empty_message("a"));
+	queue.finish();
+	auto taken = queue.take(0);
+	ASSERT_NE(taken, nullptr);
+
+	std::thread put_back([&queue, &taken] {
+		std::this_thread::sleep_for(std::chrono::milliseconds(50));
+		queue.put_back(std::move(taken));
+	});
+	auto item = queue.get_or_wait("a");
+	put_back.join();
+	ASSERT_NE(item, nullptr);
+	EXPECT_EQ(item->get_message_id(), "a");
+}
+
+// not a check, it prints how long many producers and consumers take to exchange messages by id with many pending ones
+TEST_F(WaitingQueueTest, ManyProducersAndConsumersBenchmark) {
+	const int num_threads = 16;
+	const int messages_per_thread = 2000;
+	WaitingQueue queue;
+
+	// every consumer gets its messages in the reverse order they are put, so most of them are pending
+	std::atomic<int> gotten(0);
+	auto start = std::chrono::steady_clock::now();
+	std::vector<std::thread> threads;
+	for(int t = 0; t < num_threads; t++) {
+		threads.emplace_back([&queue, t] {
+			for(int i = 0; i < messages_per_thread; i++) {
+				queue.put(make_empty_message(std::to_string(t) + "_" + std::to_string(i)));
+			}
+		});
+		threads.emplace_back([&queue, &gotten, t] {
+			for(int i = messages_per_thread - 1; i >= 0; i--) {
+				if(queue.get_or_wait(std::to_string(t) + "_" + std::to_string(i)) != nullptr) {
+					gotten++;
+				}
+			}
+		});
+	}
+	for(auto & thread : threads) {
+		thread.join();
+	}
+	auto elapsed = std::chrono::duration_cast<std::chrono::milliseconds>(std::chrono::steady_clock::now() - start).count();
+
+	std::cout << num_threads << " producers and " << num_threads << " consumers, " << num_threads * messages_per_thread
+			  << " messages: " << elapsed << " ms" << std::endl;
+	EXPECT_EQ(gotten, num_threads * messages_per_thread);
+}
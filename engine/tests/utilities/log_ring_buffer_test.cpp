@@ -0,0 +1,82 @@
+#include <cstdio>
+#include <memory>
+#include <string>
+#include <unistd.h>
+#include <vector>
+
+#include <arrow/io/file.h>
+#include <parquet/file_reader.h>
+#include <spdlog/spdlog.h>
+
+#include "utilities/LogRingBuffer.h"
+#include "../BlazingUnitTest.h"
+
+using ral::utilities::log_ring_buffer_sink;
+
+struct LogRingBufferTest : public BlazingUnitTest {
+	LogRingBufferTest() {}
+	~LogRingBufferTest() {
+		ral::utilities::clear_log_ring_buffers();
+	}
+};
+
+std::shared_ptr<spdlog::logger> make_ring_buffer_logger(std::shared_ptr<log_ring_buffer_sink> sink) {
+	auto logger = std::make_shared<spdlog::logger>("log_ring_buffer_test", sink);
+	logger->set_pattern("%v");
+	return logger;
+}
+
+TEST_F(LogRingBufferTest, KeepsTheLastSegments) {
+	// 2 segments of 2 records, the oldest segment is dropped as a whole
+	auto sink = std::make_shared<log_ring_buffer_sink>(std::vector<std::string>{"a", "b"}, 2, 2);
+	auto logger = make_ring_buffer_logger(sink);
+	for(int i = 1; i <= 4; i++) {
+		logger->info("{}|x", i);
+	}
+	EXPECT_EQ(sink->get_records(), std::vector<std::string>({"1|x", "2|x", "3|x", "4|x"}));
+
+	logger->info("5|x");
+	EXPECT_EQ(sink->get_records(), std::vector<std::string>({"3|x", "4|x", "5|x"}));
+	EXPECT_TRUE(sink->get_rolled_files().empty());
+	EXPECT_EQ(sink->get_column_names(), std::vector<std::string>({"a", "b"}));
+}
+
+TEST_F(LogRingBufferTest, ZeroSizesKeepOneRecord) {
+	auto sink = std::make_shared<log_ring_buffer_sink>(std::vector<std::string>{"a"}, 0, 0);
+	auto logger = make_ring_buffer_logger(sink);
+	logger->info("first");
+	logger->info("second");
+	EXPECT_EQ(sink->get_records(), std::vector<std::string>({"second"}));
+}
+
+TEST_F(LogRingBufferTest, DroppedSegmentsAreRolledToParquet) {
+	std::string roll_path_prefix = "/tmp/log_ring_buffer_test." + std::to_string(::getpid());
+	auto sink = std::make_shared<log_ring_buffer_sink>(std::vector<std::string>{"a", "b", "c"}, 2, 1, roll_path_prefix);
+	auto logger = make_ring_buffer_logger(sink);
+	logger->info("1|x|first");
+	// the last column keeps the rest of the record, with its delimiters
+	logger->info("2|y|with|delimiters");
+	logger->info("3");
+
+	std::vector<std::string> rolled_files = sink->get_rolled_files();
+	ASSERT_EQ(rolled_files, std::vector<std::string>({roll_path_prefix + ".0.parquet"}));
+	EXPECT_EQ(sink->get_records(), std::vector<std::string>({"3"}));
+
+	auto reader = parquet::ParquetFileReader::OpenFile(rolled_files[0]);
+	auto metadata = reader->metadata();
+	EXPECT_EQ(metadata->num_rows(), 2);
+	EXPECT_EQ(metadata->num_columns(), 3);
+	EXPECT_EQ(metadata->schema()->Column(2)->name(), "c");
+	reader->Close();
+	std::remove(rolled_files[0].c_str());
+}
+
+TEST_F(LogRingBufferTest, RingBuffersAreFoundByLoggerName) {
+	auto sink = std::make_shared<log_ring_buffer_sink>(std::vector<std::string>{"a"}, 10, 10);
+	ral::utilities::register_log_ring_buffer("test_logger", sink);
+	EXPECT_EQ(ral::utilities::get_log_ring_buffer("test_logger"), sink);
+	EXPECT_EQ(ral::utilities::get_log_ring_buffer("other_logger"), nullptr);
+
+	ral::utilities::clear_log_ring_buffers();
+	EXPECT_EQ(ral::utilities::get_log_ring_buffer("test_logger"), nullptr);
+}
@@ -0,0 +1,18 @@
+/*
+ * Copyright 2020 BlazingDB, Inc.
+ */
+
+#ifndef _BLOCK_LOCATION_H_
+#define _BLOCK_LOCATION_H_
+
+#include <string>
+#include <vector>
+
+// A contiguous range of bytes of a file and the hosts that hold a replica of it
+struct BlockLocation {
+	long long offset;
+	long long length;
+	std::vector<std::string> hosts;
+};
+
+#endif /* _BLOCK_LOCATION_H_ */
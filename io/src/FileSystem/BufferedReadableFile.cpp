@@ -0,0 +1,379 @@
+/*
+ * Copyright 2017 BlazingDB, Inc.
+ */
+
+#include "BufferedReadableFile.h"
+
+#include <algorithm>
+#include <chrono>
+#include <cstring>
+
+#include "arrow/buffer.h"
+#include <arrow/memory_pool.h>
+
+static std::mutex defaultReadAheadOptionsMutex;
+static ReadAheadOptions defaultReadAheadOptions;
+
+void setDefaultReadAheadOptions(const ReadAheadOptions & options) {
+	std::lock_guard<std::mutex> lock(defaultReadAheadOptionsMutex);
+	defaultReadAheadOptions = options;
+}
+
+ReadAheadOptions getDefaultReadAheadOptions() {
+	std::lock_guard<std::mutex> lock(defaultReadAheadOptionsMutex);
+	return defaultReadAheadOptions;
+}
+
+BufferedReadableFile::BufferedReadableFile(const ReadAheadOptions & options)
+	: options(options), position(0), isClosed(false), size(-1), useCounter(0), inFlightRange(0, 0),
+	  prefetchStarted(false), prefetchStopped(false), requests(0), bytes(0), latencyMicroseconds(0), bufferedReads(0) {}
+
+BufferedReadableFile::~BufferedReadableFile() { this->stopPrefetching(); }
+
+arrow::Status BufferedReadableFile::Close() {
+	this->stopPrefetching();
+	std::lock_guard<std::mutex> lock(this->windowsMutex);
+	this->windows.clear();
+	this->prefetchedWindows.clear();
+	this->isClosed = true;
+	return arrow::Status::OK();
+}
+
+bool BufferedReadableFile::closed() const { return this->isClosed; }
+
+arrow::Result<int64_t> BufferedReadableFile::GetSize() {
+	std::lock_guard<std::mutex> lock(this->sizeMutex);
+	if(this->size < 0) {
+		this->size = this->fetchSize();
+		if(this->size < 0) {
+			return arrow::Status::IOError("Could not get the size of the file");
+		}
+	}
+	return this->size;
+}
+
+arrow::Status BufferedReadableFile::Seek(int64_t position) {
+	this->position = position;
+	return arrow::Status::OK();
+}
+
+arrow::Result<int64_t> BufferedReadableFile::Tell() const { return this->position; }
+
+bool BufferedReadableFile::supports_zero_copy() const { return false; }
+
+arrow::Result<int64_t> BufferedReadableFile::Read(int64_t nbytes, void * out) {
+	auto result = this->ReadAt(this->position, nbytes, out);
+	if(result.ok()) {
+		this->position += result.ValueOrDie();
+	}
+	return result;
+}
+
+arrow::Result<std::shared_ptr<arrow::Buffer>> BufferedReadableFile::Read(int64_t nbytes) {
+	auto result = this->ReadAt(this->position, nbytes);
+	if(result.ok()) {
+		this->position += result.ValueOrDie()->size();
+	}
+	return result;
+}
+
+arrow::Result<std::shared_ptr<arrow::Buffer>> BufferedReadableFile::ReadAt(int64_t position, int64_t nbytes) {
+	std::shared_ptr<arrow::ResizableBuffer> buffer;
+	arrow::Status status = AllocateResizableBuffer(arrow::default_memory_pool(), std::max<int64_t>(nbytes, 0), &buffer);
+	if(!status.ok()) {
+		return status;
+	}
+
+	auto result = this->ReadAt(position, nbytes, buffer->mutable_data());
+	if(!result.ok()) {
+		return result.status();
+	}
+	status = buffer->Resize(result.ValueOrDie());
+	if(!status.ok()) {
+		return status;
+	}
+	return std::static_pointer_cast<arrow::Buffer>(buffer);
+}
+
+arrow::Result<int64_t> BufferedReadableFile::ReadAt(int64_t position, int64_t nbytes, void * out) {
+	auto sizeResult = this->GetSize();
+	if(!sizeResult.ok()) {
+		return sizeResult.status();
+	}
+	const int64_t fileSize = sizeResult.ValueOrDie();
+	nbytes = std::min(nbytes, fileSize - position);
+	if(nbytes <= 0) {
+		return 0;
+	}
+	uint8_t * destination = static_cast<uint8_t *>(out);
+
+	// without windows the reads go straight to the file
+	if(this->options.readAheadSize <= 0 && this->options.maxPrefetchWindows <= 0) {
+		const int64_t bytesRead = this->isBigRead(nbytes) ? this->parallelFetch(position, nbytes, destination)
+														  : this->countedFetch(position, nbytes, destination);
+		if(bytesRead < 0) {
+			return arrow::Status::IOError("Could not read " + std::to_string(nbytes) + " bytes at position " +
+										  std::to_string(position));
+		}
+		return bytesRead;
+	}
+
+	int64_t done = 0;
+	bool fetched = false;
+	std::unique_lock<std::mutex> lock(this->windowsMutex);
+	while(done < nbytes) {
+		const int64_t current = position + done;
+		const int64_t copied = this->copyFromWindows(current, nbytes - done, destination + done);
+		if(copied > 0) {
+			done += copied;
+			continue;
+		}
+
+		// the bytes are on their way, fetching them again would only add another request
+		if(this->inFlightRange.first <= current && current < this->inFlightRange.first + this->inFlightRange.second) {
+			this->prefetchCondition.wait(lock);
+			continue;
+		}
+		// big reads would only evict the windows, so the rest goes straight to the file, with the hinted ranges it covers
+		if(this->isBigRead(nbytes - done)) {
+			const int64_t end = position + nbytes;
+			this->pendingRanges.erase(std::remove_if(this->pendingRanges.begin(),
+										  this->pendingRanges.end(),
+										  [current, end](const std::pair<int64_t, int64_t> & range) {
+											  return current <= range.first && range.first + range.second <= end;
+										  }),
+				this->pendingRanges.end());
+			lock.unlock();
+			const int64_t bytesRead = this->parallelFetch(current, nbytes - done, destination + done);
+			lock.lock();
+			if(bytesRead < 0 && done == 0) {
+				return arrow::Status::IOError("Could not read " + std::to_string(nbytes) + " bytes at position " +
+											  std::to_string(position));
+			}
+			done += std::max<int64_t>(bytesRead, 0);
+			fetched = true;
+			break;
+		}
+		// a hinted range that was not prefetched yet is fetched whole by this read instead
+		int64_t windowSize = std::max(nbytes - done, this->options.readAheadSize);
+		auto pending = std::find_if(this->pendingRanges.begin(),
+			this->pendingRanges.end(),
+			[current](const std::pair<int64_t, int64_t> & range) {
+				return range.first <= current && current < range.first + range.second;
+			});
+		if(pending != this->pendingRanges.end()) {
+			windowSize = std::max(windowSize, pending->first + pending->second - current);
+			this->pendingRanges.erase(pending);
+		}
+		lock.unlock();
+
+		Window window;
+		window.start = current;
+		window.data.resize(std::min(windowSize, fileSize - window.start));
+		const int64_t bytesRead = this->countedFetch(window.start, window.data.size(), window.data.data());
+		lock.lock();
+		if(bytesRead <= 0) {
+			if(done > 0) {
+				break;
+			}
+			return arrow::Status::IOError("Could not read " + std::to_string(nbytes) + " bytes at position " +
+										  std::to_string(position));
+		}
+		window.data.resize(bytesRead);
+		fetched = true;
+
+		window.lastUse = ++this->useCounter;
+		if(this->windows.size() < static_cast<size_t>(std::max(this->options.maxWindows, 1))) {
+			this->windows.push_back(std::move(window));
+		} else {
+			auto leastRecentlyUsed = std::min_element(this->windows.begin(),
+				this->windows.end(),
+				[](const Window & a, const Window & b) { return a.lastUse < b.lastUse; });
+			*leastRecentlyUsed = std::move(window);
+		}
+	}
+
+	if(!fetched) {
+		this->bufferedReads++;
+	}
+	return done;
+}
+
+ReadStatistics BufferedReadableFile::getReadStatistics() const {
+	ReadStatistics statistics;
+	statistics.requests = this->requests;
+	statistics.bytes = this->bytes;
+	statistics.latencyMicroseconds = this->latencyMicroseconds;
+	statistics.bufferedReads = this->bufferedReads;
+	return statistics;
+}
+
+bool BufferedReadableFile::isBigRead(int64_t nbytes) const {
+	return this->options.parallelChunkSize > 0 && nbytes >= 2 * this->options.parallelChunkSize;
+}
+
+int64_t BufferedReadableFile::countedFetch(int64_t position, int64_t nbytes, uint8_t * out) {
+	const auto start = std::chrono::steady_clock::now();
+	const int64_t bytesRead = this->fetchRange(position, nbytes, out);
+	const auto elapsed = std::chrono::steady_clock::now() - start;
+
+	this->requests++;
+	this->latencyMicroseconds += std::chrono::duration_cast<std::chrono::microseconds>(elapsed).count();
+	if(bytesRead > 0) {
+		this->bytes += bytesRead;
+	}
+	return bytesRead;
+}
+
+int64_t BufferedReadableFile::parallelFetch(int64_t position, int64_t nbytes, uint8_t * out) {
+	const int64_t chunkSize = this->options.parallelChunkSize;
+	const int64_t numChunks = (nbytes + chunkSize - 1) / chunkSize;
+
+	std::vector<int64_t> chunkBytesRead(numChunks, 0);
+	std::atomic<int64_t> nextChunk(0);
+	std::vector<BlazingThread> threads(std::min<int64_t>(std::max(this->options.maxParallelRequests, 1), numChunks));
+	for(auto & thread : threads) {
+		thread = BlazingThread([&]() {
+			for(int64_t chunk = nextChunk++; chunk < numChunks; chunk = nextChunk++) {
+				const int64_t offset = chunk * chunkSize;
+				chunkBytesRead[chunk] = this->countedFetch(position + offset, std::min(chunkSize, nbytes - offset), out + offset);
+			}
+		});
+	}
+	for(auto & thread : threads) {
+		thread.join();
+	}
+
+	// the chunks are contiguous, so the read stops at the first one that is short
+	int64_t bytesRead = 0;
+	for(int64_t chunk = 0; chunk < numChunks; chunk++) {
+		if(chunkBytesRead[chunk] < 0) {
+			return bytesRead > 0 ? bytesRead : -1;
+		}
+		bytesRead += chunkBytesRead[chunk];
+		if(chunkBytesRead[chunk] < std::min(chunkSize, nbytes - chunk * chunkSize)) {
+			break;
+		}
+	}
+	return bytesRead;
+}
+
+int64_t BufferedReadableFile::copyFromWindows(int64_t position, int64_t nbytes, uint8_t * out) {
+	for(auto window = this->prefetchedWindows.begin(); window != this->prefetchedWindows.end(); ++window) {
+		const int64_t windowEnd = window->start + static_cast<int64_t>(window->data.size());
+		if(window->start <= position && position < windowEnd) {
+			const int64_t count = std::min(nbytes, windowEnd - position);
+			std::memcpy(out, window->data.data() + (position - window->start), count);
+			if(position + count == windowEnd) {
+				// the windows before this one were skipped by the reader, so they will not be read either
+				this->prefetchedWindows.erase(this->prefetchedWindows.begin(), window + 1);
+				this->prefetchCondition.notify_all();
+			}
+			return count;
+		}
+	}
+
+	for(auto & window : this->windows) {
+		const int64_t windowEnd = window.start + static_cast<int64_t>(window.data.size());
+		if(window.start <= position && position < windowEnd) {
+			const int64_t count = std::min(nbytes, windowEnd - position);
+			std::memcpy(out, window.data.data() + (position - window.start), count);
+			window.lastUse = ++this->useCounter;
+			return count;
+		}
+	}
+	return 0;
+}
+
+void BufferedReadableFile::willNeed(std::vector<std::pair<int64_t, int64_t>> ranges) {
+	if(this->options.maxPrefetchWindows <= 0 || ranges.empty()) {
+		return;
+	}
+	auto sizeResult = this->GetSize();
+	if(!sizeResult.ok()) {
+		return;
+	}
+	const int64_t fileSize = sizeResult.ValueOrDie();
+
+	// nearby ranges are coalesced like the reads, but each prefetched window is kept small since it stays in memory
+	// until it is read
+	const int64_t maxWindowSize = std::max(this->options.readAheadSize, 2 * this->options.parallelChunkSize);
+	std::vector<std::pair<int64_t, int64_t>> coalesced;
+	for(const auto & range : ranges) {
+		const int64_t start = std::max<int64_t>(range.first, 0);
+		const int64_t end = std::min(range.first + range.second, fileSize);
+		if(start >= end) {
+			continue;
+		}
+		if(!coalesced.empty()) {
+			auto & last = coalesced.back();
+			const int64_t lastEnd = last.first + last.second;
+			if(start >= last.first && start <= lastEnd + this->options.readAheadSize &&
+				std::max(end, lastEnd) - last.first <= maxWindowSize) {
+				last.second = std::max(end, lastEnd) - last.first;
+				continue;
+			}
+		}
+		coalesced.emplace_back(start, end - start);
+	}
+
+	std::lock_guard<std::mutex> lock(this->windowsMutex);
+	if(this->prefetchStopped) {
+		return;
+	}
+	this->pendingRanges.insert(this->pendingRanges.end(), coalesced.begin(), coalesced.end());
+	if(!this->prefetchStarted) {
+		this->prefetchStarted = true;
+		this->prefetchThread = BlazingThread(&BufferedReadableFile::prefetch, this);
+	}
+	this->prefetchCondition.notify_all();
+}
+
+void BufferedReadableFile::stopPrefetching() {
+	{
+		std::lock_guard<std::mutex> lock(this->windowsMutex);
+		this->prefetchStopped = true;
+		this->pendingRanges.clear();
+		this->prefetchCondition.notify_all();
+		if(!this->prefetchStarted) {
+			return;
+		}
+		this->prefetchStarted = false;
+	}
+	this->prefetchThread.join();
+}
+
+void BufferedReadableFile::prefetch() {
+	std::unique_lock<std::mutex> lock(this->windowsMutex);
+	while(true) {
+		this->prefetchCondition.wait(lock, [this]() {
+			return this->prefetchStopped || (!this->pendingRanges.empty() &&
+												this->prefetchedWindows.size() <
+													static_cast<size_t>(this->options.maxPrefetchWindows));
+		});
+		if(this->prefetchStopped) {
+			return;
+		}
+
+		Window window;
+		window.start = this->pendingRanges.front().first;
+		window.data.resize(this->pendingRanges.front().second);
+		this->inFlightRange = this->pendingRanges.front();
+		this->pendingRanges.pop_front();
+		lock.unlock();
+
+		const int64_t nbytes = window.data.size();
+		const int64_t bytesRead = this->isBigRead(nbytes)
+									  ? this->parallelFetch(window.start, nbytes, window.data.data())
+									  : this->countedFetch(window.start, nbytes, window.data.data());
+
+		lock.lock();
+		this->inFlightRange = std::make_pair(0, 0);
+		if(bytesRead > 0) {
+			window.data.resize(bytesRead);
+			window.lastUse = ++this->useCounter;
+			this->prefetchedWindows.push_back(std::move(window));
+		}
+		this->prefetchCondition.notify_all();
+	}
+}
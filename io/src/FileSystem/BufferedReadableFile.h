@@ -0,0 +1,116 @@
+/*
+ * Copyright 2017 BlazingDB, Inc.
+ */
+
+#ifndef _BUFFERED_READABLE_FILE_H_
+#define _BUFFERED_READABLE_FILE_H_
+
+#include <atomic>
+#include <condition_variable>
+#include <cstdint>
+#include <deque>
+#include <memory>
+#include <mutex>
+#include <utility>
+#include <vector>
+
+#include "arrow/io/interfaces.h"
+#include "arrow/status.h"
+
+#include "ExceptionHandling/BlazingThread.h"
+#include "FileSystem/ReadAheadOptions.h"
+
+struct ReadStatistics {
+	int64_t requests;
+	int64_t bytes;
+	int64_t latencyMicroseconds;  // added up for all the requests
+	int64_t bufferedReads;		  // reads served only from the read ahead windows
+};
+
+/**
+ * @brief A readable file for object stores, where every request has a high latency no matter how small it is.
+ *
+ * Each request reads at least readAheadSize bytes, and the bytes that were read ahead are kept in a few windows, so
+ * that the many small reads at nearby positions of a parquet or orc reader (footer, page headers, column chunks) are
+ * coalesced into one request. Big reads are split in parallel ranged requests instead.
+ * The readers that know which ranges they will read (like the parquet reader, from the footer) can hint them with
+ * willNeed, and a background thread keeps up to maxPrefetchWindows of them fetched ahead of the reads.
+ * Derived classes only implement the requests of a byte range and of the size of the file, and must call
+ * stopPrefetching in their destructor, since the prefetching thread calls fetchRange.
+ */
+class BufferedReadableFile : public arrow::io::RandomAccessFile {
+public:
+	explicit BufferedReadableFile(const ReadAheadOptions & options = getDefaultReadAheadOptions());
+	virtual ~BufferedReadableFile();
+
+	arrow::Status Close() override;
+	bool closed() const override;
+
+	arrow::Result<int64_t> GetSize() override;
+
+	arrow::Result<int64_t> Read(int64_t nbytes, void * out) override;
+	arrow::Result<std::shared_ptr<arrow::Buffer>> Read(int64_t nbytes) override;
+
+	arrow::Result<int64_t> ReadAt(int64_t position, int64_t nbytes, void * out) override;
+	arrow::Result<std::shared_ptr<arrow::Buffer>> ReadAt(int64_t position, int64_t nbytes) override;
+
+	bool supports_zero_copy() const override;
+
+	arrow::Status Seek(int64_t position) override;
+	arrow::Result<int64_t> Tell() const override;
+
+	ReadStatistics getReadStatistics() const;
+
+	// the (position, length) ranges that will be read soon, in the order they will be read
+	void willNeed(std::vector<std::pair<int64_t, int64_t>> ranges);
+
+protected:
+	void stopPrefetching();
+
+	// one request of the bytes [position, position + nbytes), returns how many were read or -1 if the request failed
+	virtual int64_t fetchRange(int64_t position, int64_t nbytes, uint8_t * out) = 0;
+	// returns -1 if the size could not be read
+	virtual int64_t fetchSize() = 0;
+
+private:
+	struct Window {
+		int64_t start;
+		std::vector<uint8_t> data;
+		uint64_t lastUse;
+	};
+
+	// big reads are split in parallel requests
+	bool isBigRead(int64_t nbytes) const;
+	int64_t countedFetch(int64_t position, int64_t nbytes, uint8_t * out);
+	int64_t parallelFetch(int64_t position, int64_t nbytes, uint8_t * out);
+	// copies what the windows have from position on, returns how many bytes were copied. windowsMutex must be held
+	int64_t copyFromWindows(int64_t position, int64_t nbytes, uint8_t * out);
+	void prefetch();
+
+	const ReadAheadOptions options;
+	int64_t position;
+	bool isClosed;
+
+	std::mutex sizeMutex;
+	int64_t size;  // -1 until it is read
+
+	std::mutex windowsMutex;
+	std::vector<Window> windows;
+	uint64_t useCounter;
+
+	// guarded by windowsMutex too
+	std::condition_variable prefetchCondition;
+	std::deque<std::pair<int64_t, int64_t>> pendingRanges;
+	std::pair<int64_t, int64_t> inFlightRange;  // the range being prefetched, length 0 if none
+	std::deque<Window> prefetchedWindows;		// in the order they will be read, each is dropped once it is read
+	BlazingThread prefetchThread;
+	bool prefetchStarted;
+	bool prefetchStopped;
+
+	std::atomic<int64_t> requests;
+	std::atomic<int64_t> bytes;
+	std::atomic<int64_t> latencyMicroseconds;
+	std::atomic<int64_t> bufferedReads;
+};
+
+#endif /* _BUFFERED_READABLE_FILE_H_ */
@@ -5,15 +5,21 @@
 
 #include "FileStatus.h"
 
-FileStatus::FileStatus() : uri(Uri()), fileType(FileType::UNDEFINED), fileSize(0) {}
+FileStatus::FileStatus() : uri(Uri()), fileType(FileType::UNDEFINED), fileSize(0), modificationTime(0) {}
 
 FileStatus::FileStatus(const Uri & uri, FileType fileType, unsigned long long fileSize)
-	: uri(uri), fileType(fileType), fileSize(fileSize) {}
+	: uri(uri), fileType(fileType), fileSize(fileSize), modificationTime(0) {}
 
-FileStatus::FileStatus(const FileStatus & other) : uri(other.uri), fileType(other.fileType), fileSize(other.fileSize) {}
+FileStatus::FileStatus(
+	const Uri & uri, FileType fileType, unsigned long long fileSize, unsigned long long modificationTime)
+	: uri(uri), fileType(fileType), fileSize(fileSize), modificationTime(modificationTime) {}
+
+FileStatus::FileStatus(const FileStatus & other)
+	: uri(other.uri), fileType(other.fileType), fileSize(other.fileSize), modificationTime(other.modificationTime) {}
 
 FileStatus::FileStatus(FileStatus && other)
-	: uri(std::move(other.uri)), fileType(std::move(other.fileType)), fileSize(std::move(other.fileSize)) {}
+	: uri(std::move(other.uri)), fileType(std::move(other.fileType)), fileSize(std::move(other.fileSize)),
+	  modificationTime(std::move(other.modificationTime)) {}
 
 FileStatus::~FileStatus() {}
 
@@ -23,6 +29,8 @@ FileType FileStatus::getFileType() const noexcept { return this->fileType; }
 
 unsigned long long FileStatus::getFileSize() const noexcept { return this->fileSize; }
 
+unsigned long long FileStatus::getModificationTime() const noexcept { return this->modificationTime; }
+
 bool FileStatus::isFile() const noexcept { return (this->fileType == FileType::FILE); }
 
 bool FileStatus::isDirectory() const noexcept { return (this->fileType == FileType::DIRECTORY); }
@@ -35,6 +43,7 @@ FileStatus & FileStatus::operator=(const FileStatus & other) {
 	this->uri = other.uri;
 	this->fileType = other.fileType;
 	this->fileSize = other.fileSize;
+	this->modificationTime = other.modificationTime;
 
 	return *this;
 }
@@ -43,6 +52,7 @@ FileStatus & FileStatus::operator=(FileStatus && other) {
 	this->uri = std::move(other.uri);
 	this->fileType = std::move(other.fileType);
 	this->fileSize = std::move(other.fileSize);
+	this->modificationTime = std::move(other.modificationTime);
 
 	return *this;
 }
@@ -51,8 +61,9 @@ bool FileStatus::operator==(const FileStatus & other) const {
 	const bool pathEquals = (this->uri == other.uri);
 	const bool fileTypeEquals = (this->fileType == other.fileType);
 	const bool fileSizeEquals = (this->fileSize == other.fileSize);
+	const bool modificationTimeEquals = (this->modificationTime == other.modificationTime);
 
-	const bool equals = (pathEquals && fileTypeEquals && fileSizeEquals);
+	const bool equals = (pathEquals && fileTypeEquals && fileSizeEquals && modificationTimeEquals);
 
 	return equals;
 }
@@ -15,6 +15,7 @@ class FileStatus {
 public:
 	FileStatus();
 	FileStatus(const Uri & uri, FileType fileType, unsigned long long fileSize);
+	FileStatus(const Uri & uri, FileType fileType, unsigned long long fileSize, unsigned long long modificationTime);
 	FileStatus(const FileStatus & other);
 	FileStatus(FileStatus && other);
 	~FileStatus();
@@ -22,6 +23,7 @@ public:
 	Uri getUri() const noexcept;
 	FileType getFileType() const noexcept;
 	unsigned long long getFileSize() const noexcept;
+	unsigned long long getModificationTime() const noexcept;  // milliseconds since epoch, 0 if unknown
 
 	// Helpers
 	bool isFile() const noexcept;
@@ -41,7 +43,6 @@ public:
 
 	 unsigned long long getBlockSize() const noexcept;
 
-	 unsigned long long getModificationTime() const noexcept;
 	 unsigned long long getAccessTime() const noexcept;
 
 	 std::string getOwner() const noexcept;
@@ -52,6 +53,7 @@ private:
 	Uri uri;
 	FileType fileType;
 	unsigned long long fileSize;
+	unsigned long long modificationTime;
 };
 
 #endif /* _BLAZING_FILE_STATUS_H_ */
@@ -8,6 +8,7 @@
 
 #include "arrow/io/interfaces.h"
 
+#include "FileSystem/BlockLocation.h"
 #include "FileSystem/FileFilter.h"
 #include "FileSystem/FileSystemConnection.h"
 
@@ -34,6 +35,16 @@ public:
 	virtual bool exists(const Uri & uri) const = 0;
 	virtual FileStatus getFileStatus(const Uri & uri) const = 0;
 
+	/**
+	 * @brief Returns the blocks of the file and the hosts that hold a replica of each block.
+	 *
+	 * Only file systems that expose data locality (HDFS) implement it, the others return an empty list.
+	 *
+	 * @param uri must represent a file
+	 * @return list of block locations ordered by offset
+	 */
+	virtual std::vector<BlockLocation> getBlockLocations(const Uri & uri) const { return std::vector<BlockLocation>(); }
+
 	// List
 
 	/**
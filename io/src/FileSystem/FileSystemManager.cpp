@@ -55,6 +55,10 @@ bool FileSystemManager::exists(const Uri & uri) const { return this->pimpl->exis
 
 FileStatus FileSystemManager::getFileStatus(const Uri & uri) const { return this->pimpl->getFileStatus(uri); }
 
+std::vector<BlockLocation> FileSystemManager::getBlockLocations(const Uri & uri) const {
+	return this->pimpl->getBlockLocations(uri);
+}
+
 std::vector<FileStatus> FileSystemManager::list(const Uri & uri, const FileFilter & filter) const {
 	return this->pimpl->list(uri, filter);
 }
@@ -94,3 +98,15 @@ std::shared_ptr<arrow::io::RandomAccessFile> FileSystemManager::openReadable(con
 std::shared_ptr<arrow::io::OutputStream> FileSystemManager::openWriteable(const Uri & uri) const {
 	return this->pimpl->openWriteable(uri);
 }
+
+void FileSystemManager::setMetadataCacheTTL(long long ttlMilliseconds) {
+	this->pimpl->setMetadataCacheTTL(ttlMilliseconds);
+}
+
+long long FileSystemManager::getMetadataCacheTTL() const { return this->pimpl->getMetadataCacheTTL(); }
+
+std::size_t FileSystemManager::invalidateMetadataCache(const std::string & prefix) const {
+	return this->pimpl->invalidateMetadataCache(prefix);
+}
+
+MetadataCacheStats FileSystemManager::getMetadataCacheStats() const { return this->pimpl->getMetadataCacheStats(); }
@@ -10,9 +10,16 @@
 
 #include "arrow/io/interfaces.h"
 
+#include "FileSystem/BlockLocation.h"
 #include "FileSystem/FileFilter.h"
 #include "FileSystem/FileSystemEntity.h"
 
+struct MetadataCacheStats {
+	std::size_t hits;
+	std::size_t misses;
+	std::size_t entries;
+};
+
 class FileSystemManager {
 public:
 	FileSystemManager();
@@ -26,6 +33,7 @@ public:
 	// Query
 	bool exists(const Uri & uri) const;
 	FileStatus getFileStatus(const Uri & uri) const;
+	std::vector<BlockLocation> getBlockLocations(const Uri & uri) const;
 
 	// List
 	std::vector<FileStatus> list(const Uri & uri, const FileFilter & filter) const;
@@ -45,6 +53,13 @@ public:
 	std::shared_ptr<arrow::io::RandomAccessFile> openReadable(const Uri & uri) const;
 	std::shared_ptr<arrow::io::OutputStream> openWriteable(const Uri & uri) const;
 
+	// Metadata cache: the results of exists, getFileStatus, list (by file type or wildcard) and listResourceNames
+	// are reused for ttlMilliseconds, 0 disables the cache. Writes done through this manager invalidate their entries
+	void setMetadataCacheTTL(long long ttlMilliseconds);
+	long long getMetadataCacheTTL() const;
+	std::size_t invalidateMetadataCache(const std::string & prefix) const;  // returns the number of entries removed
+	MetadataCacheStats getMetadataCacheStats() const;
+
 private:
 	class Private;
 	const std::unique_ptr<Private> pimpl;  // private implementation
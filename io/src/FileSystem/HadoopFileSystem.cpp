@@ -29,6 +29,11 @@ FileStatus HadoopFileSystem::getFileStatus(const Uri & uri) const {
 	return result;
 }
 
+std::vector<BlockLocation> HadoopFileSystem::getBlockLocations(const Uri & uri) const {
+	const std::vector<BlockLocation> result = this->pimpl->getBlockLocations(uri);
+	return result;
+}
+
 std::vector<FileStatus> HadoopFileSystem::list(const Uri & uri, const FileFilter & filter) const {
 	const std::vector<FileStatus> result = this->pimpl->list(uri, filter);
 	return result;
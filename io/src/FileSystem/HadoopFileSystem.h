@@ -27,6 +27,7 @@ public:
 	// Query
 	bool exists(const Uri & uri) const;
 	FileStatus getFileStatus(const Uri & uri) const;
+	std::vector<BlockLocation> getBlockLocations(const Uri & uri) const;
 
 	// List
 	std::vector<FileStatus> list(const Uri & uri, const FileFilter & filter) const;
@@ -0,0 +1,23 @@
+/*
+ * Copyright 2017 BlazingDB, Inc.
+ */
+
+#ifndef _READ_AHEAD_OPTIONS_H_
+#define _READ_AHEAD_OPTIONS_H_
+
+#include <cstdint>
+
+// How the files of object stores (like S3) are read, see BufferedReadableFile
+struct ReadAheadOptions {
+	int64_t readAheadSize = 4 * 1024 * 1024;		// every request reads at least this many bytes, 0 disables the buffering
+	int maxWindows = 4;								// how many read ahead windows are kept per file (about one per column read)
+	int64_t parallelChunkSize = 16 * 1024 * 1024;  // reads of at least twice this size are split in requests of this size
+	int maxParallelRequests = 8;					// how many of those requests run at the same time
+	int maxPrefetchWindows = 2;  // how many of the ranges hinted with willNeed are fetched ahead of the reads, 0 disables it
+};
+
+/// The read ahead options used by the files that are opened from now on
+void setDefaultReadAheadOptions(const ReadAheadOptions & options);
+ReadAheadOptions getDefaultReadAheadOptions();
+
+#endif /* _READ_AHEAD_OPTIONS_H_ */
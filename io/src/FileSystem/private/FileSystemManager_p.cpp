@@ -5,7 +5,9 @@
 
 #include "FileSystemManager_p.h"
 
+#include <algorithm>
 #include <iostream>
+#include <mutex>
 
 #include "ExceptionHandling/BlazingException.h"
 #include "FileSystemFactory.h"
@@ -14,7 +16,61 @@
 
 namespace Logging = Library::Logging;
 
-FileSystemManager::Private::Private() {}
+FileSystemCache::FileSystemCache(std::size_t maxEntries, long long idleTTLMilliseconds)
+	: maxEntries(maxEntries), idleTTLMilliseconds(idleTTLMilliseconds) {}
+
+std::shared_ptr<FileSystemInterface> FileSystemCache::get(
+	const FileSystemConnection & fileSystemConnection, const Path & root) {
+	std::lock_guard<std::mutex> lock(this->mutex);
+	const auto now = std::chrono::steady_clock::now();
+	this->evict(now);
+	for(auto it = this->entries.begin(); it != this->entries.end(); ++it) {
+		if(it->fileSystem->getFileSystemConnection() == fileSystemConnection && it->fileSystem->getRoot() == root) {
+			it->lastUsed = now;
+			this->entries.splice(this->entries.begin(), this->entries, it);
+			return it->fileSystem;
+		}
+	}
+
+	FileSystemFactory fileSystemFactory;
+	std::shared_ptr<FileSystemInterface> fileSystem = fileSystemFactory.createFileSystem(fileSystemConnection, root);
+	if(fileSystem != nullptr) {
+		this->entries.push_front(Entry{fileSystem, now});
+		while(this->entries.size() > this->maxEntries) {
+			this->entries.pop_back();
+		}
+	}
+	return fileSystem;
+}
+
+std::size_t FileSystemCache::size() {
+	std::lock_guard<std::mutex> lock(this->mutex);
+	this->evict(std::chrono::steady_clock::now());
+	return this->entries.size();
+}
+
+void FileSystemCache::evict(std::chrono::steady_clock::time_point now) {
+	for(auto it = this->entries.begin(); it != this->entries.end();) {
+		// a file system that a manager holds is not idle, only the cache has the entries no manager uses
+		if(it->fileSystem.use_count() > 1) {
+			it->lastUsed = now;
+		}
+		const auto idle = std::chrono::duration_cast<std::chrono::milliseconds>(now - it->lastUsed).count();
+		if(idle >= this->idleTTLMilliseconds) {
+			it = this->entries.erase(it);
+		} else {
+			++it;
+		}
+	}
+}
+
+std::shared_ptr<FileSystemInterface> getCachedFileSystem(const FileSystemConnection & fileSystemConnection, const Path & root) {
+	// at most 64 connections, the ones no manager used for 10 minutes are closed
+	static FileSystemCache cache(64, 10 * 60 * 1000);
+	return cache.get(fileSystemConnection, root);
+}
+
+FileSystemManager::Private::Private() : metadataCacheTTL(0), metadataCacheHits(0), metadataCacheMisses(0) {}
 
 FileSystemManager::Private::~Private() {}
 
@@ -35,7 +91,8 @@ bool FileSystemManager::Private::registerFileSystem(const FileSystemEntity & fil
 	int foundIndex = -1;
 
 	for(int i = 0; i < this->fileSystems.size(); ++i) {
-		const bool found = (this->fileSystems[i]->getFileSystemConnection() == fileSystemConnection) &&
+		const bool found = this->fileSystems[i] != nullptr &&
+						   (this->fileSystems[i]->getFileSystemConnection() == fileSystemConnection) &&
 						   this->fileSystems[i]->getRoot() == root;
 
 		if(found) {
@@ -45,8 +102,7 @@ bool FileSystemManager::Private::registerFileSystem(const FileSystemEntity & fil
 	}
 
 	if(foundIndex == -1) {  // if fs was not found
-		FileSystemFactory fileSystemFactory;
-		auto fileSystem = fileSystemFactory.createFileSystem(fileSystemConnection, root);
+		auto fileSystem = getCachedFileSystem(fileSystemConnection, root);
 
 		if(fileSystem == nullptr) {
 			Logging::Logger().logError("Was unable to create and connect to filesystem");
@@ -54,58 +110,48 @@ bool FileSystemManager::Private::registerFileSystem(const FileSystemEntity & fil
 			return false;
 		}
 
-		this->fileSystems.push_back(std::move(fileSystem));
-		this->fileSystemIds[authority] = this->fileSystems.size() - 1;
+		// the ids released by deregisterFileSystem are reused, so registering again does not grow the file systems
+		auto freeId = std::find(this->fileSystems.begin(), this->fileSystems.end(), nullptr);
+		if(freeId == this->fileSystems.end()) {
+			freeId = this->fileSystems.insert(freeId, fileSystem);
+		} else {
+			*freeId = fileSystem;
+		}
+		this->fileSystemIds[authority] = freeId - this->fileSystems.begin();
 	} else {  // only reuse fs that aren't null and were connected
 		Logging::Logger().logTrace("filesystem previously created. It was found and will be reused");
 		this->fileSystemIds[authority] = foundIndex;
 	}
 
-	const int fileSystemId = this->fileSystemIds[authority];
-
 	this->roots[authority] = root;
 
+	// the authority can now point to a different file system, so nothing cached before can be trusted
+	this->invalidateMetadataCache("");
+
 	return true;
 }
 
 bool FileSystemManager::Private::deregisterFileSystem(const std::string & authority) {
-	bool found = false;
-
-	for(const auto & entry : this->fileSystemIds) {
-		if(authority == entry.first) {
-			found = true;
-			break;
-		}
-	}
-
-	if(found == false) {
+	if(this->fileSystemIds.find(authority) == this->fileSystemIds.end()) {
 		Logging::Logger().logTrace("deregisterFileSystem: filesystem authority not found");
 		// TODO percy notify error: not found
 		return false;
 	}
 
+	// the id stays, so that the ids of the other authorities are still valid, but the file system is released
+	// when no other authority uses it and its id is reused by the next file system that is registered
 	const int fileSystemId = this->fileSystemIds[authority];
-
 	this->roots.erase(authority);
 	this->fileSystemIds.erase(authority);
-
-	// if nobody else is using the associated file system then delete the file system too
-	bool deleteFileSystem = true;
-
+	bool used = false;
 	for(const auto & entry : this->fileSystemIds) {
-		const int usedFileSystemId = this->fileSystemIds[entry.first];
-
-		if(usedFileSystemId == fileSystemId) {
-			deleteFileSystem = false;
-			break;
-		}
+		used = used || entry.second == fileSystemId;
 	}
-
-	if(deleteFileSystem) {
-		auto fileSystem =
-			std::move(this->fileSystems[fileSystemId]);  // transfer ownership so it can be deleted within this scope
-		this->fileSystems.erase(this->fileSystems.begin() + fileSystemId);
+	if(!used) {
+		this->fileSystems[fileSystemId] = nullptr;
 	}
+	this->invalidateMetadataCache("");
+	return true;
 }
 
 bool FileSystemManager::Private::exists(const Uri & uri) const {
@@ -115,7 +161,9 @@ bool FileSystemManager::Private::exists(const Uri & uri) const {
 	try {
 		const int fileSystemId = this->verifyFileSystemUri(uri);
 
-		const auto ret = this->fileSystems.at(fileSystemId)->exists(uri);
+		const auto ret = this->cached(this->existsCache, uri.toString(), [&]() {
+			return this->fileSystems.at(fileSystemId)->exists(uri);
+		});
 
 		return ret;
 	} catch(const std::exception & e) {
@@ -135,7 +183,9 @@ FileStatus FileSystemManager::Private::getFileStatus(const Uri & uri) const {
 
 		// TODO check fileSystemId ... manage error cases
 
-		const auto ret = this->fileSystems.at(fileSystemId)->getFileStatus(uri);
+		const auto ret = this->cached(this->fileStatusCache, uri.toString(), [&]() {
+			return this->fileSystems.at(fileSystemId)->getFileStatus(uri);
+		});
 
 		return ret;
 	} catch(const std::exception & e) {
@@ -145,6 +195,24 @@ FileStatus FileSystemManager::Private::getFileStatus(const Uri & uri) const {
 	}
 }
 
+std::vector<BlockLocation> FileSystemManager::Private::getBlockLocations(const Uri & uri) const {
+	if(uri.isValid() == false) {
+		// TODO percy thrown exception
+	}
+
+	try {
+		const int fileSystemId = this->verifyFileSystemUri(uri);
+
+		const auto ret = this->fileSystems.at(fileSystemId)->getBlockLocations(uri);
+
+		return ret;
+	} catch(const std::exception & e) {
+		std::string uriStr = uri.toString();
+		Logging::Logger().logError("Caught error in getBlockLocations with Uri: " + uriStr);
+		throw;
+	}
+}
+
 std::vector<FileStatus> FileSystemManager::Private::list(const Uri & uri, const FileFilter & filter) const {
 	if(uri.isValid() == false) {
 		// TODO percy thrown exception
@@ -175,7 +243,10 @@ std::vector<FileStatus> FileSystemManager::Private::list(
 
 		// TODO check fileSystemId ... manage error cases
 
-		const auto ret = this->fileSystems.at(fileSystemId)->list(uri, fileType, wildcard);
+		const std::string key = uri.toString() + "\n" + std::to_string(static_cast<int>(fileType)) + "\n" + wildcard;
+		const auto ret = this->cached(this->fileStatusListCache, key, [&]() {
+			return this->fileSystems.at(fileSystemId)->list(uri, fileType, wildcard);
+		});
 
 		return ret;
 	} catch(const std::exception & e) {
@@ -194,7 +265,9 @@ std::vector<Uri> FileSystemManager::Private::list(const Uri & uri, const std::st
 
 		// TODO check fileSystemId ... manage error cases
 
-		const auto ret = this->fileSystems.at(fileSystemId)->list(uri, wildcard);
+		const auto ret = this->cached(this->uriListCache, uri.toString() + "\n" + wildcard, [&]() {
+			return this->fileSystems.at(fileSystemId)->list(uri, wildcard);
+		});
 
 		return ret;
 	} catch(const std::exception & e) {
@@ -214,7 +287,10 @@ std::vector<std::string> FileSystemManager::Private::listResourceNames(
 
 		// TODO check fileSystemId ... manage error cases
 
-		const auto ret = this->fileSystems.at(fileSystemId)->listResourceNames(uri, fileType, wildcard);
+		const std::string key = uri.toString() + "\n" + std::to_string(static_cast<int>(fileType)) + "\n" + wildcard;
+		const auto ret = this->cached(this->resourceNamesCache, key, [&]() {
+			return this->fileSystems.at(fileSystemId)->listResourceNames(uri, fileType, wildcard);
+		});
 
 		return ret;
 	} catch(const std::exception & e) {
@@ -234,7 +310,9 @@ std::vector<std::string> FileSystemManager::Private::listResourceNames(
 
 		// TODO check fileSystemId ... manage error cases
 
-		const auto ret = this->fileSystems.at(fileSystemId)->listResourceNames(uri, wildcard);
+		const auto ret = this->cached(this->resourceNamesCache, uri.toString() + "\n" + wildcard, [&]() {
+			return this->fileSystems.at(fileSystemId)->listResourceNames(uri, wildcard);
+		});
 
 		return ret;
 	} catch(const std::exception & e) {
@@ -254,6 +332,7 @@ bool FileSystemManager::Private::makeDirectory(const Uri & uri) const {
 		// TODO check fileSystemId ... manage error cases
 
 		const auto ret = this->fileSystems.at(fileSystemId)->makeDirectory(uri);
+		this->invalidateWritten(uri);
 
 		return ret;
 	} catch(const std::exception & e) {
@@ -273,9 +352,11 @@ bool FileSystemManager::Private::remove(const Uri & uri) const {
 		// TODO check fileSystemId ... manage error cases
 
 		const auto ret = this->fileSystems.at(fileSystemId)->remove(uri);
+		this->invalidateWritten(uri);
 
 		return ret;
 	} catch(BlazingFileNotFoundException & e) {
+		this->invalidateWritten(uri);
 		return true;
 	} catch(const std::exception & e) {
 		std::string uriStr = uri.toString();
@@ -303,10 +384,13 @@ bool FileSystemManager::Private::move(const Uri & src, const Uri & dst) const {
 			// TODO when we implement the copy operation in the FileSystemManager, we can replace the manual copy step
 			// and replace with a general copy
 			FileUtilv2::copyFile(src, dst);
+			this->invalidateWritten(dst);
 			return remove(src);
 
 		} else {
 			const auto ret = this->fileSystems.at(fileSystemIdSrc)->move(src, dst);
+			this->invalidateWritten(src);
+			this->invalidateWritten(dst);
 			return ret;
 		}
 
@@ -329,6 +413,7 @@ bool FileSystemManager::Private::truncateFile(const Uri & uri, long long length)
 		// TODO check fileSystemId ... manage error cases
 
 		const auto ret = this->fileSystems.at(fileSystemId)->truncateFile(uri, length);
+		this->invalidateWritten(uri);
 
 		return ret;
 	} catch(const std::exception & e) {
@@ -365,7 +450,9 @@ std::shared_ptr<arrow::io::OutputStream> FileSystemManager::Private::openWriteab
 
 		// TODO check fileSystemId ... manage error cases
 
-		return this->fileSystems.at(fileSystemId)->openWriteable(uri);
+		auto ret = this->fileSystems.at(fileSystemId)->openWriteable(uri);
+		this->invalidateWritten(uri);
+		return ret;
 	} catch(const std::exception & e) {
 		std::string uriStr = uri.toString();
 		Logging::Logger().logError("Caught error in openWriteable with Uri: " + uriStr);
@@ -373,8 +460,48 @@ std::shared_ptr<arrow::io::OutputStream> FileSystemManager::Private::openWriteab
 	}
 }
 
+void FileSystemManager::Private::setMetadataCacheTTL(long long ttlMilliseconds) {
+	this->metadataCacheTTL = ttlMilliseconds > 0 ? ttlMilliseconds : 0;
+	if(this->metadataCacheTTL == 0) {
+		this->invalidateMetadataCache("");
+	}
+}
+
+long long FileSystemManager::Private::getMetadataCacheTTL() const { return this->metadataCacheTTL; }
+
+std::size_t FileSystemManager::Private::invalidateMetadataCache(const std::string & prefix) const {
+	std::size_t count = this->existsCache.invalidate(prefix);
+	count += this->fileStatusCache.invalidate(prefix);
+	count += this->fileStatusListCache.invalidate(prefix);
+	count += this->uriListCache.invalidate(prefix);
+	count += this->resourceNamesCache.invalidate(prefix);
+	return count;
+}
+
+MetadataCacheStats FileSystemManager::Private::getMetadataCacheStats() const {
+	MetadataCacheStats stats;
+	stats.hits = this->metadataCacheHits;
+	stats.misses = this->metadataCacheMisses;
+	stats.entries = this->existsCache.size() + this->fileStatusCache.size() + this->fileStatusListCache.size() +
+					this->uriListCache.size() + this->resourceNamesCache.size();
+	return stats;
+}
+
 // Private stuff
 
+void FileSystemManager::Private::invalidateWritten(const Uri & uri) const {
+	if(this->metadataCacheTTL == 0) {
+		return;
+	}
+	// the prefix of the parent also covers the uri itself and everything under it
+	std::string uriString = uri.toString();
+	while(uriString.size() > 1 && uriString.back() == '/') {
+		uriString.pop_back();
+	}
+	const std::size_t lastSlash = uriString.rfind('/');
+	this->invalidateMetadataCache(lastSlash == std::string::npos ? uriString : uriString.substr(0, lastSlash));
+}
+
 int FileSystemManager::Private::verifyFileSystemUri(const Uri & uri) const {
 	try {
 		const int fileSystemId = this->fileSystemIds.at(uri.getAuthority());
@@ -6,13 +6,70 @@
 #ifndef _FILESYSTEM_MANAGER_PRIVATE_H_
 #define _FILESYSTEM_MANAGER_PRIVATE_H_
 
+#include <atomic>
+#include <chrono>
+#include <list>
 #include <map>
+#include <memory>
+#include <mutex>
 #include <string>
 #include <vector>
 
 #include "FileSystem/FileSystemInterface.h"
 #include "FileSystem/FileSystemManager.h"
 
+/**
+ * @brief Results of metadata calls keyed by uri, that are reused while they are younger than a ttl.
+ *
+ * Keys start with the uri they belong to, so all the entries of a prefix can be invalidated at once.
+ */
+template <typename T>
+class TimedCache {
+public:
+	bool get(const std::string & key, long long ttlMilliseconds, T & value) {
+		std::lock_guard<std::mutex> lock(this->mutex);
+		auto it = this->entries.find(key);
+		if(it == this->entries.end()) {
+			return false;
+		}
+		const auto age = std::chrono::steady_clock::now() - it->second.first;
+		if(std::chrono::duration_cast<std::chrono::milliseconds>(age).count() >= ttlMilliseconds) {
+			this->entries.erase(it);
+			return false;
+		}
+		value = it->second.second;
+		return true;
+	}
+
+	void put(const std::string & key, const T & value) {
+		std::lock_guard<std::mutex> lock(this->mutex);
+		this->entries[key] = std::make_pair(std::chrono::steady_clock::now(), value);
+	}
+
+	// returns the number of entries removed
+	std::size_t invalidate(const std::string & prefix) {
+		std::lock_guard<std::mutex> lock(this->mutex);
+		auto first = this->entries.lower_bound(prefix);
+		auto last = first;
+		std::size_t count = 0;
+		while(last != this->entries.end() && last->first.compare(0, prefix.size(), prefix) == 0) {
+			++last;
+			++count;
+		}
+		this->entries.erase(first, last);
+		return count;
+	}
+
+	std::size_t size() {
+		std::lock_guard<std::mutex> lock(this->mutex);
+		return this->entries.size();
+	}
+
+private:
+	std::mutex mutex;
+	std::map<std::string, std::pair<std::chrono::steady_clock::time_point, T>> entries;
+};
+
 // Composite pattern but we don't need to use FileSystemInterface as base class
 class FileSystemManager::Private {
 public:
@@ -25,6 +82,7 @@ public:
 	// Query
 	bool exists(const Uri & uri) const;
 	FileStatus getFileStatus(const Uri & uri) const;
+	std::vector<BlockLocation> getBlockLocations(const Uri & uri) const;
 
 	// List
 	std::vector<FileStatus> list(const Uri & uri, const FileFilter & filter) const;
@@ -44,13 +102,85 @@ public:
 	std::shared_ptr<arrow::io::RandomAccessFile> openReadable(const Uri & uri) const;
 	std::shared_ptr<arrow::io::OutputStream> openWriteable(const Uri & uri) const;
 
+	// Metadata cache
+	void setMetadataCacheTTL(long long ttlMilliseconds);
+	long long getMetadataCacheTTL() const;
+	std::size_t invalidateMetadataCache(const std::string & prefix) const;
+	MetadataCacheStats getMetadataCacheStats() const;
+
 private:
 	int verifyFileSystemUri(const Uri & uri) const;  // returns FileSystem id if ok, -1 otherwise
 
+	// returns the cached value for key, or calls fetch and caches what it returns (errors are not cached)
+	template <typename T, typename Fetch>
+	T cached(TimedCache<T> & cache, const std::string & key, Fetch fetch) const {
+		const long long ttl = this->metadataCacheTTL;
+		if(ttl <= 0) {
+			return fetch();
+		}
+		T value;
+		if(cache.get(key, ttl, value)) {
+			this->metadataCacheHits++;
+			return value;
+		}
+		this->metadataCacheMisses++;
+		value = fetch();
+		cache.put(key, value);
+		return value;
+	}
+
+	// a write makes the cached metadata of the uri and the listings of its parent stale
+	void invalidateWritten(const Uri & uri) const;
+
 private:
 	std::map<std::string, Path> roots;								// <authority, root>
 	std::map<std::string, int> fileSystemIds;						// <authority, fs id>
-	std::vector<std::unique_ptr<FileSystemInterface>> fileSystems;  // [fs id] = fs
+	std::vector<std::shared_ptr<FileSystemInterface>> fileSystems;  // [fs id] = fs
+
+	std::atomic<long long> metadataCacheTTL;  // in milliseconds, 0 disables the cache
+	mutable std::atomic<std::size_t> metadataCacheHits;
+	mutable std::atomic<std::size_t> metadataCacheMisses;
+	mutable TimedCache<bool> existsCache;
+	mutable TimedCache<FileStatus> fileStatusCache;
+	mutable TimedCache<std::vector<FileStatus>> fileStatusListCache;
+	mutable TimedCache<std::vector<Uri>> uriListCache;
+	mutable TimedCache<std::vector<std::string>> resourceNamesCache;
 };
 
+/**
+ * @brief File systems keyed by connection and root, so that registering the same connection again (for example from a
+ * new BlazingContext) reuses the S3/GCS clients and HDFS handles.
+ *
+ * The cache keeps the file systems alive. It has at most maxEntries of them, the least recently used are evicted
+ * first, and a file system that no manager uses is evicted once it was not requested for idleTTLMilliseconds.
+ */
+class FileSystemCache {
+public:
+	FileSystemCache(std::size_t maxEntries, long long idleTTLMilliseconds);
+
+	// returns the cached file system, or creates (and connects) it, returns nullptr if it could not be created
+	std::shared_ptr<FileSystemInterface> get(const FileSystemConnection & fileSystemConnection, const Path & root);
+
+	std::size_t size();
+
+private:
+	struct Entry {
+		std::shared_ptr<FileSystemInterface> fileSystem;
+		std::chrono::steady_clock::time_point lastUsed;
+	};
+
+	void evict(std::chrono::steady_clock::time_point now);
+
+	const std::size_t maxEntries;
+	const long long idleTTLMilliseconds;
+	std::mutex mutex;
+	std::list<Entry> entries;  // the most recently used first
+};
+
+/**
+ * @brief Returns the file system for the connection and root from the process wide FileSystemCache.
+ * Returns nullptr if the file system could not be created.
+ */
+std::shared_ptr<FileSystemInterface> getCachedFileSystem(const FileSystemConnection & fileSystemConnection, const Path & root);
+
 #endif /* _FILESYSTEM_MANAGER_PRIVATE_H_ */
@@ -6,8 +6,7 @@
 #ifndef SRC_UTIL_BLAZING_GOOGLECLOUDSTORAGE_READABLEFILE_H_
 #define SRC_UTIL_BLAZING_GOOGLECLOUDSTORAGE_READABLEFILE_H_
 
-#include "arrow/io/interfaces.h"
-#include "arrow/status.h"
+#include "FileSystem/BufferedReadableFile.h"
 
 // BEGIN UGLY PATCH william jp c.gonzales if we don't do this we get a compile error: Mismatched major version (always before of the 1sr google header)
 #define GOOGLE_CLOUD_CPP_GOOGLE_CLOUD_STORAGE_VERSION_INFO_H 1
@@ -28,37 +27,25 @@
 
 namespace gcs = google::cloud::storage;
 
-class GoogleCloudStorageReadableFile : public arrow::io::RandomAccessFile {
+// Each request is a ranged ReadObject, see BufferedReadableFile for how reads are coalesced, split and prefetched
+class GoogleCloudStorageReadableFile : public BufferedReadableFile {
 public:
-	GoogleCloudStorageReadableFile(std::shared_ptr<gcs::Client> gcsClient, std::string bucket, std::string key);
+	GoogleCloudStorageReadableFile(std::shared_ptr<gcs::Client> gcsClient,
+		std::string bucket,
+		std::string key,
+		const ReadAheadOptions & options = getDefaultReadAheadOptions());
 	~GoogleCloudStorageReadableFile();
 
-    arrow::Status Close() override;
-
-    arrow::Result<int64_t> GetSize() override;
-
-	arrow::Result<int64_t> Read(int64_t nbytes, void* out) override;
-
-	arrow::Result<std::shared_ptr<arrow::Buffer>> Read(int64_t nbytes) override;
-
-	arrow::Result<int64_t> ReadAt(int64_t position, int64_t nbytes, void* out) override;
-
-	arrow::Result<std::shared_ptr<arrow::Buffer>> ReadAt(int64_t position, int64_t nbytes) override;
-
-	bool supports_zero_copy() const override;
-
-	arrow::Status Seek(int64_t position) override;
-	arrow::Result<int64_t> Tell() const override;
-
 	bool isValid() { return valid; }
 
-	bool closed() const override;
+protected:
+	int64_t fetchRange(int64_t position, int64_t nbytes, uint8_t * out) override;
+	int64_t fetchSize() override;
 
 private:
 	std::shared_ptr<gcs::Client> gcsClient;
 	std::string bucketName;
 	std::string key;
-	size_t position;
 	bool valid;
 
 	ARROW_DISALLOW_COPY_AND_ASSIGN(GoogleCloudStorageReadableFile);
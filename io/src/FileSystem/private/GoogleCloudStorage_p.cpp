@@ -56,8 +56,17 @@ bool GoogleCloudStorage::Private::connect(const FileSystemConnection & fileSyste
 		throw std::runtime_error(error);
 	}
 
+	// NOTE CreateDefaultClientOptions uses the CLOUD_STORAGE_TESTBENCH_ENDPOINT env var when it is defined, so a local
+	// fake GCS endpoint can be used for testing
 	auto connConf = opts->set_project_id(projectId);
 
+	// the client is shared by all the files of this file system (and cached with it), and each file makes parallel
+	// ranged reads, so the pool has to keep enough connections for them to be reused
+	const std::size_t minConnectionPoolSize = 4 * getDefaultReadAheadOptions().maxParallelRequests;
+	if(connConf.connection_pool_size() < minConnectionPoolSize) {
+		connConf.set_connection_pool_size(minConnectionPoolSize);
+	}
+
 	this->gcsClient = std::make_shared<gcs::Client>(connConf);
 
 	const std::string bucket = this->getBucketName();
@@ -154,6 +163,8 @@ FileStatus GoogleCloudStorage::Private::getFileStatus(const Uri & uri) const {
 	if(objectMetadata) {  // if success
 		std::string contentType = objectMetadata->content_type();
 		const long long contentLength = objectMetadata->size();
+		const unsigned long long modificationTime = std::chrono::duration_cast<std::chrono::milliseconds>(
+			objectMetadata->updated().time_since_epoch()).count();
 		FileType fileType = FileType::UNDEFINED;
 
 		if((contentLength == SIZE_OF_OBJECT_DIRECTORY) || (contentLength == 0)) {  // may be a directory
@@ -177,10 +188,10 @@ FileStatus GoogleCloudStorage::Private::getFileStatus(const Uri & uri) const {
 				fileType = FileType::DIRECTORY;
 			}
 
-			const FileStatus fileStatus(uri, fileType, contentLength);
+			const FileStatus fileStatus(uri, fileType, contentLength, modificationTime);
 			return fileStatus;
 		} else {  // is probably a file (e.g. application/octet-stream or text/x-python and so on ...
-			const FileStatus fileStatus(uri, FileType::FILE, contentLength);
+			const FileStatus fileStatus(uri, FileType::FILE, contentLength, modificationTime);
 			return fileStatus;
 		}
 	} else {
@@ -5,6 +5,7 @@
 
 #include "HadoopFileSystem_p.h"
 
+#include <algorithm>
 #include <iostream>
 
 #include <arrow/io/api.h>
@@ -14,7 +15,7 @@
 #include "Util/StringUtil.h"
 
 HadoopFileSystem::Private::Private(const FileSystemConnection & fileSystemConnection, const Path & root)
-	: hdfs(nullptr), connected(false), root(root) {
+	: hdfs(nullptr), connected(false), root(root), libHdfs(nullptr), libHdfsConnection(nullptr) {
 	// TODO percy improve & error handling
 	const bool connected = this->connect(fileSystemConnection);
 }
@@ -86,6 +87,14 @@ bool HadoopFileSystem::Private::connect(const FileSystemConnection & fileSystemC
 }
 
 bool HadoopFileSystem::Private::disconnect() {
+	{
+		std::lock_guard<std::mutex> lock(this->libHdfsMutex);
+		if(this->libHdfsConnection != nullptr) {
+			this->libHdfs->Disconnect(this->libHdfsConnection);
+			this->libHdfsConnection = nullptr;
+		}
+	}
+
 	if(this->connected == false) {
 		auto temphdfs = std::move(this->hdfs);
 		this->hdfs = nullptr;
@@ -132,14 +141,14 @@ FileStatus HadoopFileSystem::Private::getFileStatus(const Uri & uri) const {
 	const Uri uriWithRoot(uri.getScheme(), uri.getAuthority(), this->root + uri.getPath().toString());
 	const Path path = uriWithRoot.getPath();
 
-	arrow::io::FileStatistics stat_buf;
+	arrow::io::HdfsPathInfo path_info;
 
-	const arrow::Status result = this->hdfs->Stat(path.toString(), &stat_buf);
+	const arrow::Status result = this->hdfs->GetPathInfo(path.toString(), &path_info);
 
 	if(result.ok()) {
 		FileType fileType;
 
-		switch(stat_buf.kind) {
+		switch(path_info.kind) {
 		case arrow::io::ObjectType::type::FILE: fileType = FileType::FILE; break;
 
 		case arrow::io::ObjectType::type::DIRECTORY: fileType = FileType::DIRECTORY; break;
@@ -147,7 +156,10 @@ FileStatus HadoopFileSystem::Private::getFileStatus(const Uri & uri) const {
 		default: fileType = FileType::UNDEFINED; break;
 		}
 
-		return FileStatus(uri, fileType, stat_buf.size);
+		// hdfs reports the modification time in seconds
+		const unsigned long long modificationTime = path_info.last_modified_time * 1000ULL;
+
+		return FileStatus(uri, fileType, path_info.size, modificationTime);
 	} else {
 		// TODO percy error handling
 	}
@@ -155,6 +167,86 @@ FileStatus HadoopFileSystem::Private::getFileStatus(const Uri & uri) const {
 	return FileStatus();
 }
 
+hdfsFS HadoopFileSystem::Private::getLibHdfsConnection() const {
+	using namespace HadoopFileSystemConnection;
+
+	std::lock_guard<std::mutex> lock(this->libHdfsMutex);
+
+	if(this->libHdfsConnection != nullptr) {
+		return this->libHdfsConnection;
+	}
+
+	if(this->libHdfs == nullptr) {
+		const arrow::Status status = arrow::io::internal::ConnectLibHdfs(&this->libHdfs);
+		if(status.ok() == false) {
+			this->libHdfs = nullptr;
+			return nullptr;
+		}
+	}
+
+	const std::string host = this->fileSystemConnection.getConnectionProperty(ConnectionProperty::HOST);
+	const int port = atoi(this->fileSystemConnection.getConnectionProperty(ConnectionProperty::PORT).c_str());
+	const std::string user = this->fileSystemConnection.getConnectionProperty(ConnectionProperty::USER);
+	const std::string kerberosTicket = this->fileSystemConnection.getConnectionProperty(ConnectionProperty::KERBEROS_TICKET);
+
+	hdfsBuilder * builder = this->libHdfs->NewBuilder();
+	this->libHdfs->BuilderSetNameNode(builder, host.c_str());
+	this->libHdfs->BuilderSetNameNodePort(builder, port);
+	if(user.empty() == false) {
+		this->libHdfs->BuilderSetUserName(builder, user.c_str());
+	}
+	if(kerberosTicket.empty() == false) {
+		this->libHdfs->BuilderSetKerbTicketCachePath(builder, kerberosTicket.c_str());
+	}
+
+	this->libHdfsConnection = this->libHdfs->BuilderConnect(builder);
+
+	return this->libHdfsConnection;
+}
+
+std::vector<BlockLocation> HadoopFileSystem::Private::getBlockLocations(const Uri & uri) const {
+	std::vector<BlockLocation> response;
+
+	if(uri.isValid() == false) {
+		// TODO percy raise error
+		return response;
+	}
+
+	const Uri uriWithRoot(uri.getScheme(), uri.getAuthority(), this->root + uri.getPath().toString());
+	const std::string path = uriWithRoot.getPath().toString();
+
+	arrow::io::HdfsPathInfo path_info;
+	const arrow::Status result = this->hdfs->GetPathInfo(path, &path_info);
+	if(result.ok() == false || path_info.kind != arrow::io::ObjectType::type::FILE || path_info.size == 0) {
+		return response;
+	}
+
+	hdfsFS connection = this->getLibHdfsConnection();
+	if(connection == nullptr) {
+		return response;
+	}
+
+	char *** hosts = this->libHdfs->GetHosts(connection, path.c_str(), 0, path_info.size);
+	if(hosts == nullptr) {
+		return response;
+	}
+
+	const long long blockSize = path_info.block_size > 0 ? (long long) path_info.block_size : (long long) path_info.size;
+	for(long long block = 0; hosts[block] != nullptr; block++) {
+		BlockLocation location;
+		location.offset = block * blockSize;
+		location.length = std::min<long long>(blockSize, path_info.size - location.offset);
+		for(int host = 0; hosts[block][host] != nullptr; host++) {
+			location.hosts.push_back(std::string(hosts[block][host]));
+		}
+		response.push_back(location);
+	}
+
+	this->libHdfs->FreeHosts(hosts);
+
+	return response;
+}
+
 std::vector<FileStatus> HadoopFileSystem::Private::list(const Uri & uri, const FileFilter & filter) const {
 	std::vector<FileStatus> response;
 
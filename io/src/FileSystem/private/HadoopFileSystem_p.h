@@ -8,7 +8,10 @@
 
 #include "FileSystem/HadoopFileSystem.h"
 
+#include <mutex>
+
 #include "arrow/io/hdfs.h"
+#include "arrow/io/hdfs_internal.h"
 
 class HadoopFileSystem::Private {
 public:
@@ -21,6 +24,7 @@ public:
 	// Query
 	bool exists(const Uri & uri) const;
 	FileStatus getFileStatus(const Uri & uri) const;
+	std::vector<BlockLocation> getBlockLocations(const Uri & uri) const;
 
 	// List
 	std::vector<FileStatus> list(const Uri & uri, const FileFilter & filter) const;
@@ -60,9 +64,24 @@ private:
 	bool connect(const FileSystemConnection & fileSystemConnection);
 	bool disconnect();
 
+	/**
+	 *  @brief Returns a raw libhdfs connection, created on first use.
+	 *
+	 *  @details The arrow HadoopFileSystem does not expose block locations, so those are asked with hdfsGetHosts
+	 *  through a second connection to the same namenode.
+	 *
+	 *  @return the connection or nullptr if libhdfs could not be loaded or the connection failed.
+	 */
+	hdfsFS getLibHdfsConnection() const;
+
 private:
 	FileSystemConnection fileSystemConnection;
 	std::shared_ptr<arrow::io::HadoopFileSystem> hdfs;  // should be std::unique_ptr but we are contrained by Arrow API
+
+	// Used only to query block locations
+	mutable std::mutex libHdfsMutex;
+	mutable arrow::io::internal::LibHdfsShim * libHdfs;
+	mutable hdfsFS libHdfsConnection;
 };
 
 #endif /* _HADOOP_FILE_SYSTEM_PRIVATE_H_ */
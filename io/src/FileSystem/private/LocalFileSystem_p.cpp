@@ -128,7 +128,10 @@ FileStatus LocalFileSystem::Private::getFileStatus(const Uri & uri) const {
 		default: fileType = FileType::UNDEFINED; break;
 		}
 
-		return FileStatus(uri, fileType, stat_buf.st_size);
+		const unsigned long long modificationTime =
+			stat_buf.st_mtim.tv_sec * 1000ULL + stat_buf.st_mtim.tv_nsec / 1000000ULL;
+
+		return FileStatus(uri, fileType, stat_buf.st_size, modificationTime);
 	} else {
 		switch(errno) {
 		case EACCES: throw BlazingInvalidPermissionsFileException(uri);
@@ -385,7 +388,10 @@ std::vector<std::string> LocalFileSystem::Private::listResourceNames(
 					continue;
 				}
 
-				const bool pass = WildcardFilter::match(name, finalWildcard);
+				const Path fullPath = path + name;
+
+				const bool pass =
+					WildcardFilter::match(fullPath.toString(true), finalWildcard);  // filter must use the full path
 
 				if(pass) {
 					response.push_back(name);
@@ -351,12 +351,13 @@ FileStatus S3FileSystem::Private::getFileStatus(const Uri & uri) const {
 
 		std::string contentType = result.GetContentType().data();
 		long long contentLength = result.GetContentLength();
+		const unsigned long long modificationTime = result.GetLastModified().Millis();
 
 		if(objectKey[objectKey.size() - 1] == '/' || contentType == "application/x-directory") {
-			const FileStatus fileStatus(uri, FileType::DIRECTORY, contentLength);
+			const FileStatus fileStatus(uri, FileType::DIRECTORY, contentLength, modificationTime);
 			return fileStatus;
 		} else {
-			const FileStatus fileStatus(uri, FileType::FILE, contentLength);
+			const FileStatus fileStatus(uri, FileType::FILE, contentLength, modificationTime);
 			return fileStatus;
 		}
 	} else {
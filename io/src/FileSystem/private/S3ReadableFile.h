@@ -7,42 +7,31 @@
 #ifndef SRC_UTIL_BLAZINGS3_S3READABLEFILE_H_
 #define SRC_UTIL_BLAZINGS3_S3READABLEFILE_H_
 
-#include "arrow/io/interfaces.h"
-#include "arrow/status.h"
+#include "FileSystem/BufferedReadableFile.h"
 #include <aws/core/utils/memory/stl/AWSString.h>
 #include <aws/s3/S3Client.h>
 
-class S3ReadableFile : public arrow::io::RandomAccessFile {
+// Each request is a ranged GetObject, see BufferedReadableFile for how reads are coalesced and split
+class S3ReadableFile : public BufferedReadableFile {
 public:
-	S3ReadableFile(std::shared_ptr<Aws::S3::S3Client> s3Client, std::string bucket, std::string key);
+	S3ReadableFile(std::shared_ptr<Aws::S3::S3Client> s3Client,
+		std::string bucket,
+		std::string key,
+		const ReadAheadOptions & options = getDefaultReadAheadOptions());
 	~S3ReadableFile();
 
 	arrow::Status Close() override;
 
-    arrow::Result<int64_t> GetSize() override;
-
-	arrow::Result<int64_t> Read(int64_t nbytes, void* out) override;
-
-	arrow::Result<std::shared_ptr<arrow::Buffer>> Read(int64_t nbytes) override;
-
-	arrow::Result<int64_t> ReadAt(int64_t position, int64_t nbytes, void* out) override;
-
-	arrow::Result<std::shared_ptr<arrow::Buffer>> ReadAt(int64_t position, int64_t nbytes) override;
-
-	bool supports_zero_copy() const override;
-
-	arrow::Status Seek(int64_t position) override;
-	arrow::Result<int64_t> Tell() const override;
-
 	bool isValid() { return valid; }
 
-	bool closed() const override;
+protected:
+	int64_t fetchRange(int64_t position, int64_t nbytes, uint8_t * out) override;
+	int64_t fetchSize() override;
 
 private:
 	std::shared_ptr<Aws::S3::S3Client> s3Client;
 	std::string bucketName;
 	std::string key;
-	size_t position;
 	bool valid;
 
 	ARROW_DISALLOW_COPY_AND_ASSIGN(S3ReadableFile);
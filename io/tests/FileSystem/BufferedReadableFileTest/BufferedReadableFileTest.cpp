@@ -0,0 +1,210 @@
+#include <mutex>
+#include <numeric>
+#include <utility>
+#include <vector>
+
+#include "gtest/gtest.h"
+
+#include "FileSystem/BufferedReadableFile.h"
+
+// Stands in for an S3 object: serves byte ranges from memory and records every ranged request
+class InMemoryObjectFile : public BufferedReadableFile {
+public:
+	InMemoryObjectFile(int64_t size, const ReadAheadOptions & options) : BufferedReadableFile(options), object(size) {
+		std::iota(object.begin(), object.end(), 0);
+	}
+
+	std::vector<std::pair<int64_t, int64_t>> getRanges() {
+		std::lock_guard<std::mutex> lock(mutex);
+		return ranges;
+	}
+
+	uint8_t at(int64_t position) const { return object[position]; }
+
+protected:
+	int64_t fetchRange(int64_t position, int64_t nbytes, uint8_t * out) override {
+		{
+			std::lock_guard<std::mutex> lock(mutex);
+			ranges.emplace_back(position, nbytes);
+		}
+		const int64_t count = std::min<int64_t>(nbytes, object.size() - position);
+		std::copy(object.begin() + position, object.begin() + position + count, out);
+		return count;
+	}
+
+	int64_t fetchSize() override { return object.size(); }
+
+private:
+	std::vector<uint8_t> object;
+	std::mutex mutex;
+	std::vector<std::pair<int64_t, int64_t>> ranges;
+};
+
+static ReadAheadOptions makeOptions(int64_t readAheadSize, int maxWindows, int64_t parallelChunkSize) {
+	ReadAheadOptions options;
+	options.readAheadSize = readAheadSize;
+	options.maxWindows = maxWindows;
+	options.parallelChunkSize = parallelChunkSize;
+	options.maxParallelRequests = 4;
+	return options;
+}
+
+static void expectBytes(InMemoryObjectFile & file, int64_t position, const std::vector<uint8_t> & buffer, int64_t count) {
+	for(int64_t i = 0; i < count; i++) {
+		ASSERT_EQ(file.at(position + i), buffer[i]) << "at position " << position + i;
+	}
+}
+
+TEST(BufferedReadableFileTest, NearbyReadsAreCoalesced) {
+	InMemoryObjectFile file(10000, makeOptions(1000, 2, 1000000));
+	std::vector<uint8_t> buffer(100);
+
+	for(int64_t position : {0, 100, 250, 600, 900}) {
+		auto result = file.ReadAt(position, 100, buffer.data());
+		ASSERT_TRUE(result.ok());
+		EXPECT_EQ(100, result.ValueOrDie());
+		expectBytes(file, position, buffer, 100);
+	}
+
+	auto ranges = file.getRanges();
+	ASSERT_EQ(1, ranges.size());
+	EXPECT_EQ(0, ranges[0].first);
+	EXPECT_EQ(1000, ranges[0].second);
+
+	ReadStatistics statistics = file.getReadStatistics();
+	EXPECT_EQ(1, statistics.requests);
+	EXPECT_EQ(1000, statistics.bytes);
+	EXPECT_EQ(4, statistics.bufferedReads);
+}
+
+TEST(BufferedReadableFileTest, ReadAcrossWindowsOnlyFetchesTheMissingBytes) {
+	InMemoryObjectFile file(10000, makeOptions(1000, 2, 1000000));
+	std::vector<uint8_t> buffer(500);
+
+	ASSERT_TRUE(file.ReadAt(0, 10, buffer.data()).ok());
+	auto result = file.ReadAt(800, 500, buffer.data());
+	ASSERT_TRUE(result.ok());
+	EXPECT_EQ(500, result.ValueOrDie());
+	expectBytes(file, 800, buffer, 500);
+
+	auto ranges = file.getRanges();
+	ASSERT_EQ(2, ranges.size());
+	EXPECT_EQ(1000, ranges[1].first);
+}
+
+TEST(BufferedReadableFileTest, LeastRecentlyUsedWindowIsEvicted) {
+	InMemoryObjectFile file(10000, makeOptions(1000, 2, 1000000));
+	std::vector<uint8_t> buffer(10);
+
+	for(int64_t position : {0, 5000, 10, 8000, 20, 5010}) {
+		ASSERT_TRUE(file.ReadAt(position, 10, buffer.data()).ok());
+		expectBytes(file, position, buffer, 10);
+	}
+
+	// the window at 5000 was evicted by the one at 8000, the one at 0 was still in use
+	auto ranges = file.getRanges();
+	ASSERT_EQ(4, ranges.size());
+	EXPECT_EQ(5010, ranges[3].first);
+}
+
+TEST(BufferedReadableFileTest, BigReadsAreSplitInParallelRequests) {
+	InMemoryObjectFile file(10000, makeOptions(1000, 2, 2000));
+	std::vector<uint8_t> buffer(10000);
+
+	auto result = file.ReadAt(500, 9000, buffer.data());
+	ASSERT_TRUE(result.ok());
+	EXPECT_EQ(9000, result.ValueOrDie());
+	expectBytes(file, 500, buffer, 9000);
+
+	auto ranges = file.getRanges();
+	ASSERT_EQ(5, ranges.size());
+	int64_t total = 0;
+	for(auto & range : ranges) {
+		EXPECT_LE(range.second, 2000);
+		total += range.second;
+	}
+	EXPECT_EQ(9000, total);
+}
+
+TEST(BufferedReadableFileTest, ReadsStopAtTheEndOfTheFile) {
+	InMemoryObjectFile file(1500, makeOptions(1000, 2, 1000000));
+	std::vector<uint8_t> buffer(1000);
+
+	ASSERT_TRUE(file.Seek(1200).ok());
+	auto result = file.Read(1000, buffer.data());
+	ASSERT_TRUE(result.ok());
+	EXPECT_EQ(300, result.ValueOrDie());
+	expectBytes(file, 1200, buffer, 300);
+	EXPECT_EQ(1500, file.Tell().ValueOrDie());
+
+	result = file.Read(1000, buffer.data());
+	ASSERT_TRUE(result.ok());
+	EXPECT_EQ(0, result.ValueOrDie());
+}
+
+TEST(BufferedReadableFileTest, NoReadAheadMeansOneRequestPerRead) {
+	InMemoryObjectFile file(10000, makeOptions(0, 2, 1000000));
+	std::vector<uint8_t> buffer(100);
+
+	ASSERT_TRUE(file.ReadAt(0, 100, buffer.data()).ok());
+	ASSERT_TRUE(file.ReadAt(100, 100, buffer.data()).ok());
+	expectBytes(file, 100, buffer, 100);
+
+	EXPECT_EQ(2, file.getReadStatistics().requests);
+}
+
+TEST(BufferedReadableFileTest, HintedRangesArePrefetchedAndCoalesced) {
+	ReadAheadOptions options = makeOptions(100, 2, 1000000);
+	options.maxPrefetchWindows = 2;
+	InMemoryObjectFile file(100000, options);
+
+	// the first two ranges are close enough to be fetched together
+	file.willNeed({{1000, 500}, {1550, 500}, {50000, 2000}});
+	std::vector<uint8_t> buffer(2000);
+	for(auto range : std::vector<std::pair<int64_t, int64_t>>{{1000, 500}, {1550, 500}, {50000, 2000}}) {
+		auto result = file.ReadAt(range.first, range.second, buffer.data());
+		ASSERT_TRUE(result.ok());
+		EXPECT_EQ(range.second, result.ValueOrDie());
+		expectBytes(file, range.first, buffer, range.second);
+	}
+
+	auto ranges = file.getRanges();
+	ASSERT_EQ(2, ranges.size());
+	EXPECT_EQ(1000, ranges[0].first);
+	EXPECT_EQ(1050, ranges[0].second);
+	EXPECT_EQ(50000, ranges[1].first);
+	EXPECT_EQ(2000, ranges[1].second);
+}
+
+TEST(BufferedReadableFileTest, ReadsOutsideTheHintedRangesStillWork) {
+	ReadAheadOptions options = makeOptions(100, 2, 1000000);
+	options.maxPrefetchWindows = 1;
+	InMemoryObjectFile file(100000, options);
+
+	file.willNeed({{1000, 500}, {20000, 500}, {40000, 500}});
+	std::vector<uint8_t> buffer(500);
+	for(int64_t position : {70000, 40000, 1000}) {
+		auto result = file.ReadAt(position, 500, buffer.data());
+		ASSERT_TRUE(result.ok());
+		expectBytes(file, position, buffer, 500);
+	}
+	ASSERT_TRUE(file.Close().ok());
+}
+
+TEST(BufferedReadableFileTest, BigHintedRangesAreNotFetchedTwice) {
+	ReadAheadOptions options = makeOptions(100, 2, 1000);
+	options.maxPrefetchWindows = 1;
+	InMemoryObjectFile file(100000, options);
+
+	// whether the read finds the range prefetched, in flight or still pending, it is only fetched once
+	file.willNeed({{5000, 4000}});
+	std::vector<uint8_t> buffer(4000);
+	auto result = file.ReadAt(5000, 4000, buffer.data());
+	ASSERT_TRUE(result.ok());
+	EXPECT_EQ(4000, result.ValueOrDie());
+	expectBytes(file, 5000, buffer, 4000);
+
+	ASSERT_TRUE(file.Close().ok());
+	EXPECT_EQ(4, file.getReadStatistics().requests);
+	EXPECT_EQ(4000, file.getReadStatistics().bytes);
+}
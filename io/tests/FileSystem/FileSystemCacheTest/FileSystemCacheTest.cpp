@@ -0,0 +1,65 @@
+#include <chrono>
+#include <memory>
+#include <thread>
+
+#include "gtest/gtest.h"
+
+#include "FileSystem/FileSystemManager.h"
+#include "FileSystem/private/FileSystemManager_p.h"
+
+TEST(FileSystemCacheTest, FileSystemsAreShared) {
+	FileSystemCache cache(4, 60000);
+	const FileSystemConnection connection(FileSystemType::LOCAL);
+
+	auto fileSystem = cache.get(connection, Path("/tmp/", true));
+	ASSERT_NE(fileSystem, nullptr);
+	EXPECT_EQ(cache.get(connection, Path("/tmp/", true)), fileSystem);
+	EXPECT_NE(cache.get(connection, Path("/", true)), fileSystem);
+	EXPECT_EQ(cache.size(), 2);
+}
+
+TEST(FileSystemCacheTest, TheLeastRecentlyUsedIsEvicted) {
+	FileSystemCache cache(2, 60000);
+	const FileSystemConnection connection(FileSystemType::LOCAL);
+
+	std::weak_ptr<FileSystemInterface> first = cache.get(connection, Path("/tmp/", true));
+	std::weak_ptr<FileSystemInterface> second = cache.get(connection, Path("/", true));
+	cache.get(connection, Path("/tmp/", true));
+	cache.get(connection, Path("/var/", true));
+
+	// the cache kept them alive until they were evicted
+	EXPECT_FALSE(first.expired());
+	EXPECT_TRUE(second.expired());
+	EXPECT_EQ(cache.size(), 2);
+}
+
+TEST(FileSystemCacheTest, IdleFileSystemsAreEvicted) {
+	FileSystemCache cache(4, 20);
+	const FileSystemConnection connection(FileSystemType::LOCAL);
+
+	std::weak_ptr<FileSystemInterface> idle = cache.get(connection, Path("/tmp/", true));
+	std::shared_ptr<FileSystemInterface> used = cache.get(connection, Path("/", true));
+	std::this_thread::sleep_for(std::chrono::milliseconds(40));
+
+	// the one that is still used is not idle
+	EXPECT_EQ(cache.size(), 1);
+	EXPECT_TRUE(idle.expired());
+	EXPECT_EQ(cache.get(connection, Path("/", true)), used);
+}
+
+TEST(FileSystemCacheTest, RegisteringAgainKeepsTheOtherAuthorities) {
+	const FileSystemConnection connection(FileSystemType::LOCAL);
+	FileSystemManager fileSystemManager;
+	ASSERT_TRUE(fileSystemManager.registerFileSystem(FileSystemEntity("cache_test_a", connection, Path("/tmp/", true))));
+	ASSERT_TRUE(fileSystemManager.registerFileSystem(FileSystemEntity("cache_test_b", connection, Path("/", true))));
+
+	// like registerFileSystem of the engine, that deregisters the authority first
+	for(int i = 0; i < 3; i++) {
+		EXPECT_TRUE(fileSystemManager.deregisterFileSystem("cache_test_a"));
+		ASSERT_TRUE(
+			fileSystemManager.registerFileSystem(FileSystemEntity("cache_test_a", connection, Path("/tmp/", true))));
+	}
+
+	EXPECT_TRUE(fileSystemManager.exists(Uri(FileSystemType::LOCAL, "cache_test_a", Path("/", true))));
+	EXPECT_TRUE(fileSystemManager.exists(Uri(FileSystemType::LOCAL, "cache_test_b", Path("/tmp/", true))));
+}
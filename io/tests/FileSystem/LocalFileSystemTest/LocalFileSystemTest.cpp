@@ -1,3 +1,4 @@
+#include <algorithm>
 #include <iostream>
 #include <limits.h>
 #include <time.h>
@@ -46,6 +47,13 @@ TEST_F(LocalFileSystemTest, GetFileStatusLinuxDirectory) {
 	EXPECT_EQ(fileStatus.getFileSize(), 0);
 }
 
+TEST_F(LocalFileSystemTest, LocalFilesHaveNoBlockLocations) {
+	const std::string currentExe = "/proc/self/exe";
+	const std::vector<BlockLocation> locations = localFileSystem->getBlockLocations(currentExe);
+
+	EXPECT_TRUE(locations.empty());
+}
+
 TEST_F(LocalFileSystemTest, CanListLinuxRootDirectories) {
 	const std::set<std::string> dirs = {"/root", "/home", "/etc"};
 
@@ -79,3 +87,12 @@ TEST_F(LocalFileSystemTest, CheckIgnoreDotAnd2DotsWhenListLinuxRoot) {
 		EXPECT_FALSE(found1DotOr2Dots);
 	}
 }
+
+TEST_F(LocalFileSystemTest, ListResourceNamesWithWildcard) {
+	std::vector<std::string> names = localFileSystem->listResourceNames(Uri("/proc/self/"), "*xe");
+	EXPECT_TRUE(std::find(names.begin(), names.end(), "exe") != names.end());
+	EXPECT_TRUE(std::find(names.begin(), names.end(), "net") == names.end());
+
+	names = localFileSystem->listResourceNames(Uri("/proc/self/"), "*");
+	EXPECT_TRUE(std::find(names.begin(), names.end(), "net") != names.end());
+}
@@ -0,0 +1,139 @@
+#include <chrono>
+#include <cstdio>
+#include <fstream>
+#include <string>
+#include <thread>
+#include <unistd.h>
+
+#include "gtest/gtest.h"
+
+#include "FileSystem/FileSystemManager.h"
+#include "FileSystem/private/FileSystemManager_p.h"
+
+TEST(TimedCacheTest, EntriesExpireAfterTheTTL) {
+	TimedCache<int> cache;
+	int value = 0;
+	EXPECT_FALSE(cache.get("a", 1000, value));
+
+	cache.put("a", 1);
+	EXPECT_TRUE(cache.get("a", 1000, value));
+	EXPECT_EQ(value, 1);
+
+	std::this_thread::sleep_for(std::chrono::milliseconds(20));
+	EXPECT_FALSE(cache.get("a", 10, value));
+	// the expired entry is removed
+	EXPECT_EQ(cache.size(), 0);
+}
+
+TEST(TimedCacheTest, PutReplacesTheValue) {
+	TimedCache<int> cache;
+	cache.put("a", 1);
+	cache.put("a", 2);
+	int value = 0;
+	EXPECT_TRUE(cache.get("a", 1000, value));
+	EXPECT_EQ(value, 2);
+	EXPECT_EQ(cache.size(), 1);
+}
+
+TEST(TimedCacheTest, InvalidateRemovesTheKeysWithThePrefix) {
+	TimedCache<int> cache;
+	cache.put("/data/a/1.parquet", 1);
+	cache.put("/data/a/2.parquet", 2);
+	cache.put("/data/ab/1.parquet", 3);
+	cache.put("/data/b/1.parquet", 4);
+
+	EXPECT_EQ(cache.invalidate("/data/a/"), 2);
+	EXPECT_EQ(cache.size(), 2);
+
+	int value = 0;
+	EXPECT_FALSE(cache.get("/data/a/1.parquet", 1000, value));
+	EXPECT_TRUE(cache.get("/data/ab/1.parquet", 1000, value));
+	EXPECT_EQ(value, 3);
+
+	EXPECT_EQ(cache.invalidate("/nothing"), 0);
+	EXPECT_EQ(cache.invalidate(""), 2);
+	EXPECT_EQ(cache.size(), 0);
+}
+
+class MetadataCacheTest : public testing::Test {
+protected:
+	MetadataCacheTest() : fileSystemManager(new FileSystemManager()) {}
+
+	virtual ~MetadataCacheTest() {}
+
+	virtual void SetUp() {
+		// the manager has the local file system registered by default
+		fileSystemManager->setMetadataCacheTTL(60000);
+
+		directory = "/tmp/MetadataCacheTest." + std::to_string(::getpid());
+		ASSERT_TRUE(fileSystemManager->makeDirectory(Uri(directory)));
+		writeFile(directory + "/1.csv", "a|b\n");
+	}
+
+	virtual void TearDown() {
+		std::remove((directory + "/1.csv").c_str());
+		std::remove((directory + "/2.csv").c_str());
+		std::remove(directory.c_str());
+	}
+
+	// writes without the manager, like another process would, so the cache is not invalidated
+	void writeFile(const std::string & path, const std::string & content) {
+		std::ofstream file(path, std::ios::trunc);
+		file << content;
+	}
+
+protected:
+	const std::unique_ptr<FileSystemManager> fileSystemManager;
+	std::string directory;
+};
+
+TEST_F(MetadataCacheTest, StatusIsReusedUntilInvalidated) {
+	const Uri file(directory + "/1.csv");
+	EXPECT_EQ(fileSystemManager->getFileStatus(file).getFileSize(), 4);
+	const MetadataCacheStats before = fileSystemManager->getMetadataCacheStats();
+
+	writeFile(directory + "/1.csv", "a|b\nc|d\n");
+	EXPECT_EQ(fileSystemManager->getFileStatus(file).getFileSize(), 4);
+	EXPECT_EQ(fileSystemManager->getMetadataCacheStats().hits, before.hits + 1);
+
+	EXPECT_GT(fileSystemManager->invalidateMetadataCache(file.toString()), 0);
+	EXPECT_EQ(fileSystemManager->getFileStatus(file).getFileSize(), 8);
+}
+
+TEST_F(MetadataCacheTest, RefreshingATableSeesItsNewFiles) {
+	const Uri folder(directory + "/");
+	EXPECT_EQ(fileSystemManager->list(folder).size(), 1);
+	EXPECT_FALSE(fileSystemManager->exists(Uri(directory + "/2.csv")));
+
+	writeFile(directory + "/2.csv", "e|f\n");
+	EXPECT_EQ(fileSystemManager->list(folder).size(), 1);
+	EXPECT_FALSE(fileSystemManager->exists(Uri(directory + "/2.csv")));
+
+	// refresh_table invalidates everything under the normalized paths of the table
+	fileSystemManager->invalidateMetadataCache(Uri(directory, false).toString());
+	EXPECT_EQ(fileSystemManager->list(folder).size(), 2);
+	EXPECT_TRUE(fileSystemManager->exists(Uri(directory + "/2.csv")));
+}
+
+TEST_F(MetadataCacheTest, WritesThroughTheManagerInvalidate) {
+	const Uri file(directory + "/2.csv");
+	EXPECT_FALSE(fileSystemManager->exists(file));
+
+	auto output = fileSystemManager->openWriteable(file);
+	output->Close();
+	EXPECT_TRUE(fileSystemManager->exists(file));
+
+	EXPECT_TRUE(fileSystemManager->remove(file));
+	EXPECT_FALSE(fileSystemManager->exists(file));
+}
+
+TEST_F(MetadataCacheTest, ZeroTTLDisablesTheCache) {
+	fileSystemManager->setMetadataCacheTTL(0);
+	EXPECT_EQ(fileSystemManager->getMetadataCacheStats().entries, 0);
+
+	const Uri file(directory + "/1.csv");
+	EXPECT_EQ(fileSystemManager->getFileStatus(file).getFileSize(), 4);
+	writeFile(directory + "/1.csv", "a|b\nc|d\n");
+	EXPECT_EQ(fileSystemManager->getFileStatus(file).getFileSize(), 8);
+	EXPECT_EQ(fileSystemManager->getMetadataCacheStats().entries, 0);
+}
@@ -9,10 +9,17 @@ from enum import Enum
 
 from urllib.parse import urlparse
 
-from threading import Lock
+from threading import Lock, Condition
+from concurrent.futures import ThreadPoolExecutor, Future
 from weakref import ref
 from pyblazing.apiv2.filesystem import FileSystem
 from pyblazing.apiv2 import DataType
+from pyblazing.apiv2.metadata_cache import parseMetadataWithCache, invalidateMetadataCache
+from pyblazing.apiv2.row_group_index import RowGroupIndex
+from pyblazing.apiv2.locality import HdfsBlockLocationProvider, assign_by_locality, get_file_sizes
+from pyblazing.apiv2.result_cache import ResultCache, get_result_cache_key
+from pyblazing.apiv2.profile import QueryProfile
+from pyblazing.apiv2.partition_pruning import prune_partitions
 
 
 from .hive import *
@@ -26,6 +33,7 @@ import re
 import pandas
 import numpy as np
 import pyarrow
+from io import BytesIO
 from urllib.parse import urlparse
 from urllib.parse import ParseResult
 from pathlib import PurePath
@@ -39,6 +47,7 @@ import dask.distributed
 import netifaces as ni
 
 import random
+import uuid
 
 import logging
 
@@ -180,11 +189,8 @@ def getNodePartitionKeys(df, client):
 
     return worker_partitions
 
-def get_element(query_partid):
-    worker = dask.distributed.get_worker()
-    df = worker.query_parts[query_partid]
-    del  worker.query_parts[query_partid]
-    return df
+def get_result_meta(df):
+    return dask.dataframe.utils.make_meta(df)
 
 def collectPartitionsRunQuery(
         masterIndex,
@@ -228,23 +234,15 @@ def collectPartitionsRunQuery(
                             is_single_node=False)
     except cio.RunQueryError as e:
         print(">>>>>>>> ", e)
-        result = [cudf.DataFrame()]
+        dfs = [cudf.DataFrame()]
     except Exception as e:
         raise e   
 
-    meta = dask.dataframe.utils.make_meta(dfs[0])
-    query_partids = []
-
-    with worker._lock:
-        if not hasattr(worker, "query_parts"):
-            worker.query_parts = {}
-
-    for df in dfs:
-        query_partid = random.randint(0, np.iinfo(np.int32).max) # query_partid should be a unique identifier
-        worker.query_parts[query_partid] = df
-        query_partids.append(query_partid)
-
-    return query_partids, meta, worker.name
+    # the result of the task is the partition of the worker, so the client builds the result from the
+    # futures of the tasks, without fetching anything from the workers or submitting more tasks
+    if len(dfs) == 1:
+        return dfs[0]
+    return cudf.concat(dfs, ignore_index=True)
 
 def collectPartitionsPerformPartition(
         masterIndex,
@@ -338,89 +336,64 @@ def get_uri_values(files, partitions, base_folder):
     return uri_values
 
 
+def convertPartitionValues(values, dtype):
+    """
+    Converts the values of a partition column, as strings taken from the folder names, to a numpy array of dtype.
+    Every distinct value is only converted once.
+    """
+    codes, uniques = pandas.factorize(np.asarray(values, dtype=object))
+    uniques = np.asarray(uniques, dtype=object)
+    if dtype == np.dtype("object"):
+        converted = uniques
+    elif dtype.kind == 'M':
+        converted = uniques.astype(str).astype(dtype)
+    elif dtype.kind == 'b':
+        converted = np.isin(np.char.lower(uniques.astype(str)), ['true', '1'])
+    else:
+        converted = uniques.astype(str).astype(np.float64 if dtype.kind == 'f' else np.int64).astype(dtype)
+    return converted[codes]
+
+
 def parseHiveMetadata(curr_table, uri_values):
-    metadata = {}
-    names = []
-    final_names = [] # not all columns will have hive metadata, so this vector will capture all the names that will actually be used in the end
+    """
+    Builds the min/max metadata of the partition columns of a partitioned table, with one row per file
+    (min and max are both the value of the partition of the file) and the dtypes of the table columns.
+    """
     n_cols = len(curr_table.column_names)
 
     if all(type in cudf_to_np_types for type in curr_table.column_types):
-        dtypes = [cudf_to_np_types[t] for t in curr_table.column_types]
+        dtypes = [np.dtype(cudf_to_np_types[t]) for t in curr_table.column_types]
     else:
         for i in range(len(curr_table.column_types)):
             if not (curr_table.column_types[i] in cudf_to_np_types):
                 print("ERROR: Column " + curr_table.column_names[i] + " has type that cannot be mapped: " + curr_table.column_types[i])
     columns = [name.decode() for name in curr_table.column_names]
-    for index in range(n_cols):
-        col_name = columns[index]
-        names.append('min_' + str(index) + '_' + col_name)
-        names.append('max_' + str(index) + '_' + col_name)
-
-    names.append('file_handle_index')
-    names.append('row_group_index')
-    minmax_metadata_table = [[] for _ in range(2 * n_cols + 2)]
-    table_partition = {}
-    for file_index, uri_value in enumerate(uri_values):
-        curr_partition = uri_values
-        for index, [col_name, col_value_id] in enumerate(uri_value):
-            if col_name in columns:
-                col_index = columns.index(col_name)
-            else:
-                print("ERROR: could not find partition column name " + str(col_name) + " in table names")
-            if(dtypes[col_index] == np.dtype("object")):
-                np_col_value = col_value_id
-            elif(dtypes[col_index] == np.dtype("datetime64[s]") or dtypes[col_index] == np.dtype("datetime64[ms]") or dtypes[col_index] == np.dtype("datetime64[us]") or dtypes[col_index] == np.dtype("datetime64[ns]")):
-                np_col_value = np.datetime64(col_value_id)
-            else:
-                np_col_value = np.fromstring(col_value_id, dtypes[col_index], sep=' ')[0]
-
-            table_partition.setdefault(col_name, []).append(np_col_value)
-        minmax_metadata_table[len(minmax_metadata_table) - 2].append(file_index)
-        # this assumes that you only have one row group per partitioned file but is addressed in the mergeMetadata function,
-        # where you will have information about how many rowgroups per file and you can expand the hive metadata accordingly
-        minmax_metadata_table[len(minmax_metadata_table) - 1].append(0) # this is the rowgroup index
-    for index in range(n_cols):
-        col_name = columns[index]
-        if col_name in table_partition:
-            col_value_ids = table_partition[col_name]
-            minmax_metadata_table[2*index] = col_value_ids
-            minmax_metadata_table[2*index+1] = col_value_ids
-
-    series = []
+    column_indexes = {col_name: index for index, col_name in enumerate(columns)}
+
+    # all the files of a partition share the same list of partition values, so the columns are gathered per column
+    table_partition = OrderedDict()
+    for uri_value in uri_values:
+        for col_name, col_value_id in uri_value:
+            table_partition.setdefault(col_name, []).append(col_value_id)
+
+    frame = OrderedDict()
+    for col_name in list(table_partition.keys()):
+        if col_name not in column_indexes:
+            print("ERROR: could not find partition column name " + str(col_name) + " in table names")
+            logging.error("ERROR: could not find partition column name " + str(col_name) + " in table names")
+            del table_partition[col_name]
     for index in range(n_cols):
         col_name = columns[index]
         if col_name in table_partition:
-            if(dtypes[index] == np.dtype("datetime64[s]") or dtypes[index] == np.dtype("datetime64[ms]") or dtypes[index] == np.dtype("datetime64[us]") or dtypes[index] == np.dtype("datetime64[ns]")):
-                # when creating a pandas series, for a datetime type, it has to be in ns because that is the only internal datetime representation
-                col1 = pd.Series(minmax_metadata_table[2*index], dtype=np.dtype("datetime64[ns]"), name=names[2*index])
-                col2 = pd.Series(minmax_metadata_table[2*index+1], dtype=np.dtype("datetime64[ns]"), name=names[2*index+1])
-            else:
-                col1 = pd.Series(minmax_metadata_table[2*index], dtype=dtypes[index], name=names[2*index])
-                col2 = pd.Series(minmax_metadata_table[2*index+1], dtype=dtypes[index], name=names[2*index+1])
-            series.append(col1)
-            series.append(col2)
-            final_names.append(names[2*index])
-            final_names.append(names[2*index+1])
-    index = n_cols
-    col1 = pd.Series(minmax_metadata_table[2*index], dtype=np.int32, name=names[2*index])
-    col2 = pd.Series(minmax_metadata_table[2*index+1], dtype=np.int32, name=names[2*index+1])
-    final_names.append(names[2*index])
-    final_names.append(names[2*index+1])
-    series.append(col1)
-    series.append(col2)
+            values = convertPartitionValues(table_partition[col_name], dtypes[index])
+            frame['min_' + str(index) + '_' + col_name] = values
+            frame['max_' + str(index) + '_' + col_name] = values
 
-    frame = OrderedDict(((key,value) for (key,value) in zip(final_names, series)))
-    metadata = cudf.DataFrame(frame)
-    for index, col_type in enumerate(dtypes):
-        min_col_name = names[2*index]
-        max_col_name = names[2*index+1]
-        if(dtypes[index] == np.dtype("datetime64[s]") or dtypes[index] == np.dtype("datetime64[ms]") or dtypes[index] == np.dtype("datetime64[us]") or dtypes[index] == np.dtype("datetime64[ns]")):
-            if (min_col_name in metadata) and (max_col_name in metadata):
-                if metadata[min_col_name].dtype != dtypes[index] or metadata[max_col_name].dtype != dtypes[index]:
-                    # here we are casting the timestamp types from ns to their correct desired types
-                    metadata[min_col_name] = metadata[min_col_name].astype(dtypes[index])
-                    metadata[max_col_name] = metadata[max_col_name].astype(dtypes[index])
-    return metadata
+    frame['file_handle_index'] = np.arange(len(uri_values), dtype=np.int32)
+    # this assumes that you only have one row group per partitioned file but is addressed in the mergeMetadata function,
+    # where you will have information about how many rowgroups per file and you can expand the hive metadata accordingly
+    frame['row_group_index'] = np.zeros(len(uri_values), dtype=np.int32)
+    return cudf.DataFrame(frame)
 
 
 def mergeMetadata(curr_table, fileMetadata, hiveMetadata):
@@ -555,6 +528,184 @@ def get_plan(algebra):
     return visit(new_lines)
 
 
+# splits a sql statement into the parts that are outside of quoted text (even indexes) and the single
+# quoted literals, double quoted identifiers and -- comments (odd indexes), so that we never modify
+# the content of a literal or an identifier
+sql_literal_regex = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*)""")
+
+def normalize_sql(sql):
+    parts = sql_literal_regex.split(sql)
+    normalized = []
+    # the text around a comment is joined before its whitespace is collapsed
+    text = ''
+    for index, part in enumerate(parts):
+        if index % 2 == 0:
+            text = text + part
+        elif part.startswith('--'):
+            text = text + ' '
+        else:
+            normalized.append(re.sub(r'\s+', ' ', text))
+            normalized.append(part)
+            text = ''
+    normalized.append(re.sub(r'\s+', ' ', text))
+    return ''.join(normalized).strip().rstrip(';').strip()
+
+
+class PlanCache(object):
+    """
+    Bounded LRU cache of the plans generated by Calcite. Each entry holds the relational algebra
+    string and the json plan produced by get_plan, keyed by the normalized sql and the catalog version
+    that was used to generate them. When the catalog changes, all the entries of previous versions are evicted.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.lock = Lock()
+        self.entries = OrderedDict()
+        self.catalog_version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, sql, catalog_version):
+        key = (normalize_sql(sql), catalog_version)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits = self.hits + 1
+                return self.entries[key]
+            self.misses = self.misses + 1
+            return None
+
+    def put(self, sql, catalog_version, algebra, plan):
+        if self.max_size <= 0:
+            return
+        key = (normalize_sql(sql), catalog_version)
+        with self.lock:
+            # a plan generated with an older catalog must never be stored
+            if catalog_version != self.catalog_version:
+                return
+            self.entries[key] = (algebra, plan)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions = self.evictions + 1
+
+    def invalidate(self, catalog_version):
+        with self.lock:
+            self.catalog_version = catalog_version
+            stale_keys = [key for key in self.entries if key[1] != catalog_version]
+            for key in stale_keys:
+                del self.entries[key]
+            self.evictions = self.evictions + len(stale_keys)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class QueryStream(object):
+    """
+    Iterator over the result batches of a query started with runQueryCaller(..., stream_max_batches=n).
+    The engine buffers at most n batches, so the query advances as the batches are consumed.
+    Closing the stream, explicitly or when it is garbage collected, releases the buffered batches and lets the query finish.
+    close() waits for the query to finish, the garbage collector does not.
+    """
+
+    def __init__(self, ctxToken, tables):
+        self.ctxToken = ctxToken
+        self.tables = tables
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.closed:
+            raise StopIteration
+        try:
+            batch = cio.fetchStreamBatchCaller(self.ctxToken)
+        except Exception:
+            # the engine already released a stream whose query failed
+            self.closed = True
+            self.tables = None
+            raise
+        if batch is None:
+            self.closed = True
+            self.tables = None
+            raise StopIteration
+        return batch
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            cio.closeStreamCaller(self.ctxToken)
+            self.tables = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        # a finalizer must not block, so the query is cancelled without waiting for it
+        if not self.closed:
+            self.closed = True
+            cio.cancelStreamCaller(self.ctxToken)
+            self.tables = None
+
+
+def stream_partitions(futures):
+    """Yields the result partitions of a distributed query one at a time, releasing every future once it was fetched."""
+    for i in range(len(futures)):
+        future = futures[i]
+        futures[i] = None
+        yield future.result()
+
+
+class PlannerPool(object):
+    """
+    Pool of RelationalAlgebraGenerator instances over the same schema. Calcite planners are not thread safe,
+    so every thread that plans a query borrows its own generator. Each idle generator remembers the catalog
+    version it last saw, so it only refreshes its view of the catalog when tables were created or dropped since then.
+    """
+
+    def __init__(self, schema, max_size=4):
+        self.schema = schema
+        self.max_size = max(1, max_size)
+        self.condition = Condition()
+        self.idle = []
+        self.size = 0
+
+    def acquire(self):
+        """Returns an idle (generator, catalog_version) pair, creating a new generator if the pool is not full yet."""
+        with self.condition:
+            while len(self.idle) == 0 and self.size >= self.max_size:
+                self.condition.wait()
+            if len(self.idle) > 0:
+                return self.idle.pop()
+            self.size = self.size + 1
+        try:
+            return RelationalAlgebraGeneratorClass(self.schema), None
+        except Exception:
+            with self.condition:
+                self.size = self.size - 1
+                self.condition.notify()
+            raise
+
+    def release(self, generator, catalog_version):
+        with self.condition:
+            self.idle.append((generator, catalog_version))
+            self.condition.notify()
+
+
 def resolve_relative_path(files):
     files_out = []
     for file in files:
@@ -572,6 +723,28 @@ def resolve_relative_path(files):
             return files
     return files_out
 
+def get_cache_prefix(path):
+    """
+    The prefix that covers the cached metadata of a path given to create_table: the path itself, or the
+    folder before the first wildcard.
+    """
+    wildcards = [path.find(char) for char in '*?[' if char in path]
+    if len(wildcards) > 0:
+        return os.path.dirname(path[:min(wildcards)])
+    return path.rstrip('/')
+
+
+def get_table_cache_prefixes(table):
+    paths = [path.decode() if isinstance(path, bytes) else path for path in table.datasource]
+    if table.lazy_partitions is not None:
+        paths.append(table.lazy_partitions['hive_schema']['location'])
+    prefixes = set(get_cache_prefix(path) for path in paths)
+    files = [file.decode() if isinstance(file, bytes) else file for file in (table.files or [])]
+    if len(files) > 0:
+        prefixes.add(os.path.dirname(os.path.commonprefix(files)))
+    return [prefix for prefix in prefixes if prefix != '']
+
+
 # this is to handle the cases where there is a file that does not actually have data
 # files that do not have data wont show up in the metadata and we will want to remove them from the table schema
 def adjust_due_to_missing_rowgroups(metadata, files):
@@ -690,8 +863,19 @@ class BlazingTable(object):
         self.metadata = metadata
         # row_groups_ids, vector<vector<int>> one vector of row_groups per file
         self.row_groups_ids = row_groups_ids
+        # row_group_index, columnar index of all the row groups of the table, computed in create table
+        self.row_group_index = None
+        # row_group_sizes, RowGroupIndex with the rows and bytes of every row group (or file, for non parquet tables),
+        # only computed in create table when the context uses size aware slicing
+        self.row_group_sizes = None
+        # block_locations, the hdfs blocks of the files and the hosts that hold them, computed in create table
+        # for hdfs tables in distributed mode
+        self.block_locations = None
         # a pair of values with the startIndex and batchSize info for each slice
         self.offset = (0,0)
+        # lazy_partitions, for partitioned tables whose files are only listed for the partitions a query needs,
+        # everything needed to build the table from a subset of its partitions, set in create table
+        self.lazy_partitions = None
 
         self.column_names = []
         self.column_types = []
@@ -757,12 +941,16 @@ class BlazingTable(object):
 
         return nodeFilesList
 
-    def getSlices(self, numSlices):
+    def getSlices(self, numSlices, slicing='files', worker_hosts=None):
         nodeFilesList = []
         if self.files is None:
             for i in range(0, numSlices):
                 nodeFilesList.append(BlazingTable(self.name, self.input, self.fileType))
             return nodeFilesList
+        if worker_hosts is not None and self.block_locations:
+            return self.getLocalitySlices(worker_hosts, slicing)
+        if slicing != 'files' and self.row_group_sizes is not None:
+            return self.getBalancedSlices(numSlices, slicing)
         remaining = len(self.files)
         startIndex = 0
         for i in range(0, numSlices):
@@ -794,6 +982,138 @@ class BlazingTable(object):
 
         return nodeFilesList
 
+    def getBalancedSlices(self, numSlices, slicing):
+        """
+        Like getSlices, but the slices have (almost) the same number of bytes or rows instead of the same number of files.
+        Files bigger than a slice are split by row groups across several slices.
+        """
+        sliced_indexes, imbalance = self.row_group_sizes.split_balanced(numSlices, slicing)
+        log_imbalance(self.name, slicing, imbalance)
+        # sizes without row counts are per file (non parquet tables, or footers that could not be read)
+        by_row_groups = self.row_group_sizes.num_rows is not None
+        return self._slicesFromIndexes(sliced_indexes, by_row_groups)
+
+    def getLocalitySlices(self, worker_hosts, slicing):
+        """
+        Slices the table with one slice per worker, assigning the files (or row groups, when the table has row group sizes)
+        to the workers that run on a host that stores their HDFS blocks, and balancing the rest by size.
+        """
+        if slicing != 'files' and self.row_group_sizes is not None:
+            units = self.row_group_sizes
+            by_row_groups = units.num_rows is not None
+        else:
+            file_sizes = get_file_sizes(self.block_locations, len(self.files))
+            if (file_sizes > 0).any():
+                file_sizes[file_sizes == 0] = file_sizes[file_sizes > 0].mean()
+            else:
+                file_sizes[:] = 1
+            units = RowGroupIndex(list(range(len(self.files))), [0] * len(self.files), None, file_sizes)
+            by_row_groups = False
+
+        assignment, loads, local_fraction = assign_by_locality(
+            units.file_ids, units.weights(slicing), self.block_locations, worker_hosts)
+        logging.info('Slicing table ' + self.name + ' by locality with ' + '{:.1%}'.format(local_fraction) + ' of the data assigned to local workers')
+        average_load = sum(loads) / len(loads)
+        log_imbalance(self.name, 'locality', max(loads) / average_load if average_load > 0 else 1.0)
+        sliced_indexes = [units.take(assignment == worker_index) for worker_index in range(len(worker_hosts))]
+        return self._slicesFromIndexes(sliced_indexes, by_row_groups)
+
+    def _slicesFromIndexes(self, sliced_indexes, by_row_groups):
+        nodeFilesList = []
+        for sliced_index in sliced_indexes:
+            file_indexes = sliced_index.unique_file_ids()
+            if by_row_groups:
+                row_groups_ids = sliced_index.row_groups_per_file()
+            elif self.row_groups_ids is not None and len(self.row_groups_ids) > 0:
+                row_groups_ids = [self.row_groups_ids[i] for i in file_indexes]
+            else:
+                row_groups_ids = []
+            bt = BlazingTable(self.name,
+                                self.input,
+                                self.fileType,
+                                files=[self.files[i] for i in file_indexes],
+                                calcite_to_file_indices=self.calcite_to_file_indices,
+                                uri_values=[self.uri_values[i] for i in file_indexes if i < len(self.uri_values)],
+                                args=self.args,
+                                row_groups_ids=row_groups_ids,
+                                in_file=self.in_file)
+            bt.column_names = self.column_names
+            bt.file_column_names = self.file_column_names
+            bt.column_types = self.column_types
+            nodeFilesList.append(bt)
+
+        return nodeFilesList
+
+
+def log_imbalance(table_name, slicing, imbalance):
+    logging.info('Slicing table ' + table_name + ' by ' + slicing + ' with an expected imbalance factor of ' + '{:.3f}'.format(imbalance))
+
+
+def getRowGroupSizes(files, file_type):
+    """
+    Returns a RowGroupIndex with the number of rows and bytes of every row group of the files. For non parquet files
+    (or parquet files whose footer could not be read) every file is a single unit that only has its size in bytes.
+    """
+    # the files of a table are kept as bytes
+    files = [file.decode() if isinstance(file, bytes) else file for file in files]
+    if file_type == DataType.PARQUET:
+        row_groups = cio.getRowGroupInfoCaller(files)
+        if len(set(row_groups['file_index'])) == len(files):
+            return RowGroupIndex(row_groups['file_index'],
+                                row_groups['row_group_index'],
+                                row_groups['num_rows'],
+                                row_groups['num_bytes'])
+
+    files_info = cio.getFileInfoCaller(files)
+    return RowGroupIndex(list(range(len(files))),
+                        [0] * len(files),
+                        None,
+                        [file_info['size'] for file_info in files_info])
+
+
+# the tables registered by bc.log: table name -> (engine logger, column names, column dtypes)
+log_schemas = {
+    'bsql_logs': ('batch_logger',
+                  ['log_time', 'node_id', 'type', 'query_id', 'step', 'substep', 'info', 'duration', 'extra1', 'data1', 'extra2', 'data2'],
+                  ['date64', 'int32', 'str', 'int32', 'int16', 'int16', 'str', 'float32', 'str', 'int32', 'str', 'int32']),
+    'bsql_queries': ('queries_logger',
+                     ['ral_id', 'query_id', 'start_time', 'plan'],
+                     ['int32', 'int32', 'int64', 'str']),
+    'bsql_kernels': ('kernels_logger',
+                     ['ral_id', 'query_id', 'kernel_id', 'is_kernel', 'kernel_type'],
+                     ['int32', 'int32', 'int64', 'int16', 'str']),
+    'bsql_kernels_edges': ('kernels_edges_logger',
+                           ['ral_id', 'query_id', 'source', 'sink'],
+                           ['int32', 'int32', 'int64', 'int64']),
+    'bsql_kernel_events': ('events_logger',
+                           ['ral_id', 'query_id', 'kernel_id', 'input_num_rows', 'input_num_bytes', 'output_num_rows', 'output_num_bytes', 'event_type', 'timestamp_begin', 'timestamp_end'],
+                           ['int32', 'int32', 'int64', 'int64', 'int64', 'int64', 'int64', 'str', 'int64', 'int64']),
+    'bsql_cache_events': ('cache_events_logger',
+                          ['ral_id', 'query_id', 'source', 'sink', 'num_rows', 'num_bytes', 'event_type', 'timestamp_begin', 'timestamp_end'],
+                          ['int32', 'int32', 'int64', 'int64', 'int64', 'int64', 'str', 'int64', 'int64']),
+}
+
+log_pandas_dtypes = {'str': 'str', 'date64': 'datetime64[ms]'}
+
+def getLogTable(logger_name, names, dtypes):
+    """
+    Builds a DataFrame from the records of an engine log retained in memory. Only the retained records
+    are parsed, so the cost does not grow with the age of the process.
+    """
+    header = '|'.join(names)
+    records = [record for record in cio.getLogRecordsCaller(logger_name) if record != header]
+    if len(records) == 0:
+        return cudf.DataFrame({name: cudf.Series([], dtype=log_pandas_dtypes.get(dtype, dtype)) for name, dtype in zip(names, dtypes)})
+    return cudf.read_csv(
+        BytesIO('\n'.join(records).encode()),
+        delimiter='|',
+        names=names,
+        dtype=dtypes,
+        header=None)
+
+def getRolledLogFiles(logger_name):
+    return cio.getRolledLogFilesCaller(logger_name)
+
 class BlazingContext(object):
     """
     BlazingContext is the Python API of BlazingSQL. Along with initialization arguments allowing for
@@ -804,7 +1124,7 @@ class BlazingContext(object):
     """
 
     def __init__(self, dask_client=None, network_interface=None, allocator="managed",
-                 pool=False, initial_pool_size=None, config_options={}):
+                 pool=False, initial_pool_size=None, config_options={}, slicing='files'):
         """
         Create a BlazingSQL API instance.
 
@@ -834,8 +1154,8 @@ class BlazingContext(object):
                                     NUM_BYTES_PER_ORDER_BY_PARTITION : The max number size in bytes for each order by partition. Note that,
                                            MAX_NUM_ORDER_BY_PARTITIONS_PER_NODE will be enforced over this parameter.
                                            default: 400000000
-                                    TABLE_SCAN_KERNEL_NUM_THREADS: The number of threads used in the TableScan and BindableTableScan kernels for
-                                           reading batches
+                                    TABLE_SCAN_KERNEL_NUM_THREADS: The number of batches the TableScan and BindableTableScan kernels read at
+                                           the same time, in the threads of the executor (see BLAZING_EXECUTOR_THREADS)
                                            default: 4
                                     MAX_DATA_LOAD_CONCAT_CACHE_BYTE_SIZE : The max size in bytes to concatenate the batches read from the scan kernels
                                            default: 400000000
@@ -863,6 +1183,105 @@ class BlazingContext(object):
                                     BLAZING_CACHE_DIRECTORY : A folder path to place all orc files when start caching on Disk. The path can be relative or absolute.
                                             NOTE: This parameter only works when used in the BlazingContext
                                             default: '/tmp/'
+                                    BLAZING_LOGGING_BUFFER_SIZE : The number of records of every log that are kept in memory. bc.log queries these records
+                                            instead of parsing the log files, so it only sees the last BLAZING_LOGGING_BUFFER_SIZE records
+                                            of every log in every node. The older records are still in the log files, set it to 0 to query
+                                            the log files instead (or use BLAZING_LOGGING_ROLL_TO_PARQUET to query them as <log table>_archive).
+                                            NOTE: This parameter only works when used in the BlazingContext
+                                            default: 100000
+                                    BLAZING_LOGGING_ROLL_TO_PARQUET : If true, the records that do not fit in BLAZING_LOGGING_BUFFER_SIZE anymore are
+                                            written to parquet files in BLAZING_LOGGING_DIRECTORY (one file per 1/16th of the buffer) instead of writing
+                                            text log files. bc.log registers them as the <log table>_archive tables, with all columns as strings.
+                                            NOTE: This parameter only works when used in the BlazingContext
+                                            default: False
+                                    BLAZING_PLAN_CACHE_SIZE : The max number of query plans kept in the BlazingContext plan cache. Repeated
+                                            queries reuse the cached plan instead of being parsed and optimized again. Set to 0 to disable it.
+                                            NOTE: This parameter only works when used in the BlazingContext
+                                            default: 256
+                                    BLAZING_PLANNER_POOL_SIZE : The max number of Calcite planners used to plan queries concurrently (for example
+                                            with sql_async or when calling sql from several threads).
+                                            NOTE: This parameter only works when used in the BlazingContext
+                                            default: 4
+                                    BLAZING_MAX_CONCURRENT_QUERIES : The max number of queries submitted with sql_async that are executed at the
+                                            same time. Planning of the following queries overlaps with their execution.
+                                            NOTE: This parameter only works when used in the BlazingContext
+                                            default: 1
+                                    BLAZING_RESULT_CACHE_SIZE : The max number of bytes of host memory used to cache query results. Repeated
+                                            queries over files that did not change return the cached result. Set to 0 to disable it.
+                                            Only the results of single-GPU queries that only read tables created from files are cached.
+                                            NOTE: This parameter only works when used in the BlazingContext
+                                            default: 0
+                                    BLAZING_RESULT_CACHE_DIRECTORY : A folder path where the cached query results that do not fit in
+                                            BLAZING_RESULT_CACHE_SIZE are spilled as Arrow IPC files. If not set, those results are just dropped.
+                                            NOTE: This parameter only works when used in the BlazingContext
+                                            default: None
+                                    BLAZING_RESULT_CACHE_DISK_SIZE : The max number of bytes of spilled query results in BLAZING_RESULT_CACHE_DIRECTORY.
+                                            NOTE: This parameter only works when used in the BlazingContext
+                                            default: 10737418240
+                                    BLAZING_RESULT_CACHE_LOG_SIZE : The number of the last result cache events kept in memory for the
+                                            bsql_result_cache table of bc.log. Set to 0 to not keep them.
+                                            NOTE: This parameter only works when used in the BlazingContext
+                                            default: 10000
+                                    BLAZING_STREAM_MAX_BATCHES : The max number of result batches buffered by a query run with sql(..., stream=True)
+                                            that were not consumed yet. The query is paused while the buffer is full.
+                                            NOTE: This parameter only works when used in the BlazingContext
+                                            default: 4
+                                    BLAZING_METADATA_CACHE_DIRECTORY : A folder path where the parquet metadata read by create_table is cached. Files
+                                            that did not change since they were cached do not get their footers read again. The path can be relative or absolute.
+                                            NOTE: This parameter only works when used in the BlazingContext
+                                            default: None (the metadata cache is disabled)
+                                    BLAZING_METADATA_CACHE_MAX_SIZE : The max size in bytes of the parquet metadata cache. The least recently used
+                                            entries are removed when it grows beyond this size.
+                                            NOTE: This parameter only works when used in the BlazingContext
+                                            default: 1073741824
+                                    BLAZING_HIVE_METADATA_TTL : The number of seconds the schema and partitions read from the Hive metastore for a table
+                                            are reused by create_table before they are read again. Set to 0 to always read them.
+                                            NOTE: This parameter only works when used in the BlazingContext
+                                            default: 300
+                                    BLAZING_FILESYSTEM_CACHE_TTL : The number of seconds the existence, status and listings of the input files
+                                            and folders are reused by the queries before they are read again from the filesystem. Use
+                                            refresh_table to see the changes to the files of a table before that. Set to 0 to disable it.
+                                            default: 60
+                                    BLAZING_READ_AHEAD_SIZE : The min number of bytes read by every request to S3. The bytes read ahead are kept
+                                            in memory, so the many small reads of a parquet or orc file at nearby positions become one request.
+                                            Set to 0 to make a request for every read.
+                                            default: 4194304
+                                    BLAZING_READ_PARALLEL_REQUESTS : The max number of parallel ranged requests a big read from S3 (32 MB or
+                                            more) is split in.
+                                            default: 8
+                                    BLAZING_CACHE_SPILL_FORMAT : The format of the files of the cache on Disk. 'ORC' encodes the data with cudf,
+                                            'RAW' writes the column buffers as they are, in one sequential write that a spill thread does in the
+                                            background, and reads them back from a memory mapping. 'RAW_LZ4' does the same with LZ4 compressed buffers.
+                                            default: 'ORC'
+                                    BLAZING_CACHE_SPILL_THREADS : The number of threads that write the 'RAW' and 'RAW_LZ4' files of the cache on Disk.
+                                            Set to 0 to write them in the thread that adds the data to the cache.
+                                            default: 2
+                                    BLAZING_CACHE_SPILL_MAX_PENDING_BYTES : The most bytes of host memory that the 'RAW' and 'RAW_LZ4' files
+                                            waiting for a spill thread can hold. When it is reached, adding to a cache waits for the spill threads.
+                                            default: 1073741824 (1GB)
+                                    BLAZING_EXECUTOR_THREADS : The number of threads that run the kernels of all the queries. The kernels do not
+                                            have threads of their own, they are run in these threads when their inputs are ready.
+                                            default: the number of cores
+                                    BLAZING_CACHE_TIER_INTERVAL : How often, in milliseconds, the memory used is checked to move the data of the caches
+                                            between GPU, CPU and Disk. Set to 0 to leave the data where it was placed when it was added.
+                                            default: 100
+                                    BLAZING_CACHE_TIER_HIGH_WATERMARK : When the GPU (or host) memory used goes over this fraction of its consumption
+                                            threshold, the batches of the caches that are going to be consumed later are moved to CPU (or Disk).
+                                            default: 0.95
+                                    BLAZING_CACHE_TIER_LOW_WATERMARK : The batches are moved until the memory used is under this fraction of the consumption
+                                            threshold. When the GPU memory used is under it, the batches that are going to be consumed next are moved back to GPU.
+                                            default: 0.8
+                                    BLAZING_HOST_CACHE_COMPRESSION : The codec of the batches kept in the host memory cache level: NONE, LZ4 or ZSTD.
+                                            Every buffer is compressed on its own and decompressed only when the batch is consumed.
+                                            default: NONE
+                                    BLAZING_HOST_CACHE_DICTIONARY_ENCODING : When true, the string columns of the batches kept in the host memory
+                                            cache level that have few distinct values are kept as a dictionary and the index of every row.
+                                            default: False
+
+        slicing (optional) : how the files of a table are distributed among the nodes in distributed mode. "files" gives every node
+                             the same number of files (or row groups, when skip-data is used), "bytes" and "rows" give every node
+                             the same amount of bytes or rows, splitting big parquet files by row groups when needed.
+                             default: "files"
 
         Examples
         --------
@@ -890,6 +1309,12 @@ class BlazingContext(object):
         servers are using to communicate with the IP address of the dask-scheduler. You can see the different network
         interfaces and what IP addresses they serve with the bash command ifconfig. The default is set to 'eth0'.
         """
+        if slicing not in ('files', 'bytes', 'rows'):
+            raise ValueError("slicing must be 'files', 'bytes' or 'rows', got " + str(slicing))
+        self.slicing = slicing
+        # used to assign the files of hdfs tables to the workers that store them
+        self.block_location_provider = HdfsBlockLocationProvider(dask_client)
+
         self.lock = Lock()
         self.finalizeCaller = ref(cio.finalizeCaller)
         self.dask_client = dask_client
@@ -910,6 +1335,43 @@ class BlazingContext(object):
 
         self.config_options['BLAZING_CACHE_DIRECTORY'.encode()] = cache_dir_path.encode()
 
+        self.logging_buffer_size = int(config_options.get('BLAZING_LOGGING_BUFFER_SIZE', 100000))
+        self.config_options['BLAZING_LOGGING_BUFFER_SIZE'.encode()] = str(self.logging_buffer_size).encode()
+
+        plan_cache_size = 256
+        if ('BLAZING_PLAN_CACHE_SIZE' in config_options):
+            plan_cache_size = int(config_options['BLAZING_PLAN_CACHE_SIZE'])
+        # catalog_version is increased every time a table is created or dropped
+        self.catalog_version = 0
+        self.plan_cache = PlanCache(plan_cache_size)
+
+        self.planner_pool_size = 4
+        if ('BLAZING_PLANNER_POOL_SIZE' in config_options):
+            self.planner_pool_size = int(config_options['BLAZING_PLANNER_POOL_SIZE'])
+        self.max_concurrent_queries = 1
+        if ('BLAZING_MAX_CONCURRENT_QUERIES' in config_options):
+            self.max_concurrent_queries = int(config_options['BLAZING_MAX_CONCURRENT_QUERIES'])
+        # the executors used by sql_async are only created the first time it is called,
+        # and created again when planner_pool_size or max_concurrent_queries are changed
+        self.planning_executor = None
+        self.execution_executor = None
+        self.executor_sizes = None
+
+        self.metadata_cache_dir = None
+        if ('BLAZING_METADATA_CACHE_DIRECTORY' in config_options):
+            self.metadata_cache_dir = os.path.abspath(config_options['BLAZING_METADATA_CACHE_DIRECTORY'])
+        self.metadata_cache_max_bytes = 1073741824
+        if ('BLAZING_METADATA_CACHE_MAX_SIZE' in config_options):
+            self.metadata_cache_max_bytes = int(config_options['BLAZING_METADATA_CACHE_MAX_SIZE'])
+
+        hive_metadata_ttl = 300
+        if ('BLAZING_HIVE_METADATA_TTL' in config_options):
+            hive_metadata_ttl = float(config_options['BLAZING_HIVE_METADATA_TTL'])
+        self.hive_metadata_cache = HiveMetadataCache(hive_metadata_ttl)
+        # the input and arguments of the tables created from files or Hive, so that refresh_table can build them again
+        self.table_sources = {}
+        self.filesystem_cache_ttl = float(config_options.get('BLAZING_FILESYSTEM_CACHE_TTL', 60))
+
         # remove if exists older orc tmp files
         remove_orc_files_from_disk(cache_dir_path)
 
@@ -983,6 +1445,26 @@ class BlazingContext(object):
             self.nodes.append(node)
             self.node_log_paths.append(log_path)
 
+        self.stream_max_batches = max(1, int(config_options.get('BLAZING_STREAM_MAX_BATCHES', 4)))
+
+        # tables built from the partitions that survived the filters of a query, reused by other queries
+        # that need the same partitions of the same table
+        self.pruned_tables = OrderedDict()
+        self.pruned_tables_size = 16
+        self.pruned_tables_lock = Lock()
+
+        self.result_cache = None
+        result_cache_size = int(config_options.get('BLAZING_RESULT_CACHE_SIZE', 0))
+        if result_cache_size > 0:
+            result_cache_dir = config_options.get('BLAZING_RESULT_CACHE_DIRECTORY', None)
+            if result_cache_dir is not None:
+                result_cache_dir = os.path.abspath(result_cache_dir)
+            self.result_cache = ResultCache(
+                result_cache_size,
+                spill_dir=result_cache_dir,
+                max_spill_bytes=int(config_options.get('BLAZING_RESULT_CACHE_DISK_SIZE', 10737418240)),
+                log_size=int(config_options.get('BLAZING_RESULT_CACHE_LOG_SIZE', 10000)))
+
         # NOTE ("//"+) is a neat trick to handle ip:port cases
         #internal_api.SetupOrchestratorConnection(orchestrator_host_ip, orchestrator_port)
 
@@ -990,7 +1472,7 @@ class BlazingContext(object):
 
         self.db = DatabaseClass("main")
         self.schema = BlazingSchemaClass(self.db)
-        self.generator = RelationalAlgebraGeneratorClass(self.schema)
+        self.planner_pool = PlannerPool(self.schema, self.planner_pool_size)
         self.tables = {}
         self.logs_initialized = False
 
@@ -1005,6 +1487,7 @@ class BlazingContext(object):
             return self.client.ping()
 
     def __del__(self):
+        self._shutdown_executors()
         self.finalizeCaller()
 
     def __repr__(self):
@@ -1162,24 +1645,101 @@ class BlazingContext(object):
 
         Docs: https://docs.blazingdb.com/docs/explain
         """
+        algebra, plan = self._get_algebra_and_plan(sql)
+        return algebra
+
+    def result_cache_stats(self):
+        """
+        Returns a dictionary with the entries, bytes in memory and on disk, hits, misses and hit rate of the query result cache
+        (see BLAZING_RESULT_CACHE_SIZE), or None if the result cache is disabled. Every cache event is also logged in the
+        bsql_result_cache table of bc.log.
+
+        Examples
+        --------
+
+        >>> bc = BlazingContext(config_options={'BLAZING_RESULT_CACHE_SIZE': 1073741824})
+        >>> bc.sql('SELECT * FROM taxi')
+        >>> bc.sql('SELECT * FROM taxi')
+        >>> bc.result_cache_stats()
+        {'entries': 1, 'memory_bytes': 1503236, 'disk_bytes': 0, 'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+        >>> bc.log("SELECT event, COUNT(*) FROM bsql_result_cache GROUP BY event")
+        """
+        if self.result_cache is None:
+            return None
+        return self.result_cache.stats()
+
+    def _get_algebra_and_plan(self, sql):
+        self.lock.acquire()
+        try:
+            catalog_version = self.catalog_version
+        finally:
+            self.lock.release()
+
+        cached = self.plan_cache.get(sql, catalog_version)
+        if cached is not None:
+            return cached
+
+        generator, generator_catalog_version = self.planner_pool.acquire()
         try:
-            algebra = str(self.generator.getRelationalAlgebraString(sql))
+            # the generator only sees the tables created or dropped since it was last used after a refresh
+            if generator_catalog_version != catalog_version:
+                generator.refreshSchema()
+            algebra = str(generator.getRelationalAlgebraString(sql))
         except jpype.JException as exception:
             algebra = ""
             print("SQL Parsing Error")
             print(exception.message())
+        finally:
+            self.planner_pool.release(generator, catalog_version)
         if algebra.startswith("fail:"):
             print("Error found")
             print(algebra)
             algebra=""
 
-        return algebra
+        if algebra == "":
+            return algebra, None
+
+        plan = get_plan(algebra)
+        self.plan_cache.put(sql, catalog_version, algebra, plan)
+        return algebra, plan
+
+    def plan_cache_stats(self):
+        """
+        Returns a dictionary with the size, hits, misses and evictions of the query plan cache.
+
+        Examples
+        --------
+
+        >>> bc.sql('SELECT * FROM taxi')
+        >>> bc.sql('SELECT * FROM taxi')
+        >>> bc.plan_cache_stats()
+        {'size': 1, 'max_size': 256, 'hits': 1, 'misses': 1, 'evictions': 0}
+        """
+        return self.plan_cache.stats()
 
     def add_remove_table(self, tableName, addTable, table=None):
+        if(addTable):
+            self._update_catalog(tables_to_add={tableName: table})
+        else:
+            self._update_catalog(tables_to_remove=[tableName])
+
+    def _update_catalog(self, tables_to_add=None, tables_to_remove=None):
+        if tables_to_add is None:
+            tables_to_add = {}
+        if tables_to_remove is None:
+            tables_to_remove = []
+        # all the changes are applied to the catalog at once, and the generators only
+        # refresh their view of the catalog right before the next query they plan
         self.lock.acquire()
         try:
-            if(addTable):
+            for tableName in tables_to_remove:
                 self.db.removeTable(tableName)
+                del self.tables[tableName]
+                self.table_sources.pop(tableName, None)
+            self._forget_pruned_tables(list(tables_to_add.keys()) + list(tables_to_remove))
+
+            tablesJava = ArrayClass()
+            for tableName, table in tables_to_add.items():
                 self.tables[tableName] = table
 
                 arr = ArrayClass()
@@ -1188,16 +1748,14 @@ class BlazingContext(object):
                     dataType = ColumnTypeClass.fromTypeId(type_id)
                     column = ColumnClass(column, dataType, order)
                     arr.add(column)
-                tableJava = TableClass(tableName, self.db, arr)
-                self.db.addTable(tableJava)
-                self.schema = BlazingSchemaClass(self.db)
-                self.generator = RelationalAlgebraGeneratorClass(self.schema)
-            else:
-                self.db.removeTable(tableName)
-                self.schema = BlazingSchemaClass(self.db)
-                self.generator = RelationalAlgebraGeneratorClass(self.schema)
-                del self.tables[tableName]
+                tablesJava.add(TableClass(tableName, self.db, arr))
+            self.db.replaceTables(tablesJava)
         finally:
+            # any change in the catalog makes the cached plans stale
+            self.catalog_version = self.catalog_version + 1
+            self.plan_cache.invalidate(self.catalog_version)
+            if self.result_cache is not None:
+                self.result_cache.invalidate_tables(list(tables_to_add.keys()) + list(tables_to_remove))
             self.lock.release()
 
     def create_table(self, table_name, input, **kwargs):
@@ -1210,6 +1768,12 @@ class BlazingContext(object):
         table_name : string of table name.
         input : data source for table.
                 cudf.Dataframe, dask_cudf.DataFrame, pandas.DataFrame, filepath for csv, orc, parquet, etc...
+                A Hive cursor or a HiveCursorPool, in which case hive_table_name, hive_database_name and refresh_hive_metadata
+                (to read the table again from the metastore even if it is in the BLAZING_HIVE_METADATA_TTL cache) can be given.
+        partition_pruning (optional) : for Hive tables and tables with user defined partitions, only the partitions that
+                can match the filters of a query on the partition columns are listed and read, when the query runs.
+                Set to False to list all the partitions in create_table instead.
+                default: True
 
         Examples
         --------
@@ -1242,12 +1806,156 @@ class BlazingContext(object):
 
         Docs: https://docs.blazingdb.com/docs/create_table
         """
+        self._forget_input_metadata([input])
+        table = self._build_table(table_name, input, **kwargs)
+        if table is not None:
+            self._remember_table_source(table_name, input, kwargs)
+            self.add_remove_table(table_name, True, table)
+
+    def create_tables(self, tables, **kwargs):
+        """
+        Create several BlazingSQL tables at once. All the tables are registered in the catalog
+        in a single step, which is much faster than calling create_table for each of them.
+
+        Parameters
+        ----------
+
+        tables : dictionary of table names to the data source of each table. The data source can be any input
+                 accepted by create_table, or a dictionary with the input under the key 'input' and the arguments
+                 specific to that table.
+        kwargs (optional) : arguments that are used for all the tables, see create_table.
+
+        Examples
+        --------
+
+        >>> bc.create_tables({
+        >>>     'nation': 'data/nation.parquet',
+        >>>     'region': {'input': 'data/region.psv', 'delimiter': '|', 'names': ['r_regionkey', 'r_name', 'r_comment']},
+        >>> })
+
+        """
+        tables_kwargs = OrderedDict()
+        for table_name, table_input in tables.items():
+            table_kwargs = dict(kwargs)
+            if isinstance(table_input, dict):
+                table_kwargs.update(table_input)
+                table_input = table_kwargs.pop('input')
+            tables_kwargs[table_name] = (table_input, table_kwargs)
+
+        self._forget_input_metadata([table_input for table_input, table_kwargs in tables_kwargs.values()])
+
+        # the metadata of all the Hive tables is fetched at once, so that the metastore calls of different tables overlap
+        hive_tables = [table_name for table_name, (table_input, table_kwargs) in tables_kwargs.items() if isHiveInput(table_input)]
+        hive_metadata = {}
+        if len(hive_tables) > 0:
+            requests = [(tables_kwargs[table_name][0],
+                         tables_kwargs[table_name][1].get('hive_table_name', table_name),
+                         tables_kwargs[table_name][1].get('hive_database_name', 'default')) for table_name in hive_tables]
+            refresh = [tables_kwargs[table_name][1].get('refresh_hive_metadata', False) for table_name in hive_tables]
+            for table_name, metadata in zip(hive_tables, getHiveTablesMetadata(requests, self.hive_metadata_cache, refresh)):
+                hive_metadata[table_name] = metadata
+
+        new_tables = OrderedDict()
+        for table_name, (table_input, table_kwargs) in tables_kwargs.items():
+            table = self._build_table(table_name, table_input, hive_metadata=hive_metadata.get(table_name), **table_kwargs)
+            if table is not None:
+                self._remember_table_source(table_name, table_input, table_kwargs)
+                new_tables[table_name] = table
+
+        if len(new_tables) > 0:
+            self._update_catalog(tables_to_add=new_tables)
+
+    def _remember_table_source(self, table_name, input, kwargs):
+        if isinstance(input, (str, list)) or isHiveInput(input):
+            kwargs = dict(kwargs)
+            kwargs.pop('refresh_hive_metadata', None)
+            self.table_sources[table_name] = (input, kwargs)
+        else:
+            self.table_sources.pop(table_name, None)
+
+    def refresh_table(self, table_name):
+        """
+        Creates a table from files or from Hive again, so that the changes to its files (or to its Hive metadata) are
+        seen right away, without waiting for the BLAZING_FILESYSTEM_CACHE_TTL and BLAZING_HIVE_METADATA_TTL caches to expire.
+        The cached existence, status and listings of all the files and folders under the paths of the table are removed.
+
+        Parameters
+        ----------
+
+        table_name : string of the name of a table created from files or from a Hive cursor.
+
+        Examples
+        --------
+
+        >>> bc.create_table('taxi', 'data/taxi/*.parquet')
+        >>> # new files are written in data/taxi
+        >>> bc.refresh_table('taxi')
+
+        """
+        if table_name not in self.table_sources:
+            print("ERROR: Table " + table_name + " was not created from files or from Hive, so it can not be refreshed")
+            logging.error("ERROR: Table " + table_name + " was not created from files or from Hive, so it can not be refreshed")
+            return
+
+        input, kwargs = self.table_sources[table_name]
+        self._invalidateFileSystemCache(get_table_cache_prefixes(self.tables[table_name]))
+        if isHiveInput(input):
+            kwargs = dict(kwargs)
+            kwargs['refresh_hive_metadata'] = True
+        self.create_table(table_name, input, **kwargs)
+
+    def filesystem_cache_stats(self):
+        """
+        Returns the hits, misses and number of entries of the cache of file existence, status and listings
+        (see BLAZING_FILESYSTEM_CACHE_TTL), added up for all the nodes.
+        """
+        if self.dask_client:
+            worker_stats = list(self.dask_client.run(cio.getFileSystemCacheStatsCaller).values())
+        else:
+            worker_stats = [cio.getFileSystemCacheStatsCaller()]
+        stats = {'hits': 0, 'misses': 0, 'entries': 0}
+        for node_stats in worker_stats:
+            for key in stats:
+                stats[key] = stats[key] + node_stats[key]
+        return stats
+
+    def executor_stats(self):
+        """
+        Returns a list with the stats of the threads of every node: the threads of the executor
+        (see BLAZING_EXECUTOR_THREADS), its active, queued and completed tasks, and the kernels
+        that are running and the most there were at the same time.
+        """
+        if self.dask_client:
+            return list(self.dask_client.run(cio.getExecutorStatsCaller).values())
+        return [cio.getExecutorStatsCaller()]
+
+    def _forget_input_metadata(self, inputs):
+        # create_table always sees the files as they are now, the cached metadata is only reused by the queries
+        if self.filesystem_cache_ttl <= 0:
+            return
+        paths = []
+        for input in inputs:
+            if isinstance(input, str):
+                paths.append(input)
+            elif isinstance(input, list):
+                paths.extend(path for path in input if isinstance(path, str))
+        prefixes = set(get_cache_prefix(path) for path in resolve_relative_path(paths))
+        prefixes.discard('')
+        if len(prefixes) > 0:
+            self._invalidateFileSystemCache(list(prefixes))
+
+    def _invalidateFileSystemCache(self, prefixes):
+        # every node caches the metadata of the files it reads, so all of them have to forget it
+        if self.dask_client:
+            self.dask_client.run(cio.invalidateFileSystemCacheCaller, prefixes)
+        else:
+            cio.invalidateFileSystemCacheCaller(prefixes)
 
+    def _build_table(self, table_name, input, hive_metadata=None, **kwargs):
         logging.info('create_table start for ' + table_name)
 
         table = None
         extra_kwargs = {}
-        in_file = []
         is_hive_input = False
         partitions = {}
         extra_columns = []
@@ -1273,11 +1981,14 @@ class BlazingContext(object):
                 logging.error("ERROR: The number of columns in 'partitions' should be the same as 'partitions_schema'")
                 return
 
-        if(isinstance(input, hive.Cursor)):
+        if(isHiveInput(input)):
             hive_table_name = kwargs.get('hive_table_name', table_name)
             hive_database_name = kwargs.get('hive_database_name', 'default')
+            if hive_metadata is None:
+                hive_metadata = getHiveTableMetadata(input, hive_table_name, hive_database_name, self.hive_metadata_cache,
+                                                     kwargs.get('refresh_hive_metadata', False))
             folder_list, hive_file_format_hint, extra_kwargs, extra_columns, hive_schema = get_hive_table(
-                input, hive_table_name, hive_database_name, user_partitions)
+                input, hive_table_name, hive_database_name, user_partitions, hive_metadata=hive_metadata)
 
             if file_format_hint == 'undefined':
                 file_format_hint = hive_file_format_hint
@@ -1304,8 +2015,19 @@ class BlazingContext(object):
                 logging.error("ERROR: When using 'partitions' without a Hive cursor, the input needs to be a path to the base folder of the partitioned data")
                 return
 
-            hive_schema['partitions'] = getPartitionsFromUserPartitions(user_partitions)
-            input = getFolderListFromPartitions(hive_schema['partitions'], hive_schema['location'] )
+            # only the col=value folders that exist are enumerated, instead of every combination of the requested values.
+            # The table needs all of its partitions, so they are all kept, but the folders of each one are added as the
+            # last level is listed, instead of in another pass over all of them
+            hive_schema['location'] = resolve_relative_path([hive_schema['location']])[0]
+            hive_schema['partitions'] = OrderedDict()
+            input = []
+            for partition_name, partition_values in enumerateUserPartitions(user_partitions, hive_schema['location'], self._listResourceNames):
+                hive_schema['partitions'][partition_name] = partition_values
+                input.extend(getFolderListFromPartitions([partition_name], hive_schema['location']))
+            if len(hive_schema['partitions']) == 0:
+                print("ERROR: None of the partitions defined in 'partitions' were found in " + hive_schema['location'])
+                logging.error("ERROR: None of the partitions defined in 'partitions' were found in " + hive_schema['location'])
+                return
 
         if user_partitions_schema is not None:
             extra_columns = []
@@ -1341,94 +2063,172 @@ class BlazingContext(object):
             input = resolve_relative_path(input)
 
             ignore_missing_paths = user_partitions_schema is not None # if we are using user defined partitions without hive, we want to ignore paths we dont find.
-            parsedSchema = self._parseSchema(
-                input, file_format_hint, kwargs, extra_columns, ignore_missing_paths)
-
-            if is_hive_input or user_partitions is not None:
-                uri_values = get_uri_values(parsedSchema['files'], hive_schema['partitions'], hive_schema['location'])
-                num_cols = len(parsedSchema['names'])
-                num_partition_cols = len(extra_columns)
-                in_file = [True]*(num_cols - num_partition_cols) + [False]*num_partition_cols
+            is_partitioned = is_hive_input or user_partitions is not None
+            if is_partitioned and kwargs.get('partition_pruning', True) and len(hive_schema['partitions']) > 1:
+                table = self._build_partitioned_table(table_name, file_format_hint, kwargs, extra_columns,
+                                                      ignore_missing_paths, hive_schema, is_hive_input)
             else:
-                uri_values = []
+                table = self._build_file_table(table_name, input, file_format_hint, kwargs, extra_columns,
+                                               ignore_missing_paths, hive_schema if is_partitioned else None, is_hive_input)
 
-            file_type = parsedSchema['file_type']
+        elif isinstance(input, dask_cudf.core.DataFrame):
             table = BlazingTable(table_name,
-                parsedSchema['files'],
-                file_type,
-                files=parsedSchema['files'],
-                datasource=parsedSchema['datasource'],
-                calcite_to_file_indices=parsedSchema['calcite_to_file_indices'],
-                args=parsedSchema['args'],
-                uri_values=uri_values,
-                in_file=in_file)
-
-            if is_hive_input:
-                table.column_names = hive_schema['column_names'] # table.column_names are the official schema column_names
-                table.file_column_names = parsedSchema['names'] # table.file_column_names are the column_names used by the file (may be different)
-                merged_types = []
-                if len(hive_schema['column_types']) == len(parsedSchema['types']):
-                    for i in range(len(parsedSchema['types'])):
-                        if parsedSchema['types'][i] == 0:  # if the type parsed from the file is 0 we want to use the one from Hive
-                            merged_types.append(hive_schema['column_types'][i])
-                        else:
-                            merged_types.append(parsedSchema['types'][i])
-                else:
-                    print("ERROR: number of hive_schema columns does not match number of parsedSchema columns")
-                    logging.error("ERROR: number of hive_schema columns does not match number of parsedSchema columns")
+                input,
+                DataType.DASK_CUDF,
+                client=self.dask_client)
+
+        return table
+
+    def _build_file_table(self, table_name, input, file_format_hint, kwargs, extra_columns, ignore_missing_paths, hive_schema, is_hive_input):
+        """
+        Builds a table from a list of paths, parsing its schema and metadata. hive_schema is only given
+        for partitioned tables (Hive or user defined partitions), and input has then the partition folders.
+        """
+        parsedSchema = self._parseSchema(
+            input, file_format_hint, kwargs, extra_columns, ignore_missing_paths)
+
+        in_file = []
+        if hive_schema is not None:
+            uri_values = get_uri_values(parsedSchema['files'], hive_schema['partitions'], hive_schema['location'])
+            num_cols = len(parsedSchema['names'])
+            num_partition_cols = len(extra_columns)
+            in_file = [True]*(num_cols - num_partition_cols) + [False]*num_partition_cols
+        else:
+            uri_values = []
 
-                table.column_types = merged_types
+        file_type = parsedSchema['file_type']
+        table = BlazingTable(table_name,
+            parsedSchema['files'],
+            file_type,
+            files=parsedSchema['files'],
+            datasource=parsedSchema['datasource'],
+            calcite_to_file_indices=parsedSchema['calcite_to_file_indices'],
+            args=parsedSchema['args'],
+            uri_values=uri_values,
+            in_file=in_file)
+
+        if is_hive_input:
+            table.column_names = hive_schema['column_names'] # table.column_names are the official schema column_names
+            table.file_column_names = parsedSchema['names'] # table.file_column_names are the column_names used by the file (may be different)
+            merged_types = []
+            if len(hive_schema['column_types']) == len(parsedSchema['types']):
+                for i in range(len(parsedSchema['types'])):
+                    if parsedSchema['types'][i] == 0:  # if the type parsed from the file is 0 we want to use the one from Hive
+                        merged_types.append(hive_schema['column_types'][i])
+                    else:
+                        merged_types.append(parsedSchema['types'][i])
             else:
-                table.column_names = parsedSchema['names'] # table.column_names are the official schema column_names
-                table.file_column_names = parsedSchema['names'] # table.file_column_names are the column_names used by the file (may be different
-                table.column_types = parsedSchema['types']
+                print("ERROR: number of hive_schema columns does not match number of parsedSchema columns")
+                logging.error("ERROR: number of hive_schema columns does not match number of parsedSchema columns")
+
+            table.column_types = merged_types
+        else:
+            table.column_names = parsedSchema['names'] # table.column_names are the official schema column_names
+            table.file_column_names = parsedSchema['names'] # table.file_column_names are the column_names used by the file (may be different
+            table.column_types = parsedSchema['types']
+
+        table.slices = table.getSlices(len(self.nodes))
 
-            table.slices = table.getSlices(len(self.nodes))
+        if len(uri_values) > 0:
+            parsedMetadata = parseHiveMetadata(table, uri_values)
+            table.metadata = parsedMetadata
+
+        if parsedSchema['file_type'] == DataType.PARQUET :
+            parsedMetadata = self._parseMetadata(file_format_hint, table.slices, parsedSchema, kwargs)
+
+            if isinstance(parsedMetadata, dask_cudf.core.DataFrame):
+                parsedMetadata = parsedMetadata.compute()
+                parsedMetadata = parsedMetadata.reset_index()
 
             if len(uri_values) > 0:
-                parsedMetadata = parseHiveMetadata(table, uri_values)
+                table.metadata = mergeMetadata(table, parsedMetadata, table.metadata)
+            else:
                 table.metadata = parsedMetadata
 
-            if parsedSchema['file_type'] == DataType.PARQUET :
-                parsedMetadata = self._parseMetadata(file_format_hint, table.slices, parsedSchema, kwargs)
+            # lets make sure that the number of files from the metadata actually matches the number of files.
+            # this is to handle the cases where there is a file that does not actually have data
+            # files that do not have data wont show up in the metadata and we will want to remove them from the table schema
+            table.row_group_index = RowGroupIndex.from_metadata(table.metadata)
+            if table.row_group_index.num_files() != len(table.files) or len(table.row_group_index) != len(table.metadata):
+                table.metadata, table.files = adjust_due_to_missing_rowgroups(table.metadata, table.files)
+                table.row_group_index = RowGroupIndex.from_metadata(table.metadata)
 
-                if isinstance(parsedMetadata, dask_cudf.core.DataFrame):
-                    parsedMetadata = parsedMetadata.compute()
-                    parsedMetadata = parsedMetadata.reset_index()
-
-                if len(uri_values) > 0:
-                    table.metadata = mergeMetadata(table, parsedMetadata, table.metadata)
-                else:
-                    table.metadata = parsedMetadata
-
-                # lets make sure that the number of files from the metadata actually matches the number of files.
-                # this is to handle the cases where there is a file that does not actually have data
-                # files that do not have data wont show up in the metadata and we will want to remove them from the table schema
-                file_groups = table.metadata.groupby('file_handle_index')._grouped()
-                if len(file_groups) != len(table.files):
-                    table.metadata, table.files = adjust_due_to_missing_rowgroups(table.metadata, table.files)
-
-                # now lets get the row_groups_ids from the metadata
-                metadata_ids = table.metadata[['file_handle_index', 'row_group_index']].to_pandas()
-                grouped = metadata_ids.groupby('file_handle_index')
-                row_groups_ids = []
-                for group_id in grouped.groups:
-                    row_indices = grouped.groups[group_id].values.tolist()
-                    row_groups_col = metadata_ids['row_group_index'].values.tolist()
-                    row_group_ids = [row_groups_col[i] for i in row_indices]
-                    row_groups_ids.append(row_group_ids)
-                table.row_groups_ids = row_groups_ids
+            # now lets get the row_groups_ids from the metadata
+            table.row_groups_ids = table.row_group_index.row_groups_per_file()
 
+        if self.slicing != 'files' and len(table.files) > 0:
+            table.row_group_sizes = self._getRowGroupSizes(table.files, parsedSchema['file_type'])
 
-        elif isinstance(input, dask_cudf.core.DataFrame):
-            table = BlazingTable(table_name,
-                input,
-                DataType.DASK_CUDF,
-                client=self.dask_client)
+        if self.dask_client is not None and len(table.files) > 0:
+            table.block_locations = self.block_location_provider.get_block_locations(table.files)
 
-        if table is not None:
-            self.add_remove_table(table_name, True, table)
+        return table
 
+    def _build_partitioned_table(self, table_name, file_format_hint, kwargs, extra_columns, ignore_missing_paths, hive_schema, is_hive_input):
+        """
+        Builds a partitioned table without listing the files of its partitions. Only the first partition that has
+        files is parsed, to get the schema of the table, and the rest are listed when a query needs them
+        (see _prune_partitioned_table), so that the partitions filtered out by the query are never listed.
+        """
+        table = None
+        for partition_name, partition_values in hive_schema['partitions'].items():
+            sample_schema = dict(hive_schema)
+            sample_schema['partitions'] = {partition_name: partition_values}
+            folders = resolve_relative_path(getFolderListFromPartitions(sample_schema['partitions'], hive_schema['location']))
+            table = self._build_file_table(table_name, folders, file_format_hint, kwargs, extra_columns,
+                                           ignore_missing_paths, sample_schema, is_hive_input)
+            if len(table.files) > 0:
+                break
+
+        table.lazy_partitions = {
+            'id': uuid.uuid4().hex,
+            'hive_schema': hive_schema,
+            'sample_partitions': sample_schema['partitions'],
+            'file_format_hint': file_format_hint,
+            'kwargs': kwargs,
+            'extra_columns': extra_columns,
+            'ignore_missing_paths': ignore_missing_paths,
+            'is_hive_input': is_hive_input,
+        }
+        return table
+
+    def _prune_partitioned_table(self, table, table_scan):
+        """
+        Evaluates the filters of the table scan on the partition values and returns the table built only from the
+        partitions that can have rows that pass them.
+        """
+        lazy_partitions = table.lazy_partitions
+        hive_schema = lazy_partitions['hive_schema']
+        column_names = [name.decode() if isinstance(name, bytes) else name for name in table.column_names]
+        partitions = prune_partitions(hive_schema['partitions'], table_scan, column_names)
+        logging.info('Partition pruning for table ' + table.name + ' kept ' + str(len(partitions)) + ' of ' + str(len(hive_schema['partitions'])) + ' partitions')
+        if len(partitions) == 0:
+            # the query does not return any row from this table, but the engine still needs a file with its schema
+            partitions = lazy_partitions['sample_partitions']
+
+        key = (lazy_partitions['id'], tuple(sorted(partitions.keys())))
+        with self.pruned_tables_lock:
+            if key in self.pruned_tables:
+                self.pruned_tables.move_to_end(key)
+                return self.pruned_tables[key][1]
+
+        pruned_schema = dict(hive_schema)
+        pruned_schema['partitions'] = partitions
+        folders = resolve_relative_path(getFolderListFromPartitions(partitions, hive_schema['location']))
+        pruned_table = self._build_file_table(table.name, folders, lazy_partitions['file_format_hint'], lazy_partitions['kwargs'],
+                                              lazy_partitions['extra_columns'], lazy_partitions['ignore_missing_paths'],
+                                              pruned_schema, lazy_partitions['is_hive_input'])
+
+        with self.pruned_tables_lock:
+            self.pruned_tables[key] = (table.name, pruned_table)
+            while len(self.pruned_tables) > self.pruned_tables_size:
+                self.pruned_tables.popitem(last=False)
+        return pruned_table
+
+    def _forget_pruned_tables(self, table_names):
+        with self.pruned_tables_lock:
+            for key in [key for key, (table_name, pruned_table) in self.pruned_tables.items() if table_name in table_names]:
+                del self.pruned_tables[key]
 
     def drop_table(self, table_name):
         """
@@ -1467,7 +2267,37 @@ class BlazingContext(object):
             return cio.parseSchemaCaller(
                 input, file_format_hint, kwargs, extra_columns, ignore_missing_paths)
 
+    def _listResourceNames(self, directories):
+        if self.dask_client:
+            worker = tuple(self.dask_client.scheduler_info()['workers'])[0]
+            connection = self.dask_client.submit(
+                cio.listResourceNamesCaller,
+                directories,
+                workers=[worker])
+            return connection.result()
+        else:
+            return cio.listResourceNamesCaller(directories)
+
+    def _getRowGroupSizes(self, files, file_type):
+        if self.dask_client:
+            worker = tuple(self.dask_client.scheduler_info()['workers'])[0]
+            connection = self.dask_client.submit(
+                getRowGroupSizes,
+                files,
+                file_type,
+                workers=[worker])
+            return connection.result()
+        else:
+            return getRowGroupSizes(files, file_type)
+
     def _parseMetadata(self, file_format_hint, currentTableNodes, schema, kwargs):
+        if self.metadata_cache_dir is not None:
+            parse_function = parseMetadataWithCache
+            cache_args = (self.metadata_cache_dir, self.metadata_cache_max_bytes)
+        else:
+            parse_function = cio.parseMetadataCaller
+            cache_args = ()
+
         if self.dask_client:
             dask_futures = []
             workers = tuple(self.dask_client.scheduler_info()['workers'])
@@ -1475,57 +2305,89 @@ class BlazingContext(object):
                 file_subset = [ file.decode() for file in currentTableNodes[worker_id].files]
                 if len(file_subset) > 0:
                     connection = self.dask_client.submit(
-                        cio.parseMetadataCaller,
+                        parse_function,
                         file_subset,
                         currentTableNodes[worker_id].offset,
                         schema,
                         file_format_hint,
                         kwargs,
+                        *cache_args,
                         workers=[worker])
                     dask_futures.append(connection)
             return dask.dataframe.from_delayed(dask_futures)
 
         else:
             files = [ file.decode() for file in currentTableNodes[0].files]
-            return cio.parseMetadataCaller(
-                files, currentTableNodes[0].offset, schema, file_format_hint, kwargs)
+            return parse_function(
+                files, currentTableNodes[0].offset, schema, file_format_hint, kwargs, *cache_args)
 
-    def _sliceRowGroups(self, numSlices, files, uri_values, row_groups_ids):
-        nodeFilesList = []
+    def invalidate_metadata_cache(self, files=None):
+        """
+        Removes entries from the parquet metadata cache, so that the footers of those files are read again
+        the next time a table is created from them.
+
+        Parameters
+        ----------
+
+        files (optional) : list of file paths whose cached metadata will be removed. If None, the whole cache is cleared.
+
+        Examples
+        --------
+
+        >>> bc = BlazingContext(config_options={'BLAZING_METADATA_CACHE_DIRECTORY': '/tmp/bsql_metadata_cache'})
+        >>> bc.create_table('taxi', 'data/taxi/*.parquet')
+        >>> bc.invalidate_metadata_cache(['/home/user/data/taxi/0_0_0.parquet'])
+
+        """
+        if self.metadata_cache_dir is None:
+            return
+
+        if files is not None:
+            files = resolve_relative_path(files)
+
+        if self.dask_client:
+            dask_futures = []
+            for worker in list(self.dask_client.scheduler_info()["workers"]):
+                dask_futures.append(
+                    self.dask_client.submit(
+                        invalidateMetadataCache,
+                        self.metadata_cache_dir,
+                        files,
+                        pure=False,
+                        workers=[worker]))
+            for connection in dask_futures:
+                connection.result()
+        else:
+            invalidateMetadataCache(self.metadata_cache_dir, files)
 
-        total_num_rowgroups = sum([len(x) for x in row_groups_ids])
-        file_index_per_rowgroups = [file_index  for file_index, row_groups_for_file in enumerate(row_groups_ids) for row_group in row_groups_for_file]
-        flattened_rowgroup_ids = [row_group  for row_groups_for_file in row_groups_ids for row_group in row_groups_for_file]
+    def _getWorkerHosts(self):
+        return [node['ip'] for node in self.nodes]
 
+    def _sliceRowGroups(self, numSlices, files, uri_values, row_group_index, table_name, row_group_sizes=None, block_locations=None):
         all_sliced_files = []
         all_sliced_uri_values = []
         all_sliced_row_groups_ids = []
-        remaining = total_num_rowgroups
-        startIndex = 0
-        for i in range(0, numSlices):
-            batchSize = int(remaining / (numSlices - i))
-            file_indexes_for_slice = file_index_per_rowgroups[startIndex: startIndex + batchSize]
-            unique_file_indexes_for_slice = list(dict.fromkeys(file_indexes_for_slice)) # lets get the unique indexes, but preserving order
-            sliced_files = [files[i] for i in unique_file_indexes_for_slice]
+        if numSlices > 1 and block_locations:
+            row_group_index = row_group_index.with_sizes_from(row_group_sizes)
+            worker_hosts = self._getWorkerHosts()
+            assignment, loads, local_fraction = assign_by_locality(
+                row_group_index.file_ids, row_group_index.weights(self.slicing), block_locations, worker_hosts)
+            logging.info('Slicing table ' + table_name + ' by locality with ' + '{:.1%}'.format(local_fraction) + ' of the data assigned to local workers')
+            sliced_indexes = [row_group_index.take(assignment == worker_index) for worker_index in range(len(worker_hosts))]
+        elif self.slicing != 'files' and row_group_sizes is not None:
+            row_group_index = row_group_index.with_sizes_from(row_group_sizes)
+            sliced_indexes, imbalance = row_group_index.split_balanced(numSlices, self.slicing)
+            log_imbalance(table_name, self.slicing, imbalance)
+        else:
+            sliced_indexes = row_group_index.split(numSlices)
+        for sliced_index in sliced_indexes:
+            file_indexes_for_slice = sliced_index.unique_file_ids()
+            all_sliced_files.append([files[i] for i in file_indexes_for_slice])
             if uri_values is not None and len(uri_values) > 0:
-                sliced_uri_values = [uri_values[i] for i in unique_file_indexes_for_slice]
+                all_sliced_uri_values.append([uri_values[i] for i in file_indexes_for_slice if i < len(uri_values)])
             else:
-                sliced_uri_values = []
-
-            sliced_rowgroup_ids = []
-            last_file_index = None
-            for ind, file_index in enumerate(file_indexes_for_slice):
-                if last_file_index is None or file_index != last_file_index:
-                    sliced_rowgroup_ids.append([])
-                sliced_rowgroup_ids[-1].append(flattened_rowgroup_ids[ind + startIndex])
-                last_file_index = file_index
-
-            startIndex = startIndex + batchSize
-            remaining = remaining - batchSize
-
-            all_sliced_files.append(sliced_files)
-            all_sliced_uri_values.append(sliced_uri_values)
-            all_sliced_row_groups_ids.append(sliced_rowgroup_ids)
+                all_sliced_uri_values.append([])
+            all_sliced_row_groups_ids.append(sliced_index.row_groups_per_file())
 
         return all_sliced_files, all_sliced_uri_values, all_sliced_row_groups_ids
 
@@ -1547,80 +2409,38 @@ class BlazingContext(object):
         file_indices_and_rowgroup_indices = file_indices_and_rowgroup_indices['metadata']
 
         if not skipdata_analysis_fail:
-            actual_files = []
-            uri_values = []
-            row_groups_ids = []
-
-            if not file_indices_and_rowgroup_indices.empty: #skipdata did not filter everything
-                file_and_rowgroup_indices = file_indices_and_rowgroup_indices.to_pandas()
-                files = file_and_rowgroup_indices['file_handle_index'].values.tolist()
-                grouped = file_and_rowgroup_indices.groupby('file_handle_index')
-                for group_id in grouped.groups:
-                    row_indices = grouped.groups[group_id].values.tolist()
-                    actual_files.append(current_table.files[group_id])
-                    if group_id < len(current_table.uri_values):
-                        uri_values.append(current_table.uri_values[group_id])
-                    row_groups_col = file_and_rowgroup_indices['row_group_index'].values.tolist()
-                    row_group_ids = [row_groups_col[i] for i in row_indices]
-                    row_groups_ids.append(row_group_ids)
-
-            if self.dask_client is None:
-                bt = BlazingTable(current_table.name, 
-                                current_table.input,
-                                current_table.fileType,
-                                files=actual_files,
-                                calcite_to_file_indices=current_table.calcite_to_file_indices,
-                                uri_values=uri_values,
-                                args=current_table.args,
-                                row_groups_ids=row_groups_ids,
-                                in_file=current_table.in_file)
+            row_group_index = RowGroupIndex.from_metadata(file_indices_and_rowgroup_indices)
+
+            if self.dask_client is None or single_gpu:
+                num_slices = 1
+            else:
+                num_slices = len(self.nodes)
+
+            all_sliced_files, all_sliced_uri_values, all_sliced_row_groups_ids = self._sliceRowGroups(
+                num_slices, current_table.files, current_table.uri_values, row_group_index,
+                current_table.name, current_table.row_group_sizes, current_table.block_locations)
+
+            for i in range(0, num_slices):
+                bt = BlazingTable(current_table.name,
+                            current_table.input,
+                            current_table.fileType,
+                            files=all_sliced_files[i],
+                            calcite_to_file_indices=current_table.calcite_to_file_indices,
+                            uri_values=all_sliced_uri_values[i],
+                            args=current_table.args,
+                            row_groups_ids=all_sliced_row_groups_ids[i],
+                            in_file=current_table.in_file)
                 bt.column_names = current_table.column_names
                 bt.file_column_names = current_table.file_column_names
                 bt.column_types = current_table.column_types
                 nodeFilesList.append(bt)
 
-            else:
-                if single_gpu:
-                    all_sliced_files, all_sliced_uri_values, all_sliced_row_groups_ids = self._sliceRowGroups(1, actual_files, uri_values, row_groups_ids)
-                    i = 0
-                    bt = BlazingTable(current_table.name, 
-                                current_table.input,
-                                current_table.fileType,
-                                files=all_sliced_files[i],
-                                calcite_to_file_indices=current_table.calcite_to_file_indices,
-                                uri_values=all_sliced_uri_values[i],
-                                args=current_table.args,
-                                row_groups_ids=all_sliced_row_groups_ids[i],
-                                in_file=current_table.in_file)
-                    bt.column_names = current_table.column_names
-                    bt.file_column_names = current_table.file_column_names
-                    bt.column_types = current_table.column_types
-                    nodeFilesList.append(bt)
-                else:
-
-                    all_sliced_files, all_sliced_uri_values, all_sliced_row_groups_ids = self._sliceRowGroups(len(self.nodes), actual_files, uri_values, row_groups_ids)
-
-                    for i, node in enumerate(self.nodes):
-                        bt = BlazingTable(current_table.name, 
-                                    current_table.input,
-                                    current_table.fileType,
-                                    files=all_sliced_files[i],
-                                    calcite_to_file_indices=current_table.calcite_to_file_indices,
-                                    uri_values=all_sliced_uri_values[i],
-                                    args=current_table.args,
-                                    row_groups_ids=all_sliced_row_groups_ids[i],
-                                    in_file=current_table.in_file)
-                        bt.column_names = current_table.column_names
-                        bt.file_column_names = current_table.file_column_names
-                        bt.column_types = current_table.column_types
-                        nodeFilesList.append(bt)
-
             return nodeFilesList
         else:
             if single_gpu:
                 return current_table.getSlices(1)
             else:
-                return current_table.getSlices(len(self.nodes))
+                return current_table.getSlices(len(self.nodes), self.slicing, self._getWorkerHosts())
 
 
     """
@@ -1679,7 +2499,7 @@ class BlazingContext(object):
 
 
 
-    def sql(self, query, algebra=None, return_futures=False, single_gpu=False, config_options={}):
+    def sql(self, query, algebra=None, return_futures=False, single_gpu=False, config_options={}, stream=False):
         """
         Query a BlazingSQL table.
 
@@ -1695,6 +2515,11 @@ class BlazingContext(object):
                                     simultaneously.
         config_options (optional) : defaulted to empty. You can use this to set a specific set of config_options for this query instead
                                     of the ones set in BlazingContext. See BlazingContext for more info on this parameter
+        stream (optional) :         defaulted to false. Set to true to get an iterator of cudf.DataFrame batches instead of the whole result.
+                                    Batches are handed over while the query still runs, and the query is paused when
+                                    BLAZING_STREAM_MAX_BATCHES batches are waiting to be consumed. Closing the iterator (or dropping it)
+                                    stops the query from buffering more batches. When distributed, the batches are the result partitions,
+                                    fetched from the workers one at a time.
 
         Examples
         --------
@@ -1735,8 +2560,100 @@ class BlazingContext(object):
         ...                   ...            ...         ...        ...
 
 
+        Process a large result without holding all of it in GPU memory:
+
+        >>> for batch in bc.sql('SELECT * FROM taxi', stream=True):
+        >>>     process(batch)
+
+
         Docs: https://docs.blazingdb.com/docs/single-gpu
         """
+        plan = None
+        if (algebra is None):
+            algebra, plan = self._get_algebra_and_plan(query)
+
+        return self._run_query(algebra, plan, return_futures, single_gpu, config_options, stream)
+
+    def sql_async(self, query, algebra=None, return_futures=False, single_gpu=False, config_options={}):
+        """
+        Query a BlazingSQL table without blocking.
+
+        Takes the same parameters as sql, and returns a concurrent.futures.Future that will hold the same result.
+        It can be called from several threads at the same time. Queries are planned in parallel by a pool of
+        planners (see BLAZING_PLANNER_POOL_SIZE), so the planning of a query overlaps with the execution of the
+        previous ones, and at most BLAZING_MAX_CONCURRENT_QUERIES queries are executed at the same time.
+        A query can be cancelled with the future's cancel method only while it has not been planned yet.
+        Changes to planner_pool_size and max_concurrent_queries are applied in the next call.
+
+        Examples
+        --------
+
+        >>> future = bc.sql_async('SELECT vendor_id, passenger_count FROM taxi')
+        >>> other_future = bc.sql_async('SELECT COUNT(*) FROM taxi')
+        >>> df = future.result()
+
+        From asyncio code, wrap the future to await it:
+
+        >>> df = await asyncio.wrap_future(bc.sql_async('SELECT COUNT(*) FROM taxi'))
+
+        """
+        result_future = Future()
+
+        def plan_query():
+            if algebra is None:
+                return self._get_algebra_and_plan(query)
+            return algebra, None
+
+        def copy_result(execution_future):
+            try:
+                result_future.set_result(execution_future.result())
+            except Exception as e:
+                result_future.set_exception(e)
+
+        def run_planned_query(planning_future):
+            if not result_future.set_running_or_notify_cancel():
+                return
+            try:
+                query_algebra, plan = planning_future.result()
+                # under the lock, the executors can be replaced while the query was planned
+                self.lock.acquire()
+                try:
+                    execution_future = self.execution_executor.submit(
+                        self._run_query, query_algebra, plan, return_futures, single_gpu, config_options)
+                finally:
+                    self.lock.release()
+            except Exception as e:
+                result_future.set_exception(e)
+                return
+            execution_future.add_done_callback(copy_result)
+
+        self.lock.acquire()
+        try:
+            executor_sizes = (self.planner_pool_size, max(1, self.max_concurrent_queries))
+            if self.planning_executor is not None and self.executor_sizes != executor_sizes:
+                self._shutdown_executors()
+            if self.planning_executor is None:
+                self.planning_executor = ThreadPoolExecutor(max_workers=executor_sizes[0])
+                self.execution_executor = ThreadPoolExecutor(max_workers=executor_sizes[1])
+                self.executor_sizes = executor_sizes
+            planning_future = self.planning_executor.submit(plan_query)
+        finally:
+            self.lock.release()
+        # outside the lock, the callback takes it and it runs right away when the planning already finished
+        planning_future.add_done_callback(run_planned_query)
+        return result_future
+
+    def _shutdown_executors(self):
+        # it does not wait, the work already submitted finishes in the old executors and their threads
+        # exit once they are idle
+        if self.planning_executor is not None:
+            self.planning_executor.shutdown(wait=False)
+            self.execution_executor.shutdown(wait=False)
+            self.planning_executor = None
+            self.execution_executor = None
+            self.executor_sizes = None
+
+    def _run_query(self, algebra, plan, return_futures, single_gpu, config_options, stream=False, ctxToken=None, use_result_cache=True):
         # TODO: remove hardcoding
         masterIndex = 0
         nodeTableList = [[] for _ in range(len(self.nodes))]
@@ -1744,14 +2661,13 @@ class BlazingContext(object):
             nodeTableList = [[],]
         fileTypes = []
 
-        if (algebra is None):
-            algebra = self.explain(query)
-
 
         # when an empty `LogicalValues` appears on the optimized plan there aren't neither BindableTableScan nor TableScan nor Project
         if "LogicalValues(tuples=[[]])" in algebra:
             print("This SQL statement returns empty result. Please double check your query.")
             result = cudf.DataFrame()  # it will return an empty DataFrame
+            if stream:
+                return iter([result])
             return result
 
         if algebra == '':
@@ -1765,14 +2681,21 @@ class BlazingContext(object):
             for option in config_options:
                 query_config_options[option.encode()] = str(config_options[option]).encode() # make sure all options are encoded strings
 
+        # other threads can create or drop tables while this query runs
+        self.lock.acquire()
+        try:
+            tables = dict(self.tables)
+        finally:
+            self.lock.release()
+
         if self.dask_client is None or single_gpu == True :
-            query_tables, table_scans = cio.getTableScanInfoCaller(algebra,self.tables)
+            query_tables, table_scans = cio.getTableScanInfoCaller(algebra,tables)
         else:
             worker = tuple(self.dask_client.scheduler_info()['workers'])[0]
             connection = self.dask_client.submit(
                 cio.getTableScanInfoCaller,
                 algebra,
-                self.tables,
+                tables,
                 workers=[worker])
             query_tables, table_scans = connection.result()
 
@@ -1780,6 +2703,9 @@ class BlazingContext(object):
         # algebra = modifyAlgebraForDataframesWithOnlyWantedColumns(algebra, relational_algebra_steps,self.tables)
         
         for table_idx, query_table in enumerate(query_tables):
+            if query_table.lazy_partitions is not None:
+                query_table = self._prune_partitioned_table(query_table, table_scans[table_idx])
+                query_tables[table_idx] = query_table
             fileTypes.append(query_table.fileType)
             ftype = query_table.fileType
             if(ftype == DataType.PARQUET or ftype == DataType.ORC or ftype == DataType.JSON or ftype == DataType.CSV):
@@ -1789,7 +2715,7 @@ class BlazingContext(object):
                     if single_gpu == True:
                         currentTableNodes = query_table.getSlices(1)
                     else:
-                        currentTableNodes = query_table.getSlices(len(self.nodes))
+                        currentTableNodes = query_table.getSlices(len(self.nodes), self.slicing, self._getWorkerHosts())
             elif(query_table.fileType == DataType.DASK_CUDF):
                 if single_gpu == True:
                     #TODO: repartition onto the node that does the work
@@ -1810,12 +2736,40 @@ class BlazingContext(object):
             for j, nodeList in enumerate(nodeTableList):
                 nodeList.append(currentTableNodes[j])
 
-        ctxToken = random.randint(0, np.iinfo(np.int32).max)
+        if ctxToken is None:
+            ctxToken = random.randint(0, np.iinfo(np.int32).max)
         accessToken = 0
 
-        algebra = get_plan(algebra)
-
-        if self.dask_client is None:
+        if plan is None:
+            plan = get_plan(algebra)
+        algebra = plan
+
+        result_cache_key = None
+        if self.result_cache is not None and self.dask_client is None and use_result_cache:
+            result_cache_key = get_result_cache_key(algebra, query_tables, nodeTableList[0])
+            if result_cache_key is not None:
+                result = self.result_cache.get(result_cache_key)
+                if result is not None:
+                    if stream:
+                        return iter([result])
+                    return result
+
+        if self.dask_client is None and stream:
+            cio.runQueryCaller(
+                        masterIndex,
+                        self.nodes,
+                        nodeTableList[0],
+                        table_scans,
+                        fileTypes,
+                        ctxToken,
+                        algebra,
+                        accessToken,
+                        query_config_options,
+                        is_single_node=True,
+                        stream_max_batches=self.stream_max_batches)
+            # the stream keeps the input tables alive while the query reads them
+            result = QueryStream(ctxToken, nodeTableList[0])
+        elif self.dask_client is None:
             try:
                 result = cio.runQueryCaller(
                             masterIndex,
@@ -1828,6 +2782,8 @@ class BlazingContext(object):
                             accessToken,
                             query_config_options,
                             is_single_node=True)
+                if result_cache_key is not None:
+                    self.result_cache.put(result_cache_key, result, [query_table.name for query_table in query_tables])
             except cio.RunQueryError as e:
                 print(">>>>>>>> ", e)
                 result = cudf.DataFrame()
@@ -1872,24 +2828,158 @@ class BlazingContext(object):
 
             if(return_futures):
                 result  = dask_futures
+            elif stream:
+                result = stream_partitions(dask_futures)
             else:
-                meta_results = self.dask_client.gather(dask_futures)
-
-                futures = []
-                for query_partids, meta, worker_id in meta_results:
-                    for query_partid in query_partids:
-                        futures.append(self.dask_client.submit(get_element, query_partid, workers=[worker_id]))
-
-                result = dask.dataframe.from_delayed(futures, meta=meta)
+                # only the empty meta of one partition comes back, the partitions stay in the workers
+                # and are released when the result is garbage collected
+                meta = self.dask_client.submit(get_result_meta, dask_futures[0]).result()
+                result = dask.dataframe.from_delayed(dask_futures, meta=meta, verify_meta=False)
         return result
 
     # END SQL interface
 
     # BEGIN LOG interface
+    def profile(self, query, algebra=None, single_gpu=False, config_options={}, trace_path=None, timeout=5):
+        """
+        Run a query and return a profile of its execution graph, built from the bsql_kernels, bsql_kernels_edges,
+        bsql_kernel_events and bsql_cache_events logs.
+
+        The profile has one row per kernel (kernels) with its wall time, compute time, rows and bytes in and out,
+        the time it was blocked waiting for input and the cache tier (gpu, cpu or disk) where its input batches were placed,
+        the critical path (critical_path) through the graph, and the result of the query (result).
+        The query result cache is not used, so the query always runs.
+
+        Parameters
+        ----------
+
+        query : string of SQL query.
+        algebra, single_gpu, config_options (optional) : same as in sql
+        trace_path (optional) : if set, the profile is also saved to this path in the Chrome trace format, that can be opened
+                                with chrome://tracing or https://ui.perfetto.dev
+        timeout (optional) : the max number of seconds to wait for the engine to write the logs of the query
+
+        Examples
+        --------
+
+        >>> profile = bc.profile('SELECT vendor_id, COUNT(*) FROM taxi GROUP BY vendor_id', trace_path='taxi_trace.json')
+        >>> print(profile)
+        >>> profile.kernels.sort_values('blocked_time_ms')
+
+        """
+        plan = None
+        if (algebra is None):
+            algebra, plan = self._get_algebra_and_plan(query)
+
+        ctxToken = random.randint(0, np.iinfo(np.int32).max)
+        result = self._run_query(algebra, plan, False, single_gpu, config_options, ctxToken=ctxToken, use_result_cache=False)
+        kernels, edges, kernel_events, cache_events = self._read_profile_logs(ctxToken, timeout)
+
+        profile = QueryProfile(ctxToken, kernels, edges, kernel_events, cache_events, result=result)
+        if trace_path is not None:
+            profile.save_chrome_trace(trace_path)
+        return profile
+
+    def _register_result_cache_log_table(self):
+        # the events are kept in memory, so the table gets the latest of them on every call
+        if self.result_cache is not None and self.result_cache.log_records is not None:
+            self._create_or_refresh_table('bsql_result_cache', self.result_cache.log_table())
+
+    def _register_log_tables_from_memory(self, logs_table_name):
+        """
+        Registers the log tables from the records every node keeps in memory. They are created on the first call, and
+        on the next calls only their data is replaced with the latest records, so that the catalog does not change and the
+        cached plans stay valid. The rolled parquet files, if any, are registered as <table>_archive.
+        """
+        self.logs_table_name = logs_table_name
+        for log_table_name, (logger_name, names, dtypes) in log_schemas.items():
+            table_name = logs_table_name if log_table_name == 'bsql_logs' else log_table_name
+            rolled_files = []
+            if self.dask_client:
+                dask_futures = []
+                file_futures = []
+                for worker in list(self.dask_client.scheduler_info()["workers"]):
+                    dask_futures.append(
+                        self.dask_client.submit(getLogTable, logger_name, names, dtypes, pure=False, workers=[worker]))
+                    file_futures.append(
+                        self.dask_client.submit(getRolledLogFiles, logger_name, pure=False, workers=[worker]))
+                table = dask_cudf.from_delayed(dask_futures)
+                for files in self.dask_client.gather(file_futures):
+                    rolled_files.extend(files)
+            else:
+                table = getLogTable(logger_name, names, dtypes)
+                rolled_files = getRolledLogFiles(logger_name)
+
+            self._create_or_refresh_table(table_name, table)
+            if len(rolled_files) > 0:
+                self._create_or_refresh_table(table_name + '_archive', rolled_files, file_format='parquet')
+
+        self.logs_initialized = True
+
+    def _create_or_refresh_table(self, table_name, input, **kwargs):
+        # a table that already exists with the same columns only gets its new data, without a new catalog version
+        table = self._build_table(table_name, input, **kwargs)
+        if table is None:
+            return
+        current_table = self.tables.get(table_name)
+        if (current_table is not None and list(current_table.column_names) == list(table.column_names)
+                and list(current_table.column_types) == list(table.column_types)):
+            self._replace_table_data(table_name, table)
+        else:
+            self._remember_table_source(table_name, input, kwargs)
+            self.add_remove_table(table_name, True, table)
+
+    def _replace_table_data(self, table_name, table):
+        self.lock.acquire()
+        try:
+            self.tables[table_name] = table
+            if self.result_cache is not None:
+                self.result_cache.invalidate_tables([table_name])
+        finally:
+            self.lock.release()
+
+    def _flush_logs(self):
+        if self.dask_client:
+            dask_futures = []
+            for worker in list(self.dask_client.scheduler_info()["workers"]):
+                dask_futures.append(
+                    self.dask_client.submit(
+                        cio.flushLogsCaller,
+                        pure=False,
+                        workers=[worker]))
+            for connection in dask_futures:
+                connection.result()
+        else:
+            cio.flushLogsCaller()
+
+    def _read_profile_logs(self, query_id, timeout):
+        # the engine loggers are asynchronous, so the logs are read until the events of the query stop growing
+        self._flush_logs()
+        start_time = time.time()
+        num_events = -1
+        while True:
+            kernel_events = self.log('SELECT * FROM bsql_kernel_events WHERE query_id = {}'.format(query_id))
+            cache_events = self.log('SELECT * FROM bsql_cache_events WHERE query_id = {}'.format(query_id))
+            current_num_events = len(kernel_events) + len(cache_events)
+            if (current_num_events > 0 and current_num_events == num_events) or time.time() - start_time > timeout:
+                break
+            num_events = current_num_events
+            time.sleep(0.25)
+            self._flush_logs()
+
+        kernels = self.log('SELECT * FROM bsql_kernels WHERE query_id = {}'.format(query_id))
+        edges = self.log('SELECT * FROM bsql_kernels_edges WHERE query_id = {}'.format(query_id))
+        return kernels, edges, kernel_events, cache_events
+
     def log(self, query, logs_table_name='bsql_logs'):
         """
         Query BlazingSQL's internal log (bsql_logs) that records events from all queries run.
 
+        By default the logs are queried from the last BLAZING_LOGGING_BUFFER_SIZE records that every node keeps in memory
+        (see BlazingContext), instead of parsing the whole log files. Older records are not seen, unless
+        BLAZING_LOGGING_BUFFER_SIZE is 0 (the log files are queried) or BLAZING_LOGGING_ROLL_TO_PARQUET is set
+        (they are in the <log table>_archive tables).
+
         Parameters
         ----------
 
@@ -1917,35 +3007,12 @@ class BlazingContext(object):
 
         Docs: https://docs.blazingdb.com/docs/blazingsql-logs
         """
-        if not self.logs_initialized:
+        if self.logging_buffer_size > 0:
+            self._register_log_tables_from_memory(logs_table_name)
+        elif not self.logs_initialized:
             self.logs_table_name = logs_table_name
             log_files = [os.path.join(self.node_log_paths[i], 'RAL.' + str(i) + '.log') for i in range(0, len(self.node_log_paths))]
-            dtypes = [
-                'date64',
-                'int32',
-                'str',
-                'int32',
-                'int16',
-                'int16',
-                'str',
-                'float32',
-                'str',
-                'int32',
-                'str',
-                'int32']
-            names = [
-                'log_time',
-                'node_id',
-                'type',
-                'query_id',
-                'step',
-                'substep',
-                'info',
-                'duration',
-                'extra1',
-                'data1',
-                'extra2',
-                'data2']
+            names, dtypes = log_schemas['bsql_logs'][1:]
             t = self.create_table(
                 self.logs_table_name,
                 log_files,
@@ -1954,23 +3021,12 @@ class BlazingContext(object):
                 names=names,
                 file_format='csv')
 
-            log_schemas = {
-                'bsql_queries': (['ral_id', 'query_id', 'start_time', 'plan'],
-                                 ['int32', 'int32', 'int64', 'str']),
-                'bsql_kernels': (['ral_id', 'query_id', 'kernel_id', 'is_kernel', 'kernel_type'],
-                                 ['int32', 'int32', 'int64', 'int16', 'str']),
-                'bsql_kernels_edges': (['ral_id', 'query_id', 'source', 'sink', 'port_name'],
-                                       ['int32', 'int32', 'int64', 'int64', 'str']),
-                'bsql_kernel_events': (['ral_id', 'query_id', 'kernel_id', 'input_num_rows', 'input_num_bytes', 'output_num_rows', 'output_num_bytes', 'event_type', 'timestamp_begin', 'timestamp_end'],
-                                       ['int32', 'int32', 'int64', 'int64', 'int64', 'int64', 'int64', 'str', 'int64', 'int64']),
-                'bsql_cache_events': (['ral_id', 'query_id', 'source', 'sink', 'port_name', 'num_rows', 'num_bytes', 'event_type', 'timestamp_begin', 'timestamp_end'],
-                                       ['int32', 'int32', 'int64', 'int64', 'int64', 'int64', 'int64', 'str', 'int64', 'int64']),
-            }
-
             for log_table_name in log_schemas:
+                if log_table_name == 'bsql_logs':
+                    continue
                 log_files = [os.path.join(self.node_log_paths[i], log_table_name + '.' + str(i) + '.log') for i in range(0, len(self.node_log_paths))]
-                
-                names, dtypes = log_schemas[log_table_name]
+
+                logger_name, names, dtypes = log_schemas[log_table_name]
                 t = self.create_table(
                     log_table_name,
                     log_files,
@@ -1981,4 +3037,5 @@ class BlazingContext(object):
 
             self.logs_initialized = True
 
+        self._register_result_cache_log_table()
         return self.sql(query)
@@ -1,3 +1,4 @@
+import asyncio
 from collections import OrderedDict
 from enum import Enum
 
@@ -6,6 +7,19 @@ import cio
 from pyblazing.apiv2 import S3EncryptionType
 
 
+async def registerFileSystemOnWorker(fs, root, prefix):
+    """
+    Registers the filesystem on a dask worker. The connection can block for a while, so it is made in
+    another thread instead of the event loop of the worker, and a failure is returned instead of raised,
+    so that one worker failing does not hide the status of the others.
+    """
+    loop = asyncio.get_event_loop()
+    try:
+        return await loop.run_in_executor(None, cio.registerFileSystemCaller, fs, root, prefix)
+    except Exception as e:
+        return False, str(e).encode("utf-8")
+
+
 def registerFileSystem(client, fs, root, prefix):
     ok = False
     msg = ""
@@ -15,26 +29,20 @@ def registerFileSystem(client, fs, root, prefix):
         if not ok:
             print(msg)
     else:
-        dask_futures = []
-        i = 0
-        for worker in list(client.scheduler_info()["workers"]):
-            # REMARK: pure argument is neccesary for this case to ensure each
-            # dask worker executes registerFileSystemCaller
-            dask_futures.append(
-                client.submit(
-                    cio.registerFileSystemCaller,
-                    fs,
-                    root,
-                    prefix,
-                    pure=False,
-                    workers=[worker]))
-            i = i + 1
-        for connection in dask_futures:
-            ok, msg = connection.result()
-            msg = msg.decode("utf-8")
-            if not ok:
-                print(msg + " with dask worker")
-                print(worker)
+        # a single broadcast, all the workers register the filesystem at the same time
+        results = client.run(registerFileSystemOnWorker, fs, root, prefix)
+        ok = True
+        errors = []
+        for worker, (worker_ok, worker_msg) in results.items():
+            worker_msg = worker_msg.decode("utf-8")
+            if not worker_ok:
+                ok = False
+                errors.append(worker_msg + " with dask worker " + str(worker))
+            elif msg == "":
+                msg = worker_msg
+        if not ok:
+            msg = "\n".join(errors)
+            print(msg)
     return ok, msg, fs
 
 
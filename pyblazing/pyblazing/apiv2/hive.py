@@ -3,8 +3,14 @@ from pyhive import hive
 from TCLIService.ttypes import TOperationState
 import numpy as np
 import cudf
-from itertools import repeat
 import pandas as pd
+import pyarrow as pa
+import copy
+import time
+import queue
+from contextlib import contextmanager
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
 
 
 def convertTypeNameStrToCudfType(hiveType):
@@ -64,22 +70,24 @@ cudfTypeToCsvType = {
 }  
 
 
-def getPartitions(tableName, schema, cursor):
-    query = "show partitions " + tableName
-    result = runHiveQuery(cursor, query)
+def parseHivePartitions(rows, schema):
+    partitionColumns = set(column[0] for column in schema['columns'])
     partitions = {}
-    for partition in result[0]:
+    for partition in rows:
         columnPartitions = []
         for columnPartition in partition:
             for columnData in columnPartition.split("/"):
-                columnName = columnData.split("=")[0]
-                for column in schema['columns']:
-                    if column[0] == columnName:
-                        columnValue = columnData.split("=")[1]
-                        columnPartitions.append((columnName, columnValue))
+                columnName, _, columnValue = columnData.partition("=")
+                if columnName in partitionColumns:
+                    columnPartitions.append((columnName, columnValue))
         partitions[partition[0]] = columnPartitions
     return partitions
 
+def getPartitions(tableName, schema, cursor):
+    query = "show partitions " + tableName
+    result = runHiveQuery(cursor, query)
+    return parseHivePartitions(result[0], schema)
+
 def filterHivePartitionsWithUserPartitions(hive_partitions, user_partitions):
     new_hive_partitions = {}
     for user_partition in user_partitions:
@@ -94,38 +102,43 @@ def filterHivePartitionsWithUserPartitions(hive_partitions, user_partitions):
         new_hive_partitions = {}
     return hive_partitions
 
-def getPartitionsFromUserPartitions(user_partitions):
-    partitions_out = {}
-    num_partition_cols = len(user_partitions)
+def enumerateUserPartitions(user_partitions, base_location, list_directories, chunk_size=1000):
+    """
+    Walks the partition folders under base_location level by level, one level per partition column (in the order
+    of user_partitions), and only descends into the col=value folders that exist and have one of the requested values.
+    list_directories receives a list of directories and returns the names of the entries of each of them, so that
+    all the folders of a level are listed at once (and in parallel by the engine). The partitions of the last level
+    are yielded as (partition name, [(column, value)]) as soon as every chunk_size of their parents are listed.
+    The levels before the last one are eager: all the folders of a level are listed, and kept, before the next level.
+    """
+    if base_location.endswith('/'):
+        base_location = base_location[:-1]
     partition_columns = list(user_partitions.keys())
-    num_partitions_per_column = [len(user_partitions[col]) for col in partition_columns]
-    per_column_count = [0]*num_partition_cols
-    done = False
-    partition_key = ''
-    partition_values = []
-    cur_col_ind = 0
-    while not done:
-        col = partition_columns[cur_col_ind]
-        val = user_partitions[col][per_column_count[cur_col_ind]]
-        if partition_key == '':
-            partition_key = col + "=" + str(val)
-        else:
-            partition_key = partition_key + "/" + col + "=" + str(val)
-        partition_values.append((col,str(val)))
-        
-        cur_col_ind = (cur_col_ind + 1) % num_partition_cols
-        
-        if cur_col_ind == 0: # if we cycled back to the first column, then we are done building one of the partitions
-            partitions_out[partition_key] = partition_values
-            partition_key = ''
-            partition_values = []
-            # now lets increment the per_column_count
-            for reverse_ind in list(range(num_partition_cols))[::-1]:
-                per_column_count[reverse_ind] = (per_column_count[reverse_ind] + 1) % num_partitions_per_column[reverse_ind]
-                if per_column_count[reverse_ind] != 0:
-                    break
-            done = all([count == 0 for count in per_column_count]) 
-    return partitions_out
+    if len(partition_columns) == 0:
+        return
+    wanted = [set(col + "=" + str(val) for val in user_partitions[col]) for col in partition_columns]
+
+    def expand(prefixes, level):
+        directories = [base_location + "/" + prefix if prefix != '' else base_location for prefix, values in prefixes]
+        expanded = []
+        for (prefix, values), names in zip(prefixes, list_directories(directories)):
+            # directories can be listed with a trailing slash
+            found = set(name.rstrip('/').split('/')[-1] for name in names)
+            for folder in sorted(wanted[level] & found):
+                partition_name = folder if prefix == '' else prefix + "/" + folder
+                expanded.append((partition_name, values + [(partition_columns[level], folder.split("=", 1)[1])]))
+        return expanded
+
+    prefixes = [('', [])]
+    for level in range(len(partition_columns) - 1):
+        prefixes = expand(prefixes, level)
+        if len(prefixes) == 0:
+            return
+
+    last_level = len(partition_columns) - 1
+    for start in range(0, len(prefixes), chunk_size):
+        for partition in expand(prefixes[start:start + chunk_size], last_level):
+            yield partition
 
 def getFolderListFromPartitions(partitions, base_location):
     folder_list = []
@@ -134,15 +147,13 @@ def getFolderListFromPartitions(partitions, base_location):
     return folder_list
 
 
-def get_hive_table(cursor, tableName, hive_database_name, user_partitions):
-    query = 'use ' + hive_database_name
-    runHiveDDL(cursor, query)
-    query = 'describe formatted ' + tableName
-    result, description = runHiveQuery(cursor, query)
-
+def parseHiveDescribe(result):
+    """
+    Parses the rows of 'describe formatted <table>' into a schema with the columns (name, cudf type,
+    is partition column), location, fileType and delimiter of the table.
+    """
     schema = {}
     schema['columns'] = []
-    schema['column_types'] = []
     i = 0
     parsingColumns = False
     parsingPartitionColumns = False
@@ -188,14 +199,194 @@ def get_hive_table(cursor, tableName, hive_database_name, user_partitions):
                     schema['columns'].append(
                         (triple[0], convertTypeNameStrToCudfType(triple[1]), True))                    
         i = i + 1
-    
+    return schema
+
+
+def fetchHiveTableMetadata(cursor, tableName, hive_database_name):
+    """
+    Runs 'describe formatted' and, for partitioned tables, 'show partitions' for one table. The table name
+    is qualified with the database instead of running 'use <database>', so that the cursor does not keep any
+    state between tables. Returns the parsed schema and all the partitions of the table.
+    """
+    qualifiedName = hive_database_name + '.' + tableName
+    result, description = runHiveQuery(cursor, 'describe formatted ' + qualifiedName)
+    schema = parseHiveDescribe(result)
+
+    partitions = {}
+    if any(column[2] for column in schema['columns']):
+        rows, description = runHiveQuery(cursor, 'show partitions ' + qualifiedName)
+        partitions = parseHivePartitions(rows, schema)
+    return schema, partitions
+
+
+class HiveMetadataCache(object):
+    """
+    In memory cache of the parsed 'describe formatted' output and the partition list of every Hive table,
+    keyed by (database, table). Entries expire ttl seconds after they were fetched, so repeated
+    create_table calls over the same Hive tables do not query the metastore again. A ttl of 0 disables it.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, hive_database_name, tableName):
+        if self.ttl <= 0:
+            return None
+        key = (hive_database_name, tableName)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                self.entries.pop(key, None)
+                self.misses = self.misses + 1
+                return None
+            self.hits = self.hits + 1
+            # callers add their own keys to the schema, so every one of them gets its own copy
+            return copy.deepcopy(entry[1]), copy.deepcopy(entry[2])
+
+    def put(self, hive_database_name, tableName, schema, partitions):
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries[(hive_database_name, tableName)] = (time.time(), copy.deepcopy(schema), copy.deepcopy(partitions))
+
+    def invalidate(self, hive_database_name=None, tableName=None):
+        with self.lock:
+            for key in list(self.entries.keys()):
+                if (hive_database_name is None or key[0] == hive_database_name) and (tableName is None or key[1] == tableName):
+                    del self.entries[key]
+
+
+class HiveCursorPool(object):
+    """
+    A pool of Hive cursors, so that the metadata of several tables can be fetched concurrently.
+    connect is called to open a new cursor (or a connection, whose cursor() is then used) whenever all
+    the cursors are in use and there are less than size of them, for example:
+
+    >>> pool = HiveCursorPool(lambda: hive.connect('localhost', port=10000), size=8)
+    >>> bc.create_tables({'t1': pool, 't2': pool})
+
+    Any object with the execute(query, async_), poll(), fetchall() and description of a pyhive cursor
+    can be returned by connect.
+    """
+
+    def __init__(self, connect, size=4):
+        self.connect = connect
+        self.size = max(1, size)
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = Lock()
+
+    def _open(self):
+        cursor = self.connect()
+        if not hasattr(cursor, 'poll') and hasattr(cursor, 'cursor'):
+            cursor = cursor.cursor()
+        return cursor
+
+    @contextmanager
+    def cursor(self):
+        cursor = None
+        with self.lock:
+            if self.idle.empty() and self.opened < self.size:
+                self.opened = self.opened + 1
+                open_new = True
+            else:
+                open_new = False
+        if open_new:
+            try:
+                cursor = self._open()
+            except Exception:
+                with self.lock:
+                    self.opened = self.opened - 1
+                raise
+        else:
+            cursor = self.idle.get()
+        try:
+            yield cursor
+        finally:
+            self.idle.put(cursor)
+
+    def close(self):
+        while not self.idle.empty():
+            cursor = self.idle.get()
+            if hasattr(cursor, 'close'):
+                cursor.close()
+        with self.lock:
+            self.opened = 0
+
+
+def isHiveInput(input):
+    return isinstance(input, (hive.Cursor, HiveCursorPool))
+
+
+def getHiveTableMetadata(cursor, tableName, hive_database_name, metadata_cache=None, refresh=False):
+    """
+    Returns the parsed schema and partitions of a table, from metadata_cache when it holds a fresh entry.
+    cursor can be a single cursor or a HiveCursorPool.
+    """
+    if metadata_cache is not None and not refresh:
+        cached = metadata_cache.get(hive_database_name, tableName)
+        if cached is not None:
+            return cached
+
+    if isinstance(cursor, HiveCursorPool):
+        with cursor.cursor() as pooled_cursor:
+            schema, partitions = fetchHiveTableMetadata(pooled_cursor, tableName, hive_database_name)
+    else:
+        schema, partitions = fetchHiveTableMetadata(cursor, tableName, hive_database_name)
+
+    if metadata_cache is not None:
+        metadata_cache.put(hive_database_name, tableName, schema, partitions)
+    return schema, partitions
+
+
+def getHiveTablesMetadata(tables, metadata_cache=None, refresh=False):
+    """
+    Fetches the metadata of several tables concurrently. tables is a list of (cursor, table name, database name)
+    and the result is the list of (schema, partitions) in the same order. The tables that share a plain cursor
+    are fetched one after the other on it, while a HiveCursorPool serves as many tables at a time as its size.
+    refresh applies to all the tables, or is a list with the refresh of every table.
+    """
+    if len(tables) == 0:
+        return []
+    if not isinstance(refresh, (list, tuple)):
+        refresh = [refresh] * len(tables)
+
+    # a plain cursor can not run two operations at the same time, so it is used as a pool of one
+    pools = {}
+    requests = []
+    for cursor, tableName, hive_database_name in tables:
+        if not isinstance(cursor, HiveCursorPool):
+            if id(cursor) not in pools:
+                single_cursor = cursor
+                pools[id(cursor)] = HiveCursorPool(lambda single_cursor=single_cursor: single_cursor, size=1)
+            cursor = pools[id(cursor)]
+        else:
+            pools[id(cursor)] = cursor
+        requests.append((cursor, tableName, hive_database_name))
+
+    max_workers = sum(pool.size for pool in pools.values())
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(requests))) as executor:
+        futures = [executor.submit(getHiveTableMetadata, cursor, tableName, hive_database_name, metadata_cache, refresh_table)
+                   for (cursor, tableName, hive_database_name), refresh_table in zip(requests, refresh)]
+        return [future.result() for future in futures]
+
+
+def get_hive_table(cursor, tableName, hive_database_name, user_partitions, metadata_cache=None, hive_metadata=None):
+    if hive_metadata is None:
+        hive_metadata = getHiveTableMetadata(cursor, tableName, hive_database_name, metadata_cache)
+    schema, partitions = hive_metadata
+
     hasPartitions = False
     for column in schema['columns']:
         if column[2]:
             hasPartitions = True
     file_list = []
     if hasPartitions:
-        schema['partitions'] = getPartitions(tableName, schema, cursor)
+        schema['partitions'] = partitions
         
         if user_partitions is not None:
             schema['partitions'] = filterHivePartitionsWithUserPartitions(schema['partitions'], user_partitions)
@@ -227,37 +418,80 @@ def get_hive_table(cursor, tableName, hive_database_name, user_partitions):
     return file_list, schema['fileType'], extra_kwargs, extra_columns, schema
 
 
-def runHiveDDL(cursor, query):
-    cursor.execute(query, async_=True)
+# the metastore is polled every poll_initial_interval seconds at first, and the interval doubles
+# after every poll up to poll_max_interval, so that short operations return quickly and long ones
+# do not keep a core busy
+poll_initial_interval = 0.001
+poll_max_interval = 0.5
+
+
+def waitForHiveOperation(cursor, initial_interval=None, max_interval=None):
+    interval = poll_initial_interval if initial_interval is None else initial_interval
+    max_interval = poll_max_interval if max_interval is None else max_interval
     status = cursor.poll().operationState
     while status in (
             TOperationState.INITIALIZED_STATE,
             TOperationState.RUNNING_STATE):
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
         status = cursor.poll().operationState
+    return status
+
+
+def runHiveDDL(cursor, query):
+    cursor.execute(query, async_=True)
+    waitForHiveOperation(cursor)
 
 
 def runHiveQuery(cursor, query):
     cursor.execute(query, async_=True)
-    status = cursor.poll().operationState
-    while status in (
-            TOperationState.INITIALIZED_STATE,
-            TOperationState.RUNNING_STATE):
-        status = cursor.poll().operationState
+    waitForHiveOperation(cursor)
     return cursor.fetchall(), cursor.description
 
 
-def convertHiveToCudf(cursor, query):
-    df = cudf.DataFrame()
-    result, description = runHiveQuery(cursor, query)
-    arrays = [[] for i in repeat(None, len(result[0]))]
-    for row in result:
-        i = 0
-        for val in row:
-            arrays[i].append(val)
-            i = i + 1
-    i = 0
-    while i < len(result[0]):
-        column = cudf.Series(arrays[i])
-        df[description[i][0].split('.')[1]] = column
-        i = i + 1
-    return df
+# rows fetched from the Hive server per round trip by convertHiveToCudf
+hive_fetch_size = 10000
+
+# numpy types of the Hive column types that are not returned as strings by pyhive
+hiveTypeToNumpyType = {
+    'BOOLEAN_TYPE': np.bool_,
+    'TINYINT_TYPE': np.int8,
+    'SMALLINT_TYPE': np.int16,
+    'INT_TYPE': np.int32,
+    'BIGINT_TYPE': np.int64,
+    'FLOAT_TYPE': np.float32,
+    'DOUBLE_TYPE': np.float64,
+}
+
+
+def convertHiveToCudf(cursor, query, fetch_size=None):
+    """
+    Runs the query and returns its result as a cudf.DataFrame. Rows are fetched fetch_size at a time and
+    transposed into one numpy array per column and batch, so every column is built with a single conversion.
+    """
+    fetch_size = hive_fetch_size if fetch_size is None else fetch_size
+    cursor.execute(query, async_=True)
+    waitForHiveOperation(cursor)
+    description = cursor.description
+    names = [column[0].split('.')[-1] for column in description]
+
+    batches = [[] for _ in names]
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        for i, values in enumerate(zip(*rows)):
+            column = np.empty(len(values), dtype=object)  # filled by assignment so that no value is taken as a dimension
+            column[:] = values
+            batches[i].append(column)
+
+    arrays = []
+    for i, name in enumerate(names):
+        if len(batches[i]) == 0:
+            values = np.empty(0, dtype=object)
+        else:
+            values = np.concatenate(batches[i])
+        dtype = hiveTypeToNumpyType.get(description[i][1])
+        arrow_type = None if dtype is None else pa.from_numpy_dtype(np.dtype(dtype))
+        arrays.append(pa.array(values, type=arrow_type, from_pandas=True))
+    return cudf.DataFrame.from_arrow(pa.Table.from_arrays(arrays, names=names))
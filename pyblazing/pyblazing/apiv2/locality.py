@@ -0,0 +1,128 @@
+import heapq
+import socket
+from functools import lru_cache
+
+import numpy as np
+
+import cio
+
+
+class HdfsBlockLocationProvider(object):
+    """
+    Gets the block locations of files from the HDFS file systems registered in the engine. Any object with
+    the same get_block_locations method can be used instead, for example to test the assignment without HDFS.
+    """
+
+    def __init__(self, client=None):
+        self.client = client
+
+    def get_block_locations(self, files):
+        """
+        Returns a list of dicts with the file_index, offset, length and hosts of every block of the files.
+        Files that are not in HDFS have no blocks.
+        """
+        # the files of a table are kept as bytes
+        files = [file.decode() if isinstance(file, bytes) else file for file in files]
+        if not any(file.startswith('hdfs://') for file in files):
+            return []
+        if self.client:
+            worker = tuple(self.client.scheduler_info()['workers'])[0]
+            connection = self.client.submit(
+                cio.getBlockLocationsCaller,
+                files,
+                workers=[worker])
+            return connection.result()
+        else:
+            return cio.getBlockLocationsCaller(files)
+
+
+@lru_cache(maxsize=1024)
+def resolve_host(host):
+    # hdfs reports datanodes by hostname while the nodes are known by ip, so both are compared as ips
+    try:
+        return socket.gethostbyname(host)
+    except OSError:
+        return host
+
+
+def get_local_fractions(block_locations):
+    """
+    Returns a dict with the fraction of the bytes of every file that is stored in every host:
+    {file_index: {host: fraction}}
+    """
+    local_bytes = {}
+    file_bytes = {}
+    for block in block_locations:
+        file_index = block['file_index']
+        file_bytes[file_index] = file_bytes.get(file_index, 0) + block['length']
+        hosts_bytes = local_bytes.setdefault(file_index, {})
+        for host in set(resolve_host(host) for host in block['hosts']):
+            hosts_bytes[host] = hosts_bytes.get(host, 0) + block['length']
+
+    local_fractions = {}
+    for file_index, hosts_bytes in local_bytes.items():
+        if file_bytes[file_index] > 0:
+            local_fractions[file_index] = {host: num_bytes / file_bytes[file_index] for host, num_bytes in hosts_bytes.items()}
+    return local_fractions
+
+
+def get_file_sizes(block_locations, num_files):
+    """The size of every file according to its blocks (0 for files without blocks)."""
+    file_sizes = np.zeros(num_files, dtype=np.float64)
+    for block in block_locations:
+        file_sizes[block['file_index']] += block['length']
+    return file_sizes
+
+
+def assign_by_locality(unit_file_ids, unit_weights, block_locations, worker_hosts, slack=0.1):
+    """
+    Assigns work units (files or row groups) to workers preferring the workers that run on a host that stores
+    the data of the unit. Units are first placed, from heaviest to lightest, on the least loaded worker among the ones
+    on the host with most local bytes of the unit, as long as that worker stays under (1 + slack) times the average load.
+    The units that could not be placed locally are then balanced with LPT over all the workers.
+
+    Returns the worker of every unit, the load of every worker and the fraction of the total weight that was assigned locally.
+    """
+    unit_file_ids = np.asarray(unit_file_ids)
+    unit_weights = np.asarray(unit_weights, dtype=np.float64)
+    num_workers = len(worker_hosts)
+    assignment = np.full(len(unit_weights), -1, dtype=np.int32)
+    loads = [0.0] * num_workers
+    total_weight = unit_weights.sum()
+    if num_workers == 0 or len(unit_weights) == 0:
+        return assignment, loads, 0.0
+
+    workers_per_host = {}
+    for worker_index, host in enumerate(worker_hosts):
+        workers_per_host.setdefault(resolve_host(host), []).append(worker_index)
+
+    capacity = (1 + slack) * total_weight / num_workers
+    local_fractions = get_local_fractions(block_locations)
+    local_weight = 0.0
+    order = np.argsort(-unit_weights, kind='stable')
+    for position in order:
+        fractions = local_fractions.get(int(unit_file_ids[position]), {})
+        for host, fraction in sorted(fractions.items(), key=lambda item: -item[1]):
+            if host not in workers_per_host:
+                continue
+            worker_index = min(workers_per_host[host], key=lambda index: loads[index])
+            weight = unit_weights[position]
+            # a unit heavier than the capacity can still go to an idle local worker
+            if loads[worker_index] + weight <= capacity or loads[worker_index] == 0:
+                assignment[position] = worker_index
+                loads[worker_index] += weight
+                local_weight += weight * fraction
+                break
+
+    heap = [(load, worker_index) for worker_index, load in enumerate(loads)]
+    heapq.heapify(heap)
+    for position in order:
+        if assignment[position] != -1:
+            continue
+        load, worker_index = heapq.heappop(heap)
+        assignment[position] = worker_index
+        loads[worker_index] = load + unit_weights[position]
+        heapq.heappush(heap, (loads[worker_index], worker_index))
+
+    local_fraction = local_weight / total_weight if total_weight > 0 else 0.0
+    return assignment, loads, local_fraction
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+import cudf
+import numpy as np
+import pyarrow
+import pyarrow.parquet as pq
+
+import cio
+
+import logging
+
+
+def hash_str(value):
+    return hashlib.sha1(value.encode()).hexdigest()
+
+
+class MetadataCache(object):
+    """
+    On disk cache of the parquet min/max metadata of each file. Every file has its own folder
+    (named after the hash of its uri) with a single parquet file that holds the metadata rows of
+    all its row groups. The name of that parquet file is the hash of the file fingerprint, which is
+    made of the size and modification time of the file and the schema of the table, so any change
+    in the file or the schema just results in a miss.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _uri_dir(self, uri):
+        return os.path.join(self.cache_dir, hash_str(uri))
+
+    def _entry_path(self, uri, fingerprint):
+        return os.path.join(self._uri_dir(uri), hash_str(fingerprint) + '.parquet')
+
+    def get(self, uri, fingerprint):
+        """Returns the metadata of the file as a pyarrow Table, or None if it is not cached."""
+        path = self._entry_path(uri, fingerprint)
+        if not os.path.isfile(path):
+            return None
+        try:
+            metadata = pq.read_table(path).replace_schema_metadata()
+        except Exception as e:
+            logging.warning('Could not read cached metadata for ' + uri + ': ' + str(e))
+            return None
+        os.utime(path)  # the modification time is used to evict the least recently used entries
+        return metadata
+
+    def put(self, uri, fingerprint, metadata):
+        """Caches the metadata of the file, a pyarrow Table."""
+        uri_dir = self._uri_dir(uri)
+        os.makedirs(uri_dir, exist_ok=True)
+        path = self._entry_path(uri, fingerprint)
+        # entries for older versions of the same file are stale
+        for entry in os.listdir(uri_dir):
+            if os.path.join(uri_dir, entry) != path:
+                os.remove(os.path.join(uri_dir, entry))
+
+        # write to a temporary file first, so that concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=uri_dir, suffix='.tmp')
+        os.close(fd)
+        pq.write_table(metadata, tmp_path)
+        os.replace(tmp_path, path)
+
+    def invalidate(self, uris=None):
+        if not os.path.isdir(self.cache_dir):
+            return
+        if uris is None:
+            for entry in os.listdir(self.cache_dir):
+                shutil.rmtree(os.path.join(self.cache_dir, entry), ignore_errors=True)
+        else:
+            for uri in uris:
+                shutil.rmtree(self._uri_dir(uri), ignore_errors=True)
+
+    def evict(self):
+        entries = []
+        total_bytes = 0
+        for uri_dir in os.listdir(self.cache_dir):
+            uri_dir = os.path.join(self.cache_dir, uri_dir)
+            if not os.path.isdir(uri_dir):
+                continue
+            for entry in os.listdir(uri_dir):
+                path = os.path.join(uri_dir, entry)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_bytes = total_bytes + stat.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+            total_bytes = total_bytes - size
+
+
+def is_cacheable(file_info):
+    # without a modification time there is no way to know if the file changed since it was cached
+    return file_info['exists'] and file_info['modification_time'] > 0
+
+
+def get_fingerprint(file_info, schema, file_format_hint):
+    schema_str = ','.join([str(name) + ':' + str(col_type) for name, col_type in zip(schema['names'], schema['types'])])
+    return '|'.join([str(file_info['size']), str(file_info['modification_time']), file_format_hint, schema_str])
+
+
+def with_file_handle_index(table, file_handle_index):
+    position = table.schema.get_field_index('file_handle_index')
+    column = pyarrow.array(np.full(table.num_rows, file_handle_index, dtype=np.int32))
+    return table.set_column(position, 'file_handle_index', column)
+
+
+def parseMetadataWithCache(files, offset, schema, file_format_hint, args, cache_dir, max_bytes):
+    """
+    Same as cio.parseMetadataCaller, but only the files that are not in the metadata cache
+    (or that changed since they were cached) get their footers read.
+    """
+    start_index, num_files = offset
+    if num_files == 0:
+        return cio.parseMetadataCaller(files, offset, schema, file_format_hint, args)
+
+    cache = MetadataCache(cache_dir, max_bytes)
+    files_info = cio.getFileInfoCaller(files)
+    fingerprints = [get_fingerprint(file_info, schema, file_format_hint) for file_info in files_info]
+
+    # the metadata of each file is kept as a pyarrow Table, they are converted to cudf once all together
+    metadata_per_file = [None] * len(files)
+    missing_indexes = []
+    for index, file in enumerate(files):
+        if is_cacheable(files_info[index]):
+            metadata_per_file[index] = cache.get(file, fingerprints[index])
+        if metadata_per_file[index] is None:
+            missing_indexes.append(index)
+
+    if len(missing_indexes) > 0:
+        missing_files = [files[index] for index in missing_indexes]
+        new_metadata = cio.parseMetadataCaller(missing_files, (0, len(missing_files)), schema, file_format_hint, args)
+        # a -1 file_handle_index means that none of the files had row groups, and that metadata does
+        # not have the same columns as the metadata of files with row groups. Its not worth caching it
+        if (new_metadata['file_handle_index'] == -1).any():
+            return cio.parseMetadataCaller(files, offset, schema, file_format_hint, args)
+
+        for missing_position, index in enumerate(missing_indexes):
+            file_metadata = new_metadata[new_metadata['file_handle_index'] == missing_position]
+            file_metadata = file_metadata.to_arrow(preserve_index=False).replace_schema_metadata()
+            metadata_per_file[index] = with_file_handle_index(file_metadata, 0)
+
+    metadata_schema = metadata_per_file[0].schema
+    if any(not file_metadata.schema.equals(metadata_schema, check_metadata=False) for file_metadata in metadata_per_file):
+        logging.warning('Cached metadata does not match the metadata of the files, parsing all the files again')
+        cache.invalidate(files)
+        return cio.parseMetadataCaller(files, offset, schema, file_format_hint, args)
+
+    try:
+        for index in missing_indexes:
+            if is_cacheable(files_info[index]):
+                cache.put(files[index], fingerprints[index], metadata_per_file[index])
+        if len(missing_indexes) > 0:
+            cache.evict()
+    except Exception as e:
+        logging.warning('Could not update the metadata cache: ' + str(e))
+
+    metadata_per_file = [with_file_handle_index(file_metadata, start_index + index)
+                         for index, file_metadata in enumerate(metadata_per_file)]
+    return cudf.DataFrame.from_arrow(pyarrow.concat_tables(metadata_per_file))
+
+
+def invalidateMetadataCache(cache_dir, files=None):
+    MetadataCache(cache_dir, 0).invalidate(files)
+    return True
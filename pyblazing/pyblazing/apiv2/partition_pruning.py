@@ -0,0 +1,262 @@
+import numpy as np
+
+
+# the value Hive gives to the partition folder of the rows where the partition column is null
+hive_null_partition_value = '__HIVE_DEFAULT_PARTITION__'
+
+comparison_operators = {
+    '=': lambda a, b: a == b,
+    '<>': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+
+
+class CalciteExpressionParser(object):
+    """
+    Parses a Calcite expression, as it is printed in the optimized relational algebra
+    (for example "AND(=($3, '2026-10-01'), >($0, 5))"), into a tree of tuples:
+    ('call', operator, [operands]), ('input', index) or ('literal', text, is_quoted).
+    Type suffixes like ":VARCHAR" or ":DATE" are dropped.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.position = 0
+
+    def parse(self):
+        node = self._parse_expression()
+        self._skip_spaces()
+        if self.position != len(self.expression):
+            raise ValueError('Unexpected text in expression: ' + self.expression[self.position:])
+        return node
+
+    def _skip_spaces(self):
+        while self.position < len(self.expression) and self.expression[self.position] == ' ':
+            self.position = self.position + 1
+
+    def _skip_type(self):
+        # a type suffix runs until the next separator at this level, like ":DECIMAL(10, 2)" or ":VARCHAR"
+        if self.position < len(self.expression) and self.expression[self.position] == ':':
+            depth = 0
+            while self.position < len(self.expression):
+                char = self.expression[self.position]
+                if char == '(':
+                    depth = depth + 1
+                elif char == ')':
+                    if depth == 0:
+                        break
+                    depth = depth - 1
+                elif char == ',' and depth == 0:
+                    break
+                self.position = self.position + 1
+
+    def _parse_expression(self):
+        self._skip_spaces()
+        expression = self.expression
+        if self.position >= len(expression):
+            raise ValueError('Unexpected end of expression: ' + expression)
+
+        if expression[self.position] == "'":
+            end = self.position + 1
+            value = []
+            while True:
+                if end >= len(expression):
+                    raise ValueError('Unterminated string in expression: ' + expression)
+                if expression[end] == "'":
+                    if end + 1 < len(expression) and expression[end + 1] == "'":
+                        value.append("'")
+                        end = end + 2
+                        continue
+                    break
+                value.append(expression[end])
+                end = end + 1
+            self.position = end + 1
+            self._skip_type()
+            return ('literal', ''.join(value), True)
+
+        # a call, an input reference or an unquoted literal, which can have spaces (like a timestamp)
+        start = self.position
+        while self.position < len(expression) and expression[self.position] not in '(),':
+            # a colon starts a type suffix, unless it is part of a time like 10:00:00
+            if expression[self.position] == ':' and not expression[self.position + 1:self.position + 2].isdigit():
+                break
+            self.position = self.position + 1
+        token = expression[start:self.position].strip()
+
+        if self.position < len(expression) and expression[self.position] == '(':
+            self.position = self.position + 1
+            operands = []
+            self._skip_spaces()
+            if expression[self.position] == ')':
+                self.position = self.position + 1
+            else:
+                while True:
+                    operands.append(self._parse_expression())
+                    self._skip_spaces()
+                    if expression[self.position] == ',':
+                        self.position = self.position + 1
+                    elif expression[self.position] == ')':
+                        self.position = self.position + 1
+                        break
+                    else:
+                        raise ValueError('Unexpected text in expression: ' + expression[self.position:])
+            self._skip_type()
+            return ('call', token.upper(), operands)
+
+        self._skip_type()
+        if token.startswith('$') and token[1:].isdigit():
+            return ('input', int(token[1:]))
+        return ('literal', token, False)
+
+
+def parse_calcite_expression(expression):
+    return CalciteExpressionParser(expression).parse()
+
+
+def get_named_expression(scan, name):
+    """Python version of the engine get_named_expression, for 'filters' and 'projects' of a table scan."""
+    start = scan.find(name + '=[[')
+    if start == -1:
+        return ''
+    start = start + len(name) + 3
+    depth = 0
+    position = start
+    while position < len(scan):
+        char = scan[position]
+        if char == "'":
+            position = scan.find("'", position + 1)
+            if position == -1:
+                return ''
+        elif char == '[' or char == '(':
+            depth = depth + 1
+        elif char == ')':
+            depth = depth - 1
+        elif char == ']':
+            if depth == 0:
+                return scan[start:position]
+            depth = depth - 1
+        position = position + 1
+    return ''
+
+
+def _coerce(partition_value, literal, is_quoted):
+    """
+    Converts a partition value (always a string, taken from the folder name) and a literal to comparable values.
+    Quoted literals are compared as strings, unquoted ones as numbers or as dates when both sides parse as such.
+    """
+    if is_quoted:
+        return partition_value, literal
+    try:
+        return float(partition_value), float(literal)
+    except ValueError:
+        pass
+    try:
+        return np.datetime64(partition_value), np.datetime64(literal)
+    except ValueError:
+        pass
+    return partition_value, literal
+
+
+def _evaluate(node, values):
+    """
+    Evaluates the expression on the partition values of one partition, with three valued logic:
+    True or False when the partition values decide it, None when it depends on the data.
+    """
+    kind = node[0]
+    if kind != 'call':
+        return None
+    operator, operands = node[1], node[2]
+
+    if operator == 'AND':
+        results = [_evaluate(operand, values) for operand in operands]
+        if any(result is False for result in results):
+            return False
+        return True if all(result is True for result in results) else None
+    if operator == 'OR':
+        results = [_evaluate(operand, values) for operand in operands]
+        if any(result is True for result in results):
+            return True
+        return False if all(result is False for result in results) else None
+    if operator == 'NOT' and len(operands) == 1:
+        result = _evaluate(operands[0], values)
+        return None if result is None else not result
+
+    if operator in ('IS NULL', 'IS_NULL', 'IS NOT NULL', 'IS_NOT_NULL') and len(operands) == 1:
+        value = _operand_value(operands[0], values)
+        if value is None or value[0] != 'partition':
+            return None
+        is_null = value[1] == hive_null_partition_value
+        return is_null if operator in ('IS NULL', 'IS_NULL') else not is_null
+
+    if operator in comparison_operators and len(operands) == 2:
+        left = _operand_value(operands[0], values)
+        right = _operand_value(operands[1], values)
+        if left is None or right is None:
+            return None
+        if left[0] == 'partition' and right[0] == 'literal':
+            a, b = _coerce(left[1], right[1], right[2])
+        elif left[0] == 'literal' and right[0] == 'partition':
+            b, a = _coerce(right[1], left[1], left[2])
+        else:
+            return None
+        if left[0] == 'partition' and left[1] == hive_null_partition_value:
+            return False  # comparisons with null are never true
+        if right[0] == 'partition' and right[1] == hive_null_partition_value:
+            return False
+        try:
+            return bool(comparison_operators[operator](a, b))
+        except TypeError:
+            return None
+
+    return None
+
+
+def _operand_value(node, values):
+    # casts do not change which partitions match, the comparison is coerced anyway
+    while node[0] == 'call' and node[1] == 'CAST' and len(node[2]) == 1:
+        node = node[2][0]
+    if node[0] == 'input':
+        if node[1] in values:
+            return ('partition', values[node[1]])
+        return None
+    if node[0] == 'literal':
+        return node
+    return None
+
+
+def prune_partitions(partitions, table_scan, column_names):
+    """
+    Returns the partitions (a dict of partition folder to its list of (column name, value)) that can have rows
+    that pass the filters of the table scan. The filters reference the columns of the scan projection, so
+    column_names (all the columns of the table) is needed to know which ones are partition columns.
+    If the filters can not be parsed or the scan has no filters, all the partitions are returned.
+    """
+    filters = get_named_expression(table_scan, 'filters')
+    if filters == '' or len(partitions) == 0:
+        return partitions
+    try:
+        tree = parse_calcite_expression(filters)
+    except (ValueError, IndexError):
+        return partitions
+
+    projects = get_named_expression(table_scan, 'projects')
+    if projects == '':
+        scan_columns = list(range(len(column_names)))
+    else:
+        scan_columns = [int(index) for index in projects.split(',')]
+    scan_index = {}
+    for position, column_index in enumerate(scan_columns):
+        scan_index[column_names[column_index]] = position
+
+    pruned = {}
+    for partition_name, partition_values in partitions.items():
+        values = {}
+        for column_name, value in partition_values:
+            if column_name in scan_index:
+                values[scan_index[column_name]] = value
+        if _evaluate(tree, values) is not False:
+            pruned[partition_name] = partition_values
+    return pruned
@@ -0,0 +1,208 @@
+import json
+
+import pandas
+
+
+# event types of bsql_cache_events that are logged by the caches themselves
+cache_placement_events = {'placeGPU': 'gpu', 'placeCPU': 'cpu', 'placeDisk': 'disk'}
+cache_wait_event = 'waitCache'
+
+
+def _to_pandas(df):
+    if df is None:
+        return pandas.DataFrame()
+    if hasattr(df, 'compute'):  # dask_cudf
+        df = df.compute()
+    if hasattr(df, 'to_pandas'):  # cudf
+        df = df.to_pandas()
+    return df
+
+
+class QueryProfile(object):
+    """
+    Profile of one query built from the execution graph logs (bsql_kernels, bsql_kernels_edges,
+    bsql_kernel_events and bsql_cache_events).
+
+    kernels has one row per kernel and node with its wall time (first to last batch), compute time,
+    rows and bytes in and out, the time it was blocked waiting for its input caches and how many of the
+    batches of its input caches were placed in every cache tier. critical_path is the chain of kernels,
+    from a table scan to the output, with the largest total compute time.
+    """
+
+    def __init__(self, query_id, kernels, edges, kernel_events, cache_events, result=None):
+        self.query_id = query_id
+        self.result = result
+        self.kernel_events = _to_pandas(kernel_events)
+        self.cache_events = _to_pandas(cache_events)
+        kernels = _to_pandas(kernels)
+        edges = _to_pandas(edges)
+
+        self.kernels = self._build_kernels(kernels, edges)
+        self.critical_path = self._build_critical_path(edges)
+        if len(self.kernel_events) > 0:
+            self.duration_ms = int(self.kernel_events['timestamp_end'].max() - self.kernel_events['timestamp_begin'].min())
+        else:
+            self.duration_ms = 0
+
+    def _build_kernels(self, kernels, edges):
+        columns = ['ral_id', 'kernel_id', 'kernel_type', 'wall_time_ms', 'compute_time_ms', 'batches',
+                   'input_num_rows', 'input_num_bytes', 'output_num_rows', 'output_num_bytes', 'blocked_time_ms',
+                   'input_batches_gpu', 'input_batches_cpu', 'input_batches_disk']
+        if len(kernels) == 0:
+            return pandas.DataFrame(columns=columns)
+
+        kernels = kernels[kernels['is_kernel'] == 1][['ral_id', 'kernel_id', 'kernel_type']].drop_duplicates()
+
+        events = self.kernel_events[self.kernel_events['event_type'] == 'compute'].copy()
+        events['duration'] = events['timestamp_end'] - events['timestamp_begin']
+        stats = events.groupby(['ral_id', 'kernel_id']).agg(
+            begin=('timestamp_begin', 'min'),
+            end=('timestamp_end', 'max'),
+            compute_time_ms=('duration', 'sum'),
+            batches=('duration', 'size'),
+            input_num_rows=('input_num_rows', 'sum'),
+            input_num_bytes=('input_num_bytes', 'sum'),
+            output_num_rows=('output_num_rows', 'sum'),
+            output_num_bytes=('output_num_bytes', 'sum')).reset_index()
+        stats['wall_time_ms'] = stats['end'] - stats['begin']
+        kernels = kernels.merge(stats, on=['ral_id', 'kernel_id'], how='left')
+
+        # the caches log their own events with source == sink == cache id, and every cache feeds the kernel
+        # it has an edge to, so the waits and placements of a cache are charged to that kernel
+        cache_stats = self._cache_stats()
+        if len(cache_stats) > 0 and len(edges) > 0:
+            consumers = edges[['ral_id', 'source', 'sink']].rename(columns={'source': 'cache_id', 'sink': 'kernel_id'})
+            cache_stats = cache_stats.merge(consumers, on=['ral_id', 'cache_id'])
+            cache_stats = cache_stats.drop(columns=['cache_id']).groupby(['ral_id', 'kernel_id']).sum().reset_index()
+            kernels = kernels.merge(cache_stats, on=['ral_id', 'kernel_id'], how='left')
+
+        for column in columns:
+            if column not in kernels.columns:
+                kernels[column] = 0
+        kernels = kernels[columns].fillna(0)
+        return kernels.sort_values(['ral_id', 'kernel_id']).reset_index(drop=True)
+
+    def _cache_stats(self):
+        events = self.cache_events
+        if len(events) == 0:
+            return pandas.DataFrame()
+        events = events[events['source'] == events['sink']].copy()
+        events['duration'] = events['timestamp_end'] - events['timestamp_begin']
+        events['blocked_time_ms'] = events['duration'].where(events['event_type'] == cache_wait_event, 0)
+        for event_type, tier in cache_placement_events.items():
+            events['input_batches_' + tier] = (events['event_type'] == event_type).astype('int64')
+        events = events.rename(columns={'source': 'cache_id'})
+        columns = ['blocked_time_ms'] + ['input_batches_' + tier for tier in cache_placement_events.values()]
+        return events.groupby(['ral_id', 'cache_id'])[columns].sum().reset_index()
+
+    def _build_critical_path(self, edges):
+        """
+        Longest path by compute time through the kernel DAG of every node (edges kernel -> cache -> kernel
+        are collapsed into kernel -> kernel). The path of the node where it is longest is returned.
+        """
+        if len(self.kernels) == 0 or len(edges) == 0:
+            return []
+
+        critical_path = []
+        critical_time = -1
+        for ral_id, node_kernels in self.kernels.groupby('ral_id'):
+            weights = dict(zip(node_kernels['kernel_id'], node_kernels['compute_time_ms']))
+            node_edges = edges[edges['ral_id'] == ral_id]
+            sinks_of = {}
+            for source, sink in zip(node_edges['source'], node_edges['sink']):
+                sinks_of.setdefault(source, []).append(sink)
+
+            successors = {kernel_id: set() for kernel_id in weights}
+            for kernel_id in weights:
+                for cache_id in sinks_of.get(kernel_id, []):
+                    for next_kernel_id in sinks_of.get(cache_id, []):
+                        if next_kernel_id in weights:
+                            successors[kernel_id].add(next_kernel_id)
+
+            # longest path from every kernel to the output, memoized in reverse topological order
+            longest = {}
+            visiting = set()
+
+            def visit(kernel_id):
+                if kernel_id in longest:
+                    return longest[kernel_id]
+                visiting.add(kernel_id)
+                best_time, best_path = 0, []
+                for next_kernel_id in successors[kernel_id]:
+                    if next_kernel_id in visiting:
+                        continue
+                    time, path = visit(next_kernel_id)
+                    if time > best_time or len(best_path) == 0:
+                        best_time, best_path = time, path
+                visiting.discard(kernel_id)
+                longest[kernel_id] = (weights[kernel_id] + best_time, [kernel_id] + best_path)
+                return longest[kernel_id]
+
+            for kernel_id in weights:
+                time, path = visit(kernel_id)
+                if time > critical_time:
+                    critical_time = time
+                    critical_path = [(ral_id, kernel_id) for kernel_id in path]
+
+        kernels = self.kernels.set_index(['ral_id', 'kernel_id'])
+        return [{'ral_id': ral_id,
+                 'kernel_id': kernel_id,
+                 'kernel_type': kernels.loc[(ral_id, kernel_id), 'kernel_type'],
+                 'compute_time_ms': kernels.loc[(ral_id, kernel_id), 'compute_time_ms']}
+                for ral_id, kernel_id in critical_path]
+
+    def to_chrome_trace(self):
+        """
+        Returns the profile in the Chrome trace event format, which can be opened with chrome://tracing
+        or https://ui.perfetto.dev. Every node is a process and every kernel a thread.
+        """
+        trace_events = []
+        kernel_types = {}
+        for ral_id, kernel_id, kernel_type in zip(self.kernels['ral_id'], self.kernels['kernel_id'], self.kernels['kernel_type']):
+            kernel_types[(ral_id, kernel_id)] = kernel_type
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': int(ral_id), 'tid': int(kernel_id),
+                                 'args': {'name': '{} {}'.format(kernel_type, kernel_id)}})
+
+        events = self.kernel_events
+        for row in events[events['event_type'] == 'compute'].itertuples():
+            key = (row.ral_id, row.kernel_id)
+            trace_events.append({
+                'name': kernel_types.get(key, str(row.kernel_id)),
+                'cat': 'kernel',
+                'ph': 'X',
+                'pid': int(row.ral_id),
+                'tid': int(row.kernel_id),
+                'ts': int(row.timestamp_begin) * 1000,
+                'dur': int(row.timestamp_end - row.timestamp_begin) * 1000,
+                'args': {'input_num_rows': int(row.input_num_rows), 'input_num_bytes': int(row.input_num_bytes),
+                         'output_num_rows': int(row.output_num_rows), 'output_num_bytes': int(row.output_num_bytes)}})
+
+        events = self.cache_events
+        if len(events) > 0:
+            for row in events[events['source'] == events['sink']].itertuples():
+                trace_events.append({
+                    'name': row.event_type,
+                    'cat': 'cache',
+                    'ph': 'X',
+                    'pid': int(row.ral_id),
+                    'tid': int(row.source),
+                    'ts': int(row.timestamp_begin) * 1000,
+                    'dur': int(row.timestamp_end - row.timestamp_begin) * 1000,
+                    'args': {'num_rows': int(row.num_rows), 'num_bytes': int(row.num_bytes)}})
+
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms',
+                'otherData': {'query_id': int(self.query_id)}}
+
+    def save_chrome_trace(self, path):
+        with open(path, 'w') as trace_file:
+            json.dump(self.to_chrome_trace(), trace_file)
+
+    def __str__(self):
+        lines = ['Query {}: {} ms'.format(self.query_id, self.duration_ms)]
+        lines.append(self.kernels.to_string(index=False))
+        path = ' -> '.join('{} {}'.format(step['kernel_type'], step['kernel_id']) for step in self.critical_path)
+        lines.append('Critical path: ' + path)
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,228 @@
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from threading import Lock
+
+import cudf
+import pyarrow
+
+import cio
+
+
+# columns of the bsql_result_cache log table, one row per cache event
+result_cache_log_names = ['log_time', 'event', 'cache_key', 'table_names', 'num_rows', 'num_bytes',
+                          'memory_bytes', 'disk_bytes', 'hits', 'misses']
+result_cache_log_dtypes = ['int64', 'str', 'str', 'str', 'int64', 'int64',
+                           'int64', 'int64', 'int64', 'int64']
+
+
+class ResultCacheEntry(object):
+    def __init__(self, table_names, arrow_table, num_rows, num_bytes):
+        self.table_names = table_names
+        self.arrow_table = arrow_table  # None when the entry was spilled to disk
+        self.path = None  # the Arrow IPC file of a spilled entry
+        self.num_rows = num_rows
+        self.num_bytes = num_bytes
+
+
+class ResultCache(object):
+    """
+    LRU cache of query results. Results are kept in host memory as arrow tables up to max_bytes. When that budget is
+    exceeded, the least recently used results are spilled to spill_dir as Arrow IPC files (up to max_spill_bytes),
+    or just dropped if there is no spill_dir. Every entry remembers the tables it was computed from, so that
+    creating or dropping any of them invalidates the entry. The last log_size events are kept in memory,
+    log_table returns them as the bsql_result_cache table of bc.log.
+    """
+
+    def __init__(self, max_bytes, spill_dir=None, max_spill_bytes=0, log_size=0):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self.log_records = deque(maxlen=log_size) if log_size > 0 else None
+        self.lock = Lock()
+        self.entries = OrderedDict()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _log(self, event, key, entry=None, table_names=None):
+        # the lock must be held
+        if self.log_records is None:
+            return
+        if entry is not None:
+            table_names = entry.table_names
+        self.log_records.append((
+            int(time.time() * 1000),
+            event,
+            key,
+            ','.join(table_names or []),
+            entry.num_rows if entry is not None else 0,
+            entry.num_bytes if entry is not None else 0,
+            self.memory_bytes,
+            self.disk_bytes,
+            self.hits,
+            self.misses))
+
+    def log_table(self):
+        """Returns the events kept in memory as a DataFrame with the bsql_result_cache columns, or None if they are not kept."""
+        if self.log_records is None:
+            return None
+        with self.lock:
+            records = list(self.log_records)
+        columns = list(zip(*records)) if len(records) > 0 else [[]] * len(result_cache_log_names)
+        return cudf.DataFrame({name: cudf.Series(list(values), dtype=dtype)
+                               for name, values, dtype in zip(result_cache_log_names, columns, result_cache_log_dtypes)})
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses = self.misses + 1
+                self._log('miss', key)
+                return None
+            self.entries.move_to_end(key)
+            self.hits = self.hits + 1
+            self._log('hit', key, entry)
+            arrow_table = entry.arrow_table
+            path = entry.path
+
+        if arrow_table is None:
+            try:
+                with pyarrow.OSFile(path, 'rb') as source:
+                    arrow_table = pyarrow.ipc.open_file(source).read_all()
+            except Exception as e:
+                logging.warning('Could not read the spilled result ' + path + ': ' + str(e))
+                self.invalidate_keys([key])
+                return None
+        return cudf.DataFrame.from_arrow(arrow_table)
+
+    def put(self, key, df, table_names):
+        arrow_table = df.to_arrow(preserve_index=False)
+        entry = ResultCacheEntry(table_names, arrow_table, len(df), arrow_table.nbytes)
+        if entry.num_bytes > self.max_bytes and (self.spill_dir is None or entry.num_bytes > self.max_spill_bytes):
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = entry
+            self.memory_bytes = self.memory_bytes + entry.num_bytes
+            self._log('store', key, entry)
+            self._make_room()
+
+    def _make_room(self):
+        # the lock must be held
+        for key in list(self.entries.keys()):
+            if self.memory_bytes <= self.max_bytes:
+                break
+            entry = self.entries[key]
+            if entry.arrow_table is None:
+                continue
+            if self.spill_dir is not None and entry.num_bytes <= self.max_spill_bytes:
+                self._spill(key, entry)
+            else:
+                self._remove(key)
+                self._log('evict', key, entry)
+
+        for key in list(self.entries.keys()):
+            if self.disk_bytes <= self.max_spill_bytes:
+                break
+            entry = self.entries[key]
+            if entry.path is not None:
+                self._remove(key)
+                self._log('evict', key, entry)
+
+    def _spill(self, key, entry):
+        path = os.path.join(self.spill_dir, key + '.arrow')
+        try:
+            with pyarrow.OSFile(path, 'wb') as sink:
+                writer = pyarrow.ipc.new_file(sink, entry.arrow_table.schema)
+                writer.write_table(entry.arrow_table)
+                writer.close()
+        except Exception as e:
+            logging.warning('Could not spill the result to ' + path + ': ' + str(e))
+            self._remove(key)
+            self._log('evict', key, entry)
+            return
+        entry.arrow_table = None
+        entry.path = path
+        self.memory_bytes = self.memory_bytes - entry.num_bytes
+        self.disk_bytes = self.disk_bytes + entry.num_bytes
+        self._log('spill', key, entry)
+
+    def _remove(self, key):
+        # the lock must be held
+        entry = self.entries.pop(key)
+        if entry.path is not None:
+            self.disk_bytes = self.disk_bytes - entry.num_bytes
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        else:
+            self.memory_bytes = self.memory_bytes - entry.num_bytes
+        return entry
+
+    def invalidate_keys(self, keys):
+        with self.lock:
+            for key in keys:
+                if key in self.entries:
+                    entry = self._remove(key)
+                    self._log('invalidate', key, entry)
+
+    def invalidate_tables(self, table_names):
+        """Removes all the results that were computed from any of the tables."""
+        table_names = set(table_names)
+        with self.lock:
+            keys = [key for key, entry in self.entries.items() if len(table_names.intersection(entry.table_names)) > 0]
+            for key in keys:
+                entry = self._remove(key)
+                self._log('invalidate', key, entry)
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.entries.keys()):
+                entry = self._remove(key)
+                self._log('invalidate', key, entry)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'memory_bytes': self.memory_bytes,
+                'disk_bytes': self.disk_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups > 0 else 0.0,
+            }
+
+
+def get_result_cache_key(plan, query_tables, table_slices):
+    """
+    The key of a query result: a hash of the optimized plan and of the fingerprints of the data that every table scan
+    reads, that is the uri, size and modification time of every selected file plus the selected row groups (after skip-data).
+    Returns None when the query reads an in memory table, since a dataframe can change in place without any trace,
+    so those results are never cached.
+    """
+    if any(table_slice.files is None for table_slice in table_slices):
+        return None
+
+    # every lookup reads the current status of every file (one request per file on an object store), the files of all
+    # the tables are asked for in a single call
+    files = [[file.decode() if isinstance(file, bytes) else file for file in table_slice.files] for table_slice in table_slices]
+    files_info = iter(cio.getFileInfoCaller([file for table_files in files for file in table_files]))
+
+    fingerprints = [plan]
+    for query_table, table_slice, table_files in zip(query_tables, table_slices, files):
+        fingerprints.append(query_table.name)
+        for _ in table_files:
+            file_info = next(files_info)
+            fingerprints.append('{}:{}:{}'.format(file_info['uri'], file_info['size'], file_info['modification_time']))
+        fingerprints.append(str(table_slice.row_groups_ids))
+    return hashlib.sha1('\n'.join(fingerprints).encode()).hexdigest()
@@ -0,0 +1,172 @@
+import heapq
+
+import numpy as np
+
+
+class RowGroupIndex(object):
+    """
+    Columnar index of the row groups of a table. Each row group is a position in a set of
+    parallel numpy arrays: the index of the file it belongs to, its row group id inside that file,
+    and optionally its number of rows and its size in bytes (None when unknown).
+    Row groups are kept sorted by file, preserving the order of the row groups inside each file,
+    so the row groups of a file are always contiguous.
+    """
+
+    def __init__(self, file_ids, row_group_ids, num_rows=None, num_bytes=None):
+        file_ids = np.asarray(file_ids, dtype=np.int32)
+        row_group_ids = np.asarray(row_group_ids, dtype=np.int32)
+        order = np.argsort(file_ids, kind='stable')
+        self.file_ids = file_ids[order]
+        self.row_group_ids = row_group_ids[order]
+        self.num_rows = None if num_rows is None else np.asarray(num_rows, dtype=np.int64)[order]
+        self.num_bytes = None if num_bytes is None else np.asarray(num_bytes, dtype=np.int64)[order]
+
+    @classmethod
+    def from_metadata(cls, metadata):
+        """
+        Builds the index from the file_handle_index and row_group_index columns of a metadata table
+        (as returned by cio.parseMetadataCaller or cio.runSkipDataCaller). Rows with a file_handle_index
+        of -1 (files without row groups) are left out.
+        """
+        if metadata is None or len(metadata) == 0:
+            return cls([], [])
+        metadata_ids = metadata[['file_handle_index', 'row_group_index']].to_pandas()
+        file_ids = metadata_ids['file_handle_index'].values
+        row_group_ids = metadata_ids['row_group_index'].values
+        valid = file_ids != -1
+        return cls(file_ids[valid], row_group_ids[valid])
+
+    def __len__(self):
+        return len(self.file_ids)
+
+    def _file_starts(self):
+        if len(self.file_ids) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(([0], np.flatnonzero(np.diff(self.file_ids)) + 1))
+
+    def unique_file_ids(self):
+        """The indexes of the files that have at least one row group, in order."""
+        return self.file_ids[self._file_starts()]
+
+    def num_files(self):
+        return len(self._file_starts())
+
+    def row_groups_per_file(self):
+        """
+        The row group ids grouped by file, as a list with one list of row groups per file
+        (the row_groups_ids format that the engine expects).
+        """
+        if len(self.file_ids) == 0:
+            return []
+        return [row_groups.tolist() for row_groups in np.split(self.row_group_ids, self._file_starts()[1:])]
+
+    def keys(self):
+        """One int64 key per row group that identifies the (file, row group) pair."""
+        return (self.file_ids.astype(np.int64) << 32) | self.row_group_ids.astype(np.int64)
+
+    def with_sizes_from(self, sized_index):
+        """
+        Returns a copy of this index with the row counts and byte sizes looked up in sized_index.
+        Row groups that are not found in sized_index get the average size of the ones that were found.
+        """
+        if sized_index is None or len(self) == 0 or len(sized_index) == 0:
+            return self
+        sized_keys = sized_index.keys()
+        order = np.argsort(sized_keys)
+        sorted_keys = sized_keys[order]
+        keys = self.keys()
+        positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+        found = sorted_keys[positions] == keys
+        sizes = []
+        for values in (sized_index.num_rows, sized_index.num_bytes):
+            if values is None:
+                sizes.append(None)
+                continue
+            values = values[order][positions]
+            default = int(values[found].mean()) if found.any() else 1
+            sizes.append(np.where(found, values, default))
+        return RowGroupIndex(self.file_ids, self.row_group_ids, sizes[0], sizes[1])
+
+    def weights(self, slicing):
+        """
+        The work weight of each row group for the given slicing strategy ('bytes' or 'rows'). If the
+        requested size is unknown the other one is used, and if no size is known all row groups weight the same.
+        """
+        if slicing == 'rows':
+            candidates = (self.num_rows, self.num_bytes)
+        else:
+            candidates = (self.num_bytes, self.num_rows)
+        for values in candidates:
+            if values is not None:
+                return values.astype(np.float64)
+        return np.ones(len(self), dtype=np.float64)
+
+    def take(self, positions):
+        """Returns a new index with the row groups at the given positions (or boolean mask)."""
+        return RowGroupIndex(
+            self.file_ids[positions],
+            self.row_group_ids[positions],
+            None if self.num_rows is None else self.num_rows[positions],
+            None if self.num_bytes is None else self.num_bytes[positions])
+
+    def split(self, num_slices):
+        """
+        Splits the row groups into num_slices contiguous slices with (almost) the same number of row groups.
+        """
+        slices = []
+        remaining = len(self)
+        start_index = 0
+        for i in range(0, num_slices):
+            batch_size = int(remaining / (num_slices - i))
+            slices.append(self.take(slice(start_index, start_index + batch_size)))
+            start_index = start_index + batch_size
+            remaining = remaining - batch_size
+        return slices
+
+    def split_balanced(self, num_slices, slicing):
+        """
+        Splits the row groups into num_slices slices with (almost) the same total weight, using
+        longest processing time first (LPT) bin packing. Files are kept whole unless they weight more than
+        the target weight of a slice, in which case their row groups are packed independently.
+        Returns the slices and the expected imbalance factor (heaviest slice over average slice).
+        """
+        if len(self) == 0 or num_slices <= 1:
+            return self.split(num_slices), 1.0
+
+        weights = self.weights(slicing)
+        target = weights.sum() / num_slices
+
+        # every file is a packing unit, except files heavier than a slice, where every row group is a unit
+        file_starts = self._file_starts()
+        file_weights = np.add.reduceat(weights, file_starts)
+        file_sizes = np.diff(np.append(file_starts, len(self)))
+        split_file = np.repeat(file_weights > target, file_sizes)
+        unit_starts = split_file.copy()
+        unit_starts[file_starts] = True
+        unit_ids = np.cumsum(unit_starts) - 1
+        unit_weights = np.bincount(unit_ids, weights=weights)
+
+        unit_assignment, loads = lpt_assign(unit_weights, num_slices)
+        assignment = unit_assignment[unit_ids]
+        slices = [self.take(assignment == slice_index) for slice_index in range(num_slices)]
+
+        average_load = sum(loads) / num_slices
+        imbalance = max(loads) / average_load if average_load > 0 else 1.0
+        return slices, imbalance
+
+
+def lpt_assign(weights, num_bins):
+    """
+    Longest processing time first: assigns every weight, from heaviest to lightest, to the bin with the
+    lowest load so far. Returns the bin of every weight and the final load of every bin.
+    """
+    assignment = np.empty(len(weights), dtype=np.int32)
+    heap = [(0.0, bin_index) for bin_index in range(num_bins)]
+    for position in np.argsort(-weights, kind='stable'):
+        load, bin_index = heapq.heappop(heap)
+        assignment[position] = bin_index
+        heapq.heappush(heap, (load + weights[position], bin_index))
+    loads = [0.0] * num_bins
+    for load, bin_index in heap:
+        loads[bin_index] = load
+    return assignment, loads
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('cio')
+
+from pyblazing.apiv2 import filesystem
+from pyblazing.apiv2.filesystem import registerFileSystem
+
+
+class FakeClient(object):
+    """Runs the function once per worker, like dask's Client.run, each worker with its own registration."""
+
+    def __init__(self, workers):
+        self.workers = workers
+
+    def run(self, function, *args):
+        results = {}
+        for worker, register in self.workers.items():
+            filesystem.cio.registerFileSystemCaller = register
+            results[worker] = asyncio.run(function(*args))
+        return results
+
+
+def registered(fs, root, prefix):
+    return True, b'registered ' + prefix.encode('utf-8')
+
+
+def failed(fs, root, prefix):
+    return False, b'could not connect'
+
+
+def raised(fs, root, prefix):
+    raise IOError('connection refused')
+
+
+@pytest.fixture(autouse=True)
+def keep_cio(monkeypatch):
+    monkeypatch.setattr(filesystem.cio, 'registerFileSystemCaller', registered, raising=False)
+
+
+def test_all_the_workers_register():
+    client = FakeClient({'tcp://a': registered, 'tcp://b': registered})
+
+    ok, msg, fs = registerFileSystem(client, {'type': 'local'}, '/', 'data')
+
+    assert ok
+    assert msg == 'registered data'
+
+
+def test_the_errors_of_every_worker_are_collected():
+    client = FakeClient({'tcp://a': raised, 'tcp://b': registered, 'tcp://c': failed})
+
+    ok, msg, fs = registerFileSystem(client, {'type': 'local'}, '/', 'data')
+
+    assert not ok
+    assert msg.split('\n') == ['connection refused with dask worker tcp://a',
+                               'could not connect with dask worker tcp://c']
@@ -0,0 +1,230 @@
+import pytest
+
+pytest.importorskip('cudf')
+pytest.importorskip('pyhive')
+
+from TCLIService.ttypes import TOperationState
+
+from pyblazing.apiv2 import hive
+from pyblazing.apiv2.hive import HiveCursorPool, HiveMetadataCache, getHiveTablesMetadata, waitForHiveOperation
+
+
+class FakePollResult(object):
+    def __init__(self, operationState):
+        self.operationState = operationState
+
+
+class FakeCursor(object):
+    """Has the parts of a pyhive cursor that are used, its operations run for running_polls polls."""
+
+    def __init__(self, running_polls=0):
+        self.running_polls = running_polls
+        self.polls = 0
+        self.closed = False
+
+    def poll(self):
+        self.polls = self.polls + 1
+        if self.polls <= self.running_polls:
+            return FakePollResult(TOperationState.RUNNING_STATE)
+        return FakePollResult(TOperationState.FINISHED_STATE)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.opened_cursor = FakeCursor()
+
+    def cursor(self):
+        return self.opened_cursor
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(hive.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """Replaces the metastore queries, keeps the (cursor, table, database) of every fetch."""
+    fetches = []
+
+    def fetch(cursor, tableName, hive_database_name):
+        fetches.append((cursor, tableName, hive_database_name))
+        return {'location': '/data/' + tableName}, {}
+
+    monkeypatch.setattr(hive, 'fetchHiveTableMetadata', fetch)
+    return fetches
+
+
+def test_metadata_cache_entries_expire_after_the_ttl(clock):
+    cache = HiveMetadataCache(60)
+    assert cache.get('default', 't') is None
+
+    cache.put('default', 't', {'location': '/data/t'}, {'p=1': []})
+    clock[0] += 30
+    assert cache.get('default', 't') == ({'location': '/data/t'}, {'p=1': []})
+
+    clock[0] += 31
+    assert cache.get('default', 't') is None
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+
+def test_metadata_cache_returns_copies():
+    cache = HiveMetadataCache(60)
+    cache.put('default', 't', {'location': '/data/t'}, {})
+
+    schema, partitions = cache.get('default', 't')
+    schema['partitions'] = {}
+
+    assert cache.get('default', 't')[0] == {'location': '/data/t'}
+
+
+def test_metadata_cache_with_zero_ttl_keeps_nothing():
+    cache = HiveMetadataCache(0)
+    cache.put('default', 't', {}, {})
+
+    assert cache.get('default', 't') is None
+    assert cache.entries == {}
+
+
+def test_metadata_cache_invalidate():
+    cache = HiveMetadataCache(60)
+    cache.put('default', 't1', {}, {})
+    cache.put('default', 't2', {}, {})
+    cache.put('other', 't1', {}, {})
+
+    cache.invalidate('default', 't1')
+    assert sorted(cache.entries.keys()) == [('default', 't2'), ('other', 't1')]
+    cache.invalidate(tableName='t1')
+    assert list(cache.entries.keys()) == [('default', 't2')]
+    cache.invalidate()
+    assert cache.entries == {}
+
+
+def test_cursor_pool_reuses_the_idle_cursors():
+    opened = []
+
+    def connect():
+        opened.append(FakeCursor())
+        return opened[-1]
+
+    pool = HiveCursorPool(connect, size=2)
+    with pool.cursor() as first:
+        with pool.cursor() as second:
+            assert first is not second
+    with pool.cursor() as third:
+        assert third in (first, second)
+    assert len(opened) == 2
+
+    pool.close()
+    assert all(cursor.closed for cursor in opened)
+
+
+def test_cursor_pool_takes_the_cursor_of_a_connection():
+    connection = FakeConnection()
+    pool = HiveCursorPool(lambda: connection)
+
+    with pool.cursor() as cursor:
+        assert cursor is connection.opened_cursor
+
+
+def test_cursor_pool_does_not_count_the_cursors_that_failed_to_open():
+    def connect():
+        raise IOError('metastore is down')
+
+    pool = HiveCursorPool(connect, size=1)
+    with pytest.raises(IOError):
+        with pool.cursor():
+            pass
+    assert pool.opened == 0
+
+
+def test_wait_for_hive_operation_backs_off(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(hive.time, 'sleep', sleeps.append)
+    cursor = FakeCursor(running_polls=6)
+
+    status = waitForHiveOperation(cursor, initial_interval=0.1, max_interval=0.5)
+
+    assert status == TOperationState.FINISHED_STATE
+    assert sleeps == pytest.approx([0.1, 0.2, 0.4, 0.5, 0.5, 0.5])
+    assert cursor.polls == 7
+
+
+def test_tables_metadata_keeps_the_order_of_the_tables(fetched):
+    cursor = FakeCursor()
+    pool = HiveCursorPool(FakeCursor, size=2)
+    tables = [(cursor, 't1', 'default'), (pool, 't2', 'default'), (cursor, 't3', 'other')]
+
+    metadata = getHiveTablesMetadata(tables)
+
+    assert [schema['location'] for schema, partitions in metadata] == ['/data/t1', '/data/t2', '/data/t3']
+    assert sorted((tableName, database) for _, tableName, database in fetched) == [
+        ('t1', 'default'), ('t2', 'default'), ('t3', 'other')]
+    # the plain cursor is used as it is
+    assert [fetch[0] for fetch in fetched if fetch[1] != 't2'] == [cursor, cursor]
+
+
+def test_tables_metadata_refresh_is_per_table(fetched):
+    cache = HiveMetadataCache(60)
+    cursor = FakeCursor()
+    tables = [(cursor, 't1', 'default'), (cursor, 't2', 'default')]
+    getHiveTablesMetadata(tables, cache)
+    assert len(fetched) == 2
+
+    getHiveTablesMetadata(tables, cache, [True, False])
+
+    assert len(fetched) == 3
+    assert fetched[-1][1] == 't1'
+
+
+class FakeDirectoryLister(object):
+    """Lists the folders of a fake tree of partition folders, keeps the directories of every call."""
+
+    def __init__(self, folders):
+        self.folders = folders
+        self.calls = []
+
+    def __call__(self, directories):
+        self.calls.append(directories)
+        names = []
+        for directory in directories:
+            prefix = directory + '/'
+            names.append(sorted(set(folder[len(prefix):].split('/')[0] + '/'
+                                    for folder in self.folders if folder.startswith(prefix))))
+        return names
+
+
+def test_enumerate_user_partitions_only_lists_the_wanted_folders():
+    lister = FakeDirectoryLister(['/data/t/year=2025/region=eu', '/data/t/year=2025/region=us',
+                                  '/data/t/year=2026/region=eu', '/data/t/year=2027/region=eu'])
+    user_partitions = {'year': [2025, 2026, 2028], 'region': ['eu']}
+
+    partitions = list(hive.enumerateUserPartitions(user_partitions, '/data/t/', lister))
+
+    assert partitions == [('year=2025/region=eu', [('year', '2025'), ('region', 'eu')]),
+                          ('year=2026/region=eu', [('year', '2026'), ('region', 'eu')])]
+    # one call per level, the folders of the values that do not exist are not listed
+    assert lister.calls == [['/data/t'], ['/data/t/year=2025', '/data/t/year=2026']]
+
+
+def test_enumerate_user_partitions_lists_the_last_level_in_chunks():
+    lister = FakeDirectoryLister(['/data/t/a=1/b=x', '/data/t/a=2/b=x', '/data/t/a=3/b=y'])
+    user_partitions = {'a': [1, 2, 3], 'b': ['x']}
+
+    partitions = list(hive.enumerateUserPartitions(user_partitions, '/data/t', lister, chunk_size=2))
+
+    assert [name for name, values in partitions] == ['a=1/b=x', 'a=2/b=x']
+    assert lister.calls == [['/data/t'], ['/data/t/a=1', '/data/t/a=2'], ['/data/t/a=3']]
+
+
+def test_enumerate_user_partitions_without_matches():
+    lister = FakeDirectoryLister(['/data/t/a=1/b=x'])
+
+    assert list(hive.enumerateUserPartitions({'a': [5], 'b': ['x']}, '/data/t', lister)) == []
+    assert list(hive.enumerateUserPartitions({}, '/data/t', lister)) == []
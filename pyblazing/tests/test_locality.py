@@ -0,0 +1,102 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cio')
+
+from pyblazing.apiv2 import locality
+from pyblazing.apiv2.locality import HdfsBlockLocationProvider, assign_by_locality, get_file_sizes
+
+
+class FakeBlockLocationProvider(object):
+    """Returns fixed block locations and keeps the files it was asked for."""
+
+    def __init__(self, block_locations):
+        self.block_locations = block_locations
+        self.requested_files = []
+
+    def get_block_locations(self, files):
+        self.requested_files.append(files)
+        return self.block_locations
+
+
+def block(file_index, length, hosts, offset=0):
+    return {'file_index': file_index, 'offset': offset, 'length': length, 'hosts': hosts}
+
+
+@pytest.fixture(autouse=True)
+def hosts_are_ips(monkeypatch):
+    # the hosts of the tests are not resolvable
+    monkeypatch.setattr(locality, 'resolve_host', lambda host: host)
+
+
+def test_units_go_to_the_worker_of_their_host():
+    provider = FakeBlockLocationProvider([block(0, 100, ['host_a']),
+                                          block(1, 100, ['host_b']),
+                                          block(2, 100, ['host_a']),
+                                          block(3, 100, ['host_b'])])
+    block_locations = provider.get_block_locations(['hdfs://f0', 'hdfs://f1', 'hdfs://f2', 'hdfs://f3'])
+
+    assignment, loads, local_fraction = assign_by_locality([0, 1, 2, 3], [100, 100, 100, 100],
+                                                           block_locations, ['host_a', 'host_b'])
+
+    assert list(assignment) == [0, 1, 0, 1]
+    assert loads == [200, 200]
+    assert local_fraction == 1.0
+
+
+def test_local_workers_are_not_overloaded():
+    # all the data is in host_a, but host_b has to take its share
+    block_locations = [block(file_index, 100, ['host_a']) for file_index in range(4)]
+
+    assignment, loads, local_fraction = assign_by_locality([0, 1, 2, 3], [100, 100, 100, 100],
+                                                           block_locations, ['host_a', 'host_b'], slack=0.0)
+
+    assert sorted(loads) == [200, 200]
+    assert list(assignment).count(0) == 2
+    assert local_fraction == 0.5
+
+
+def test_units_without_blocks_are_balanced():
+    assignment, loads, local_fraction = assign_by_locality([0, 1, 2], [300, 200, 100], [], ['host_a', 'host_b'])
+
+    assert list(assignment) == [0, 1, 1]
+    assert loads == [300, 300]
+    assert local_fraction == 0.0
+
+
+def test_row_groups_of_a_file_split_by_its_blocks():
+    block_locations = [block(0, 50, ['host_a']), block(0, 50, ['host_b'], offset=50)]
+
+    assignment, loads, local_fraction = assign_by_locality([0, 0], [50, 50], block_locations, ['host_a', 'host_b'])
+
+    assert sorted(assignment) == [0, 1]
+    assert local_fraction == 0.5
+
+
+def test_no_workers():
+    assignment, loads, local_fraction = assign_by_locality([0], [10], [], [])
+
+    assert list(assignment) == [-1]
+    assert loads == []
+
+
+def test_file_sizes_from_blocks():
+    block_locations = [block(0, 10, ['host_a']), block(0, 5, ['host_a'], offset=10), block(2, 7, ['host_b'])]
+
+    assert list(get_file_sizes(block_locations, 3)) == [15, 0, 7]
+
+
+def test_hdfs_provider_takes_the_files_as_bytes(monkeypatch):
+    requested_files = []
+
+    def get_block_locations(files):
+        requested_files.extend(files)
+        return [block(0, 10, ['host_a'])]
+
+    monkeypatch.setattr(locality.cio, 'getBlockLocationsCaller', get_block_locations, raising=False)
+    provider = HdfsBlockLocationProvider()
+
+    assert provider.get_block_locations([b'/local/file.parquet']) == []
+    assert requested_files == []
+    assert provider.get_block_locations([b'hdfs://data/file.parquet']) == [block(0, 10, ['host_a'])]
+    assert requested_files == ['hdfs://data/file.parquet']
@@ -0,0 +1,131 @@
+import os
+
+import pytest
+
+cudf = pytest.importorskip('cudf')
+pytest.importorskip('cio')
+
+from pyblazing.apiv2 import metadata_cache
+from pyblazing.apiv2.metadata_cache import MetadataCache, get_fingerprint, parseMetadataWithCache
+
+schema = {'names': ['a'], 'types': [3]}
+
+
+def make_metadata(file_handle_index, num_row_groups, min_value=0):
+    return cudf.DataFrame({'file_handle_index': [file_handle_index] * num_row_groups,
+                           'row_group_index': list(range(num_row_groups)),
+                           'min_0_a': [min_value + i for i in range(num_row_groups)]})
+
+
+def make_table(num_row_groups):
+    return make_metadata(0, num_row_groups).to_arrow(preserve_index=False)
+
+
+def file_info(size, modification_time):
+    return {'size': size, 'modification_time': modification_time, 'exists': True}
+
+
+def test_get_returns_what_was_put(tmpdir):
+    cache = MetadataCache(str(tmpdir), 1 << 20)
+    assert cache.get('/data/a.parquet', 'v1') is None
+
+    cache.put('/data/a.parquet', 'v1', make_table(2))
+
+    assert cache.get('/data/a.parquet', 'v1')['min_0_a'].to_pylist() == [0, 1]
+    assert cache.get('/data/a.parquet', 'v2') is None
+
+
+def test_put_removes_the_entries_of_older_versions(tmpdir):
+    cache = MetadataCache(str(tmpdir), 1 << 20)
+    cache.put('/data/a.parquet', 'v1', make_table(2))
+    cache.put('/data/a.parquet', 'v2', make_table(3))
+
+    assert cache.get('/data/a.parquet', 'v1') is None
+    assert len(cache.get('/data/a.parquet', 'v2')) == 3
+    assert os.listdir(cache._uri_dir('/data/a.parquet')) == [os.path.basename(cache._entry_path('/data/a.parquet', 'v2'))]
+
+
+def test_invalidate(tmpdir):
+    cache = MetadataCache(str(tmpdir), 1 << 20)
+    cache.put('/data/a.parquet', 'v1', make_table(1))
+    cache.put('/data/b.parquet', 'v1', make_table(1))
+
+    cache.invalidate(['/data/a.parquet'])
+    assert cache.get('/data/a.parquet', 'v1') is None
+    assert cache.get('/data/b.parquet', 'v1') is not None
+
+    cache.invalidate()
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_evict_removes_the_least_recently_used_entries(tmpdir):
+    cache = MetadataCache(str(tmpdir), 1 << 20)
+    for index, uri in enumerate(['/data/a.parquet', '/data/b.parquet', '/data/c.parquet']):
+        cache.put(uri, 'v1', make_table(1))
+        os.utime(cache._entry_path(uri, 'v1'), (index, index))
+    entry_size = os.path.getsize(cache._entry_path('/data/a.parquet', 'v1'))
+    cache.get('/data/a.parquet', 'v1')
+
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+
+    assert cache.get('/data/b.parquet', 'v1') is None
+    assert cache.get('/data/a.parquet', 'v1') is not None
+    assert cache.get('/data/c.parquet', 'v1') is not None
+    assert not os.path.exists(cache._uri_dir('/data/b.parquet'))
+
+
+def test_fingerprint_changes_with_the_file_and_the_schema():
+    fingerprint = get_fingerprint(file_info(100, 1), schema, 'parquet')
+
+    assert fingerprint != get_fingerprint(file_info(100, 2), schema, 'parquet')
+    assert fingerprint != get_fingerprint(file_info(101, 1), schema, 'parquet')
+    assert fingerprint != get_fingerprint(file_info(100, 1), {'names': ['a'], 'types': [4]}, 'parquet')
+
+
+@pytest.fixture
+def fake_cio(monkeypatch):
+    """The files have one row group each, their metadata min is their position in files_info."""
+    files_info = {}
+    parsed = []
+
+    def get_file_info(files):
+        return [files_info[file] for file in files]
+
+    def parse_metadata(files, offset, schema, file_format_hint, args):
+        parsed.append(list(files))
+        frames = [make_metadata(index, 1, list(files_info.keys()).index(file) * 10) for index, file in enumerate(files)]
+        return cudf.concat(frames, ignore_index=True)
+
+    monkeypatch.setattr(metadata_cache.cio, 'getFileInfoCaller', get_file_info, raising=False)
+    monkeypatch.setattr(metadata_cache.cio, 'parseMetadataCaller', parse_metadata, raising=False)
+    return files_info, parsed
+
+
+def test_only_the_files_not_cached_are_parsed(tmpdir, fake_cio):
+    files_info, parsed = fake_cio
+    files = ['/data/a.parquet', '/data/b.parquet']
+    files_info[files[0]] = file_info(100, 1)
+    files_info[files[1]] = file_info(100, 1)
+    cache_dir = str(tmpdir)
+
+    first = parseMetadataWithCache(files, (4, 2), schema, 'parquet', {}, cache_dir, 1 << 20)
+    files_info[files[1]] = file_info(200, 2)
+    second = parseMetadataWithCache(files, (4, 2), schema, 'parquet', {}, cache_dir, 1 << 20)
+
+    assert parsed == [files, ['/data/b.parquet']]
+    assert isinstance(second, cudf.DataFrame)
+    assert first['file_handle_index'].tolist() == [4, 5]
+    assert second['file_handle_index'].tolist() == [4, 5]
+    assert second['min_0_a'].tolist() == [0, 10]
+
+
+def test_files_without_modification_time_are_not_cached(tmpdir, fake_cio):
+    files_info, parsed = fake_cio
+    files_info['/data/a.parquet'] = file_info(100, 0)
+
+    parseMetadataWithCache(['/data/a.parquet'], (0, 1), schema, 'parquet', {}, str(tmpdir), 1 << 20)
+    parseMetadataWithCache(['/data/a.parquet'], (0, 1), schema, 'parquet', {}, str(tmpdir), 1 << 20)
+
+    assert len(parsed) == 2
+    assert os.listdir(str(tmpdir)) == []
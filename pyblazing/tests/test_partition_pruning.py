@@ -0,0 +1,110 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+from pyblazing.apiv2.partition_pruning import get_named_expression, parse_calcite_expression, prune_partitions
+
+
+def test_parse_quoted_and_unquoted_literals():
+    assert parse_calcite_expression("=($3, 'it''s')") == ('call', '=', [('input', 3), ('literal', "it's", True)])
+    assert parse_calcite_expression('>($0, 5)') == ('call', '>', [('input', 0), ('literal', '5', False)])
+
+
+def test_parse_drops_type_suffixes():
+    tree = parse_calcite_expression("AND(=($1, 'a':VARCHAR), <($0, 10.5:DECIMAL(10, 2)))")
+
+    assert tree == ('call', 'AND', [('call', '=', [('input', 1), ('literal', 'a', True)]),
+                                    ('call', '<', [('input', 0), ('literal', '10.5', False)])])
+
+
+def test_parse_keeps_the_colons_of_timestamps():
+    tree = parse_calcite_expression('>=($2, 2026-10-01 10:00:00:TIMESTAMP(0))')
+
+    assert tree == ('call', '>=', [('input', 2), ('literal', '2026-10-01 10:00:00', False)])
+
+
+def test_parse_cast_and_is_null():
+    assert parse_calcite_expression('=(CAST($1):INTEGER, 3)') == (
+        'call', '=', [('call', 'CAST', [('input', 1)]), ('literal', '3', False)])
+    assert parse_calcite_expression('IS NULL($0)') == ('call', 'IS NULL', [('input', 0)])
+
+
+def test_parse_errors():
+    with pytest.raises(ValueError):
+        parse_calcite_expression("=($0, 'unterminated)")
+    with pytest.raises(ValueError):
+        parse_calcite_expression('=($0, 1) extra')
+
+
+def test_named_expressions_of_a_scan():
+    scan = "BindableTableScan(table=[[main, t]], filters=[[AND(=($0, 'a]b'), >($1, 2))]], projects=[[0, 2]])"
+
+    assert get_named_expression(scan, 'filters') == "AND(=($0, 'a]b'), >($1, 2))"
+    assert get_named_expression(scan, 'projects') == '0, 2'
+    assert get_named_expression(scan, 'aliases') == ''
+
+
+# the table has the columns a, year and region, the last two are the partition columns
+column_names = ['a', 'year', 'region']
+partitions = {
+    'year=2025/region=eu': [('year', '2025'), ('region', 'eu')],
+    'year=2026/region=eu': [('year', '2026'), ('region', 'eu')],
+    'year=2026/region=us': [('year', '2026'), ('region', 'us')],
+    'year=__HIVE_DEFAULT_PARTITION__/region=us': [('year', '__HIVE_DEFAULT_PARTITION__'), ('region', 'us')],
+}
+
+
+def pruned(filters, projects=None):
+    scan = 'BindableTableScan(table=[[main, t]], filters=[[' + filters + ']]'
+    if projects is not None:
+        scan = scan + ', projects=[[' + projects + ']]'
+    return sorted(prune_partitions(partitions, scan + ')', column_names).keys())
+
+
+def test_prune_comparisons():
+    assert pruned('>($1, 2025)') == ['year=2026/region=eu', 'year=2026/region=us']
+    assert pruned("=($2, 'us')") == ['year=2026/region=us', 'year=__HIVE_DEFAULT_PARTITION__/region=us']
+    # unquoted literals are compared as numbers, quoted ones as strings
+    assert pruned('=($1, 2026.0)') == ['year=2026/region=eu', 'year=2026/region=us']
+    assert pruned("=($1, '2026.0')") == []
+
+
+def test_prune_with_the_columns_of_the_projection():
+    assert pruned("=($0, 'eu')", projects='2, 0') == ['year=2025/region=eu', 'year=2026/region=eu']
+
+
+def test_prune_cast():
+    assert pruned('=(CAST($1):INTEGER, 2025)') == ['year=2025/region=eu']
+
+
+def test_prune_is_null_on_the_default_partition():
+    assert pruned('IS NULL($1)') == ['year=__HIVE_DEFAULT_PARTITION__/region=us']
+    assert pruned('IS NOT NULL($1)') == ['year=2025/region=eu', 'year=2026/region=eu', 'year=2026/region=us']
+
+
+def test_prune_and_or_not():
+    assert pruned("AND(=($1, 2026), =($2, 'eu'))") == ['year=2026/region=eu']
+    assert pruned("OR(=($1, 2025), =($2, 'us'))") == [
+        'year=2025/region=eu', 'year=2026/region=us', 'year=__HIVE_DEFAULT_PARTITION__/region=us']
+    assert pruned("NOT(=($2, 'eu'))") == ['year=2026/region=us', 'year=__HIVE_DEFAULT_PARTITION__/region=us']
+
+
+def test_filters_on_data_columns_keep_the_partitions():
+    # the partitions can not be pruned by the data, OR with a data column keeps them all
+    assert pruned('>($0, 1)') == sorted(partitions.keys())
+    assert pruned('OR(>($0, 1), =($1, 2025))') == sorted(partitions.keys())
+    assert pruned('AND(>($0, 1), =($1, 2025))') == ['year=2025/region=eu']
+
+
+def test_timestamp_partitions():
+    timestamp_partitions = {
+        'ts=2026-10-01 09:00:00': [('ts', '2026-10-01 09:00:00')],
+        'ts=2026-10-01 11:00:00': [('ts', '2026-10-01 11:00:00')],
+    }
+    scan = 'BindableTableScan(table=[[main, t]], filters=[[>=($0, 2026-10-01 10:00:00:TIMESTAMP(0))]])'
+
+    assert list(prune_partitions(timestamp_partitions, scan, ['ts']).keys()) == ['ts=2026-10-01 11:00:00']
+
+
+def test_filters_that_do_not_parse_keep_all_the_partitions():
+    assert pruned("=($1, 'unterminated)") == sorted(partitions.keys())
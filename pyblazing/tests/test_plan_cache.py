@@ -0,0 +1,71 @@
+import pytest
+
+pytest.importorskip('cudf')
+pytest.importorskip('cio')
+pytest.importorskip('jpype')
+
+from pyblazing.apiv2.context import PlanCache, normalize_sql
+
+
+def test_normalize_collapses_the_whitespace_and_the_semicolon():
+    assert normalize_sql('  SELECT a,\n\tb  FROM t ;\n') == 'SELECT a, b FROM t'
+
+
+def test_normalize_keeps_the_quoted_text():
+    assert normalize_sql("SELECT a FROM t WHERE b = 'x  y'") == "SELECT a FROM t WHERE b = 'x  y'"
+    assert normalize_sql("SELECT 'it''s  here'") == "SELECT 'it''s  here'"
+    assert normalize_sql('SELECT "my  column"  FROM t') == 'SELECT "my  column" FROM t'
+    assert normalize_sql('SELECT "a""  b" FROM t') == 'SELECT "a""  b" FROM t'
+
+
+def test_normalize_strips_the_comments():
+    assert normalize_sql('SELECT a -- the a\n  FROM t; -- done') == 'SELECT a FROM t'
+    assert normalize_sql('SELECT a--no space\nFROM t') == 'SELECT a FROM t'
+    # inside quotes it is not a comment
+    assert normalize_sql("SELECT '-- x' FROM t") == "SELECT '-- x' FROM t"
+    assert normalize_sql('SELECT "--  x" FROM t') == 'SELECT "--  x" FROM t'
+
+
+def test_queries_that_only_differ_in_quoted_identifiers_do_not_share_a_plan():
+    cache = PlanCache(4)
+    cache.put('SELECT "a  b" FROM t', 0, 'algebra', 'plan')
+
+    assert cache.get('SELECT  "a  b"\nFROM t', 0) == ('algebra', 'plan')
+    assert cache.get('SELECT "a b" FROM t', 0) is None
+
+
+def test_the_least_recently_used_plan_is_evicted():
+    cache = PlanCache(2)
+    cache.put('SELECT 1', 0, 'a1', 'p1')
+    cache.put('SELECT 2', 0, 'a2', 'p2')
+    cache.get('SELECT 1', 0)
+    cache.put('SELECT 3', 0, 'a3', 'p3')
+
+    assert cache.get('SELECT 1', 0) == ('a1', 'p1')
+    assert cache.get('SELECT 2', 0) is None
+    assert cache.get('SELECT 3', 0) == ('a3', 'p3')
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['size'] == 2
+
+
+def test_a_new_catalog_version_invalidates_the_plans():
+    cache = PlanCache(4)
+    cache.put('SELECT a FROM t', 0, 'algebra', 'plan')
+
+    cache.invalidate(1)
+
+    assert cache.get('SELECT a FROM t', 0) is None
+    assert cache.get('SELECT a FROM t', 1) is None
+    assert cache.stats()['evictions'] == 1
+    # a plan generated with the old catalog is not stored
+    cache.put('SELECT a FROM t', 0, 'algebra', 'plan')
+    assert cache.stats()['size'] == 0
+    cache.put('SELECT a FROM t', 1, 'algebra', 'plan')
+    assert cache.get('SELECT a FROM t', 1) == ('algebra', 'plan')
+
+
+def test_a_zero_size_cache_keeps_nothing():
+    cache = PlanCache(0)
+    cache.put('SELECT 1', 0, 'algebra', 'plan')
+
+    assert cache.get('SELECT 1', 0) is None
@@ -0,0 +1,156 @@
+import os
+
+import pytest
+
+cudf = pytest.importorskip('cudf')
+pytest.importorskip('cio')
+
+from pyblazing.apiv2 import result_cache
+from pyblazing.apiv2.result_cache import ResultCache, get_result_cache_key
+
+
+def make_result(num_rows):
+    return cudf.DataFrame({'a': list(range(num_rows))})
+
+
+def result_bytes(num_rows):
+    return make_result(num_rows).to_arrow(preserve_index=False).nbytes
+
+
+def test_get_returns_what_was_put():
+    cache = ResultCache(max_bytes=1 << 20)
+    assert cache.get('key') is None
+
+    cache.put('key', make_result(10), ['t'])
+
+    assert cache.get('key').to_pandas()['a'].tolist() == list(range(10))
+    stats = cache.stats()
+    assert stats['entries'] == 1
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+
+
+def test_least_recently_used_results_are_evicted():
+    cache = ResultCache(max_bytes=2 * result_bytes(100))
+    cache.put('first', make_result(100), ['t'])
+    cache.put('second', make_result(100), ['t'])
+    cache.get('first')
+
+    cache.put('third', make_result(100), ['t'])
+
+    assert cache.get('second') is None
+    assert cache.get('first') is not None
+    assert cache.get('third') is not None
+    assert cache.stats()['memory_bytes'] == 2 * result_bytes(100)
+
+
+def test_results_bigger_than_the_cache_are_not_kept():
+    cache = ResultCache(max_bytes=result_bytes(10))
+    cache.put('key', make_result(1000), ['t'])
+
+    assert cache.stats()['entries'] == 0
+
+
+def test_evicted_results_are_spilled(tmpdir):
+    spill_dir = str(tmpdir.join('spill'))
+    cache = ResultCache(max_bytes=result_bytes(100), spill_dir=spill_dir, max_spill_bytes=1 << 20)
+    cache.put('first', make_result(100), ['t'])
+    cache.put('second', make_result(100), ['t'])
+
+    assert os.listdir(spill_dir) == ['first.arrow']
+    assert cache.stats()['disk_bytes'] == result_bytes(100)
+    assert len(cache.get('first')) == 100
+
+    cache.invalidate_keys(['first'])
+    assert os.listdir(spill_dir) == []
+    assert cache.stats()['disk_bytes'] == 0
+
+
+def test_results_are_invalidated_by_their_tables():
+    cache = ResultCache(max_bytes=1 << 20, log_size=100)
+    cache.put('orders', make_result(10), ['orders'])
+    cache.put('join', make_result(10), ['orders', 'customer'])
+    cache.put('nation', make_result(10), ['nation'])
+
+    cache.invalidate_tables(['customer'])
+
+    assert cache.get('join') is None
+    assert cache.get('orders') is not None
+    assert cache.get('nation') is not None
+
+    events = cache.log_table()['event'].tolist()
+    assert events.count('store') == 3
+    assert events.count('invalidate') == 1
+
+
+def test_the_log_keeps_the_last_events():
+    cache = ResultCache(max_bytes=1 << 20, log_size=3)
+    assert len(cache.log_table()) == 0
+    for key in ['a', 'b', 'c', 'd']:
+        cache.get(key)
+
+    log = cache.log_table()
+    assert log['cache_key'].tolist() == ['b', 'c', 'd']
+    assert log['misses'].tolist() == [2, 3, 4]
+    assert ResultCache(max_bytes=1 << 20).log_table() is None
+
+
+class FakeTable(object):
+    def __init__(self, name, input=None):
+        self.name = name
+        self.input = input
+
+
+class FakeTableSlice(object):
+    def __init__(self, files, row_groups_ids=None):
+        self.files = files
+        self.row_groups_ids = row_groups_ids or []
+
+
+@pytest.fixture
+def file_info(monkeypatch):
+    files_info = {}
+
+    def get_file_info(files):
+        return [{'uri': file, 'size': files_info[file][0], 'modification_time': files_info[file][1], 'exists': True}
+                for file in files]
+
+    monkeypatch.setattr(result_cache.cio, 'getFileInfoCaller', get_file_info, raising=False)
+    return files_info
+
+
+def test_key_gets_the_files_of_all_the_tables_at_once(file_info, monkeypatch):
+    file_info['/data/a.parquet'] = (100, 1)
+    file_info['/data/b.parquet'] = (200, 1)
+    calls = []
+    get_file_info = result_cache.cio.getFileInfoCaller
+    monkeypatch.setattr(result_cache.cio, 'getFileInfoCaller', lambda files: calls.append(files) or get_file_info(files))
+    tables = [FakeTable('a'), FakeTable('b')]
+
+    key = get_result_cache_key('plan', tables, [FakeTableSlice([b'/data/a.parquet']), FakeTableSlice(['/data/b.parquet'])])
+
+    assert calls == [['/data/a.parquet', '/data/b.parquet']]
+    file_info['/data/b.parquet'] = (201, 1)
+    assert key != get_result_cache_key('plan', tables, [FakeTableSlice([b'/data/a.parquet']), FakeTableSlice(['/data/b.parquet'])])
+
+
+def test_key_changes_with_the_files(file_info):
+    file_info['/data/a.parquet'] = (100, 1)
+    tables = [FakeTable('a')]
+    key = get_result_cache_key('plan', tables, [FakeTableSlice([b'/data/a.parquet'], [[0, 1]])])
+
+    assert key == get_result_cache_key('plan', tables, [FakeTableSlice([b'/data/a.parquet'], [[0, 1]])])
+    assert key != get_result_cache_key('other plan', tables, [FakeTableSlice([b'/data/a.parquet'], [[0, 1]])])
+    assert key != get_result_cache_key('plan', tables, [FakeTableSlice([b'/data/a.parquet'], [[0]])])
+
+    file_info['/data/a.parquet'] = (100, 2)
+    assert key != get_result_cache_key('plan', tables, [FakeTableSlice([b'/data/a.parquet'], [[0, 1]])])
+
+
+def test_queries_over_in_memory_tables_have_no_key(file_info):
+    file_info['/data/a.parquet'] = (100, 1)
+    tables = [FakeTable('a'), FakeTable('df', make_result(10))]
+    table_slices = [FakeTableSlice([b'/data/a.parquet']), FakeTableSlice(None)]
+
+    assert get_result_cache_key('plan', tables, table_slices) is None
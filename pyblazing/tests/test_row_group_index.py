@@ -0,0 +1,81 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from pyblazing.apiv2.row_group_index import RowGroupIndex, lpt_assign
+
+
+def test_lpt_assigns_the_heaviest_first():
+    assignment, loads = lpt_assign(np.array([1.0, 5.0, 3.0, 3.0]), 2)
+
+    assert list(assignment) == [0, 0, 1, 1]
+    assert loads == [6.0, 6.0]
+
+
+def test_lpt_with_more_bins_than_weights():
+    assignment, loads = lpt_assign(np.array([2.0]), 3)
+
+    assert list(assignment) == [0]
+    assert loads == [2.0, 0.0, 0.0]
+
+
+def test_split_balanced_keeps_small_files_whole():
+    # four files of two row groups each, the files have different sizes
+    index = RowGroupIndex([0, 0, 1, 1, 2, 2, 3, 3], [0, 1] * 4,
+                          num_bytes=[40, 40, 10, 10, 30, 30, 20, 20])
+
+    slices, imbalance = index.split_balanced(2, 'bytes')
+
+    assert [sorted(sliced.unique_file_ids().tolist()) for sliced in slices] == [[0, 1], [2, 3]]
+    assert [sliced.row_groups_per_file() for sliced in slices] == [[[0, 1], [0, 1]], [[0, 1], [0, 1]]]
+    assert imbalance == 1.0
+
+
+def test_split_balanced_splits_files_heavier_than_a_slice():
+    index = RowGroupIndex([0, 0, 0, 0, 1], [0, 1, 2, 3, 0], num_bytes=[25, 25, 25, 25, 20])
+
+    slices, imbalance = index.split_balanced(2, 'bytes')
+
+    loads = [int(sliced.num_bytes.sum()) for sliced in slices]
+    assert sorted(loads) == [50, 70]
+    assert imbalance == pytest.approx(70 / 60)
+    assert sum(len(sliced) for sliced in slices) == len(index)
+
+
+def test_split_balanced_by_rows():
+    index = RowGroupIndex([0, 1, 2], [0, 0, 0], num_rows=[100, 10, 90], num_bytes=[1, 1000, 1])
+
+    by_rows, _ = index.split_balanced(2, 'rows')
+    by_bytes, _ = index.split_balanced(2, 'bytes')
+
+    assert sorted(sliced.unique_file_ids().tolist() for sliced in by_rows) == [[0], [1, 2]]
+    assert sorted(sliced.unique_file_ids().tolist() for sliced in by_bytes) == [[0, 2], [1]]
+
+
+def test_split_balanced_without_sizes_balances_row_group_counts():
+    index = RowGroupIndex([0, 0, 0, 1, 2, 3], [0, 1, 2, 0, 0, 0])
+
+    slices, imbalance = index.split_balanced(2, 'bytes')
+
+    assert sorted(len(sliced) for sliced in slices) == [3, 3]
+    assert imbalance == 1.0
+
+
+def test_split_balanced_with_one_slice():
+    index = RowGroupIndex([1, 0], [0, 0], num_bytes=[5, 10])
+
+    slices, imbalance = index.split_balanced(1, 'bytes')
+
+    assert len(slices) == 1
+    assert slices[0].unique_file_ids().tolist() == [0, 1]
+    assert imbalance == 1.0
+
+
+def test_sizes_are_looked_up_by_file_and_row_group():
+    index = RowGroupIndex([0, 0, 1], [0, 1, 0])
+    sized_index = RowGroupIndex([1, 0, 0], [0, 1, 0], num_rows=[30, 20, 10], num_bytes=[300, 200, 100])
+
+    sized = index.with_sizes_from(sized_index)
+
+    assert sized.num_rows.tolist() == [10, 20, 30]
+    assert sized.num_bytes.tolist() == [100, 200, 300]
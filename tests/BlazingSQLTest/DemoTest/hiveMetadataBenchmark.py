@@ -0,0 +1,103 @@
+from collections import namedtuple
+
+from TCLIService.ttypes import TOperationState
+
+from pyblazing.apiv2.context import get_uri_values, parseHiveMetadata
+from pyblazing.apiv2.hive import parseHiveDescribe, parseHivePartitions, convertHiveToCudf
+from DemoTest.chronometer import Chronometer
+
+# Benchmark of the Hive metadata handling of create_table with a synthetic table of 100k partitions
+# (dt x hour x region). Run from tests/BlazingSQLTest: python -m DemoTest.hiveMetadataBenchmark
+
+NUM_DAYS = 1000
+NUM_HOURS = 25
+NUM_REGIONS = 4
+LOCATION = '/data/warehouse/events'
+
+PollStatus = namedtuple('PollStatus', ['operationState'])
+
+
+class FakeHiveCursor:
+    """Serves canned results through the subset of the pyhive cursor API used by pyblazing."""
+
+    def __init__(self, results):
+        self.results = results
+        self.rows = []
+        self.position = 0
+        self.description = None
+
+    def execute(self, query, async_=False):
+        self.description, self.rows = self.results[query.split(' ')[0]]
+        self.position = 0
+
+    def poll(self):
+        return PollStatus(TOperationState.FINISHED_STATE)
+
+    def fetchall(self):
+        return self.fetchmany(len(self.rows))
+
+    def fetchmany(self, size):
+        rows = self.rows[self.position:self.position + size]
+        self.position = self.position + len(rows)
+        return rows
+
+
+class FakeTable:
+
+    def __init__(self, columns):
+        self.column_names = [name.encode() for name, dtype, is_partition in columns]
+        self.column_types = [dtype for name, dtype, is_partition in columns]
+
+
+def synthetic_describe():
+    return [('# col_name', 'data_type', 'comment'), ('', None, None),
+            ('user_id', 'bigint', ''), ('amount', 'double', ''), ('', None, None),
+            ('# Partition Information', None, None), ('# col_name', 'data_type', 'comment'), ('', None, None),
+            ('dt', 'date', ''), ('hour', 'int', ''), ('region', 'string', ''), ('', None, None),
+            ('# Detailed Table Information', None, None),
+            ('Location:', 'file:' + LOCATION, None),
+            ('InputFormat:', 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat', None)]
+
+
+def synthetic_partitions():
+    rows = []
+    for day in range(NUM_DAYS):
+        dt = str(2020 + day // 336) + '-' + str(day % 336 // 28 + 1).zfill(2) + '-' + str(day % 28 + 1).zfill(2)
+        for hour in range(NUM_HOURS):
+            for region in range(NUM_REGIONS):
+                rows.append(('dt=' + dt + '/hour=' + str(hour) + '/region=r' + str(region),))
+    return rows
+
+
+def main():
+    partition_rows = synthetic_partitions()
+    print('Partitions: %d' % len(partition_rows))
+
+    chronometer = Chronometer.makeStarted()
+    schema = parseHiveDescribe(synthetic_describe())
+    partitions = parseHivePartitions(partition_rows, schema)
+    Chronometer.show(chronometer, 'Parse show partitions')
+
+    files = [(LOCATION + '/' + name + '/part-0.parquet').encode() for name in partitions]
+    chronometer = Chronometer.makeStarted()
+    uri_values = get_uri_values(files, partitions, LOCATION)
+    Chronometer.show(chronometer, 'Partition values per file')
+
+    chronometer = Chronometer.makeStarted()
+    metadata = parseHiveMetadata(FakeTable(schema['columns']), uri_values)
+    Chronometer.show(chronometer, 'Partition min/max metadata')
+    print(metadata.dtypes)
+
+    events = [(user_id, user_id * 0.5, 'r' + str(user_id % NUM_REGIONS)) for user_id in range(len(partition_rows))]
+    description = [('events.user_id', 'BIGINT_TYPE'), ('events.amount', 'DOUBLE_TYPE'), ('events.region', 'STRING_TYPE')]
+    cursor = FakeHiveCursor({'select': (description, events)})
+    chronometer = Chronometer.makeStarted()
+    df = convertHiveToCudf(cursor, 'select * from events')
+    Chronometer.show(chronometer, 'convertHiveToCudf')
+    print(df.dtypes)
+
+    Chronometer.show_resume()
+
+
+if __name__ == '__main__':
+    main()